@@ -10,6 +10,7 @@ from werkzeug.exceptions import NotFound
 
 from configs import dify_config
 from constants.languages import languages
+from core.rag.datasource.retrieval_cache import RetrievalCache
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.index_processor.constant.built_in_field import BuiltInField
@@ -21,7 +22,14 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DatasetMetadata, DatasetMetadataBinding, DocumentSegment
+from models.dataset import (
+    Dataset,
+    DatasetCollectionBinding,
+    DatasetKeywordTable,
+    DatasetMetadata,
+    DatasetMetadataBinding,
+    DocumentSegment,
+)
 from models.dataset import Document as DatasetDocument
 from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
 from models.provider import Provider, ProviderModel
@@ -277,6 +285,7 @@ def migrate_knowledge_vector_database():
         VectorType.ELASTICSEARCH,
         VectorType.OPENGAUSS,
         VectorType.TABLESTORE,
+        VectorType.LOCAL,
     }
     lower_collection_vector_types = {
         VectorType.ANALYTICDB,
@@ -814,3 +823,61 @@ def clear_free_plan_tenant_expired_logs(days: int, batch: int, tenant_ids: list[
     ClearFreePlanTenantExpiredLogs.process(days, batch, tenant_ids)
 
     click.echo(click.style("Clear free plan tenant expired logs completed.", fg="green"))
+
+
+@click.command("migrate-keyword-postings", help="Migrate dataset keyword tables to keyword postings.")
+def migrate_keyword_postings():
+    """
+    Copy every dataset keyword table into the incremental `jieba_postings` keyword store.
+    """
+    from core.rag.datasource.keyword.jieba.jieba_postings import JiebaPostings
+
+    click.echo(click.style("Starting keyword postings migration.", fg="green"))
+    migrated_count = 0
+    page = 1
+    while True:
+        try:
+            keyword_tables = DatasetKeywordTable.query.order_by(DatasetKeywordTable.id).paginate(page=page, per_page=50)
+        except NotFound:
+            break
+
+        page += 1
+        for keyword_table in keyword_tables:
+            try:
+                dataset = db.session.query(Dataset).filter(Dataset.id == keyword_table.dataset_id).first()
+                keyword_table_dict = keyword_table.keyword_table_dict
+                if not dataset or not keyword_table_dict:
+                    continue
+                posting_count = JiebaPostings(dataset).import_keyword_table(keyword_table_dict["__data__"]["table"])
+                migrated_count += 1
+                click.echo(f"Migrated {posting_count} keyword postings for dataset {dataset.id}.")
+            except Exception:
+                db.session.rollback()
+                click.echo(
+                    click.style(f"Failed to migrate keyword postings for dataset {keyword_table.dataset_id}.", fg="red")
+                )
+                logging.exception(f"Failed to migrate keyword postings, dataset_id: {keyword_table.dataset_id}")
+
+        if not keyword_tables.has_next:
+            break
+
+    click.echo(click.style(f"Migrated keyword postings for {migrated_count} datasets.", fg="green"))
+
+
+@click.command("retrieval-cache-stats", help="Show the hit ratio of the retrieval cache.")
+@click.option("--reset", is_flag=True, help="Reset the counters after showing them.")
+def retrieval_cache_stats(reset: bool):
+    """
+    Show the hit, near-duplicate hit and miss counters of the retrieval cache.
+    """
+    stats = RetrievalCache.get_stats()
+    click.echo(
+        click.style(
+            "Retrieval cache hits: {hits}, semantic hits: {semantic_hits}, misses: {misses}, "
+            "hit ratio: {hit_ratio:.2%}".format(**stats),
+            fg="green",
+        )
+    )
+    if reset:
+        RetrievalCache.reset_stats()
+        click.echo(click.style("Retrieval cache counters reset.", fg="green"))
@@ -57,6 +57,11 @@ class AppExecutionConfig(BaseSettings):
         description="Maximum allowed execution time for the application in seconds",
         default=1200,
     )
+    APP_STOP_CHECK_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds at which running tasks poll redis for a stop request,"
+        " as a fallback to the stop messages pushed over redis pub/sub",
+        default=5,
+    )
     APP_MAX_ACTIVE_REQUESTS: NonNegativeInt = Field(
         description="Maximum number of concurrent active requests per app (0 for unlimited)",
         default=0,
@@ -97,6 +102,27 @@ class CodeExecutionSandboxConfig(BaseSettings):
         default=10.0,
     )
 
+    CODE_EXECUTION_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections to the code execution service",
+        default=100,
+    )
+
+    CODE_EXECUTION_POOL_MAX_KEEPALIVE_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of idle connections kept open to the code execution service",
+        default=20,
+    )
+
+    CODE_EXECUTION_POOL_KEEPALIVE_EXPIRY: Optional[float] = Field(
+        description="Seconds an idle connection to the code execution service is kept open",
+        default=5.0,
+    )
+
+    CODE_EXECUTION_BATCH_SIZE: NonNegativeInt = Field(
+        description="Maximum number of iteration items whose code node is executed in one code execution request"
+        " when the iteration only contains that code node, 0 to disable batching",
+        default=50,
+    )
+
     CODE_MAX_NUMBER: PositiveInt = Field(
         description="Maximum allowed numeric value in code execution",
         default=9223372036854775807,
@@ -137,6 +163,27 @@ class CodeExecutionSandboxConfig(BaseSettings):
         default=1000,
     )
 
+    JINJA2_LOCAL_RENDER_ENABLED: bool = Field(
+        description="Render jinja2 templates in process with a sandboxed environment,"
+        " only templates outside the sandbox rules or limits are sent to the code execution service",
+        default=False,
+    )
+
+    JINJA2_LOCAL_RENDER_MAX_CPU_TIME: PositiveFloat = Field(
+        description="Maximum CPU time in seconds for rendering a jinja2 template in process",
+        default=1.0,
+    )
+
+    JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH: PositiveInt = Field(
+        description="Maximum length of a jinja2 template rendered in process",
+        default=400000,
+    )
+
+    JINJA2_LOCAL_RENDER_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of compiled jinja2 templates kept in memory",
+        default=512,
+    )
+
 
 class PluginConfig(BaseSettings):
     """
@@ -381,6 +428,31 @@ class HttpConfig(BaseSettings):
         default=5,
     )
 
+    SSRF_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of connections of the pooled client used for network requests (SSRF)",
+        default=100,
+    )
+
+    SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of idle connections the pooled client keeps alive for network requests (SSRF)",
+        default=20,
+    )
+
+    SSRF_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Time in seconds an idle pooled connection is kept alive for network requests (SSRF)",
+        default=5.0,
+    )
+
+    SSRF_POOL_MAX_CONNECTIONS_PER_HOST: NonNegativeInt = Field(
+        description="Maximum number of concurrent network requests (SSRF) to one host, 0 for unlimited",
+        default=0,
+    )
+
+    SSRF_POOL_HTTP2_ENABLED: bool = Field(
+        description="Use HTTP/2 for network requests (SSRF) when the server supports it, requires the h2 package",
+        default=False,
+    )
+
     RESPECT_XFORWARD_HEADERS_ENABLED: bool = Field(
         description="Enable handling of X-Forwarded-For, X-Forwarded-Proto, and X-Forwarded-Port headers"
         " when the app is behind a single trusted reverse proxy.",
@@ -451,6 +523,28 @@ class ModelLoadBalanceConfig(BaseSettings):
     )
 
 
+class ModelProviderCacheConfig(BaseSettings):
+    """
+    Configuration for the in-process cache of plugin model providers, model schemas and provider configurations
+    """
+
+    MODEL_PROVIDER_CACHE_ENABLED: bool = Field(
+        description="Enable caching plugin model providers, model schemas and provider configurations across requests",
+        default=True,
+    )
+
+    MODEL_PROVIDER_CACHE_TTL: PositiveInt = Field(
+        description="Time-to-live in seconds of the model provider cache entries, bounding how long quota usage"
+        " and plugins installed by the plugin daemon may be stale",
+        default=120,
+    )
+
+    MODEL_PROVIDER_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of entries in the model provider cache of each process",
+        default=1000,
+    )
+
+
 class BillingConfig(BaseSettings):
     """
     Configuration for platform billing features
@@ -498,6 +592,18 @@ class WorkflowConfig(BaseSettings):
         default=3,
     )
 
+    WORKFLOW_ITERATION_EVENT_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of events the items of a parallel iteration queue up before they wait"
+        " for the events to be consumed",
+        default=1000,
+    )
+
+    WORKFLOW_GRAPH_CACHE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of compiled workflow graphs, including iteration and loop sub graphs,"
+        " each process keeps in memory, 0 to compile the graph on every run",
+        default=256,
+    )
+
     MAX_VARIABLE_SIZE: PositiveInt = Field(
         description="Maximum size in bytes for a single variable in workflows. Default to 200 KB.",
         default=200 * 1024,
@@ -514,6 +620,22 @@ class WorkflowNodeExecutionConfig(BaseSettings):
         default=100,
     )
 
+    WORKFLOW_NODE_EXECUTION_FLUSH_SIZE: PositiveInt = Field(
+        description="Number of pending node execution records that triggers a bulk write to the database",
+        default=100,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Maximum time in seconds a node execution record waits before it is written to the database",
+        default=1.0,
+    )
+
+    WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD: NonNegativeInt = Field(
+        description="Size in bytes above which node execution inputs, outputs and process data are saved to storage"
+        " instead of the database, 0 to keep them in the database",
+        default=0,
+    )
+
 
 class AuthConfig(BaseSettings):
     """
@@ -718,6 +840,35 @@ class DataSetConfig(BaseSettings):
     )
 
 
+class RetrievalCacheConfig(BaseSettings):
+    """
+    Configuration for the dataset retrieval result cache
+    """
+
+    RETRIEVAL_CACHE_ENABLED: bool = Field(
+        description="Enable or disable caching of dataset retrieval results, entries are dropped on index changes",
+        default=False,
+    )
+
+    RETRIEVAL_CACHE_TTL: PositiveInt = Field(
+        description="Time-to-live in seconds for cached retrieval results",
+        default=600,
+    )
+
+    RETRIEVAL_CACHE_SEMANTIC_THRESHOLD: float = Field(
+        description="Minimum cosine similarity for a query to reuse the results of a cached near-duplicate query,"
+        " 0 to only reuse results of identical queries",
+        default=0.0,
+        ge=0.0,
+        le=1.0,
+    )
+
+    RETRIEVAL_CACHE_SEMANTIC_MAX_QUERIES: PositiveInt = Field(
+        description="Maximum number of query embeddings kept per dataset for near-duplicate lookups",
+        default=256,
+    )
+
+
 class WorkspaceConfig(BaseSettings):
     """
     Configuration for workspace management
@@ -744,6 +895,42 @@ class IndexingConfig(BaseSettings):
         default=50,
     )
 
+    EMBEDDING_CACHE_LRU_SIZE: NonNegativeInt = Field(
+        description="Maximum number of document embeddings kept in the in-process cache, 0 to disable",
+        default=10000,
+    )
+
+    EMBEDDING_CACHE_REDIS_TTL: NonNegativeInt = Field(
+        description="Expiration time in seconds for document embeddings cached in Redis, 0 to disable",
+        default=3600,
+    )
+
+    EMBEDDING_MAX_CONCURRENT_BATCHES: PositiveInt = Field(
+        description="Maximum number of embedding model batches requested concurrently",
+        default=4,
+    )
+
+    KEYWORD_EXTRACTION_MAX_WORKERS: NonNegativeInt = Field(
+        description="Number of worker processes used to extract keywords from large batches of chunks,"
+        " 0 or 1 to extract in the calling process",
+        default=4,
+    )
+
+    INDEXING_PIPELINE_PAGES_PER_BATCH: PositiveInt = Field(
+        description="Number of extracted pages split, stored and embedded together by the indexing pipeline",
+        default=16,
+    )
+
+    INDEXING_PIPELINE_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of batches waiting in front of each indexing pipeline stage",
+        default=8,
+    )
+
+    INDEXING_PIPELINE_EMBEDDING_WORKERS: PositiveInt = Field(
+        description="Number of threads embedding and writing chunks to the vector store during indexing",
+        default=10,
+    )
+
 
 class MultiModalTransferConfig(BaseSettings):
     MULTIMODAL_SEND_FORMAT: Literal["base64", "url"] = Field(
@@ -872,10 +1059,12 @@ class FeatureConfig(
     LoggingConfig,
     MailConfig,
     ModelLoadBalanceConfig,
+    ModelProviderCacheConfig,
     ModerationConfig,
     MultiModalTransferConfig,
     PositionConfig,
     RagEtlConfig,
+    RetrievalCacheConfig,
     SecurityConfig,
     ToolConfig,
     UpdateConfig,
@@ -23,6 +23,7 @@ from .vdb.chroma_config import ChromaConfig
 from .vdb.couchbase_config import CouchbaseConfig
 from .vdb.elasticsearch_config import ElasticsearchConfig
 from .vdb.lindorm_config import LindormConfig
+from .vdb.local_vector_config import LocalVectorConfig
 from .vdb.milvus_config import MilvusConfig
 from .vdb.myscale_config import MyScaleConfig
 from .vdb.oceanbase_config import OceanBaseVectorConfig
@@ -82,11 +83,28 @@ class VectorStoreConfig(BaseSettings):
         default=False,
     )
 
+    VECTOR_STORE_POOL_SIZE: PositiveInt = Field(
+        description="Maximum number of connections one vector store client of a process uses at once."
+        " PGVector uses PGVECTOR_MAX_CONNECTION instead.",
+        default=10,
+    )
+
+    VECTOR_STORE_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of connections to vector stores one process uses at once, across all clients.",
+        default=100,
+    )
+
+    VECTOR_STORE_POOL_TIMEOUT: PositiveFloat = Field(
+        description="Time in seconds a vector store operation waits for a free connection before failing.",
+        default=30.0,
+    )
+
 
 class KeywordStoreConfig(BaseSettings):
     KEYWORD_STORE: str = Field(
         description="Method for keyword extraction and storage."
-        " Default is 'jieba', a Chinese text segmentation library.",
+        " Default is 'jieba', a Chinese text segmentation library."
+        " 'jieba_postings' stores one row per keyword and chunk so edits are incremental.",
         default="jieba",
     )
 
@@ -174,6 +192,24 @@ class DatabaseConfig(BaseSettings):
         default=os.cpu_count(),
     )
 
+    RETRIEVAL_EXECUTOR_THREADS: PositiveInt = Field(
+        description="Number of threads of the shared retrieval thread pools. Search branches mostly wait on"
+        " the vector database and model providers, so this is sized for I/O rather than CPU cores.",
+        default=64,
+    )
+
+    RETRIEVAL_TENANT_MAX_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of retrieval search branches a single tenant may run at the same time.",
+        default=8,
+    )
+
+    RETRIEVAL_BRANCH_TIMEOUT: PositiveFloat = Field(
+        description="Deadline in seconds for each retrieval search branch, counted from when the branch starts"
+        " running. Slower branches, and branches that wait as long for a free thread, are left out of the"
+        " partial result.",
+        default=30.0,
+    )
+
     @computed_field
     def SQLALCHEMY_ENGINE_OPTIONS(self) -> dict[str, Any]:
         return {
@@ -285,5 +321,6 @@ class MiddlewareConfig(
     BaiduVectorDBConfig,
     OpenGaussConfig,
     TableStoreConfig,
+    LocalVectorConfig,
 ):
     pass
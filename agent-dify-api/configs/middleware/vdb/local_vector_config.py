@@ -0,0 +1,29 @@
+from pydantic import Field, NonNegativeInt, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class LocalVectorConfig(BaseSettings):
+    """
+    Configuration settings for the local memory-mapped vector store
+    """
+
+    LOCAL_VECTOR_PATH: str = Field(
+        description="Directory holding the collection files of the local vector store",
+        default="storage/vector",
+    )
+
+    LOCAL_VECTOR_IVF_MIN_ROWS: NonNegativeInt = Field(
+        description="Number of vectors from which a collection is searched through an IVF partition index"
+        " instead of exhaustively, 0 to always search exhaustively",
+        default=0,
+    )
+
+    LOCAL_VECTOR_IVF_PROBES: PositiveInt = Field(
+        description="Number of IVF partitions scanned for each query",
+        default=8,
+    )
+
+    LOCAL_VECTOR_MAX_OPEN_COLLECTIONS: PositiveInt = Field(
+        description="Maximum number of collections each process keeps loaded in memory",
+        default=64,
+    )
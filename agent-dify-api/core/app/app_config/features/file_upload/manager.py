@@ -16,6 +16,8 @@ class FileUploadConfigManager:
         file_upload_dict = config.get("file_upload")
         if file_upload_dict:
             if file_upload_dict.get("enabled"):
+                # the config may be the cached value of a model property, it is not modified in place
+                file_upload_dict = dict(file_upload_dict)
                 transform_methods = file_upload_dict.get("allowed_file_upload_methods", [])
                 file_upload_dict["image_config"] = {
                     "number_limits": file_upload_dict.get("number_limits", 1),
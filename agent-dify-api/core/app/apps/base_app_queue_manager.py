@@ -7,6 +7,7 @@ from typing import Any, Optional
 from sqlalchemy.orm import DeclarativeMeta
 
 from configs import dify_config
+from core.app.apps.task_stop_channel import TaskStopChannel
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     AppQueueEvent,
@@ -41,6 +42,8 @@ class AppQueueManager:
         q: queue.Queue[WorkflowQueueMessage | MessageQueueMessage | None] = queue.Queue()
 
         self._q = q
+        self._stop_event = TaskStopChannel.subscribe(self._task_id)
+        self._last_stop_check = time.monotonic()
 
     def listen(self):
         """
@@ -125,15 +128,26 @@ class AppQueueManager:
 
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
+        TaskStopChannel.publish(task_id)
 
     def _is_stopped(self) -> bool:
         """
-        Check if task is stopped
+        Check if task is stopped, the stop flag in redis is only read every APP_STOP_CHECK_INTERVAL seconds
+        in case a stop message was missed
         :return:
         """
+        if self._stop_event.is_set():
+            return True
+
+        now = time.monotonic()
+        if now - self._last_stop_check < dify_config.APP_STOP_CHECK_INTERVAL:
+            return False
+        self._last_stop_check = now
+
         stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
+            self._stop_event.set()
             return True
 
         return False
@@ -264,8 +264,8 @@ class CompletionAppGenerator(MessageBasedAppGenerator):
 
         app_model_config = message.app_model_config
         override_model_config_dict = app_model_config.to_dict()
-        model_dict = override_model_config_dict["model"]
-        completion_params = model_dict.get("completion_params")
+        model_dict = dict(override_model_config_dict["model"])
+        completion_params = dict(model_dict.get("completion_params") or {})
         completion_params["temperature"] = 0.9
         model_dict["completion_params"] = completion_params
         override_model_config_dict["model"] = model_dict
@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStopChannel:
+    """
+    Push-based stop signals for generate tasks.
+
+    `publish` sends a task id over a Redis pub/sub channel. The first `subscribe` starts one subscriber
+    thread per process, and that thread sets the stop event of the matching task, so a running task checks
+    for a stop by reading a local flag. Messages sent while the subscriber is reconnecting are lost, so
+    callers keep a throttled check of the stop flag in Redis as a fallback.
+    """
+
+    CHANNEL = "generate_task_stopped"
+
+    _events: "weakref.WeakValueDictionary[str, threading.Event]" = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def subscribe(cls, task_id: str) -> threading.Event:
+        """
+        Get the stop event of a task, it is unsubscribed once the caller drops the event.
+        """
+        event = threading.Event()
+        with cls._lock:
+            cls._events[task_id] = event
+            if cls._thread is None:
+                cls._thread = threading.Thread(target=cls._listen, name="task_stop_channel", daemon=True)
+                cls._thread.start()
+        return event
+
+    @classmethod
+    def publish(cls, task_id: str) -> None:
+        redis_client.publish(cls.CHANNEL, task_id)
+
+    @classmethod
+    def _listen(cls) -> None:
+        while True:
+            try:
+                # leaving the block closes the pubsub and returns its connection before resubscribing
+                with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    pubsub.subscribe(cls.CHANNEL)
+                    for message in pubsub.listen():
+                        cls._dispatch(message)
+            except Exception:
+                logger.exception("Task stop channel subscription failed, resubscribing")
+                time.sleep(1)
+
+    @classmethod
+    def _dispatch(cls, message: dict[str, Any]) -> None:
+        if message.get("type") != "message":
+            return
+        data = message["data"]
+        task_id = data.decode("utf-8") if isinstance(data, bytes) else str(data)
+        with cls._lock:
+            event = cls._events.get(task_id)
+        if event is not None:
+            event.set()
@@ -106,7 +106,7 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
             )
 
             # init graph
-            graph = self._init_graph(graph_config=workflow.graph_dict)
+            graph = self._init_graph(graph_config=workflow.graph_dict, workflow_id=workflow.id)
 
         # RUN WORKFLOW
         workflow_entry = WorkflowEntry(
@@ -60,6 +60,7 @@ from core.workflow.graph_engine.entities.event import (
     ParallelBranchRunSucceededEvent,
 )
 from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.graph_cache import GraphCache
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.node_mapping import NODE_TYPE_CLASSES_MAPPING
 from core.workflow.workflow_entry import WorkflowEntry
@@ -72,9 +73,9 @@ class WorkflowBasedAppRunner(AppRunner):
     def __init__(self, queue_manager: AppQueueManager):
         self.queue_manager = queue_manager
 
-    def _init_graph(self, graph_config: Mapping[str, Any]) -> Graph:
+    def _init_graph(self, graph_config: Mapping[str, Any], workflow_id: str) -> Graph:
         """
-        Init graph
+        Init graph, reusing the compiled graph of an unchanged workflow
         """
         if "nodes" not in graph_config or "edges" not in graph_config:
             raise ValueError("nodes or edges not found in workflow graph")
@@ -85,7 +86,7 @@ class WorkflowBasedAppRunner(AppRunner):
         if not isinstance(graph_config.get("edges"), list):
             raise ValueError("edges in workflow graph must be a list")
         # init graph
-        graph = Graph.init(graph_config=graph_config)
+        graph = GraphCache.get(workflow_id=workflow_id, graph_config=graph_config)
 
         if not graph:
             raise ValueError("graph not found in workflow")
@@ -106,7 +107,8 @@ class WorkflowBasedAppRunner(AppRunner):
         if not graph_config:
             raise ValueError("workflow graph not found")
 
-        graph_config = cast(dict[str, Any], graph_config)
+        # the nodes and edges are filtered in a copy, the graph is the cached value of `Workflow.graph_dict`
+        graph_config = dict(cast(dict[str, Any], graph_config))
 
         if "nodes" not in graph_config or "edges" not in graph_config:
             raise ValueError("nodes or edges not found in workflow graph")
@@ -196,7 +198,8 @@ class WorkflowBasedAppRunner(AppRunner):
         if not graph_config:
             raise ValueError("workflow graph not found")
 
-        graph_config = cast(dict[str, Any], graph_config)
+        # the nodes and edges are filtered in a copy, the graph is the cached value of `Workflow.graph_dict`
+        graph_config = dict(cast(dict[str, Any], graph_config))
 
         if "nodes" not in graph_config or "edges" not in graph_config:
             raise ValueError("nodes or edges not found in workflow graph")
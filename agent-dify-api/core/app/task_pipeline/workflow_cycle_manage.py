@@ -1,4 +1,5 @@
 import json
+import logging
 import time
 from collections.abc import Mapping, Sequence
 from datetime import UTC, datetime
@@ -45,6 +46,10 @@ from core.app.entities.task_entities import (
     WorkflowStartStreamResponse,
 )
 from core.app.task_pipeline.exc import WorkflowRunNotFoundError
+from core.app.task_pipeline.workflow_node_execution_recorder import (
+    WorkflowNodeExecutionRecorder,
+    WorkflowNodeExecutionWriteError,
+)
 from core.file import FILE_MODEL_IDENTITY, File
 from core.model_runtime.utils.encoders import jsonable_encoder
 from core.ops.entities.trace_entity import TraceTaskName
@@ -67,6 +72,8 @@ from models.workflow import (
     WorkflowRunStatus,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class WorkflowCycleManage:
     def __init__(
@@ -76,7 +83,9 @@ class WorkflowCycleManage:
         workflow_system_variables: dict[SystemVariableKey, Any],
     ) -> None:
         self._workflow_run: WorkflowRun | None = None
+        # node executions are never attached to a session, they are written by the recorder
         self._workflow_node_executions: dict[str, WorkflowNodeExecution] = {}
+        self._workflow_node_execution_recorder = WorkflowNodeExecutionRecorder()
         self._application_generate_entity = application_generate_entity
         self._workflow_system_variables = workflow_system_variables
 
@@ -161,6 +170,7 @@ class WorkflowCycleManage:
         :param conversation_id: conversation id
         :return:
         """
+        node_executions_written = self._flush_workflow_node_executions()
         workflow_run = self._get_workflow_run(session=session, workflow_run_id=workflow_run_id)
 
         outputs = WorkflowEntry.handle_special_values(outputs)
@@ -172,7 +182,8 @@ class WorkflowCycleManage:
         workflow_run.total_steps = total_steps
         workflow_run.finished_at = datetime.now(UTC).replace(tzinfo=None)
 
-        if trace_manager:
+        # the trace reads the node executions of the run back from the database
+        if trace_manager and node_executions_written:
             trace_manager.add_trace_task(
                 TraceTask(
                     TraceTaskName.WORKFLOW_TRACE,
@@ -197,6 +208,7 @@ class WorkflowCycleManage:
         conversation_id: Optional[str] = None,
         trace_manager: Optional[TraceQueueManager] = None,
     ) -> WorkflowRun:
+        node_executions_written = self._flush_workflow_node_executions()
         workflow_run = self._get_workflow_run(session=session, workflow_run_id=workflow_run_id)
         outputs = WorkflowEntry.handle_special_values(dict(outputs) if outputs else None)
 
@@ -208,7 +220,8 @@ class WorkflowCycleManage:
         workflow_run.finished_at = datetime.now(UTC).replace(tzinfo=None)
         workflow_run.exceptions_count = exceptions_count
 
-        if trace_manager:
+        # the trace reads the node executions of the run back from the database
+        if trace_manager and node_executions_written:
             trace_manager.add_trace_task(
                 TraceTask(
                     TraceTaskName.WORKFLOW_TRACE,
@@ -254,18 +267,10 @@ class WorkflowCycleManage:
         workflow_run.finished_at = datetime.now(UTC).replace(tzinfo=None)
         workflow_run.exceptions_count = exceptions_count
 
-        stmt = select(WorkflowNodeExecution.node_execution_id).where(
-            WorkflowNodeExecution.tenant_id == workflow_run.tenant_id,
-            WorkflowNodeExecution.app_id == workflow_run.app_id,
-            WorkflowNodeExecution.workflow_id == workflow_run.workflow_id,
-            WorkflowNodeExecution.triggered_from == WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN.value,
-            WorkflowNodeExecution.workflow_run_id == workflow_run.id,
-            WorkflowNodeExecution.status == WorkflowNodeExecutionStatus.RUNNING.value,
-        )
-        ids = session.scalars(stmt).all()
-        # Use self._get_workflow_node_execution here to make sure the cache is updated
         running_workflow_node_executions = [
-            self._get_workflow_node_execution(session=session, node_execution_id=id) for id in ids if id
+            workflow_node_execution
+            for workflow_node_execution in self._workflow_node_executions.values()
+            if workflow_node_execution.status == WorkflowNodeExecutionStatus.RUNNING.value
         ]
 
         for workflow_node_execution in running_workflow_node_executions:
@@ -274,8 +279,11 @@ class WorkflowCycleManage:
             workflow_node_execution.error = error
             workflow_node_execution.finished_at = now
             workflow_node_execution.elapsed_time = (now - workflow_node_execution.created_at).total_seconds()
+            self._workflow_node_execution_recorder.record(workflow_node_execution)
+        node_executions_written = self._flush_workflow_node_executions()
 
-        if trace_manager:
+        # the trace reads the node executions of the run back from the database
+        if trace_manager and node_executions_written:
             trace_manager.add_trace_task(
                 TraceTask(
                     TraceTaskName.WORKFLOW_TRACE,
@@ -287,6 +295,18 @@ class WorkflowCycleManage:
 
         return workflow_run
 
+    def _flush_workflow_node_executions(self) -> bool:
+        """
+        Wait for the recorded node executions to be written
+        :return: False if some of them could not be written
+        """
+        try:
+            self._workflow_node_execution_recorder.flush()
+        except WorkflowNodeExecutionWriteError:
+            logger.exception("Failed to write the node executions of the workflow run")
+            return False
+        return True
+
     def _handle_node_execution_start(
         self, *, session: Session, workflow_run: WorkflowRun, event: QueueNodeStartedEvent
     ) -> WorkflowNodeExecution:
@@ -315,7 +335,7 @@ class WorkflowCycleManage:
         )
         workflow_node_execution.created_at = datetime.now(UTC).replace(tzinfo=None)
 
-        session.add(workflow_node_execution)
+        self._workflow_node_execution_recorder.record(workflow_node_execution)
 
         self._workflow_node_executions[event.node_execution_id] = workflow_node_execution
         return workflow_node_execution
@@ -344,7 +364,7 @@ class WorkflowCycleManage:
         workflow_node_execution.finished_at = finished_at
         workflow_node_execution.elapsed_time = elapsed_time
 
-        workflow_node_execution = session.merge(workflow_node_execution)
+        self._workflow_node_execution_recorder.record(workflow_node_execution)
         return workflow_node_execution
 
     def _handle_workflow_node_execution_failed(
@@ -387,7 +407,7 @@ class WorkflowCycleManage:
         workflow_node_execution.elapsed_time = elapsed_time
         workflow_node_execution.execution_metadata = execution_metadata
 
-        workflow_node_execution = session.merge(workflow_node_execution)
+        self._workflow_node_execution_recorder.record(workflow_node_execution)
         return workflow_node_execution
 
     def _handle_workflow_node_execution_retried(
@@ -439,7 +459,7 @@ class WorkflowCycleManage:
         workflow_node_execution.execution_metadata = execution_metadata
         workflow_node_execution.index = event.node_run_index
 
-        session.add(workflow_node_execution)
+        self._workflow_node_execution_recorder.record(workflow_node_execution)
 
         self._workflow_node_executions[event.node_execution_id] = workflow_node_execution
         return workflow_node_execution
@@ -937,8 +957,7 @@ class WorkflowCycleManage:
     def _get_workflow_node_execution(self, session: Session, node_execution_id: str) -> WorkflowNodeExecution:
         if node_execution_id not in self._workflow_node_executions:
             raise ValueError(f"Workflow node execution not found: {node_execution_id}")
-        cached_workflow_node_execution = self._workflow_node_executions[node_execution_id]
-        return session.merge(cached_workflow_node_execution)
+        return self._workflow_node_executions[node_execution_id]
 
     def _handle_agent_log(self, task_id: str, event: QueueAgentLogEvent) -> AgentLogStreamResponse:
         """
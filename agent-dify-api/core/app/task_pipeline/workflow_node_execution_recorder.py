@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_storage import storage
+from models.workflow import WorkflowNodeExecution
+
+logger = logging.getLogger(__name__)
+
+_PAYLOAD_COLUMNS = ("inputs", "process_data", "outputs")
+
+
+# failed writes of a node execution after which it is dropped
+_MAX_WRITE_ATTEMPTS = 3
+
+
+class WorkflowNodeExecutionWriteError(Exception):
+    """Raised by `flush` when node executions were dropped after failing to write."""
+
+    def __init__(self, ids: list[str]):
+        super().__init__(f"Failed to write workflow node executions {', '.join(ids)}")
+        self.ids = ids
+
+
+class WorkflowNodeExecutionRecorder:
+    """
+    Write-behind persistence of the node executions of a workflow run.
+
+    `record` only snapshots the column values of a node execution, the rows are written by a background
+    thread with one upsert per batch once WORKFLOW_NODE_EXECUTION_FLUSH_SIZE rows are pending or
+    WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL seconds have passed. Recording the same execution again before
+    it is written replaces the pending row, so a node that starts and finishes within one interval is
+    written once. Payloads larger than WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD are saved to storage
+    and the column keeps a reference, see `WorkflowNodeExecution.load_payload`.
+
+    When a batch fails to write its rows are written one by one, so one bad row does not hold back the
+    others. Rows that still fail are retried an interval later and dropped after `_MAX_WRITE_ATTEMPTS`
+    attempts, which `flush` reports. The background thread exits once it has been idle for an interval and
+    is started again by the next `record`.
+    """
+
+    def __init__(self) -> None:
+        self._flask_app: Optional[Flask] = None
+        self._pending: dict[str, tuple[int, dict[str, Any]]] = {}
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._recorded_seq = 0
+        # lowest sequence number of the batch being written
+        self._writing_seq: Optional[int] = None
+        self._write_attempts: dict[str, int] = {}
+        self._dropped: dict[str, int] = {}
+        self._flush_waiters = 0
+        self._first_pending_at: Optional[float] = None
+
+    def record(self, workflow_node_execution: WorkflowNodeExecution) -> None:
+        """Queue the current state of a node execution to be written."""
+        # only the attributes set so far, unset columns keep their server defaults on insert
+        row = {
+            key: value
+            for key, value in inspect(workflow_node_execution).dict.items()
+            if key in WorkflowNodeExecution.__table__.columns
+        }
+        with self._condition:
+            if self._flask_app is None:
+                self._flask_app = current_app._get_current_object()  # type: ignore
+            self._recorded_seq += 1
+            self._pending[row["id"]] = (self._recorded_seq, row)
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="workflow_node_execution_recorder", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+
+    def flush(self) -> None:
+        """
+        Wait until every node execution recorded so far has been written or dropped.
+
+        :raises WorkflowNodeExecutionWriteError: if some of them were dropped after failing to write
+        """
+        with self._condition:
+            target_seq = self._recorded_seq
+            self._flush_waiters += 1
+            try:
+                self._condition.notify_all()
+                self._condition.wait_for(lambda: self._settled(target_seq))
+            finally:
+                self._flush_waiters -= 1
+            dropped = [id for id, seq in self._dropped.items() if seq <= target_seq]
+            for id in dropped:
+                del self._dropped[id]
+        if dropped:
+            raise WorkflowNodeExecutionWriteError(dropped)
+
+    def _settled(self, target_seq: int) -> bool:
+        if self._writing_seq is not None and self._writing_seq <= target_seq:
+            return False
+        return all(seq > target_seq for seq, _ in self._pending.values())
+
+    def _work(self) -> None:
+        flush_interval = dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL
+        assert self._flask_app is not None
+        with self._flask_app.app_context():
+            while True:
+                with self._condition:
+                    self._condition.wait_for(self._batch_ready, timeout=flush_interval)
+                    if not self._pending:
+                        # idle for an interval, the next record starts a new worker
+                        self._worker = None
+                        return
+                    batch = self._pending
+                    self._pending = {}
+                    self._first_pending_at = None
+                    self._writing_seq = min(seq for seq, _ in batch.values())
+
+                failed = self._write_batch(batch)
+
+                with self._condition:
+                    for id in batch.keys() - failed.keys():
+                        self._write_attempts.pop(id, None)
+                    for id, (seq, row) in failed.items():
+                        attempts = self._write_attempts.get(id, 0) + 1
+                        if attempts >= _MAX_WRITE_ATTEMPTS:
+                            logger.error(f"Dropped workflow node execution {id} after {attempts} failed writes")
+                            self._write_attempts.pop(id, None)
+                            self._dropped[id] = seq
+                        elif id not in self._pending:
+                            # newer records of the same execution replace the failed one and its attempts
+                            self._write_attempts[id] = attempts
+                            self._pending[id] = (seq, row)
+                        if self._pending and self._first_pending_at is None:
+                            self._first_pending_at = time.monotonic()
+                    self._writing_seq = None
+                    self._condition.notify_all()
+
+                if failed:
+                    # back off before the failed rows are retried
+                    time.sleep(flush_interval)
+
+    def _write_batch(self, batch: dict[str, tuple[int, dict[str, Any]]]) -> dict[str, tuple[int, dict[str, Any]]]:
+        """Write a batch, one row at a time if it fails as a whole, and return the rows that failed."""
+        try:
+            self._write([row for _, row in batch.values()])
+            return {}
+        except Exception:
+            if len(batch) == 1:
+                logger.exception(f"Failed to write workflow node execution {next(iter(batch))}")
+                return batch
+            logger.warning(f"Failed to write {len(batch)} workflow node executions, writing them one by one")
+
+        failed = {}
+        for id, (seq, row) in batch.items():
+            try:
+                self._write([row])
+            except Exception:
+                logger.exception(f"Failed to write workflow node execution {id}")
+                failed[id] = (seq, row)
+        return failed
+
+    def _batch_ready(self) -> bool:
+        if not self._pending:
+            return False
+        if self._flush_waiters or len(self._pending) >= dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_SIZE:
+            return True
+        assert self._first_pending_at is not None
+        return time.monotonic() - self._first_pending_at >= dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL
+
+    def _write(self, rows: list[dict[str, Any]]) -> None:
+        rows = [self._offload_payloads(row) for row in rows]
+        # rows of executions that started and that finished set different columns, upsert each shape at once
+        rows_by_columns: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for row in rows:
+            rows_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+
+        with Session(db.engine) as session:
+            for columns, column_rows in rows_by_columns.items():
+                stmt = insert(WorkflowNodeExecution).values(column_rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={column: stmt.excluded[column] for column in columns if column != "id"},
+                )
+                session.execute(stmt)
+            session.commit()
+
+    @staticmethod
+    def _offload_payloads(row: dict[str, Any]) -> dict[str, Any]:
+        threshold = dify_config.WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD
+        if not threshold:
+            return row
+        row = dict(row)
+        for column in _PAYLOAD_COLUMNS:
+            value = row.get(column)
+            if value is None:
+                continue
+            data = value.encode("utf-8")
+            if len(data) <= threshold:
+                continue
+            storage_key = f"workflow_node_executions/{row['tenant_id']}/{row['id']}/{column}.json"
+            storage.save(storage_key, data)
+            row[column] = WorkflowNodeExecution.offloaded_payload(storage_key)
+        return row
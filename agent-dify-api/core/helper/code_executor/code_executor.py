@@ -1,15 +1,21 @@
 import logging
-from collections.abc import Mapping
+import os
+from collections.abc import Mapping, Sequence
 from enum import StrEnum
 from threading import Lock
 from typing import Any, Optional
 
-from httpx import Timeout, post
+from httpx import Client, Limits, Timeout
 from pydantic import BaseModel
 from yarl import URL
 
 from configs import dify_config
 from core.helper.code_executor.javascript.javascript_transformer import NodeJsTemplateTransformer
+from core.helper.code_executor.jinja2.jinja2_sandbox import (
+    Jinja2SandboxRenderer,
+    Jinja2SandboxRenderError,
+    Jinja2SandboxUnsupportedError,
+)
 from core.helper.code_executor.jinja2.jinja2_transformer import Jinja2TemplateTransformer
 from core.helper.code_executor.python3.python3_transformer import Python3TemplateTransformer
 from core.helper.code_executor.template_transformer import TemplateTransformer
@@ -55,6 +61,42 @@ class CodeExecutor:
 
     supported_dependencies_languages: set[CodeLanguage] = {CodeLanguage.PYTHON3}
 
+    _client: Optional[Client] = None
+    _client_pid: Optional[int] = None
+    _client_lock = Lock()
+
+    @classmethod
+    def _get_client(cls) -> Client:
+        """
+        Get the client of this process, its connections to the sandbox are kept alive between executions
+        """
+        with cls._client_lock:
+            # connections of a client are not usable after a fork, every process gets its own
+            if cls._client is None or cls._client_pid != os.getpid():
+                cls._client = Client(
+                    limits=Limits(
+                        max_connections=dify_config.CODE_EXECUTION_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=dify_config.CODE_EXECUTION_POOL_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=dify_config.CODE_EXECUTION_POOL_KEEPALIVE_EXPIRY,
+                    )
+                )
+                cls._client_pid = os.getpid()
+            return cls._client
+
+    @classmethod
+    def get_preload_script(cls, language: CodeLanguage) -> str:
+        """
+        Get the preload script of a language, built once per process
+        :param language: code language
+        :return: preload script
+        """
+        preload = cls.dependencies_cache.get(language)
+        if preload is None:
+            template_transformer = cls.code_template_transformers[language]
+            with cls.dependencies_cache_lock:
+                preload = cls.dependencies_cache.setdefault(language, template_transformer.get_preload_script())
+        return preload
+
     @classmethod
     def execute_code(cls, language: CodeLanguage, preload: str, code: str) -> str:
         """
@@ -76,7 +118,7 @@ class CodeExecutor:
         }
 
         try:
-            response = post(
+            response = cls._get_client().post(
                 str(url),
                 json=data,
                 headers=headers,
@@ -131,7 +173,16 @@ class CodeExecutor:
         if not template_transformer:
             raise CodeExecutionError(f"Unsupported language {language}")
 
-        runner, preload = template_transformer.transform_caller(code, inputs)
+        if language == CodeLanguage.JINJA2 and dify_config.JINJA2_LOCAL_RENDER_ENABLED:
+            try:
+                return {"result": Jinja2SandboxRenderer.render(code, inputs)}
+            except Jinja2SandboxUnsupportedError as e:
+                logger.debug(f"Rendering jinja2 template in the code sandbox: {e}")
+            except Jinja2SandboxRenderError as e:
+                raise CodeExecutionError(str(e)) from e
+
+        runner = template_transformer.assemble_runner_script(code, inputs)
+        preload = cls.get_preload_script(language)
 
         try:
             response = cls.execute_code(language, preload, runner)
@@ -139,3 +190,47 @@ class CodeExecutor:
             raise e
 
         return template_transformer.transform_response(response)
+
+    @classmethod
+    def supports_batch(cls, language: CodeLanguage) -> bool:
+        """
+        Whether the code of the language can be executed for several inputs in one sandbox request
+        """
+        template_transformer = cls.code_template_transformers.get(language)
+        return template_transformer is not None and template_transformer.supports_batch
+
+    @classmethod
+    def execute_workflow_code_template_batch(
+        cls, language: CodeLanguage, code: str, inputs_list: Sequence[Mapping[str, Any]]
+    ) -> list[Mapping[str, Any] | Exception]:
+        """
+        Execute code once for each inputs in a single sandbox request
+        :param language: code language
+        :param code: code
+        :param inputs_list: inputs of each execution
+        :return: result of each execution, or the error it raised
+        """
+        template_transformer = cls.code_template_transformers.get(language)
+        if not template_transformer or not template_transformer.supports_batch:
+            raise CodeExecutionError(f"Unsupported language {language} for batch execution")
+
+        runner = template_transformer.assemble_batch_runner_script(code, inputs_list)
+        preload = cls.get_preload_script(language)
+
+        response = cls.execute_code(language, preload, runner)
+
+        try:
+            items = template_transformer.transform_batch_response(response, len(inputs_list))
+        except ValueError as e:
+            raise CodeExecutionError(str(e)) from e
+
+        results: list[Mapping[str, Any] | Exception] = []
+        for item in items:
+            if "error" in item:
+                results.append(CodeExecutionError(item["error"]))
+                continue
+            try:
+                results.append(template_transformer.validate_result(item.get("result")))
+            except ValueError as e:
+                results.append(e)
+        return results
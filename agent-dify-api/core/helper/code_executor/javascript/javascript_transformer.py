@@ -4,6 +4,8 @@ from core.helper.code_executor.template_transformer import TemplateTransformer
 
 
 class NodeJsTemplateTransformer(TemplateTransformer):
+    supports_batch = True
+
     @classmethod
     def get_runner_script(cls) -> str:
         runner_script = dedent(
@@ -24,3 +26,30 @@ class NodeJsTemplateTransformer(TemplateTransformer):
             """
         )
         return runner_script
+
+    @classmethod
+    def get_batch_runner_script(cls) -> str:
+        runner_script = dedent(
+            f"""
+            // decode the main function code and prepare the list of input objects
+            var code = Buffer.from('{cls._code_placeholder}', 'base64').toString('utf-8')
+            var inputs_list = JSON.parse(Buffer.from('{cls._inputs_placeholder}', 'base64').toString('utf-8'))
+            
+            // declare main function in a fresh scope and execute it for each input object,
+            // keeping the error of each call
+            var results = inputs_list.map(function (inputs_obj) {{
+                try {{
+                    var main = new Function(code + '\\nreturn main')()
+                    return JSON.stringify({{ result: main(inputs_obj) }})
+                }} catch (e) {{
+                    return JSON.stringify({{ error: String((e && e.stack) || e) }})
+                }}
+            }})
+            
+            // convert outputs to a json array and print
+            var output_json = '[' + results.join(',') + ']'
+            var result = `<<RESULT>>${{output_json}}<<RESULT>>`
+            console.log(result)
+            """
+        )
+        return runner_script
@@ -0,0 +1,455 @@
+import ast
+import functools
+import hashlib
+import json
+import math
+import re
+import string
+import threading
+import time
+import warnings
+from collections.abc import Iterable, Mapping
+from typing import Any, Optional
+
+from cachetools import LRUCache
+from jinja2 import Template, TemplateError
+from jinja2.compiler import CodeGenerator, Frame
+from jinja2.exceptions import SecurityError
+from jinja2.filters import make_attrgetter
+from jinja2.nodes import Concat
+from jinja2.runtime import markup_join
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+from jinja2.utils import Namespace
+
+from configs import dify_config
+
+
+class Jinja2SandboxUnsupportedError(Exception):
+    """
+    The template needs more than the in-process sandbox allows and has to be rendered by the code sandbox.
+    """
+
+
+class Jinja2SandboxRenderError(Exception):
+    pass
+
+
+_limits = threading.local()
+
+
+def _check_cpu_time() -> None:
+    deadline = getattr(_limits, "deadline", None)
+    if deadline is not None and time.thread_time() > deadline:
+        raise Jinja2SandboxUnsupportedError("Template exceeded the CPU time limit of the in-process sandbox")
+
+
+def _check_length(length: int) -> None:
+    max_length = dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+    if length > max_length:
+        raise Jinja2SandboxUnsupportedError(
+            f"Template would build a value longer than {max_length} characters in the in-process sandbox"
+        )
+
+
+def _check_int_bits(bits: int) -> None:
+    # an integer too long to be written out is too long to be computed
+    _check_length(int(bits * math.log10(2)))
+
+
+_SEQUENCE_TYPES = (str, bytes, list, tuple)
+
+
+def _size(value: Any, budget: Optional[int] = None) -> int:
+    """
+    Length of a value including the strings and containers it holds, which bounds the length of its string form.
+    Counting stops once the size exceeds the budget, the output length limit by default.
+    """
+    if budget is None:
+        budget = dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+    size = 0
+    stack = [value]
+    while stack and size <= budget:
+        value = stack.pop()
+        if isinstance(value, str | bytes):
+            size += len(value)
+        elif isinstance(value, list | tuple):
+            size += len(value)
+            if size <= budget:
+                stack.extend(value)
+        elif isinstance(value, Mapping):
+            size += len(value)
+            if size <= budget:
+                stack.extend(value.keys())
+                stack.extend(value.values())
+        elif isinstance(value, Namespace):
+            stack.append(value._Namespace__attrs)  # type: ignore[attr-defined]
+        else:
+            size += 1
+    return size
+
+
+def _bounded_list(iterable: Iterable[Any], separator: Any = "") -> list[Any]:
+    """Collect the items of an iterable, stopping once they, joined by the separator, exceed the length limit."""
+    max_length = dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+    separator_size = _size(separator)
+    items = []
+    total = 0
+    for item in iterable:
+        _check_cpu_time()
+        total += _size(item, max_length - total) + (separator_size if items else 0)
+        _check_length(total)
+        items.append(item)
+    return items
+
+
+def _largest_size(values: Iterable[Any]) -> int:
+    return max((_size(value) for value in values), default=0)
+
+
+# width and precision of the conversions of a printf-style format
+_FORMAT_WIDTHS = re.compile(r"%(?:\([^)]*\))?[-+ #0]*(\d+|\*)?(?:\.(\d+|\*))?")
+
+
+def _check_printf_format(format: str, args: Any) -> None:
+    if isinstance(args, Mapping):
+        values = list(args.values())
+    else:
+        values = list(args) if isinstance(args, tuple) else [args]
+    conversions = 0
+    widths = []
+    for match in _FORMAT_WIDTHS.finditer(format):
+        conversions += 1
+        widths.extend(int(width) for width in match.groups() if width and width != "*")
+        if "*" in match.groups():
+            widths.extend(value for value in values if isinstance(value, int))
+    # every conversion can write out the largest argument, padded to the largest width
+    _check_length(len(format) + conversions * max(max(widths, default=0), _largest_size(values)))
+
+
+def _check_str_format(format: str, args: tuple, kwargs: Mapping[str, Any]) -> None:
+    try:
+        fields = [(field, spec) for _, field, spec, _ in string.Formatter().parse(format) if field is not None]
+    except ValueError:
+        # str.format raises the same error
+        return
+    widths = []
+    for _, spec in fields:
+        if "{" in (spec or ""):
+            raise Jinja2SandboxUnsupportedError("Nested format specs are not checked by the in-process sandbox")
+        widths.extend(int(width) for width in re.findall(r"\d+", spec or ""))
+    largest = max(_largest_size(args), _largest_size(kwargs.values()))
+    _check_length(len(format) + len(fields) * max(max(widths, default=0), largest))
+
+
+def _check_replace(value: str | bytes, old: Any, new: Any, count: Any = -1) -> None:
+    if len(new) > len(old):
+        replacements = value.count(old) if old else len(value) + 1
+        if isinstance(count, int) and count >= 0:
+            replacements = min(replacements, count)
+        _check_length(len(value) + replacements * (len(new) - len(old)))
+
+
+def _limit_string_method(method: Any, args: tuple, kwargs: Mapping[str, Any]) -> tuple:
+    """Check the length of the value a string method builds, returns the arguments to call it with."""
+    # str.format is wrapped by the sandbox when it is looked up
+    value = getattr(getattr(method, "__wrapped__", method), "__self__", None)
+    if not isinstance(value, str | bytes):
+        return args
+    name = getattr(method, "__name__", "")
+    if name in {"center", "ljust", "rjust", "zfill"}:
+        width = args[0] if args else kwargs.get("width")
+        if isinstance(width, int):
+            _check_length(width)
+    elif name == "expandtabs":
+        tabsize = args[0] if args else kwargs.get("tabsize", 8)
+        if isinstance(tabsize, int):
+            _check_length(len(value) + value.count("\t" if isinstance(value, str) else b"\t") * tabsize)
+    elif name == "replace" and len(args) >= 2 and all(isinstance(arg, str | bytes) for arg in args[:2]):
+        _check_replace(value, *args[:3])
+    elif name == "join" and args:
+        items = _bounded_list(args[0], value)
+        args = (items, *args[1:])
+    elif name == "translate" and args and isinstance(args[0], Mapping):
+        _check_length(len(value) * max(_largest_size(args[0].values()), 1))
+    elif name == "format" and isinstance(value, str):
+        _check_str_format(value, args, kwargs)
+    elif name == "format_map" and isinstance(value, str) and args and isinstance(args[0], Mapping):
+        _check_str_format(value, (), args[0])
+    return args
+
+
+def _limited_filter(filter: Any, check: Any) -> Any:
+    @functools.wraps(filter)
+    def limited(*args, **kwargs):
+        check(*args, **kwargs)
+        return filter(*args, **kwargs)
+
+    return limited
+
+
+def _check_center_filter(value: Any, width: Any = 80, *args: Any, **kwargs: Any) -> None:
+    if isinstance(width, int):
+        _check_length(width)
+
+
+def _check_indent_filter(value: Any, width: Any = 4, *args: Any, **kwargs: Any) -> None:
+    lines = str(value).count("\n") + 1
+    width = len(width) if isinstance(width, str) else width
+    if isinstance(width, int):
+        _check_length(len(str(value)) + lines * width)
+
+
+def _check_format_filter(value: Any, *args: Any, **kwargs: Any) -> None:
+    if isinstance(value, str):
+        _check_printf_format(value, args or kwargs)
+
+
+def _check_replace_filter(eval_ctx: Any, value: Any, old: Any, new: Any, count: Any = None) -> None:
+    if isinstance(value, str) and isinstance(old, str) and isinstance(new, str):
+        _check_replace(value, old, new, -1 if count is None else count)
+
+
+def _check_wordwrap_filter(
+    environment: Any, s: Any, width: Any = 79, break_long_words: Any = True, wrapstring: Any = None, *args: Any
+) -> None:
+    if isinstance(s, str) and isinstance(width, int):
+        wrapstring = environment.newline_sequence if wrapstring is None else wrapstring
+        lines = len(s) // max(width, 1) + s.count("\n") + 1
+        _check_length(len(s) + lines * _size(wrapstring))
+
+
+def _check_batch_filter(value: Any, linecount: Any, fill_with: Any = None) -> None:
+    if fill_with is not None and isinstance(linecount, int):
+        _check_length(linecount)
+
+
+def _check_slice_filter(eval_ctx: Any, value: Any, slices: Any, fill_with: Any = None) -> None:
+    if isinstance(slices, int):
+        _check_length(slices)
+
+
+def _limited_join_filter(join: Any) -> Any:
+    @functools.wraps(join)
+    def limited(eval_ctx: Any, value: Any, d: str = "", attribute: Any = None) -> str:
+        if attribute is not None:
+            value = map(make_attrgetter(eval_ctx.environment, attribute), value)
+        return join(eval_ctx, _bounded_list(value, d), d)
+
+    return limited
+
+
+def _limited_list_filter(list_filter: Any) -> Any:
+    @functools.wraps(list_filter)
+    def limited(eval_ctx: Any, value: Any) -> list:
+        return list_filter(eval_ctx, _bounded_list(value))
+
+    return limited
+
+
+def _limited_sum_filter(sum_filter: Any) -> Any:
+    @functools.wraps(sum_filter)
+    def limited(environment: Any, iterable: Any, attribute: Any = None, start: Any = 0) -> Any:
+        if attribute is not None:
+            iterable = map(make_attrgetter(environment, attribute), iterable)
+        items = _bounded_list(iterable)
+        _check_length(_size(start) + _size(items))
+        return sum_filter(environment, items, start=start)
+
+    return limited
+
+
+def _limited_lipsum(lipsum: Any) -> Any:
+    @functools.wraps(lipsum)
+    def limited(n: Any = 5, html: Any = True, min: Any = 20, max: Any = 100) -> Any:
+        if isinstance(n, int) and isinstance(max, int):
+            # the words of the lorem ipsum text are at most 12 characters long
+            _check_length(n * max * 13)
+        return lipsum(n, html, min, max)
+
+    return limited
+
+
+def _limited_concat(values: Iterable[str]) -> str:
+    values = list(values)
+    _check_length(sum(len(value) for value in values))
+    return "".join(values)
+
+
+def _as_code_sandbox_source(template: str) -> str:
+    """
+    The code sandbox embeds the template in a triple-quoted Python string literal, so backslash escapes in the
+    template are decoded before jinja2 sees it. Templates that are not a valid literal are left to the code sandbox.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            source = ast.literal_eval(f"'''{template}'''")
+    except (SyntaxError, ValueError) as e:
+        raise Jinja2SandboxUnsupportedError("Template is not a valid string literal for the code sandbox") from e
+    if not isinstance(source, str):
+        raise Jinja2SandboxUnsupportedError("Template is not a valid string literal for the code sandbox")
+    return source
+
+
+class _LimitedCodeGenerator(CodeGenerator):
+    def visit_Concat(self, node: Concat, frame: Frame) -> None:  # noqa: N802
+        # `~` joins through the environment so the length is checked before the joined string is built
+        if frame.eval_ctx.volatile:
+            markup = "context.eval_ctx.volatile"
+        else:
+            markup = "True" if frame.eval_ctx.autoescape else "False"
+        self.write("environment.limited_join((")
+        for arg in node.nodes:
+            self.visit(arg, frame)
+            self.write(", ")
+        self.write(f"), {markup})")
+
+
+class _LimitedSandboxedEnvironment(ImmutableSandboxedEnvironment):
+    """
+    Sandbox that checks the CPU time limit on every call, binary operator and attribute or item access, which
+    bounds loops that produce no output.
+
+    The operators, `~` concatenation, block and macro output, string methods, filters and globals that can build
+    a value much larger than their operands are checked against the output length limit before the value is
+    built, so a single one cannot exhaust the memory of the process. Lengths count the strings and containers a
+    value holds. Intercepted operators are not folded into constants when the template is compiled either.
+    Lazy filters such as `map` build nothing themselves, whatever collects their items is checked.
+
+    Unsafe attribute access raises instead of rendering as undefined, so the template is rendered by the code
+    sandbox like before, which does not restrict attributes.
+    """
+
+    code_generator_class = _LimitedCodeGenerator
+    intercepted_binops = frozenset(["+", "*", "**", "%"])
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.concat = _limited_concat  # type: ignore[assignment]
+        for name, check in (
+            ("center", _check_center_filter),
+            ("indent", _check_indent_filter),
+            ("format", _check_format_filter),
+            ("replace", _check_replace_filter),
+            ("wordwrap", _check_wordwrap_filter),
+            ("batch", _check_batch_filter),
+            ("slice", _check_slice_filter),
+        ):
+            self.filters[name] = _limited_filter(self.filters[name], check)
+        self.filters["join"] = _limited_join_filter(self.filters["join"])
+        self.filters["list"] = _limited_list_filter(self.filters["list"])
+        self.filters["sum"] = _limited_sum_filter(self.filters["sum"])
+        self.globals["lipsum"] = _limited_lipsum(self.globals["lipsum"])
+
+    def limited_join(self, values: tuple, markup: bool) -> str:
+        """`~` concatenation, `markup_join` or `str_join` of the jinja2 runtime with a length check."""
+        _check_cpu_time()
+        if markup:
+            _check_length(sum(_size(value) for value in values))
+            return markup_join(values)
+        strings = [str(value) for value in values]
+        _check_length(sum(len(value) for value in strings))
+        return "".join(strings)
+
+    def unsafe_undefined(self, obj: Any, attribute: str) -> Any:
+        raise SecurityError(f"access to attribute {attribute!r} of {type(obj).__name__!r} object is unsafe.")
+
+    def call_binop(self, context: Any, operator: str, left: Any, right: Any) -> Any:
+        _check_cpu_time()
+        if operator == "+":
+            if isinstance(left, _SEQUENCE_TYPES) and isinstance(right, _SEQUENCE_TYPES):
+                _check_length(_size(left) + _size(right))
+        elif operator == "*":
+            for sequence, times in ((left, right), (right, left)):
+                if isinstance(sequence, _SEQUENCE_TYPES) and isinstance(times, int) and times > 0:
+                    _check_length(_size(sequence) * times)
+            if isinstance(left, int) and isinstance(right, int):
+                _check_int_bits(left.bit_length() + right.bit_length())
+        elif operator == "**":
+            if isinstance(left, int) and isinstance(right, int) and abs(left) > 1 and right > 0:
+                _check_int_bits(left.bit_length() * right)
+        elif operator == "%":
+            if isinstance(left, str):
+                _check_printf_format(left, right)
+        return super().call_binop(context, operator, left, right)
+
+    def call(__self, __context, __obj, *args, **kwargs):  # noqa: N805
+        _check_cpu_time()
+        args = _limit_string_method(__obj, args, kwargs)
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def getattr(self, obj: Any, attribute: str) -> Any:
+        _check_cpu_time()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj: Any, argument: Any) -> Any:
+        _check_cpu_time()
+        return super().getitem(obj, argument)
+
+
+class Jinja2SandboxRenderer:
+    """
+    In-process Jinja2 renderer for templates that stay within the immutable sandbox.
+
+    Templates are compiled once and kept in an LRU keyed by the hash of their source. Rendering is limited
+    to JINJA2_LOCAL_RENDER_MAX_CPU_TIME seconds of CPU time and JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+    characters, for the output and for every value built while rendering. Templates that break the sandbox
+    rules or the limits raise `Jinja2SandboxUnsupportedError`, so the caller can hand them to the code sandbox
+    which has neither. Backslash escapes are decoded like the code sandbox does.
+    """
+
+    _environment = _LimitedSandboxedEnvironment()
+    _templates: LRUCache = LRUCache(maxsize=dify_config.JINJA2_LOCAL_RENDER_CACHE_SIZE)
+    _templates_lock = threading.Lock()
+
+    @classmethod
+    def render(cls, template: str, inputs: Mapping[str, Any]) -> str:
+        """
+        Render template
+        :param template: template source
+        :param inputs: inputs, passed through JSON like the code sandbox does
+        :return: rendered text
+        """
+        compiled = cls._get_template(template)
+        inputs = json.loads(json.dumps(inputs, ensure_ascii=False))
+
+        max_output_length = dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+        _limits.deadline = time.thread_time() + dify_config.JINJA2_LOCAL_RENDER_MAX_CPU_TIME
+        chunks = []
+        output_length = 0
+        try:
+            for chunk in compiled.generate(**inputs):
+                output_length += len(chunk)
+                if output_length > max_output_length:
+                    raise Jinja2SandboxUnsupportedError(
+                        f"Template output exceeded {max_output_length} characters in the in-process sandbox"
+                    )
+                _check_cpu_time()
+                chunks.append(chunk)
+        except SecurityError as e:
+            raise Jinja2SandboxUnsupportedError(str(e)) from e
+        except Jinja2SandboxUnsupportedError:
+            raise
+        except Exception as e:
+            raise Jinja2SandboxRenderError(f"{type(e).__name__}: {e}") from e
+        finally:
+            _limits.deadline = None
+
+        return "".join(chunks)
+
+    @classmethod
+    def _get_template(cls, template: str) -> Template:
+        key = hashlib.sha256(template.encode("utf-8")).hexdigest()
+        with cls._templates_lock:
+            compiled = cls._templates.get(key)
+        if compiled is not None:
+            return compiled
+
+        try:
+            compiled = cls._environment.from_string(_as_code_sandbox_source(template))
+        except TemplateError as e:
+            raise Jinja2SandboxRenderError(f"{type(e).__name__}: {e}") from e
+
+        with cls._templates_lock:
+            cls._templates[key] = compiled
+        return compiled
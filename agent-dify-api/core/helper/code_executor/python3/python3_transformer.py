@@ -4,6 +4,8 @@ from core.helper.code_executor.template_transformer import TemplateTransformer
 
 
 class Python3TemplateTransformer(TemplateTransformer):
+    supports_batch = True
+
     @classmethod
     def get_runner_script(cls) -> str:
         runner_script = dedent(f"""
@@ -25,3 +27,32 @@ class Python3TemplateTransformer(TemplateTransformer):
             print(result)
             """)
         return runner_script
+
+    @classmethod
+    def get_batch_runner_script(cls) -> str:
+        runner_script = dedent(f"""
+            import json
+            import traceback
+            from base64 import b64decode
+            
+            # decode the main function code and prepare the list of input dicts
+            code = compile(b64decode('{cls._code_placeholder}').decode('utf-8'), '<code>', 'exec')
+            inputs_list = json.loads(b64decode('{cls._inputs_placeholder}').decode('utf-8'))
+            
+            # declare main function in fresh globals and execute it for each input dict,
+            # keeping the error of each call
+            results = []
+            for inputs_obj in inputs_list:
+                try:
+                    code_globals = {{"__name__": "__main__"}}
+                    exec(code, code_globals)
+                    results.append(json.dumps({{"result": code_globals["main"](**inputs_obj)}}))
+                except Exception:
+                    results.append(json.dumps({{"error": traceback.format_exc()}}))
+            
+            # convert outputs to a json list and print
+            output_json = '[' + ','.join(results) + ']'
+            result = f'''<<RESULT>>{{output_json}}<<RESULT>>'''
+            print(result)
+            """)
+        return runner_script
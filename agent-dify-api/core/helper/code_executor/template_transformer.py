@@ -2,7 +2,7 @@ import json
 import re
 from abc import ABC, abstractmethod
 from base64 import b64encode
-from collections.abc import Mapping
+from collections.abc import Mapping, Sequence
 from typing import Any
 
 
@@ -10,6 +10,8 @@ class TemplateTransformer(ABC):
     _code_placeholder: str = "{{code}}"
     _inputs_placeholder: str = "{{inputs}}"
     _result_tag: str = "<<RESULT>>"
+    # whether get_batch_runner_script is implemented for the language
+    supports_batch: bool = False
 
     @classmethod
     def transform_caller(cls, code: str, inputs: Mapping[str, Any]) -> tuple[str, str]:
@@ -42,6 +44,28 @@ class TemplateTransformer(ABC):
             result = json.loads(cls.extract_result_str_from_response(response))
         except json.JSONDecodeError:
             raise ValueError("failed to parse response")
+        return cls.validate_result(result)
+
+    @classmethod
+    def transform_batch_response(cls, response: str, count: int) -> list[Mapping[str, Any]]:
+        """
+        Transform response of a batch runner to one item per inputs
+        :param response: response
+        :param count: number of inputs in the batch
+        :return: items with either the `result` or the `error` of each call
+        """
+        try:
+            items = json.loads(cls.extract_result_str_from_response(response))
+        except json.JSONDecodeError:
+            raise ValueError("failed to parse response")
+        if not isinstance(items, list) or len(items) != count:
+            raise ValueError(f"batch response must be a list of {count} items")
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError("batch response items must be dicts")
+        return items
+
+    @classmethod
+    def validate_result(cls, result: Any) -> Mapping[str, Any]:
         if not isinstance(result, dict):
             raise ValueError("result must be a dict")
         if not all(isinstance(k, str) for k in result):
@@ -57,7 +81,16 @@ class TemplateTransformer(ABC):
         pass
 
     @classmethod
-    def serialize_inputs(cls, inputs: Mapping[str, Any]) -> str:
+    def get_batch_runner_script(cls) -> str:
+        """
+        Get runner script calling the main function once for each inputs of a list, only for transformers
+        that set `supports_batch`. The code placeholder is replaced with the base64 encoded code, which the
+        script runs again in fresh globals for each call so that calls do not share state.
+        """
+        raise NotImplementedError(f"{cls.__name__} does not support batch execution")
+
+    @classmethod
+    def serialize_inputs(cls, inputs: Mapping[str, Any] | Sequence[Mapping[str, Any]]) -> str:
         inputs_json_str = json.dumps(inputs, ensure_ascii=False).encode()
         input_base64_encoded = b64encode(inputs_json_str).decode("utf-8")
         return input_base64_encoded
@@ -71,6 +104,14 @@ class TemplateTransformer(ABC):
         script = script.replace(cls._inputs_placeholder, inputs_str)
         return script
 
+    @classmethod
+    def assemble_batch_runner_script(cls, code: str, inputs_list: Sequence[Mapping[str, Any]]) -> str:
+        script = cls.get_batch_runner_script()
+        script = script.replace(cls._code_placeholder, b64encode(code.encode()).decode("utf-8"))
+        inputs_str = cls.serialize_inputs(inputs_list)
+        script = script.replace(cls._inputs_placeholder, inputs_str)
+        return script
+
     @classmethod
     def get_preload_script(cls) -> str:
         """
@@ -1,10 +1,21 @@
 import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Hashable
 from enum import Enum
 from json import JSONDecodeError
-from typing import Optional
+from typing import Optional, TypeVar
 
+from cachetools import TTLCache
+
+from configs import dify_config
 from extensions.ext_redis import redis_client
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 class ProviderCredentialsCacheType(Enum):
     PROVIDER = "provider"
@@ -50,3 +61,90 @@ class ProviderCredentialsCache:
         :return:
         """
         redis_client.delete(self.cache_key)
+
+
+class TenantModelProviderCache:
+    """
+    In-process cache of what the model runtime loads for a tenant: its plugin model providers, model schemas and
+    provider configurations.
+
+    Entries are keyed by the tenant's version in Redis, which is bumped by writes to the tenant's providers,
+    credentials, model settings, load balancing configs and plugins, so a write in one process makes the entries
+    of every process unreachable. Entries expire after MODEL_PROVIDER_CACHE_TTL seconds, which bounds the
+    staleness of what is not versioned, like quota usage and plugin installs finished by the daemon. Cached
+    values are shared by all requests of the process and must not be modified.
+    """
+
+    _cache: TTLCache = TTLCache(maxsize=dify_config.MODEL_PROVIDER_CACHE_SIZE, ttl=dify_config.MODEL_PROVIDER_CACHE_TTL)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _version_key(tenant_id: str) -> str:
+        return f"model_provider_cache_version:{tenant_id}"
+
+    @classmethod
+    def get_version(cls, tenant_id: str) -> int:
+        """
+        Get the version of a tenant, a missing version starts from the current time in nanoseconds.
+        """
+        key = cls._version_key(tenant_id)
+        version = redis_client.get(key)
+        if version is None:
+            redis_client.set(key, time.time_ns(), nx=True)
+            version = redis_client.get(key)
+        return int(version)
+
+    @classmethod
+    def bump(cls, tenant_id: str) -> None:
+        """
+        Invalidate the cached entries of a tenant in every process.
+        """
+        key = cls._version_key(tenant_id)
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.set(key, time.time_ns(), nx=True)
+            pipeline.incr(key)
+            pipeline.execute()
+        except Exception:
+            logger.exception(f"Failed to bump model provider cache version of tenant {tenant_id}")
+
+    @classmethod
+    def get_or_load(cls, tenant_id: str, key: Hashable, loader: Callable[[], T]) -> T:
+        """
+        Get a cached entry of a tenant, loading it on a miss.
+
+        `None` is returned without being cached, and the entry is loaded without the cache when Redis is not
+        available.
+
+        :param tenant_id: tenant id
+        :param key: key of the entry within the tenant
+        :param loader: loads the entry
+        """
+        if not dify_config.MODEL_PROVIDER_CACHE_ENABLED:
+            return loader()
+
+        try:
+            version = cls.get_version(tenant_id)
+        except Exception:
+            logger.exception(f"Failed to get model provider cache version of tenant {tenant_id}")
+            return loader()
+
+        cache_key = (tenant_id, version, key)
+        with cls._lock:
+            value = cls._cache.get(cache_key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value is not None:
+            with cls._lock:
+                cls._cache[cache_key] = value
+        return value
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Drop the cached entries of this process.
+        """
+        with cls._lock:
+            cls._cache.clear()
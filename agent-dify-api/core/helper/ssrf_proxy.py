@@ -2,10 +2,19 @@
 Proxy requests to avoid SSRF
 """
 
+import http.cookiejar
+import importlib.util
 import logging
+import os
+import threading
 import time
+import weakref
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import urlsplit
 
 import httpx
+from pydantic import BaseModel
 
 from configs import dify_config
 
@@ -34,6 +43,140 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
+class ClientPoolStats(BaseModel):
+    """
+    Connections of one pooled client, per mounted transport.
+    """
+
+    proxy: Optional[str]
+    verify: bool
+    http2: bool
+    requests: int
+    connections: int
+    idle_connections: int
+
+
+_clients: dict[tuple, httpx.Client] = {}
+_client_requests: dict[tuple, int] = defaultdict(int)
+_clients_lock = threading.Lock()
+# only kept while a request to the host holds or waits for a slot, so hosts requested once take no memory
+_host_semaphores: weakref.WeakValueDictionary[str, threading.BoundedSemaphore] = weakref.WeakValueDictionary()
+
+
+def _http2_enabled() -> bool:
+    if not dify_config.SSRF_POOL_HTTP2_ENABLED:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logging.warning("SSRF_POOL_HTTP2_ENABLED is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def _client_key() -> tuple:
+    # clients are not shared with forked worker processes
+    return (
+        os.getpid(),
+        dify_config.SSRF_PROXY_ALL_URL,
+        dify_config.SSRF_PROXY_HTTP_URL,
+        dify_config.SSRF_PROXY_HTTPS_URL,
+        HTTP_REQUEST_NODE_SSL_VERIFY,
+        dify_config.SSRF_POOL_HTTP2_ENABLED,
+    )
+
+
+def _discarding_cookie_jar() -> http.cookiejar.CookieJar:
+    """
+    Cookie jar that never stores cookies, so the shared client does not send the cookies one request received
+    with the next, unrelated, request. Cookies passed to a request are still sent.
+    """
+    return http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+
+def _create_client() -> httpx.Client:
+    http2 = _http2_enabled()
+    limits = httpx.Limits(
+        max_connections=dify_config.SSRF_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=dify_config.SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=dify_config.SSRF_POOL_KEEPALIVE_EXPIRY,
+    )
+    cookies = _discarding_cookie_jar()
+    if dify_config.SSRF_PROXY_ALL_URL:
+        return httpx.Client(
+            proxy=dify_config.SSRF_PROXY_ALL_URL,
+            verify=HTTP_REQUEST_NODE_SSL_VERIFY,
+            limits=limits,
+            http2=http2,
+            cookies=cookies,
+        )
+    elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
+        # mounted transports do not inherit the settings of the client
+        proxy_mounts = {
+            "http://": httpx.HTTPTransport(
+                proxy=dify_config.SSRF_PROXY_HTTP_URL, verify=HTTP_REQUEST_NODE_SSL_VERIFY, limits=limits, http2=http2
+            ),
+            "https://": httpx.HTTPTransport(
+                proxy=dify_config.SSRF_PROXY_HTTPS_URL, verify=HTTP_REQUEST_NODE_SSL_VERIFY, limits=limits, http2=http2
+            ),
+        }
+        return httpx.Client(
+            mounts=proxy_mounts, verify=HTTP_REQUEST_NODE_SSL_VERIFY, limits=limits, http2=http2, cookies=cookies
+        )
+    else:
+        return httpx.Client(verify=HTTP_REQUEST_NODE_SSL_VERIFY, limits=limits, http2=http2, cookies=cookies)
+
+
+def _get_client() -> httpx.Client:
+    """
+    Get the long-lived client of the current proxy configuration, its connections are reused across requests but
+    no cookies are kept between them.
+    """
+    key = _client_key()
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _create_client()
+        _client_requests[key] += 1
+    return client
+
+
+def _get_host_semaphore(url) -> Optional[threading.BoundedSemaphore]:
+    max_connections_per_host = dify_config.SSRF_POOL_MAX_CONNECTIONS_PER_HOST
+    if not max_connections_per_host:
+        return None
+    host = urlsplit(str(url)).netloc.lower()
+    with _clients_lock:
+        return _host_semaphores.setdefault(host, threading.BoundedSemaphore(max_connections_per_host))
+
+
+def get_pool_stats() -> list[ClientPoolStats]:
+    """Connection counts of the pooled clients of this process."""
+    stats = []
+    with _clients_lock:
+        clients = list(_clients.items())
+        requests = dict(_client_requests)
+    for key, client in clients:
+        if key[0] != os.getpid():
+            continue
+        transports = [client._transport, *(transport for transport in client._mounts.values() if transport)]
+        connections = [
+            connection
+            for transport in transports
+            if isinstance(transport, httpx.HTTPTransport)
+            for connection in transport._pool.connections
+        ]
+        stats.append(
+            ClientPoolStats(
+                proxy=key[1] or (f"{key[2]}, {key[3]}" if key[2] and key[3] else None),
+                verify=key[4],
+                http2=key[5],
+                requests=requests.get(key, 0),
+                connections=len(connections),
+                idle_connections=sum(1 for connection in connections if connection.is_idle()),
+            )
+        )
+    return stats
+
+
 def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
@@ -48,22 +191,16 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
             write=dify_config.SSRF_DEFAULT_WRITE_TIME_OUT,
         )
 
+    client = _get_client()
+    host_semaphore = _get_host_semaphore(url)
     retries = 0
     while retries <= max_retries:
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL, verify=HTTP_REQUEST_NODE_SSL_VERIFY) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
-                proxy_mounts = {
-                    "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL),
-                    "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL),
-                }
-                with httpx.Client(mounts=proxy_mounts, verify=HTTP_REQUEST_NODE_SSL_VERIFY) as client:
+            if host_semaphore:
+                with host_semaphore:
                     response = client.request(method=method, url=url, **kwargs)
             else:
-                with httpx.Client(verify=HTTP_REQUEST_NODE_SSL_VERIFY) as client:
-                    response = client.request(method=method, url=url, **kwargs)
+                response = client.request(method=method, url=url, **kwargs)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -0,0 +1,149 @@
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from flask import Flask
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PipelineStageStats(BaseModel):
+    """
+    Work done by one stage of a staged pipeline.
+    """
+
+    name: str
+    workers: int
+    items: int = 0
+    busy_time: float = 0.0
+    max_queue_depth: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Items handled per second of worker time."""
+        return self.items / self.busy_time if self.busy_time else 0.0
+
+
+class _Stage:
+    def __init__(
+        self, name: str, handler: Callable[[Any], None], workers: int, queue_size: int, partitioned: bool
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queues: list[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(workers if partitioned else 1)]
+        self.stats = PipelineStageStats(name=name, workers=workers)
+        self.stats_lock = threading.Lock()
+
+
+class StagedPipeline:
+    """
+    Stages of worker threads connected by bounded queues.
+
+    Handlers pass items on with `put`, which blocks while the next stage's queue is full, so a slow stage
+    throttles the stages feeding it instead of letting work pile up in memory. A partitioned stage gives
+    each worker its own queue and routes items by key, so items with the same key never run concurrently.
+    Handlers may only put items to later stages, a cycle could deadlock on full queues.
+
+    Every worker runs inside its own application context, so it gets its own database session.
+
+    When feeding the items fails the pipeline is aborted: workers drop the items still queued and handlers
+    stop waiting on full queues, so the workers can be stopped instead of blocking each other.
+    """
+
+    def __init__(self, flask_app: Flask, queue_size: int, on_error: Callable[[Any, Exception], None]) -> None:
+        self._flask_app = flask_app
+        self._queue_size = queue_size
+        self._on_error = on_error
+        self._stages: dict[str, _Stage] = {}
+        self._pending = 0
+        self._pending_condition = threading.Condition()
+        self._aborted = threading.Event()
+
+    def add_stage(self, name: str, handler: Callable[[Any], None], workers: int = 1, partitioned: bool = False) -> None:
+        self._stages[name] = _Stage(name, handler, workers, self._queue_size, partitioned)
+
+    def put(self, stage_name: str, item: Any, key: int = 0) -> None:
+        """Queue an item for a stage, blocking while the stage's queue is full. Dropped once the pipeline aborted."""
+        stage = self._stages[stage_name]
+        stage_queue = stage.queues[key % len(stage.queues)]
+        with self._pending_condition:
+            self._pending += 1
+        while not self._aborted.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        else:
+            return
+        queue_depth = stage_queue.qsize()
+        with stage.stats_lock:
+            stage.stats.max_queue_depth = max(stage.stats.max_queue_depth, queue_depth)
+
+    def run(self, stage_name: str, items: Iterable[Any]) -> list[PipelineStageStats]:
+        """
+        Feed the items to a stage and wait until every stage is idle.
+
+        :return: stats of each stage
+        """
+        threads = []
+        for stage in self._stages.values():
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(stage, stage.queues[worker % len(stage.queues)]),
+                    name=f"pipeline_{stage.name}_{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in items:
+                self.put(stage_name, item)
+            with self._pending_condition:
+                self._pending_condition.wait_for(lambda: self._pending == 0)
+        except BaseException:
+            self._aborted.set()
+            raise
+        finally:
+            # the queues are empty unless aborted, then the workers drain them without blocking
+            for stage in self._stages.values():
+                for worker in range(stage.workers):
+                    stage.queues[worker % len(stage.queues)].put(_STOP)
+            for thread in threads:
+                thread.join()
+
+        return [stage.stats for stage in self._stages.values()]
+
+    def _work(self, stage: _Stage, stage_queue: queue.Queue) -> None:
+        with self._flask_app.app_context():
+            while True:
+                item = stage_queue.get()
+                if item is _STOP:
+                    return
+                if self._aborted.is_set():
+                    continue
+                started_at = time.perf_counter()
+                try:
+                    stage.handler(item)
+                except Exception as e:
+                    try:
+                        self._on_error(item, e)
+                    except Exception:
+                        logger.exception(f"Failed to handle error of pipeline stage {stage.name}")
+                finally:
+                    with stage.stats_lock:
+                        stage.stats.items += 1
+                        stage.stats.busy_time += time.perf_counter() - started_at
+                    with self._pending_condition:
+                        self._pending -= 1
+                        if self._pending == 0:
+                            self._pending_condition.notify_all()
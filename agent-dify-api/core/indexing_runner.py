@@ -6,19 +6,22 @@ import re
 import threading
 import time
 import uuid
+from functools import partial
 from typing import Any, Optional, cast
 
-from flask import current_app
+from flask import Flask, current_app
 from flask_login import current_user  # type: ignore
 from sqlalchemy.orm.exc import ObjectDeletedError
 
 from configs import dify_config
 from core.entities.knowledge_entities import IndexingEstimate, PreviewDetail, QAPreviewDetail
 from core.errors.error import ProviderTokenNotInitError
+from core.indexing_pipeline import StagedPipeline
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.rag.cleaner.clean_processor import CleanProcessor
 from core.rag.datasource.keyword.keyword_factory import Keyword
+from core.rag.datasource.keyword.keyword_type import KeyWordType
 from core.rag.docstore.dataset_docstore import DatasetDocumentStore
 from core.rag.extractor.entity.extract_setting import ExtractSetting
 from core.rag.index_processor.constant.index_type import IndexType
@@ -38,6 +41,7 @@ from libs import helper
 from models.dataset import ChildChunk, Dataset, DatasetProcessRule, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from models.model import UploadFile
+from services.entities.knowledge_entities.knowledge_entities import ParentMode
 from services.feature_service import FeatureService
 
 
@@ -47,57 +51,53 @@ class IndexingRunner:
         self.model_manager = ModelManager()
 
     def run(self, dataset_documents: list[DatasetDocument]):
-        """Run the indexing process."""
-        for dataset_document in dataset_documents:
-            try:
-                # get dataset
-                dataset = Dataset.query.filter_by(id=dataset_document.dataset_id).first()
-
-                if not dataset:
-                    raise ValueError("no dataset found")
+        """
+        Run the indexing process.
 
-                # get the process rule
-                processing_rule = (
-                    db.session.query(DatasetProcessRule)
-                    .filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id)
-                    .first()
-                )
-                if not processing_rule:
-                    raise ValueError("no process rule found")
-                index_type = dataset_document.doc_form
-                index_processor = IndexProcessorFactory(index_type).init_index_processor()
-                # extract
-                text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
-
-                # transform
-                documents = self._transform(
-                    index_processor, dataset, text_docs, dataset_document.doc_language, processing_rule.to_dict()
-                )
-                # save segment
-                self._load_segments(dataset, dataset_document, documents)
-
-                # load
-                self._load(
-                    index_processor=index_processor,
-                    dataset=dataset,
-                    dataset_document=dataset_document,
-                    documents=documents,
+        Documents flow through a staged pipeline: pages are split and stored in batches as soon as the
+        document is extracted, and each stored batch is embedded and keyword-indexed while the next ones
+        are split, so the stages of consecutive documents overlap.
+        """
+        flask_app = current_app._get_current_object()  # type: ignore
+        states = [_DocumentIndexingState(dataset_document) for dataset_document in dataset_documents]
+
+        pipeline = StagedPipeline(flask_app, dify_config.INDEXING_PIPELINE_QUEUE_SIZE, self._on_pipeline_error)
+        pipeline.add_stage("extract", partial(self._extract_stage, pipeline))
+        pipeline.add_stage("split", partial(self._split_stage, pipeline))
+        pipeline.add_stage("store", partial(self._store_stage, pipeline))
+        pipeline.add_stage(
+            "index",
+            partial(self._index_stage, flask_app),
+            workers=dify_config.INDEXING_PIPELINE_EMBEDDING_WORKERS,
+            partitioned=True,
+        )
+        pipeline.add_stage("keyword", partial(self._keyword_stage, flask_app))
+        for stats in pipeline.run("extract", states):
+            logging.info(
+                "Indexing stage {}: {} items, {:.1f} items/s per worker, max queue depth {}".format(
+                    stats.name, stats.items, stats.throughput, stats.max_queue_depth
                 )
-            except DocumentIsPausedError:
-                raise DocumentIsPausedError("Document paused, document id: {}".format(dataset_document.id))
-            except ProviderTokenNotInitError as e:
+            )
+
+        paused_document_id = None
+        for state, dataset_document in zip(states, dataset_documents):
+            if state.error is None:
+                continue
+            try:
+                if isinstance(state.error, DocumentIsPausedError):
+                    paused_document_id = paused_document_id or dataset_document.id
+                    continue
+                if isinstance(state.error, ProviderTokenNotInitError):
+                    dataset_document.error = str(state.error.description)
+                else:
+                    dataset_document.error = str(state.error)
                 dataset_document.indexing_status = "error"
-                dataset_document.error = str(e.description)
                 dataset_document.stopped_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
                 db.session.commit()
             except ObjectDeletedError:
-                logging.warning("Document deleted, document id: {}".format(dataset_document.id))
-            except Exception as e:
-                logging.exception("consume document failed")
-                dataset_document.indexing_status = "error"
-                dataset_document.error = str(e)
-                dataset_document.stopped_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-                db.session.commit()
+                logging.warning("Document deleted, document id: {}".format(state.document_id))
+        if paused_document_id:
+            raise DocumentIsPausedError("Document paused, document id: {}".format(paused_document_id))
 
     def run_in_splitting_status(self, dataset_document: DatasetDocument):
         """Run the indexing process when the index_status is splitting."""
@@ -113,50 +113,218 @@ class IndexingRunner:
                 dataset_id=dataset.id, document_id=dataset_document.id
             ).all()
 
+            # batches stored before the interruption may already be indexed
+            index_node_ids = [document_segment.index_node_id for document_segment in document_segments]
+            if index_node_ids:
+                index_processor = IndexProcessorFactory(dataset_document.doc_form).init_index_processor()
+                index_processor.clean(dataset, index_node_ids, with_keywords=True, delete_child_chunks=True)
+
             for document_segment in document_segments:
                 db.session.delete(document_segment)
                 if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
                     # delete child chunks
                     db.session.query(ChildChunk).filter(ChildChunk.segment_id == document_segment.id).delete()
             db.session.commit()
-            # get the process rule
-            processing_rule = (
-                db.session.query(DatasetProcessRule)
-                .filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id)
-                .first()
+        except Exception as e:
+            logging.exception("consume document failed")
+            dataset_document.indexing_status = "error"
+            dataset_document.error = str(e)
+            dataset_document.stopped_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+            db.session.commit()
+            return
+
+        self.run([dataset_document])
+
+    def _extract_stage(self, pipeline: StagedPipeline, state: "_DocumentIndexingState") -> None:
+        dataset = Dataset.query.filter_by(id=state.dataset_id).first()
+        if not dataset:
+            raise ValueError("no dataset found")
+        dataset_document = DatasetDocument.query.filter_by(id=state.document_id).first()
+        if not dataset_document:
+            raise DocumentIsDeletedPausedError()
+
+        # get the process rule
+        processing_rule = (
+            db.session.query(DatasetProcessRule)
+            .filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id)
+            .first()
+        )
+        if not processing_rule:
+            raise ValueError("no process rule found")
+        state.process_rule = processing_rule.to_dict()
+        state.index_processor = IndexProcessorFactory(state.doc_form).init_index_processor()
+        if dataset.indexing_technique == "high_quality":
+            state.embedding_model_instance = self.model_manager.get_model_instance(
+                tenant_id=dataset.tenant_id,
+                provider=dataset.embedding_model_provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=dataset.embedding_model,
             )
-            if not processing_rule:
-                raise ValueError("no process rule found")
 
-            index_type = dataset_document.doc_form
-            index_processor = IndexProcessorFactory(index_type).init_index_processor()
-            # extract
-            text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
+        # extract
+        text_docs = self._extract(state.index_processor, dataset_document, state.process_rule)
 
-            # transform
-            documents = self._transform(
-                index_processor, dataset, text_docs, dataset_document.doc_language, processing_rule.to_dict()
+        # full-doc parents span every page, so they can only be split all at once
+        rules = state.process_rule.get("rules") or {}
+        if state.doc_form == IndexType.PARENT_CHILD_INDEX and rules.get("parent_mode") == ParentMode.FULL_DOC:
+            batch_size = max(len(text_docs), 1)
+        else:
+            batch_size = dify_config.INDEXING_PIPELINE_PAGES_PER_BATCH
+        batches = [text_docs[i : i + batch_size] for i in range(0, len(text_docs), batch_size)]
+
+        with state.lock:
+            state.total_batches = state.remaining = len(batches)
+        if not batches:
+            cur_time = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+            self._update_document_index_status(
+                document_id=state.document_id,
+                after_indexing_status="indexing",
+                extra_update_params={
+                    DatasetDocument.cleaning_completed_at: cur_time,
+                    DatasetDocument.splitting_completed_at: cur_time,
+                },
             )
-            # save segment
-            self._load_segments(dataset, dataset_document, documents)
+            state.started_at = time.perf_counter()
+            self._complete_document(state)
+        for batch in batches:
+            pipeline.put("split", (state, batch))
+
+    def _split_stage(self, pipeline: StagedPipeline, item: tuple["_DocumentIndexingState", list[Document]]) -> None:
+        state, text_docs = item
+        if state.error:
+            return
+        dataset = Dataset.query.filter_by(id=state.dataset_id).first()
+        if not dataset:
+            raise ValueError("no dataset found")
+
+        # transform
+        documents = self._transform(state.index_processor, dataset, text_docs, state.doc_language, state.process_rule)
+        pipeline.put("store", (state, documents))
+
+    def _store_stage(self, pipeline: StagedPipeline, item: tuple["_DocumentIndexingState", list[Document]]) -> None:
+        state, documents = item
+        if state.error:
+            return
+        dataset = Dataset.query.filter_by(id=state.dataset_id).first()
+        if not dataset:
+            raise ValueError("no dataset found")
 
-            # load
-            self._load(
-                index_processor=index_processor, dataset=dataset, dataset_document=dataset_document, documents=documents
+        # save node to document segment
+        doc_store = DatasetDocumentStore(dataset=dataset, user_id=state.created_by, document_id=state.document_id)
+        doc_store.add_documents(docs=documents, save_child=state.doc_form == IndexType.PARENT_CHILD_INDEX)
+
+        # update segment status to indexing
+        document_ids = [document.metadata["doc_id"] for document in documents]
+        if document_ids:
+            db.session.query(DocumentSegment).filter(
+                DocumentSegment.document_id == state.document_id,
+                DocumentSegment.dataset_id == state.dataset_id,
+                DocumentSegment.index_node_id.in_(document_ids),
+            ).update(
+                {
+                    DocumentSegment.status: "indexing",
+                    DocumentSegment.indexing_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
+                }
             )
-        except DocumentIsPausedError:
-            raise DocumentIsPausedError("Document paused, document id: {}".format(dataset_document.id))
-        except ProviderTokenNotInitError as e:
-            dataset_document.indexing_status = "error"
-            dataset_document.error = str(e.description)
-            dataset_document.stopped_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
             db.session.commit()
-        except Exception as e:
+
+        # the keyword table is rewritten as a whole on every update, so it gets the document's chunks at once
+        batch_keywords = dify_config.KEYWORD_STORE == KeyWordType.JIEBA_POSTINGS
+        with state.lock:
+            if state.stored_batches == 0:
+                state.started_at = time.perf_counter()
+            state.stored_batches += 1
+            all_stored = state.stored_batches == state.total_batches
+            if not batch_keywords:
+                state.keyword_documents.extend(documents)
+        if all_stored:
+            # update document status to indexing
+            cur_time = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+            self._update_document_index_status(
+                document_id=state.document_id,
+                after_indexing_status="indexing",
+                extra_update_params={
+                    DatasetDocument.cleaning_completed_at: cur_time,
+                    DatasetDocument.splitting_completed_at: cur_time,
+                },
+            )
+
+        tasks: list[tuple[str, list[Document], int]] = []
+        if documents and dataset.indexing_technique == "high_quality":
+            # Distribute documents into the index workers based on the hash values of page_content
+            # This is done to prevent multiple threads from processing the same document,
+            # Thereby avoiding potential database insertion deadlocks
+            workers = dify_config.INDEXING_PIPELINE_EMBEDDING_WORKERS
+            document_groups: list[list[Document]] = [[] for _ in range(workers)]
+            for document in documents:
+                hash = helper.generate_text_hash(document.page_content)
+                document_groups[int(hash, 16) % workers].append(document)
+            tasks.extend(
+                ("index", chunk_documents, group_index)
+                for group_index, chunk_documents in enumerate(document_groups)
+                if chunk_documents
+            )
+        if state.doc_form != IndexType.PARENT_CHILD_INDEX:
+            if batch_keywords and documents:
+                tasks.append(("keyword", documents, 0))
+            elif not batch_keywords and all_stored and state.keyword_documents:
+                tasks.append(("keyword", state.keyword_documents, 0))
+
+        self._finish_batch(state, new_tasks=len(tasks))
+        for stage_name, chunk_documents, key in tasks:
+            pipeline.put(stage_name, (state, chunk_documents), key=key)
+
+    def _index_stage(self, flask_app: Flask, item: tuple["_DocumentIndexingState", list[Document]]) -> None:
+        state, documents = item
+        if state.error:
+            return
+        dataset = Dataset.query.filter_by(id=state.dataset_id).first()
+        if not dataset:
+            raise ValueError("no dataset found")
+        tokens = self._process_chunk(
+            flask_app, state.index_processor, documents, dataset, state.document_id, state.embedding_model_instance
+        )
+        with state.lock:
+            state.tokens += tokens
+        self._finish_batch(state)
+
+    def _keyword_stage(self, flask_app: Flask, item: tuple["_DocumentIndexingState", list[Document]]) -> None:
+        state, documents = item
+        if state.error:
+            return
+        self._process_keyword_index(flask_app, state.dataset_id, state.document_id, documents)
+        self._finish_batch(state)
+
+    def _finish_batch(self, state: "_DocumentIndexingState", new_tasks: int = 0) -> None:
+        """Replace one task of a document by its follow-up tasks, completing the document after its last task."""
+        with state.lock:
+            state.remaining += new_tasks - 1
+            completed = state.remaining == 0 and state.stored_batches == state.total_batches
+        if completed:
+            self._complete_document(state)
+
+    def _complete_document(self, state: "_DocumentIndexingState") -> None:
+        # update document status to completed
+        self._update_document_index_status(
+            document_id=state.document_id,
+            after_indexing_status="completed",
+            extra_update_params={
+                DatasetDocument.tokens: state.tokens,
+                DatasetDocument.completed_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
+                DatasetDocument.indexing_latency: time.perf_counter() - state.started_at,
+                DatasetDocument.error: None,
+            },
+        )
+
+    @staticmethod
+    def _on_pipeline_error(item: Any, error: Exception) -> None:
+        state = item[0] if isinstance(item, tuple) else item
+        if not isinstance(error, DocumentIsPausedError | ProviderTokenNotInitError | DocumentIsDeletedPausedError):
             logging.exception("consume document failed")
-            dataset_document.indexing_status = "error"
-            dataset_document.error = str(e)
-            dataset_document.stopped_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-            db.session.commit()
+        db.session.rollback()
+        with state.lock:
+            if state.error is None:
+                state.error = error
 
     def run_in_indexing_status(self, dataset_document: DatasetDocument):
         """Run the indexing process when the index_status is indexing."""
@@ -561,7 +729,7 @@ class IndexingRunner:
                             index_processor,
                             chunk_documents,
                             dataset,
-                            dataset_document,
+                            dataset_document.id,
                             embedding_model_instance,
                         )
                     )
@@ -610,11 +778,11 @@ class IndexingRunner:
                 db.session.commit()
 
     def _process_chunk(
-        self, flask_app, index_processor, chunk_documents, dataset, dataset_document, embedding_model_instance
+        self, flask_app, index_processor, chunk_documents, dataset, dataset_document_id, embedding_model_instance
     ):
         with flask_app.app_context():
             # check document is paused
-            self._check_document_paused_status(dataset_document.id)
+            self._check_document_paused_status(dataset_document_id)
 
             tokens = 0
             if embedding_model_instance:
@@ -626,7 +794,7 @@ class IndexingRunner:
 
             document_ids = [document.metadata["doc_id"] for document in chunk_documents]
             db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
+                DocumentSegment.document_id == dataset_document_id,
                 DocumentSegment.dataset_id == dataset.id,
                 DocumentSegment.index_node_id.in_(document_ids),
                 DocumentSegment.status == "indexing",
@@ -713,35 +881,36 @@ class IndexingRunner:
 
         return documents
 
-    def _load_segments(self, dataset, dataset_document, documents):
-        # save node to document segment
-        doc_store = DatasetDocumentStore(
-            dataset=dataset, user_id=dataset_document.created_by, document_id=dataset_document.id
-        )
-
-        # add document segments
-        doc_store.add_documents(docs=documents, save_child=dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX)
 
-        # update document status to indexing
-        cur_time = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-        self._update_document_index_status(
-            document_id=dataset_document.id,
-            after_indexing_status="indexing",
-            extra_update_params={
-                DatasetDocument.cleaning_completed_at: cur_time,
-                DatasetDocument.splitting_completed_at: cur_time,
-            },
-        )
-
-        # update segment status to indexing
-        self._update_segments_by_document(
-            dataset_document_id=dataset_document.id,
-            update_params={
-                DocumentSegment.status: "indexing",
-                DocumentSegment.indexing_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
-            },
-        )
-        pass
+class _DocumentIndexingState:
+    """
+    Progress of one document through the indexing pipeline, shared by the stage workers.
+
+    Only plain values are kept, stage workers load the models they need in their own session.
+    """
+
+    def __init__(self, dataset_document: DatasetDocument):
+        self.document_id: str = dataset_document.id
+        self.dataset_id: str = dataset_document.dataset_id
+        self.doc_form: str = dataset_document.doc_form
+        self.doc_language: str = dataset_document.doc_language
+        self.created_by: str = dataset_document.created_by
+        self.process_rule: dict = {}
+        self.index_processor: Optional[BaseIndexProcessor] = None
+        self.embedding_model_instance: Optional[ModelInstance] = None
+        self.lock = threading.Lock()
+        self.error: Optional[Exception] = None
+        # indexing_latency counts from when the first batch is stored and its embedding can start, like the
+        # sequential indexing it replaced counted from the embedding of the stored chunks, so extraction,
+        # splitting and storing are left out of it as before
+        self.started_at = 0.0
+        self.total_batches = 0
+        self.stored_batches = 0
+        # chunks waiting for the keyword table until the last batch is stored
+        self.keyword_documents: list[Document] = []
+        # batches not yet stored plus index/keyword tasks not yet done
+        self.remaining = 0
+        self.tokens = 0
 
 
 class DocumentIsPausedError(Exception):
@@ -485,15 +485,17 @@ class LBModelManager:
         self._provider = provider
         self._model_type = model_type
         self._model = model
-        self._load_balancing_configs = load_balancing_configs
+        # the configs belong to cached provider configurations, so they are copied instead of modified
+        self._load_balancing_configs = []
 
-        for load_balancing_config in self._load_balancing_configs[:]:  # Iterate over a shallow copy of the list
+        for load_balancing_config in load_balancing_configs:
             if load_balancing_config.name == "__inherit__":
                 if not managed_credentials:
                     # remove __inherit__ if managed credentials is not provided
-                    self._load_balancing_configs.remove(load_balancing_config)
-                else:
-                    load_balancing_config.credentials = managed_credentials
+                    continue
+
+                load_balancing_config = load_balancing_config.model_copy(update={"credentials": managed_credentials})
+            self._load_balancing_configs.append(load_balancing_config)
 
     def fetch_next(self) -> Optional[ModelLoadBalancingConfiguration]:
         """
@@ -6,6 +6,7 @@ from typing import Optional
 from pydantic import BaseModel, ConfigDict, Field
 
 import contexts
+from core.helper.model_provider_cache import TenantModelProviderCache
 from core.model_runtime.entities.common_entities import I18nObject
 from core.model_runtime.entities.defaults import PARAMETER_RULE_TEMPLATE
 from core.model_runtime.entities.model_entities import (
@@ -157,14 +158,18 @@ class AIModel(BaseModel):
             if cache_key in contexts.plugin_model_schemas.get():
                 return contexts.plugin_model_schemas.get()[cache_key]
 
-            schema = plugin_model_manager.get_model_schema(
-                tenant_id=self.tenant_id,
-                user_id="unknown",
-                plugin_id=self.plugin_id,
-                provider=self.provider_name,
-                model_type=self.model_type.value,
-                model=model,
-                credentials=credentials or {},
+            schema = TenantModelProviderCache.get_or_load(
+                self.tenant_id,
+                ("model_schema", cache_key),
+                lambda: plugin_model_manager.get_model_schema(
+                    tenant_id=self.tenant_id,
+                    user_id="unknown",
+                    plugin_id=self.plugin_id,
+                    provider=self.provider_name,
+                    model_type=self.model_type.value,
+                    model=model,
+                    credentials=credentials or {},
+                ),
             )
 
             if schema:
@@ -1,35 +1,71 @@
+import hashlib
 import logging
+from collections.abc import Sequence
 from threading import Lock
-from typing import Any
+from typing import Any, Optional
+
+from cachetools import LRUCache
 
 logger = logging.getLogger(__name__)
 
 _tokenizer: Any = None
 _lock = Lock()
 
+# splitters measure the same pieces of text over and over, keep the latest counts around.
+# keyed by the sha1 digest of the text so the cache does not keep large texts alive
+_TOKEN_COUNT_CACHE_SIZE = 8192
+_token_count_cache: LRUCache = LRUCache(maxsize=_TOKEN_COUNT_CACHE_SIZE)
+_token_count_cache_lock = Lock()
+
+# below this many uncached texts, threads cost more than encoding in the calling thread
+_BATCH_THREAD_THRESHOLD = 16
+_BATCH_MAX_THREADS = 8
+
 
 class GPT2Tokenizer:
     @staticmethod
-    def _get_num_tokens_by_gpt2(text: str) -> int:
+    def get_num_tokens(text: str) -> int:
+        return GPT2Tokenizer.count_batch([text])[0]
+
+    @staticmethod
+    def count_batch(texts: Sequence[str]) -> list[int]:
         """
-        use gpt2 tokenizer to get num tokens
+        Get num tokens of many texts at once.
+
+        Counts are served from a bounded LRU keyed by text digest, the rest are encoded with tiktoken's
+        batch encoding, which spreads the texts over threads.
         """
-        _tokenizer = GPT2Tokenizer.get_encoder()
-        tokens = _tokenizer.encode(text)
-        return len(tokens)
+        keys = [hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest() for text in texts]
+        counts: list[Optional[int]] = [None] * len(texts)
+        with _token_count_cache_lock:
+            for i, key in enumerate(keys):
+                counts[i] = _token_count_cache.get(key)
+
+        missing = [i for i, count in enumerate(counts) if count is None]
+        if missing:
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = dict(zip(missing_texts, GPT2Tokenizer._encode_batch(missing_texts)))
+            with _token_count_cache_lock:
+                for i in missing:
+                    _token_count_cache[keys[i]] = counts[i] = encoded[texts[i]]
+
+        return [count or 0 for count in counts]
 
     @staticmethod
-    def get_num_tokens(text: str) -> int:
-        # Because this process needs more cpu resource, we turn this back before we find a better way to handle it.
-        #
-        # future = _executor.submit(GPT2Tokenizer._get_num_tokens_by_gpt2, text)
-        # result = future.result()
-        # return cast(int, result)
-        return GPT2Tokenizer._get_num_tokens_by_gpt2(text)
+    def _encode_batch(texts: list[str]) -> list[int]:
+        _tokenizer = GPT2Tokenizer.get_encoder()
+        if len(texts) >= _BATCH_THREAD_THRESHOLD and hasattr(_tokenizer, "encode_batch"):
+            num_threads = min(_BATCH_MAX_THREADS, len(texts) // _BATCH_THREAD_THRESHOLD + 1)
+            return [len(tokens) for tokens in _tokenizer.encode_batch(texts, num_threads=num_threads)]
+        return [len(_tokenizer.encode(text)) for text in texts]
 
     @staticmethod
     def get_encoder() -> Any:
         global _tokenizer, _lock
+        # the encoder never changes once loaded, only the first load has to be serialized
+        if _tokenizer is not None:
+            return _tokenizer
+
         with _lock:
             if _tokenizer is None:
                 # Try to use tiktoken to get the tokenizer because it is faster
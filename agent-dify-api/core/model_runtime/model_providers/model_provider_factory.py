@@ -8,6 +8,7 @@ from typing import Optional
 from pydantic import BaseModel
 
 import contexts
+from core.helper.model_provider_cache import TenantModelProviderCache
 from core.helper.position_helper import get_provider_position_map, sort_to_dict_by_position_map
 from core.model_runtime.entities.model_entities import AIModelEntity, ModelType
 from core.model_runtime.entities.provider_entities import ProviderConfig, ProviderEntity, SimpleProviderEntity
@@ -91,15 +92,27 @@ class ModelProviderFactory:
             plugin_model_providers = []
             contexts.plugin_model_providers.set(plugin_model_providers)
 
-            # Fetch plugin model providers
-            plugin_providers = self.plugin_model_manager.fetch_model_providers(self.tenant_id)
-
-            for provider in plugin_providers:
-                provider.declaration.provider = provider.plugin_id + "/" + provider.declaration.provider
-                plugin_model_providers.append(provider)
+            # Fetch plugin model providers, shared with the other requests of the process
+            plugin_model_providers.extend(
+                TenantModelProviderCache.get_or_load(
+                    self.tenant_id, "plugin_model_providers", self._fetch_plugin_model_providers
+                )
+            )
 
             return plugin_model_providers
 
+    def _fetch_plugin_model_providers(self) -> list[PluginModelProviderEntity]:
+        """
+        Fetch all plugin model providers from the plugin daemon
+        :return: list of plugin model providers
+        """
+        plugin_model_providers = []
+        for provider in self.plugin_model_manager.fetch_model_providers(self.tenant_id):
+            provider.declaration.provider = provider.plugin_id + "/" + provider.declaration.provider
+            plugin_model_providers.append(provider)
+
+        return plugin_model_providers
+
     def get_provider_schema(self, provider: str) -> ProviderEntity:
         """
         Get provider schema
@@ -222,14 +235,18 @@ class ModelProviderFactory:
             if cache_key in contexts.plugin_model_schemas.get():
                 return contexts.plugin_model_schemas.get()[cache_key]
 
-            schema = self.plugin_model_manager.get_model_schema(
-                tenant_id=self.tenant_id,
-                user_id="unknown",
-                plugin_id=plugin_id,
-                provider=provider_name,
-                model_type=model_type.value,
-                model=model,
-                credentials=credentials or {},
+            schema = TenantModelProviderCache.get_or_load(
+                self.tenant_id,
+                ("model_schema", cache_key),
+                lambda: self.plugin_model_manager.get_model_schema(
+                    tenant_id=self.tenant_id,
+                    user_id="unknown",
+                    plugin_id=plugin_id,
+                    provider=provider_name,
+                    model_type=model_type.value,
+                    model=model,
+                    credentials=credentials or {},
+                ),
             )
 
             if schema:
@@ -184,12 +184,10 @@ class OpikDataTrace(BaseTraceInstance):
             node_type = node_execution.node_type
             status = node_execution.status
             if node_type == "llm":
-                inputs = (
-                    json.loads(node_execution.process_data).get("prompts", {}) if node_execution.process_data else {}
-                )
+                inputs = (WorkflowNodeExecution.load_payload(node_execution.process_data) or {}).get("prompts", {})
             else:
-                inputs = json.loads(node_execution.inputs) if node_execution.inputs else {}
-            outputs = json.loads(node_execution.outputs) if node_execution.outputs else {}
+                inputs = WorkflowNodeExecution.load_payload(node_execution.inputs) or {}
+            outputs = WorkflowNodeExecution.load_payload(node_execution.outputs) or {}
             created_at = node_execution.created_at or datetime.now()
             elapsed_time = node_execution.elapsed_time
             finished_at = created_at + timedelta(seconds=elapsed_time)
@@ -210,7 +208,7 @@ class OpikDataTrace(BaseTraceInstance):
                 }
             )
 
-            process_data = json.loads(node_execution.process_data) if node_execution.process_data else {}
+            process_data = WorkflowNodeExecution.load_payload(node_execution.process_data) or {}
 
             provider = None
             model = None
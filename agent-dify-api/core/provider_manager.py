@@ -20,7 +20,11 @@ from core.entities.provider_entities import (
     SystemConfiguration,
 )
 from core.helper import encrypter
-from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.model_provider_cache import (
+    ProviderCredentialsCache,
+    ProviderCredentialsCacheType,
+    TenantModelProviderCache,
+)
 from core.helper.position_helper import is_filtered
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (
@@ -89,6 +93,19 @@ class ProviderManager:
         - Get provider instance
         - Switch selection priority
 
+        The configurations are cached across requests by `TenantModelProviderCache`, do not modify them.
+
+        :param tenant_id:
+        :return:
+        """
+        return TenantModelProviderCache.get_or_load(
+            tenant_id, "provider_configurations", lambda: self._load_configurations(tenant_id)
+        )
+
+    def _load_configurations(self, tenant_id: str) -> ProviderConfigurations:
+        """
+        Load model provider configurations from the provider records of the workspace.
+
         :param tenant_id:
         :return:
         """
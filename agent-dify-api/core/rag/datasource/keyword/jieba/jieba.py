@@ -24,43 +24,19 @@ class Jieba(BaseKeyword):
         self._config = KeywordTableConfig()
 
     def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
-        lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
-        with redis_client.lock(lock_name, timeout=600):
-            keyword_table_handler = JiebaKeywordTableHandler()
-            keyword_table = self._get_dataset_keyword_table()
-            for text in texts:
-                keywords = keyword_table_handler.extract_keywords(
-                    text.page_content, self._config.max_keywords_per_chunk
-                )
-                if text.metadata is not None:
-                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
-                    keyword_table = self._add_text_to_keyword_table(
-                        keyword_table or {}, text.metadata["doc_id"], list(keywords)
-                    )
-
-            self._save_dataset_keyword_table(keyword_table)
-
-            return self
+        self.add_texts(texts, **kwargs)
+        return self
 
     def add_texts(self, texts: list[Document], **kwargs):
+        # extract before taking the lock, only the keyword table update has to be serialized
+        keywords_list = JiebaKeywordTableHandler().batch_extract_keywords(
+            [text.page_content for text in texts], self._config.max_keywords_per_chunk, kwargs.get("keywords_list")
+        )
+
         lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
         with redis_client.lock(lock_name, timeout=600):
-            keyword_table_handler = JiebaKeywordTableHandler()
-
             keyword_table = self._get_dataset_keyword_table()
-            keywords_list = kwargs.get("keywords_list")
-            for i in range(len(texts)):
-                text = texts[i]
-                if keywords_list:
-                    keywords = keywords_list[i]
-                    if not keywords:
-                        keywords = keyword_table_handler.extract_keywords(
-                            text.page_content, self._config.max_keywords_per_chunk
-                        )
-                else:
-                    keywords = keyword_table_handler.extract_keywords(
-                        text.page_content, self._config.max_keywords_per_chunk
-                    )
+            for text, keywords in zip(texts, keywords_list):
                 if text.metadata is not None:
                     self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
                     keyword_table = self._add_text_to_keyword_table(
@@ -230,20 +206,18 @@ class Jieba(BaseKeyword):
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
         keyword_table_handler = JiebaKeywordTableHandler()
+        keywords_list = keyword_table_handler.batch_extract_keywords(
+            [data["segment"].content for data in pre_segment_data_list],
+            self._config.max_keywords_per_chunk,
+            [data["keywords"] for data in pre_segment_data_list],
+        )
         keyword_table = self._get_dataset_keyword_table()
-        for pre_segment_data in pre_segment_data_list:
+        for pre_segment_data, keywords in zip(pre_segment_data_list, keywords_list):
             segment = pre_segment_data["segment"]
-            if pre_segment_data["keywords"]:
-                segment.keywords = pre_segment_data["keywords"]
-                keyword_table = self._add_text_to_keyword_table(
-                    keyword_table or {}, segment.index_node_id, pre_segment_data["keywords"]
-                )
-            else:
-                keywords = keyword_table_handler.extract_keywords(segment.content, self._config.max_keywords_per_chunk)
-                segment.keywords = list(keywords)
-                keyword_table = self._add_text_to_keyword_table(
-                    keyword_table or {}, segment.index_node_id, list(keywords)
-                )
+            segment.keywords = pre_segment_data["keywords"] or list(keywords)
+            keyword_table = self._add_text_to_keyword_table(
+                keyword_table or {}, segment.index_node_id, segment.keywords
+            )
         self._save_dataset_keyword_table(keyword_table)
 
     def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
@@ -1,14 +1,78 @@
+import logging
+import multiprocessing
 import re
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, cast
 
+from configs import dify_config
 
-class JiebaKeywordTableHandler:
-    def __init__(self):
+logger = logging.getLogger(__name__)
+
+# below this many texts the round trip to the worker processes costs more than it saves
+_PARALLEL_MIN_TEXTS = 32
+_TEXTS_PER_TASK = 16
+
+_jieba_lock = threading.Lock()
+_jieba_loaded = False
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_disabled = False
+
+
+def _load_jieba():
+    """Load the jieba dictionary and stopwords once per process."""
+    global _jieba_loaded
+    if _jieba_loaded:
+        return
+    with _jieba_lock:
+        if _jieba_loaded:
+            return
+        import jieba  # type: ignore
         import jieba.analyse  # type: ignore
 
         from core.rag.datasource.keyword.jieba.stopwords import STOPWORDS
 
+        jieba.initialize()
         jieba.analyse.default_tfidf.stop_words = STOPWORDS  # type: ignore
+        _jieba_loaded = True
+
+
+def _extract_keywords_batch(texts: Sequence[str], max_keywords_per_chunk: Optional[int]) -> list[set[str]]:
+    handler = JiebaKeywordTableHandler()
+    return [handler.extract_keywords(text, max_keywords_per_chunk) for text in texts]
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    max_workers = dify_config.KEYWORD_EXTRACTION_MAX_WORKERS
+    if max_workers <= 1 or _pool_disabled:
+        return None
+    with _pool_lock:
+        if _pool is None and not _pool_disabled:
+            # spawn keeps the workers clear of the threads and gevent state of the parent process
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_jieba,
+            )
+        return _pool
+
+
+def _disable_pool():
+    global _pool, _pool_disabled
+    with _pool_lock:
+        _pool_disabled = True
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class JiebaKeywordTableHandler:
+    def __init__(self):
+        _load_jieba()
 
     def extract_keywords(self, text: str, max_keywords_per_chunk: Optional[int] = 10) -> set[str]:
         """Extract keywords with JIEBA tfidf."""
@@ -23,6 +87,44 @@ class JiebaKeywordTableHandler:
 
         return set(self._expand_tokens_with_subtokens(set(keywords)))
 
+    def batch_extract_keywords(
+        self,
+        texts: Sequence[str],
+        max_keywords_per_chunk: Optional[int] = 10,
+        keywords_list: Optional[Sequence[Optional[Sequence[str]]]] = None,
+    ) -> list[set[str]]:
+        """
+        Extract keywords for many texts, spreading large batches over a process pool.
+
+        Texts with non-empty keywords in `keywords_list` keep those keywords.
+        """
+        results = [set(keywords_list[i]) if keywords_list and keywords_list[i] else None for i in range(len(texts))]
+        missing = [i for i, keywords in enumerate(results) if keywords is None]
+        extracted = self._extract_keywords_parallel([texts[i] for i in missing], max_keywords_per_chunk)
+        for i, keywords in zip(missing, extracted):
+            results[i] = keywords
+        return cast(list[set[str]], results)
+
+    def _extract_keywords_parallel(self, texts: list[str], max_keywords_per_chunk: Optional[int]) -> list[set[str]]:
+        pool = _get_pool() if len(texts) >= _PARALLEL_MIN_TEXTS else None
+        if pool is None:
+            return _extract_keywords_batch(texts, max_keywords_per_chunk)
+
+        try:
+            futures = [
+                pool.submit(_extract_keywords_batch, texts[i : i + _TEXTS_PER_TASK], max_keywords_per_chunk)
+                for i in range(0, len(texts), _TEXTS_PER_TASK)
+            ]
+            results: list[set[str]] = []
+            for future in futures:
+                results.extend(future.result())
+            return results
+        except Exception:
+            # e.g. daemonic celery workers cannot start child processes
+            logger.exception("Parallel keyword extraction failed, falling back to serial extraction")
+            _disable_pool()
+            return _extract_keywords_batch(texts, max_keywords_per_chunk)
+
     def _expand_tokens_with_subtokens(self, tokens: set[str]) -> set[str]:
         """Get subtokens from a list of tokens., filtering for stopwords."""
         from core.rag.datasource.keyword.jieba.stopwords import STOPWORDS
@@ -32,6 +134,6 @@ class JiebaKeywordTableHandler:
             results.add(token)
             sub_tokens = re.findall(r"\w+", token)
             if len(sub_tokens) > 1:
-                results.update({w for w in sub_tokens if w not in list(STOPWORDS)})
+                results.update({w for w in sub_tokens if w not in STOPWORDS})
 
         return results
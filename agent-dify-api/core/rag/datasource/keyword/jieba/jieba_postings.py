@@ -0,0 +1,195 @@
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from sqlalchemy import and_, func
+from sqlalchemy.dialects.postgresql import insert
+
+from core.rag.datasource.keyword.jieba.jieba import KeywordTableConfig
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.keyword.keyword_base import BaseKeyword
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import Dataset, DatasetKeywordPosting, DocumentSegment
+
+# keep IN lists and multi-row inserts at a size postgres plans well
+_BATCH_SIZE = 500
+_MAX_KEYWORD_LENGTH = 255
+
+
+class JiebaPostings(BaseKeyword):
+    """
+    Jieba keyword index stored as one `dataset_keyword_postings` row per (keyword, chunk).
+
+    Unlike `Jieba`, which loads and rewrites the whole dataset keyword table under a dataset lock,
+    adding or deleting chunks only touches the postings of those chunks, and the unique
+    constraint on (dataset, keyword, chunk) makes concurrent writers safe without a lock.
+    """
+
+    def __init__(self, dataset: Dataset):
+        super().__init__(dataset)
+        self._config = KeywordTableConfig()
+
+    def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        self.add_texts(texts, **kwargs)
+        return self
+
+    def add_texts(self, texts: list[Document], **kwargs):
+        keywords_list = JiebaKeywordTableHandler().batch_extract_keywords(
+            [text.page_content for text in texts], self._config.max_keywords_per_chunk, kwargs.get("keywords_list")
+        )
+        node_keywords = {
+            text.metadata["doc_id"]: list(keywords)
+            for text, keywords in zip(texts, keywords_list)
+            if text.metadata is not None
+        }
+
+        self._update_segments_keywords(node_keywords)
+        self._replace_postings(node_keywords)
+
+    def text_exists(self, id: str) -> bool:
+        return (
+            db.session.query(DatasetKeywordPosting.id)
+            .filter(DatasetKeywordPosting.dataset_id == self.dataset.id, DatasetKeywordPosting.index_node_id == id)
+            .first()
+            is not None
+        )
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        self._delete_postings(ids)
+        db.session.commit()
+
+    def delete(self) -> None:
+        db.session.query(DatasetKeywordPosting).filter(DatasetKeywordPosting.dataset_id == self.dataset.id).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    def search(self, query: str, **kwargs: Any) -> list[Document]:
+        k = kwargs.get("top_k", 4)
+        document_ids_filter = kwargs.get("document_ids_filter")
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords = list(keyword_table_handler.extract_keywords(query))
+        if not keywords:
+            return []
+
+        # go through text chunks in order of most matching keywords
+        hits = func.count(DatasetKeywordPosting.keyword).label("hits")
+        ranking_query = db.session.query(DatasetKeywordPosting.index_node_id, hits).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id, DatasetKeywordPosting.keyword.in_(keywords)
+        )
+        if document_ids_filter:
+            ranking_query = ranking_query.join(
+                DocumentSegment,
+                and_(
+                    DocumentSegment.dataset_id == DatasetKeywordPosting.dataset_id,
+                    DocumentSegment.index_node_id == DatasetKeywordPosting.index_node_id,
+                ),
+            ).filter(DocumentSegment.document_id.in_(document_ids_filter))
+        ranking = (
+            ranking_query.group_by(DatasetKeywordPosting.index_node_id)
+            .order_by(hits.desc(), DatasetKeywordPosting.index_node_id)
+            .limit(k)
+            .all()
+        )
+        sorted_chunk_indices = [row.index_node_id for row in ranking]
+        if not sorted_chunk_indices:
+            return []
+
+        segments = (
+            db.session.query(DocumentSegment)
+            .filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(sorted_chunk_indices),
+            )
+            .all()
+        )
+        segment_map = {segment.index_node_id: segment for segment in segments}
+
+        documents = []
+        for chunk_index in sorted_chunk_indices:
+            segment = segment_map.get(chunk_index)
+            if segment:
+                documents.append(
+                    Document(
+                        page_content=segment.content,
+                        metadata={
+                            "doc_id": chunk_index,
+                            "doc_hash": segment.index_node_hash,
+                            "document_id": segment.document_id,
+                            "dataset_id": segment.dataset_id,
+                        },
+                    )
+                )
+
+        return documents
+
+    def create_segment_keywords(self, node_id: str, keywords: list[str]):
+        self._update_segments_keywords({node_id: keywords})
+        self._replace_postings({node_id: keywords})
+
+    def multi_create_segment_keywords(self, pre_segment_data_list: list):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords_list = keyword_table_handler.batch_extract_keywords(
+            [data["segment"].content for data in pre_segment_data_list],
+            self._config.max_keywords_per_chunk,
+            [data["keywords"] for data in pre_segment_data_list],
+        )
+        node_keywords: dict[str, list[str]] = {}
+        for pre_segment_data, keywords in zip(pre_segment_data_list, keywords_list):
+            segment = pre_segment_data["segment"]
+            segment.keywords = pre_segment_data["keywords"] or list(keywords)
+            node_keywords[segment.index_node_id] = segment.keywords
+        self._replace_postings(node_keywords)
+
+    def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        self._replace_postings({node_id: keywords})
+
+    def import_keyword_table(self, keyword_table: Mapping[str, Sequence[str]]) -> int:
+        """Load postings from a legacy keyword table ({keyword: node ids}), returns the number of postings."""
+        rows = [
+            {"dataset_id": self.dataset.id, "keyword": keyword, "index_node_id": node_id}
+            for keyword, node_ids in keyword_table.items()
+            if len(keyword) <= _MAX_KEYWORD_LENGTH
+            for node_id in node_ids
+        ]
+        self._insert_postings(rows)
+        db.session.commit()
+        return len(rows)
+
+    def _replace_postings(self, node_keywords: Mapping[str, Sequence[str]]):
+        self._delete_postings(list(node_keywords))
+        rows = [
+            {"dataset_id": self.dataset.id, "keyword": keyword, "index_node_id": node_id}
+            for node_id, keywords in node_keywords.items()
+            for keyword in dict.fromkeys(keywords)
+            if keyword and len(keyword) <= _MAX_KEYWORD_LENGTH
+        ]
+        self._insert_postings(rows)
+        db.session.commit()
+
+    def _insert_postings(self, rows: list[dict]):
+        for i in range(0, len(rows), _BATCH_SIZE):
+            stmt = insert(DatasetKeywordPosting).values(rows[i : i + _BATCH_SIZE])
+            db.session.execute(stmt.on_conflict_do_nothing(constraint="dataset_keyword_posting_unique_idx"))
+
+    def _delete_postings(self, node_ids: list[str]):
+        for i in range(0, len(node_ids), _BATCH_SIZE):
+            db.session.query(DatasetKeywordPosting).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.index_node_id.in_(node_ids[i : i + _BATCH_SIZE]),
+            ).delete(synchronize_session=False)
+
+    def _update_segments_keywords(self, node_keywords: Mapping[str, Sequence[str]]):
+        node_ids = list(node_keywords)
+        for i in range(0, len(node_ids), _BATCH_SIZE):
+            segments = (
+                db.session.query(DocumentSegment)
+                .filter(
+                    DocumentSegment.dataset_id == self.dataset.id,
+                    DocumentSegment.index_node_id.in_(node_ids[i : i + _BATCH_SIZE]),
+                )
+                .all()
+            )
+            for segment in segments:
+                segment.keywords = list(node_keywords[segment.index_node_id])
+        db.session.commit()
@@ -1,4 +1,4 @@
-STOPWORDS = {
+_STOPWORDS = {
     "during",
     "when",
     "but",
@@ -1378,3 +1378,6 @@ STOPWORDS = {
     "日",
     "\n",
 }
+
+# read-only, shared by the jieba TF-IDF extractor and the subtoken filter
+STOPWORDS = frozenset(_STOPWORDS)
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from typing import Any, Optional
+
+import numpy as np
+
+from configs import dify_config
+from core.model_manager import ModelManager
+from core.model_runtime.entities.model_entities import ModelType
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from core.rag.models.document import Document
+from extensions.ext_redis import redis_client
+from models.dataset import Dataset
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetIndexVersion:
+    """
+    Version of a dataset's search index, bumped by every write to its vector or keyword index.
+
+    A missing version (new dataset, evicted key) starts from the current time in nanoseconds, so it is
+    always ahead of any version that was handed out before.
+    """
+
+    @staticmethod
+    def _key(dataset_id: str) -> str:
+        return f"dataset_index_version:{dataset_id}"
+
+    @classmethod
+    def get(cls, dataset_id: str) -> int:
+        key = cls._key(dataset_id)
+        version = redis_client.get(key)
+        if version is None:
+            redis_client.set(key, time.time_ns(), nx=True)
+            version = redis_client.get(key)
+        return int(version)
+
+    @classmethod
+    def bump(cls, dataset_id: str) -> None:
+        key = cls._key(dataset_id)
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.set(key, time.time_ns(), nx=True)
+            pipeline.incr(key)
+            pipeline.execute()
+        except Exception:
+            logger.exception(f"Failed to bump index version of dataset {dataset_id}")
+
+
+class RetrievalCache:
+    """
+    Cache of the documents retrieved from one dataset.
+
+    Entries are keyed by (dataset id, dataset index version, retrieval config hash, normalized query), so any
+    index write makes the old entries unreachable. When `RETRIEVAL_CACHE_SEMANTIC_THRESHOLD` is set, a miss on
+    a dataset with an embedding model falls back to the cached query whose embedding is the most similar.
+    """
+
+    _STATS_KEY = "retrieval_cache:stats"
+
+    def __init__(self, dataset: Dataset, retrieval_config: dict[str, Any]):
+        self._dataset = dataset
+        self._version = DatasetIndexVersion.get(dataset.id)
+        config_hash = hashlib.sha256(
+            json.dumps(retrieval_config, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+        self._scope = f"{dataset.id}:{self._version}:{config_hash}"
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return unicodedata.normalize("NFKC", " ".join(query.split()))
+
+    def _entry_key(self, query_hash: str) -> str:
+        return f"retrieval_cache:{self._scope}:{query_hash}"
+
+    def _queries_key(self) -> str:
+        return f"retrieval_cache_queries:{self._scope}"
+
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> Optional[list[Document]]:
+        try:
+            query_hash = self._query_hash(self.normalize_query(query))
+            data = redis_client.get(self._entry_key(query_hash))
+            stat = "hits"
+            if data is None and self._semantic_enabled():
+                similar_hash = self._find_similar_query(query)
+                if similar_hash:
+                    data = redis_client.get(self._entry_key(similar_hash))
+                    stat = "semantic_hits"
+            redis_client.hincrby(self._STATS_KEY, stat if data is not None else "misses", 1)
+        except Exception:
+            logger.exception("Failed to read retrieval cache")
+            return None
+        if data is None:
+            return None
+        return [Document.model_validate(document) for document in json.loads(data)]
+
+    def set(self, query: str, documents: list[Document]) -> None:
+        ttl = dify_config.RETRIEVAL_CACHE_TTL
+        try:
+            query_hash = self._query_hash(self.normalize_query(query))
+            # embeddings are not needed by the callers, sets in the metadata (keywords) are stored as lists
+            data = json.dumps(
+                [
+                    document.model_dump(mode="json", exclude={"vector": True, "children": {"__all__": {"vector"}}})
+                    for document in documents
+                ]
+            )
+            redis_client.setex(self._entry_key(query_hash), ttl, data)
+            if self._semantic_enabled():
+                queries_key = self._queries_key()
+                if redis_client.hlen(queries_key) < dify_config.RETRIEVAL_CACHE_SEMANTIC_MAX_QUERIES:
+                    query_vector = np.asarray(self._embed_query(query), dtype="<f4")
+                    redis_client.hset(queries_key, query_hash, query_vector.tobytes())
+                    redis_client.expire(queries_key, ttl)
+        except Exception:
+            logger.exception("Failed to write retrieval cache")
+
+    def _semantic_enabled(self) -> bool:
+        if not dify_config.RETRIEVAL_CACHE_SEMANTIC_THRESHOLD:
+            return False
+        return self._dataset.indexing_technique == "high_quality"
+
+    def _embed_query(self, query: str) -> list[float]:
+        # the query embedding is cached by CacheEmbedding, so the search reuses it on a miss
+        embedding_model = ModelManager().get_model_instance(
+            tenant_id=self._dataset.tenant_id,
+            provider=self._dataset.embedding_model_provider,
+            model_type=ModelType.TEXT_EMBEDDING,
+            model=self._dataset.embedding_model,
+        )
+        return CacheEmbedding(embedding_model).embed_query(query)
+
+    def _find_similar_query(self, query: str) -> Optional[str]:
+        cached_queries = redis_client.hgetall(self._queries_key())
+        if not cached_queries:
+            return None
+        query_hashes = [key.decode() if isinstance(key, bytes) else key for key in cached_queries]
+        vectors = np.stack([np.frombuffer(vector, dtype="<f4") for vector in cached_queries.values()])
+        query_vector = np.asarray(self._embed_query(query), dtype="<f4")
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+        similarities = np.divide(
+            vectors @ query_vector, norms, out=np.zeros(len(vectors), dtype="<f4"), where=norms > 0
+        )
+        best = int(np.argmax(similarities))
+        if similarities[best] < dify_config.RETRIEVAL_CACHE_SEMANTIC_THRESHOLD:
+            return None
+        return query_hashes[best]
+
+    @classmethod
+    def get_stats(cls) -> dict[str, Any]:
+        stats = {
+            (key.decode() if isinstance(key, bytes) else key): int(value)
+            for key, value in redis_client.hgetall(cls._STATS_KEY).items()
+        }
+        hits = stats.get("hits", 0) + stats.get("semantic_hits", 0)
+        lookups = hits + stats.get("misses", 0)
+        return {
+            "hits": stats.get("hits", 0),
+            "semantic_hits": stats.get("semantic_hits", 0),
+            "misses": stats.get("misses", 0),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        redis_client.delete(cls._STATS_KEY)
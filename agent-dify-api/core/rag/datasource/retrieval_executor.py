@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from configs import dify_config
+from core.rag.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalBranchReport(BaseModel):
+    """
+    Outcome of one search branch (keyword, embedding or full text search of a dataset).
+    """
+
+    name: str
+    dataset_id: str
+    status: str = "completed"  # completed, failed or timeout
+    latency: Optional[float] = None
+    document_count: int = 0
+
+
+class RetrievalResult(BaseModel):
+    """
+    Documents of a retrieval, `partial` is set when a branch missed its deadline
+    and `cached` when the documents were served from the retrieval cache.
+    """
+
+    documents: list[Document] = []
+    partial: bool = False
+    cached: bool = False
+    branches: list[RetrievalBranchReport] = []
+
+
+class RetrievalBranchFuture:
+    """
+    A submitted search branch. Its deadline starts once a worker picks the branch up,
+    so time spent waiting for a free worker does not count against the branch.
+    """
+
+    def __init__(self) -> None:
+        self.future: Optional[Future] = None
+        self.started_at: Optional[float] = None
+        self._started = threading.Event()
+
+    def _run(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+        self.started_at = time.perf_counter()
+        self._started.set()
+        return fn(*args, **kwargs)
+
+    def result(self, queue_deadline: float, timeout: float) -> Any:
+        """
+        Wait until `queue_deadline` for a worker to start the branch, then up to `timeout` seconds
+        from its start for the branch to finish.
+
+        :raises TimeoutError: if the branch did not start or finish in time, a branch that did not start is cancelled
+        """
+        assert self.future is not None
+        if not self._started.wait(max(queue_deadline - time.perf_counter(), 0)):
+            if self.future.cancel():
+                raise TimeoutError()
+            # a worker picked the branch up right at the deadline
+            self._started.wait()
+        assert self.started_at is not None
+        return self.future.result(timeout=max(self.started_at + timeout - time.perf_counter(), 0))
+
+
+class RetrievalExecutor:
+    """
+    Long-lived, bounded thread pools shared by all retrievals of the process.
+
+    Search branches run on the branch pool and never wait on other tasks, dataset fan-outs
+    (which wait on their branches) run on a separate pool so the two can not deadlock each other.
+    Each tenant may only occupy `RETRIEVAL_TENANT_MAX_CONCURRENCY` branch workers at a time.
+    """
+
+    _lock = threading.Lock()
+    _branch_executor: Optional[ThreadPoolExecutor] = None
+    _dataset_executor: Optional[ThreadPoolExecutor] = None
+    # only kept while a branch of the tenant holds or waits for a slot, so idle tenants take no memory
+    _tenant_semaphores: weakref.WeakValueDictionary[str, threading.BoundedSemaphore] = weakref.WeakValueDictionary()
+
+    @classmethod
+    def _get_executors(cls) -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        if cls._branch_executor is None or cls._dataset_executor is None:
+            with cls._lock:
+                if cls._branch_executor is None or cls._dataset_executor is None:
+                    max_workers = dify_config.RETRIEVAL_EXECUTOR_THREADS
+                    cls._branch_executor = ThreadPoolExecutor(
+                        max_workers=max_workers, thread_name_prefix="retrieval_branch"
+                    )
+                    cls._dataset_executor = ThreadPoolExecutor(
+                        max_workers=max_workers, thread_name_prefix="retrieval_dataset"
+                    )
+        return cls._branch_executor, cls._dataset_executor
+
+    @classmethod
+    def _get_tenant_semaphore(cls, tenant_id: str) -> threading.BoundedSemaphore:
+        semaphore = cls._tenant_semaphores.get(tenant_id)
+        if semaphore is None:
+            with cls._lock:
+                semaphore = cls._tenant_semaphores.setdefault(
+                    tenant_id, threading.BoundedSemaphore(dify_config.RETRIEVAL_TENANT_MAX_CONCURRENCY)
+                )
+        return semaphore
+
+    @classmethod
+    def submit_branch(
+        cls, tenant_id: str, queue_deadline: float, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> Optional[RetrievalBranchFuture]:
+        """
+        Submit a search branch, waiting for a free slot of the tenant until the queue deadline.
+
+        :return: the submitted branch, None if the tenant had no free slot before the queue deadline
+        """
+        branch_executor, _ = cls._get_executors()
+        semaphore = cls._get_tenant_semaphore(tenant_id)
+        if not semaphore.acquire(timeout=max(queue_deadline - time.perf_counter(), 0)):
+            return None
+        branch = RetrievalBranchFuture()
+        try:
+            branch.future = branch_executor.submit(branch._run, fn, *args, **kwargs)
+        except Exception:
+            semaphore.release()
+            raise
+        branch.future.add_done_callback(lambda _: semaphore.release())
+        return branch
+
+    @classmethod
+    def submit_dataset(cls, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        """Submit the retrieval of one dataset of a multi-dataset query."""
+        _, dataset_executor = cls._get_executors()
+        return dataset_executor.submit(fn, *args, **kwargs)
@@ -1,5 +1,6 @@
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+from collections.abc import Callable
 from typing import Optional
 
 from flask import Flask, current_app
@@ -8,6 +9,13 @@ from sqlalchemy.orm import load_only
 from configs import dify_config
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.keyword_factory import Keyword
+from core.rag.datasource.retrieval_cache import RetrievalCache
+from core.rag.datasource.retrieval_executor import (
+    RetrievalBranchFuture,
+    RetrievalBranchReport,
+    RetrievalExecutor,
+    RetrievalResult,
+)
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.embedding.retrieval import RetrievalSegments
 from core.rag.index_processor.constant.index_type import IndexType
@@ -19,6 +27,8 @@ from models.dataset import ChildChunk, Dataset, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
 default_retrieval_model = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -43,68 +53,139 @@ class RetrievalService:
         weights: Optional[dict] = None,
         document_ids_filter: Optional[list[str]] = None,
     ):
+        return cls.retrieve_with_report(
+            retrieval_method=retrieval_method,
+            dataset_id=dataset_id,
+            query=query,
+            top_k=top_k,
+            score_threshold=score_threshold,
+            reranking_model=reranking_model,
+            reranking_mode=reranking_mode,
+            weights=weights,
+            document_ids_filter=document_ids_filter,
+        ).documents
+
+    @classmethod
+    def retrieve_with_report(
+        cls,
+        retrieval_method: str,
+        dataset_id: str,
+        query: str,
+        top_k: int,
+        score_threshold: Optional[float] = 0.0,
+        reranking_model: Optional[dict] = None,
+        reranking_mode: str = "reranking_model",
+        weights: Optional[dict] = None,
+        document_ids_filter: Optional[list[str]] = None,
+    ) -> RetrievalResult:
+        """
+        Run the search branches of the retrieval method on the shared retrieval executor.
+
+        Branches that miss the `RETRIEVAL_BRANCH_TIMEOUT` deadline, counted from when they start running,
+        or that wait as long for a free worker are left out and the result is marked partial.
+        Complete results are kept in the retrieval cache when `RETRIEVAL_CACHE_ENABLED` is set.
+        """
         if not query:
-            return []
+            return RetrievalResult()
         dataset = cls._get_dataset(dataset_id)
         if not dataset or dataset.available_document_count == 0 or dataset.available_segment_count == 0:
-            return []
+            return RetrievalResult()
+
+        retrieval_cache = cls._get_retrieval_cache(
+            dataset,
+            {
+                "retrieval_method": retrieval_method,
+                "top_k": top_k,
+                "score_threshold": score_threshold,
+                "reranking_model": reranking_model,
+                "reranking_mode": reranking_mode,
+                "weights": weights,
+                "document_ids_filter": sorted(document_ids_filter) if document_ids_filter is not None else None,
+            },
+        )
+        if retrieval_cache:
+            cached_documents = retrieval_cache.get(query)
+            if cached_documents is not None:
+                return RetrievalResult(documents=cached_documents, cached=True)
+
+        flask_app = current_app._get_current_object()  # type: ignore
+        started_at = time.perf_counter()
+        branch_timeout = dify_config.RETRIEVAL_BRANCH_TIMEOUT
+        queue_deadline = started_at + branch_timeout
+        branches: list[tuple[RetrievalBranchReport, Optional[RetrievalBranchFuture], list[Document], list[str]]] = []
+
+        def submit(name: str, search: Callable[..., None], **kwargs):
+            documents: list[Document] = []
+            exceptions: list[str] = []
+            branch = RetrievalExecutor.submit_branch(
+                str(dataset.tenant_id),
+                queue_deadline,
+                cls._run_branch,
+                search,
+                flask_app=flask_app,
+                dataset_id=dataset_id,
+                query=query,
+                top_k=top_k,
+                all_documents=documents,
+                exceptions=exceptions,
+                document_ids_filter=document_ids_filter,
+                **kwargs,
+            )
+            branches.append((RetrievalBranchReport(name=name, dataset_id=dataset_id), branch, documents, exceptions))
+
+        if retrieval_method == "keyword_search":
+            submit("keyword_search", cls.keyword_search)
+        if RetrievalMethod.is_support_semantic_search(retrieval_method):
+            submit(
+                "embedding_search",
+                cls.embedding_search,
+                score_threshold=score_threshold,
+                reranking_model=reranking_model,
+                retrieval_method=retrieval_method,
+            )
+        if RetrievalMethod.is_support_fulltext_search(retrieval_method):
+            submit(
+                "full_text_search",
+                cls.full_text_index_search,
+                score_threshold=score_threshold,
+                reranking_model=reranking_model,
+                retrieval_method=retrieval_method,
+            )
 
+        result = RetrievalResult()
         all_documents: list[Document] = []
         exceptions: list[str] = []
-
-        # Optimize multithreading with thread pools
-        with ThreadPoolExecutor(max_workers=dify_config.RETRIEVAL_SERVICE_EXECUTORS) as executor:  # type: ignore
-            futures = []
-            if retrieval_method == "keyword_search":
-                futures.append(
-                    executor.submit(
-                        cls.keyword_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        all_documents=all_documents,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
-                )
-            if RetrievalMethod.is_support_semantic_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.embedding_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
-                )
-            if RetrievalMethod.is_support_fulltext_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.full_text_index_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
-                )
-            concurrent.futures.wait(futures, timeout=30, return_when=concurrent.futures.ALL_COMPLETED)
+        for report, branch, branch_documents, branch_exceptions in branches:
+            try:
+                if branch is None:
+                    raise TimeoutError()
+                report.latency = branch.result(queue_deadline, branch_timeout)
+            except TimeoutError:
+                report.status = "timeout"
+                branch_started_at = branch.started_at if branch and branch.started_at is not None else started_at
+                report.latency = time.perf_counter() - branch_started_at
+                result.partial = True
+            else:
+                if branch_exceptions:
+                    report.status = "failed"
+                    exceptions.extend(branch_exceptions)
+                else:
+                    report.document_count = len(branch_documents)
+                    all_documents.extend(branch_documents)
+            result.branches.append(report)
+            logger.debug(
+                f"Retrieval branch {report.name} of dataset {dataset_id} {report.status} in {report.latency:.3f}s"
+            )
 
         if exceptions:
             raise ValueError(";\n".join(exceptions))
 
+        if result.partial:
+            logger.warning(
+                f"Retrieval of dataset {dataset_id} returned partial results, timed out branches: "
+                + ", ".join(report.name for report in result.branches if report.status == "timeout")
+            )
+
         if retrieval_method == RetrievalMethod.HYBRID_SEARCH.value:
             data_post_processor = DataPostProcessor(
                 str(dataset.tenant_id), reranking_mode, reranking_model, weights, False
@@ -116,7 +197,26 @@ class RetrievalService:
                 top_n=top_k,
             )
 
-        return all_documents
+        result.documents = all_documents
+        if retrieval_cache and not result.partial:
+            retrieval_cache.set(query, all_documents)
+        return result
+
+    @staticmethod
+    def _get_retrieval_cache(dataset: Dataset, retrieval_config: dict) -> Optional[RetrievalCache]:
+        if not dify_config.RETRIEVAL_CACHE_ENABLED:
+            return None
+        try:
+            return RetrievalCache(dataset, retrieval_config)
+        except Exception:
+            logger.exception(f"Failed to open retrieval cache of dataset {dataset.id}")
+            return None
+
+    @staticmethod
+    def _run_branch(search: Callable[..., None], **kwargs) -> float:
+        started_at = time.perf_counter()
+        search(**kwargs)
+        return time.perf_counter() - started_at
 
     @classmethod
     def external_retrieve(cls, dataset_id: str, query: str, external_retrieval_model: Optional[dict] = None):
@@ -9,8 +9,10 @@ from elasticsearch import Elasticsearch
 from flask import current_app
 from pydantic import BaseModel, model_validator
 
+from configs import dify_config
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -44,8 +46,19 @@ class ElasticSearchConfig(BaseModel):
 class ElasticSearchVector(BaseVector):
     def __init__(self, index_name: str, config: ElasticSearchConfig, attributes: list):
         super().__init__(index_name.lower())
-        self._client = self._init_client(config)
-        self._version = self._get_version()
+        # one client per cluster is shared by the indexes of all datasets, it is thread-safe
+        self.registered_client = VectorClientRegistry.get(
+            backend=VectorType.ELASTICSEARCH,
+            endpoint=f"{config.host}:{config.port}",
+            settings_hash=VectorClientRegistry.settings_hash(config.username, config.password),
+            factory=lambda: self._init_client(config),
+            close=lambda client: client.close(),
+        )
+        self._client = self.registered_client.client
+        # the cluster version is checked once per client
+        if "version" not in self.registered_client.attributes:
+            self.registered_client.attributes["version"] = self._get_version()
+        self._version = self.registered_client.attributes["version"]
         self._check_version()
         self._attributes = attributes
 
@@ -62,6 +75,7 @@ class ElasticSearchVector(BaseVector):
                 request_timeout=100000,
                 retry_on_timeout=True,
                 max_retries=10000,
+                connections_per_node=dify_config.VECTOR_STORE_POOL_SIZE,
             )
         except requests.exceptions.ConnectionError:
             raise ConnectionError("Vector database connection error")
@@ -97,6 +111,16 @@ class ElasticSearchVector(BaseVector):
     def text_exists(self, id: str) -> bool:
         return bool(self._client.exists(index=self._collection_name, id=id))
 
+    def existing_ids(self, ids: list[str], batch_size: int = 1000) -> set[str]:
+        if not ids or not self._client.indices.exists(index=self._collection_name):
+            return set()
+
+        existing_ids = set()
+        for i in range(0, len(ids), batch_size):
+            response = self._client.mget(index=self._collection_name, ids=ids[i : i + batch_size], source=False)
+            existing_ids.update(doc["_id"] for doc in response["docs"] if doc.get("found"))
+        return existing_ids
+
     def delete_by_ids(self, ids: list[str]) -> None:
         if not ids:
             return
@@ -0,0 +1,499 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import numpy as np
+from cachetools import LRUCache
+from pydantic import BaseModel
+
+from configs import dify_config
+from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
+from core.rag.datasource.vdb.vector_type import VectorType
+from core.rag.embedding.embedding_base import Embeddings
+from core.rag.models.document import Document
+from models.dataset import Dataset
+
+# rows per segment file, a full segment is never written again
+_SEGMENT_ROWS = 65536
+# rows scored by one matrix multiplication
+_BLOCK_ROWS = 16384
+# deleted rows are only reclaimed once there are more of them than live rows
+_COMPACT_MIN_DELETED_ROWS = 4096
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_ROWS = 65536
+
+
+class LocalVectorConfig(BaseModel):
+    path: str
+    ivf_min_rows: int = 0
+    ivf_probes: int = 8
+
+
+class _CollectionIndex:
+    """
+    In-memory view of one collection directory, caught up with the directory's log before every access.
+
+    A collection directory holds, for its current generation (named in `CURRENT`):
+      - `log-{generation}.jsonl`: append-only log, one line per added batch of records or per deletion
+      - `seg-{generation}-{n}.f32`: normalized float32 vectors, `_SEGMENT_ROWS` rows per file
+      - `ivf-{generation}.npz`: IVF centroids, only built for large collections
+    Vectors are synced to disk before the log line referencing them is appended, and a log line only counts
+    once its newline is written, so an interrupted append leaves no trace. Writers of all processes serialize
+    on an flock of the `lock` file, readers never block.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self._reset(None)
+
+    def _reset(self, generation: Optional[str]) -> None:
+        self.generation = generation
+        self.log_offset = 0
+        self.dimension = 0
+        self.total_rows = 0
+        self.ids: dict[str, int] = {}
+        # (id, text, metadata) of each row, None once the row is deleted
+        self.records: list[Optional[tuple[str, str, dict]]] = []
+        self.live = bytearray()
+        self.document_rows: dict[str, set[int]] = {}
+        self.segments: dict[int, np.memmap] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.centroid_rows = 0
+        self.assignments = np.zeros(0, dtype=np.int32)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _log_path(self) -> str:
+        return self._file(f"log-{self.generation}.jsonl")
+
+    def _segment_path(self, segment: int, generation: Optional[str] = None) -> str:
+        return self._file(f"seg-{generation or self.generation}-{segment}.f32")
+
+    def _ivf_path(self) -> str:
+        return self._file(f"ivf-{self.generation}.npz")
+
+    def _read_generation(self) -> Optional[str]:
+        try:
+            with open(self._file("CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> None:
+        """Apply the log lines appended since the last refresh, reloading everything after a compaction."""
+        generation = self._read_generation()
+        if generation != self.generation:
+            self._reset(generation)
+        if generation is None:
+            return
+        try:
+            with open(self._log_path(), "rb") as f:
+                f.seek(self.log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # a line without newline is still being written, or was torn by a crash
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self.log_offset += end
+
+    def _apply(self, entry: dict) -> None:
+        if "delete" in entry:
+            for doc_id in entry["delete"]:
+                self._delete_row(doc_id)
+            return
+
+        self.dimension = entry["dimension"]
+        row = entry["row"]
+        for doc_id, text, metadata in entry["records"]:
+            # adding an existing id replaces its row
+            self._delete_row(doc_id)
+            self.ids[doc_id] = row
+            self.records.append((doc_id, text, metadata))
+            self.live.append(1)
+            document_id = metadata.get("document_id")
+            if document_id:
+                self.document_rows.setdefault(document_id, set()).add(row)
+            row += 1
+        self.total_rows = row
+
+    def _delete_row(self, doc_id: str) -> None:
+        row = self.ids.pop(doc_id, None)
+        if row is None:
+            return
+        record = self.records[row]
+        self.records[row] = None
+        self.live[row] = 0
+        document_id = record[2].get("document_id") if record else None
+        if document_id in self.document_rows:
+            self.document_rows[document_id].discard(row)
+
+    @contextmanager
+    def write_lock(self) -> Iterator[None]:
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(self._file("lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                if self.generation is None:
+                    self._switch_generation(uuid.uuid4().hex)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _switch_generation(self, generation: str) -> None:
+        current_tmp = self._file("CURRENT.tmp")
+        with open(current_tmp, "w") as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, self._file("CURRENT"))
+        self._fsync_dir()
+        self.refresh()
+
+    def _fsync_dir(self) -> None:
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _write_vectors(self, start: int, vectors: np.ndarray, generation: Optional[str] = None) -> None:
+        row = start
+        while row < start + len(vectors):
+            segment, offset = divmod(row, _SEGMENT_ROWS)
+            count = min(_SEGMENT_ROWS - offset, start + len(vectors) - row)
+            data = memoryview(vectors[row - start : row - start + count].tobytes())
+            path = self._segment_path(segment, generation)
+            created = not os.path.exists(path)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                position = offset * self.dimension * 4
+                while data:
+                    written = os.pwrite(fd, data, position)
+                    data = data[written:]
+                    position += written
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            if created:
+                self._fsync_dir()
+            row += count
+
+    def _append_log(self, entry: dict) -> None:
+        with open(self._log_path(), "ab") as f:
+            # drop the torn line of an interrupted writer, it never became visible
+            if f.tell() > self.log_offset:
+                f.truncate(self.log_offset)
+            f.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self.log_offset == 0:
+            self._fsync_dir()
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict], vectors: np.ndarray) -> None:
+        """Must be called under the write lock."""
+        if self.dimension and vectors.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match the collection ({self.dimension}).")
+        self.dimension = vectors.shape[1]
+        start = self.total_rows
+        self._write_vectors(start, _normalize(vectors))
+        self._append_log(
+            {"row": start, "dimension": self.dimension, "records": [list(r) for r in zip(ids, texts, metadatas)]}
+        )
+        self.refresh()
+
+    def delete(self, ids: list[str]) -> None:
+        """Must be called under the write lock."""
+        ids = [doc_id for doc_id in ids if doc_id in self.ids]
+        if ids:
+            self._append_log({"delete": ids})
+            self.refresh()
+        deleted_rows = self.total_rows - len(self.ids)
+        if deleted_rows > _COMPACT_MIN_DELETED_ROWS and deleted_rows > len(self.ids):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Copy the live rows into a new generation, dropping deleted rows."""
+        old_generation = self.generation
+        generation = uuid.uuid4().hex
+        live_rows = np.asarray(sorted(self.ids.values()), dtype=np.int64)
+        with open(self._file(f"log-{generation}.jsonl"), "wb") as log:
+            for start in range(0, len(live_rows), _BLOCK_ROWS):
+                rows = live_rows[start : start + _BLOCK_ROWS]
+                self._write_vectors(start, self._gather(rows), generation)
+                records = [list(self.records[row]) for row in rows]  # type: ignore[arg-type]
+                entry = {"row": start, "dimension": self.dimension, "records": records}
+                log.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            log.flush()
+            os.fsync(log.fileno())
+        self._switch_generation(generation)
+
+        # keep the previous generation for readers still catching up with it
+        for name in os.listdir(self.path):
+            parts = name.split("-")
+            if len(parts) > 1 and parts[0] in {"log", "seg", "ivf"}:
+                file_generation = parts[1].split(".")[0]
+                if file_generation not in {generation, old_generation}:
+                    os.remove(self._file(name))
+
+    def drop(self) -> None:
+        with self.lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._reset(None)
+
+    def _segment(self, segment: int, rows: int) -> np.memmap:
+        mapped = self.segments.get(segment)
+        if mapped is None or len(mapped) < rows:
+            mapped = np.memmap(self._segment_path(segment), dtype=np.float32, mode="r", shape=(rows, self.dimension))
+            self.segments[segment] = mapped
+        return mapped
+
+    def _iter_blocks(self, start: int = 0) -> Iterator[tuple[int, np.ndarray]]:
+        row = start
+        while row < self.total_rows:
+            segment, offset = divmod(row, _SEGMENT_ROWS)
+            segment_rows = min(_SEGMENT_ROWS, self.total_rows - segment * _SEGMENT_ROWS)
+            end = min(offset + _BLOCK_ROWS, segment_rows)
+            yield row, self._segment(segment, segment_rows)[offset:end]
+            row += end - offset
+
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.empty((len(rows), self.dimension), dtype=np.float32)
+        segments = rows // _SEGMENT_ROWS
+        for segment in np.unique(segments):
+            positions = np.flatnonzero(segments == segment)
+            segment_rows = min(_SEGMENT_ROWS, self.total_rows - int(segment) * _SEGMENT_ROWS)
+            vectors[positions] = self._segment(int(segment), segment_rows)[rows[positions] - segment * _SEGMENT_ROWS]
+        return vectors
+
+    def search(
+        self, query: np.ndarray, top_k: int, document_ids: Optional[list[str]], ivf_min_rows: int, ivf_probes: int
+    ) -> list[tuple[float, tuple[str, str, dict]]]:
+        """Top-k rows by cosine similarity, exhaustively or over the closest IVF partitions."""
+        if not self.total_rows or top_k <= 0:
+            return []
+        mask = np.frombuffer(self.live, dtype=np.uint8).astype(bool)
+        if document_ids is not None:
+            document_mask = np.zeros(self.total_rows, dtype=bool)
+            for document_id in document_ids:
+                document_mask[list(self.document_rows.get(document_id, ()))] = True
+            mask &= document_mask
+
+        query = _normalize(query.reshape(1, -1))[0]
+        candidates = self._ivf_candidates(query, mask, ivf_min_rows, ivf_probes)
+        if candidates is not None and len(candidates) >= top_k:
+            scores = self._gather(candidates) @ query
+            rows = candidates
+        else:
+            block_scores = []
+            block_rows = []
+            for start, block in self._iter_blocks():
+                scores = np.where(mask[start : start + len(block)], block @ query, -np.inf)
+                k = min(top_k, len(scores))
+                best = np.argpartition(-scores, k - 1)[:k]
+                block_scores.append(scores[best])
+                block_rows.append(best + start)
+            scores = np.concatenate(block_scores)
+            rows = np.concatenate(block_rows)
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            (float(scores[i]), record)
+            for i in order
+            if np.isfinite(scores[i]) and (record := self.records[rows[i]]) is not None
+        ]
+
+    def _ivf_candidates(
+        self, query: np.ndarray, mask: np.ndarray, ivf_min_rows: int, ivf_probes: int
+    ) -> Optional[np.ndarray]:
+        if not ivf_min_rows or len(self.ids) < ivf_min_rows:
+            return None
+        if self.centroids is None or len(self.ids) >= 2 * self.centroid_rows:
+            self._load_or_build_centroids()
+        if self.centroids is None:
+            return None
+
+        # rows added since the last search are assigned to their closest partition
+        if len(self.assignments) < self.total_rows:
+            assignments = [self.assignments]
+            for _, block in self._iter_blocks(len(self.assignments)):
+                assignments.append(np.argmax(block @ self.centroids.T, axis=1).astype(np.int32))
+            self.assignments = np.concatenate(assignments)
+
+        probes = np.argsort(-(self.centroids @ query))[:ivf_probes]
+        return np.flatnonzero(mask & np.isin(self.assignments, probes))
+
+    def _load_or_build_centroids(self) -> None:
+        try:
+            with np.load(self._ivf_path()) as ivf:
+                centroids, centroid_rows = ivf["centroids"], int(ivf["rows"])
+        except (FileNotFoundError, KeyError, ValueError):
+            centroids, centroid_rows = None, 0
+        if centroids is None or centroids.shape[1] != self.dimension or len(self.ids) >= 2 * centroid_rows:
+            centroid_rows = len(self.ids)
+            centroids = self._build_centroids()
+            ivf_tmp = self._file(f"ivf-{self.generation}.tmp.npz")
+            np.savez(ivf_tmp, centroids=centroids, rows=centroid_rows)
+            os.replace(ivf_tmp, self._ivf_path())
+        self.centroids = centroids
+        self.centroid_rows = centroid_rows
+        self.assignments = np.zeros(0, dtype=np.int32)
+
+    def _build_centroids(self) -> np.ndarray:
+        """Spherical k-means over a sample of the live rows, with about sqrt(n) partitions."""
+        rng = np.random.default_rng(0)
+        live_rows = np.asarray(sorted(self.ids.values()), dtype=np.int64)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(len(live_rows), _KMEANS_SAMPLE_ROWS), replace=False))
+        sample = self._gather(sample_rows)
+        partitions = max(1, min(int(np.sqrt(len(live_rows))), len(sample)))
+        centroids = sample[rng.choice(len(sample), size=partitions, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS):
+            assignments = np.concatenate(
+                [
+                    np.argmax(sample[start : start + _BLOCK_ROWS] @ centroids.T, axis=1)
+                    for start in range(0, len(sample), _BLOCK_ROWS)
+                ]
+            )
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            # empty partitions keep their previous centroid
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        return centroids
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+_indexes: LRUCache = LRUCache(maxsize=dify_config.LOCAL_VECTOR_MAX_OPEN_COLLECTIONS)
+_indexes_lock = threading.Lock()
+
+
+def _get_index(path: str) -> _CollectionIndex:
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = _CollectionIndex(path)
+        return index
+
+
+class LocalVector(BaseVector):
+    """
+    Flat vector store kept in memory-mapped files on the local disk, for deployments without a vector database.
+    """
+
+    def __init__(self, collection_name: str, config: LocalVectorConfig):
+        super().__init__(collection_name)
+        self._config = config
+        self._index = _get_index(os.path.join(config.path, collection_name))
+
+    def get_type(self) -> str:
+        return VectorType.LOCAL
+
+    def create(self, texts: list[Document], embeddings: list[list[float]], **kwargs):
+        if texts:
+            self.add_texts(texts, embeddings, **kwargs)
+
+    def add_texts(self, documents: list[Document], embeddings: list[list[float]], **kwargs):
+        if not documents:
+            return []
+        # documents without metadata have no doc_id and are skipped, keeping the embeddings aligned
+        indexes = [i for i, document in enumerate(documents) if document.metadata]
+        if not indexes:
+            return []
+        ids = [documents[i].metadata["doc_id"] for i in indexes]  # type: ignore
+        with self._index.write_lock():
+            self._index.add(
+                ids,
+                [documents[i].page_content for i in indexes],
+                [documents[i].metadata for i in indexes],
+                np.asarray([embeddings[i] for i in indexes], dtype=np.float32),
+            )
+        return ids
+
+    def text_exists(self, id: str) -> bool:
+        with self._index.lock:
+            self._index.refresh()
+            return id in self._index.ids
+
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        with self._index.lock:
+            self._index.refresh()
+            return {id for id in ids if id in self._index.ids}
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        with self._index.write_lock():
+            self._index.delete(ids)
+
+    def get_ids_by_metadata_field(self, key: str, value: str):
+        with self._index.lock:
+            self._index.refresh()
+            return [record[0] for record in self._index.records if record and record[2].get(key) == value]
+
+    def delete_by_metadata_field(self, key: str, value: str) -> None:
+        with self._index.write_lock():
+            ids = [record[0] for record in self._index.records if record and record[2].get(key) == value]
+            self._index.delete(ids)
+
+    def search_by_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
+        top_k = kwargs.get("top_k", 4)
+        score_threshold = float(kwargs.get("score_threshold") or 0.0)
+        with self._index.lock:
+            self._index.refresh()
+            results = self._index.search(
+                np.asarray(query_vector, dtype=np.float32),
+                top_k,
+                kwargs.get("document_ids_filter"),
+                self._config.ivf_min_rows,
+                self._config.ivf_probes,
+            )
+
+        docs = []
+        for score, (_, text, metadata) in results:
+            if score > score_threshold:
+                metadata = dict(metadata)
+                metadata["score"] = score
+                docs.append(Document(page_content=text, metadata=metadata))
+        return docs
+
+    def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
+        # the local vector store does not support full text searching
+        return []
+
+    def delete(self) -> None:
+        self._index.drop()
+
+
+class LocalVectorFactory(AbstractVectorFactory):
+    def init_vector(self, dataset: Dataset, attributes: list, embeddings: Embeddings) -> BaseVector:
+        if dataset.index_struct_dict:
+            collection_name = dataset.index_struct_dict["vector_store"]["class_prefix"]
+        else:
+            collection_name = Dataset.gen_collection_name_by_id(dataset.id)
+            dataset.index_struct = json.dumps(self.gen_index_struct_dict(VectorType.LOCAL, collection_name))
+
+        return LocalVector(
+            collection_name=collection_name,
+            config=LocalVectorConfig(
+                path=dify_config.LOCAL_VECTOR_PATH,
+                ivf_min_rows=dify_config.LOCAL_VECTOR_IVF_MIN_ROWS,
+                ivf_probes=dify_config.LOCAL_VECTOR_IVF_PROBES,
+            ),
+        )
@@ -10,6 +10,7 @@ from pymilvus.milvus_client import IndexParams  # type: ignore
 from configs import dify_config
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -69,12 +70,23 @@ class MilvusVector(BaseVector):
     def __init__(self, collection_name: str, config: MilvusConfig):
         super().__init__(collection_name)
         self._client_config = config
-        self._client = self._init_client(config)
+        # one client per server is shared by the collections of all datasets, it is thread-safe
+        self.registered_client = VectorClientRegistry.get(
+            backend=VectorType.MILVUS,
+            endpoint=f"{config.uri}/{config.database}",
+            settings_hash=VectorClientRegistry.settings_hash(config.user, config.password, config.enable_hybrid_search),
+            factory=lambda: self._init_client(config),
+            close=lambda client: client.close(),
+        )
+        self._client = self.registered_client.client
         self._consistency_level = "Session"  # Consistency level for Milvus operations
         self._fields: list[str] = []  # List of fields in the collection
         if self._client.has_collection(collection_name):
             self._load_collection_fields()
-        self._hybrid_search_enabled = self._check_hybrid_search_support()  # Check if hybrid search is supported
+        # the server version is checked once per client
+        if "hybrid_search_enabled" not in self.registered_client.attributes:
+            self.registered_client.attributes["hybrid_search_enabled"] = self._check_hybrid_search_support()
+        self._hybrid_search_enabled = self.registered_client.attributes["hybrid_search_enabled"]
 
     def _load_collection_fields(self, fields: Optional[list[str]] = None) -> None:
         if fields is None:
@@ -196,6 +208,23 @@ class MilvusVector(BaseVector):
 
         return len(result) > 0
 
+    def existing_ids(self, ids: list[str], batch_size: int = 1000) -> set[str]:
+        """
+        Get which of the given document IDs exist in the collection, querying them in batches.
+        """
+        if not ids or not self._client.has_collection(self._collection_name):
+            return set()
+
+        existing_ids = set()
+        for i in range(0, len(ids), batch_size):
+            result = self._client.query(
+                collection_name=self._collection_name,
+                filter=f'metadata["doc_id"] in {json.dumps(ids[i : i + batch_size])}',
+                output_fields=[Field.METADATA_KEY.value],
+            )
+            existing_ids.update(item[Field.METADATA_KEY.value]["doc_id"] for item in result)
+        return existing_ids
+
     def field_exists(self, field: str) -> bool:
         """
         Check if a field exists in the collection.
@@ -11,6 +11,7 @@ from pydantic import BaseModel, model_validator
 
 from configs import dify_config
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -74,7 +75,16 @@ USING gin (text gin_bigm_ops);
 class PGVector(BaseVector):
     def __init__(self, collection_name: str, config: PGVectorConfig):
         super().__init__(collection_name)
-        self.pool = self._create_connection_pool(config)
+        # one pool per database is shared by the tables of all datasets
+        self.registered_client = VectorClientRegistry.get(
+            backend=VectorType.PGVECTOR,
+            endpoint=f"{config.host}:{config.port}/{config.database}",
+            settings_hash=VectorClientRegistry.settings_hash(config.user, config.password),
+            factory=lambda: self._create_connection_pool(config),
+            max_connections=config.max_connection,
+            close=lambda pool: pool.closeall(),
+        )
+        self.pool = self.registered_client.client
         self.table_name = f"embedding_{collection_name}"
         self.pg_bigm = config.pg_bigm
 
@@ -82,7 +92,7 @@ class PGVector(BaseVector):
         return VectorType.PGVECTOR
 
     def _create_connection_pool(self, config: PGVectorConfig):
-        return psycopg2.pool.SimpleConnectionPool(
+        return psycopg2.pool.ThreadedConnectionPool(
             config.min_connection,
             config.max_connection,
             host=config.host,
@@ -134,6 +144,13 @@ class PGVector(BaseVector):
             cur.execute(f"SELECT id FROM {self.table_name} WHERE id = %s", (id,))
             return cur.fetchone() is not None
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        with self._get_cursor() as cur:
+            cur.execute(f"SELECT id FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
+            return {str(record[0]) for record in cur}
+
     def get_by_ids(self, ids: list[str]) -> list[Document]:
         with self._get_cursor() as cur:
             cur.execute(f"SELECT meta, text FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
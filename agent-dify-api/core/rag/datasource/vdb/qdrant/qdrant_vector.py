@@ -22,6 +22,7 @@ from qdrant_client.local.qdrant_local import QdrantLocal
 from configs import dify_config
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -71,7 +72,18 @@ class QdrantVector(BaseVector):
     def __init__(self, collection_name: str, group_id: str, config: QdrantConfig, distance_func: str = "Cosine"):
         super().__init__(collection_name)
         self._client_config = config
-        self._client = qdrant_client.QdrantClient(**self._client_config.to_qdrant_params())
+        qdrant_params = self._client_config.to_qdrant_params()
+        # one client per server is shared by the collections of all datasets, it is thread-safe
+        self.registered_client = VectorClientRegistry.get(
+            backend=VectorType.QDRANT,
+            endpoint=qdrant_params.get("url") or qdrant_params["path"],
+            settings_hash=VectorClientRegistry.settings_hash(
+                config.api_key, config.timeout, config.grpc_port, config.prefer_grpc
+            ),
+            factory=lambda: qdrant_client.QdrantClient(**qdrant_params),
+            close=lambda client: client.close(),
+        )
+        self._client = self.registered_client.client
         self._distance_func = distance_func.upper()
         self._group_id = group_id
 
@@ -323,6 +335,22 @@ class QdrantVector(BaseVector):
 
         return len(response) > 0
 
+    def existing_ids(self, ids: list[str], batch_size: int = 1000) -> set[str]:
+        if not ids:
+            return set()
+        collections_response = self._client.get_collections()
+        if self._collection_name not in {collection.name for collection in collections_response.collections}:
+            return set()
+
+        existing_ids = set()
+        ids_iterator = iter(ids)
+        while batch_ids := list(islice(ids_iterator, batch_size)):
+            points = self._client.retrieve(
+                collection_name=self._collection_name, ids=batch_ids, with_payload=False, with_vectors=False
+            )
+            existing_ids.update(str(point.id) for point in points)
+        return existing_ids
+
     def search_by_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
         from qdrant_client.http import models
 
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Optional
 
+from core.rag.datasource.vdb.vector_client_registry import RegisteredVectorClient
 from core.rag.models.document import Document
 
 
 class BaseVector(ABC):
+    # shared client of the vector store, for backends that register theirs in `VectorClientRegistry`
+    registered_client: Optional[RegisteredVectorClient] = None
+
     def __init__(self, collection_name: str):
         self._collection_name = collection_name
 
@@ -26,6 +30,14 @@ class BaseVector(ABC):
     def text_exists(self, id: str) -> bool:
         raise NotImplementedError
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """
+        Get which of the given document ids are stored in the collection.
+
+        Backends override this with a batched lookup, the default checks the ids one by one with `text_exists`.
+        """
+        return {id for id in ids if self.text_exists(id)}
+
     @abstractmethod
     def delete_by_ids(self, ids: list[str]) -> None:
         raise NotImplementedError
@@ -50,14 +62,10 @@ class BaseVector(ABC):
         raise NotImplementedError
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata and "doc_id" in text.metadata:
-                doc_id = text.metadata["doc_id"]
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        existing_ids = self.existing_ids(self._get_uuids(texts))
+        if not existing_ids:
+            return texts
+        return [text for text in texts if not (text.metadata and text.metadata.get("doc_id") in existing_ids)]
 
     def _get_uuids(self, texts: list[Document]) -> list[str]:
         return [text.metadata["doc_id"] for text in texts if text.metadata and "doc_id" in text.metadata]
@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStorePoolTimeoutError(Exception):
+    """Raised when no connection to a vector store became free in VECTOR_STORE_POOL_TIMEOUT seconds."""
+
+    pass
+
+
+class VectorClientPoolStats(BaseModel):
+    """
+    Usage of the connections of one registered vector store client.
+    """
+
+    backend: str
+    endpoint: str
+    max_connections: int
+    in_use: int
+    peak_in_use: int
+    leases: int
+    waits: int
+    timeouts: int
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_use >= self.max_connections
+
+
+class RegisteredVectorClient:
+    """
+    Client or connection pool of one vector store, shared by the `BaseVector` of all its collections.
+
+    `attributes` keeps what a backend learned once about its server, like its version, and `lock` guards
+    the parts of clients that are not thread-safe.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        endpoint: str,
+        client: Any,
+        max_connections: int,
+        close: Optional[Callable[[Any], None]] = None,
+    ):
+        self.backend = backend
+        self.endpoint = endpoint
+        self.client = client
+        self.max_connections = max_connections
+        self.close = close
+        self.attributes: dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+        self._stats_lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.leases = 0
+        self.waits = 0
+        self.timeouts = 0
+
+
+class VectorClientRegistry:
+    """
+    Process-wide registry of vector store clients.
+
+    One client, or connection pool, is created per (backend, endpoint, credentials) and handed to every
+    `BaseVector` of that store, so building a `Vector` for a dataset does not open new connections. Each
+    operation `Vector` runs on a registered client leases one of its connections: at most `max_connections`
+    run at once per client and VECTOR_STORE_MAX_CONNECTIONS across all clients of the process, the others
+    wait up to VECTOR_STORE_POOL_TIMEOUT seconds. Clients are not shared with forked worker processes.
+    """
+
+    _clients: dict[tuple, RegisteredVectorClient] = {}
+    _lock = threading.Lock()
+    _connections = threading.BoundedSemaphore(dify_config.VECTOR_STORE_MAX_CONNECTIONS)
+    _leased = threading.local()
+
+    @staticmethod
+    def settings_hash(*settings: Any) -> str:
+        """Hash of the credentials and other settings of a client, so credentials are not kept in the keys."""
+        return hashlib.sha256("\0".join(str(setting) for setting in settings).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get(
+        cls,
+        backend: str,
+        endpoint: str,
+        settings_hash: str,
+        factory: Callable[[], Any],
+        max_connections: Optional[int] = None,
+        close: Optional[Callable[[Any], None]] = None,
+    ) -> RegisteredVectorClient:
+        """
+        Get the registered client of a vector store, creating it on first use.
+
+        :param backend: vector type of the store
+        :param endpoint: address of the store, as shown in the pool stats
+        :param settings_hash: `settings_hash` of the credentials and settings the client is created with
+        :param factory: creates the client, called at most once per process and key
+        :param max_connections: connections the client may use at once, defaults to VECTOR_STORE_POOL_SIZE
+        :param close: optional callable closing the client, called by `clear`
+        """
+        key = (os.getpid(), backend, endpoint, settings_hash)
+        registered = cls._clients.get(key)
+        if registered is not None:
+            return registered
+
+        with cls._lock:
+            registered = cls._clients.get(key)
+            if registered is None:
+                registered = RegisteredVectorClient(
+                    backend=backend,
+                    endpoint=endpoint,
+                    client=factory(),
+                    max_connections=max_connections or dify_config.VECTOR_STORE_POOL_SIZE,
+                    close=close,
+                )
+                cls._clients[key] = registered
+        return registered
+
+    @classmethod
+    @contextmanager
+    def lease(cls, registered: RegisteredVectorClient) -> Generator[Any, None, None]:
+        """
+        Lease a connection of a registered client for one operation, waiting for one to become free.
+
+        Leases are reentrant per thread, nested operations on the same client use the connection of the
+        outer one.
+        """
+        leased: Optional[set[int]] = getattr(cls._leased, "clients", None)
+        if leased is None:
+            leased = cls._leased.clients = set()
+        if id(registered) in leased:
+            yield registered.client
+            return
+
+        timeout = dify_config.VECTOR_STORE_POOL_TIMEOUT
+        started_at = time.perf_counter()
+        waited = not registered._semaphore.acquire(blocking=False)
+        if waited and not registered._semaphore.acquire(timeout=timeout):
+            cls._on_timeout(registered, "client")
+        remaining = max(timeout - (time.perf_counter() - started_at), 0)
+        if not cls._connections.acquire(blocking=False):
+            waited = True
+            if not cls._connections.acquire(timeout=remaining):
+                registered._semaphore.release()
+                cls._on_timeout(registered, "process")
+
+        with registered._stats_lock:
+            registered.in_use += 1
+            registered.peak_in_use = max(registered.peak_in_use, registered.in_use)
+            registered.leases += 1
+            registered.waits += int(waited)
+        leased.add(id(registered))
+        try:
+            yield registered.client
+        finally:
+            leased.discard(id(registered))
+            with registered._stats_lock:
+                registered.in_use -= 1
+            cls._connections.release()
+            registered._semaphore.release()
+
+    @classmethod
+    def _on_timeout(cls, registered: RegisteredVectorClient, limit: str) -> None:
+        with registered._stats_lock:
+            registered.timeouts += 1
+        logger.warning(
+            f"No connection to {registered.backend} at {registered.endpoint} became free in"
+            f" {dify_config.VECTOR_STORE_POOL_TIMEOUT}s, the {limit} connection limit is saturated"
+        )
+        raise VectorStorePoolTimeoutError(f"Timed out waiting for a connection to {registered.backend}")
+
+    @classmethod
+    def get_pool_stats(cls) -> list[VectorClientPoolStats]:
+        """Connection usage of the registered clients of this process."""
+        with cls._lock:
+            clients = [registered for key, registered in cls._clients.items() if key[0] == os.getpid()]
+        return [
+            VectorClientPoolStats(
+                backend=registered.backend,
+                endpoint=registered.endpoint,
+                max_connections=registered.max_connections,
+                in_use=registered.in_use,
+                peak_in_use=registered.peak_in_use,
+                leases=registered.leases,
+                waits=registered.waits,
+                timeouts=registered.timeouts,
+            )
+            for registered in clients
+        ]
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Close and forget the registered clients of this process.
+        """
+        with cls._lock:
+            clients = [registered for key, registered in cls._clients.items() if key[0] == os.getpid()]
+            cls._clients.clear()
+        for registered in clients:
+            if registered.close is None:
+                continue
+            try:
+                registered.close(registered.client)
+            except Exception:
+                logger.exception(f"Failed to close the {registered.backend} client of {registered.endpoint}")
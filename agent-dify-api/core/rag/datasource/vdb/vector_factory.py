@@ -1,10 +1,14 @@
+import functools
 from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager, nullcontext
 from typing import Any, Optional
 
 from configs import dify_config
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
+from core.rag.datasource.retrieval_cache import DatasetIndexVersion
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.embedding.embedding_base import Embeddings
@@ -156,44 +160,74 @@ class Vector:
                 from core.rag.datasource.vdb.tablestore.tablestore_vector import TableStoreVectorFactory
 
                 return TableStoreVectorFactory
+            case VectorType.LOCAL:
+                from core.rag.datasource.vdb.local.local_vector import LocalVectorFactory
+
+                return LocalVectorFactory
             case _:
                 raise ValueError(f"Vector store {vector_type} is not supported.")
 
     def create(self, texts: Optional[list] = None, **kwargs):
         if texts:
             embeddings = self._embeddings.embed_documents([document.page_content for document in texts])
-            self._vector_processor.create(texts=texts, embeddings=embeddings, **kwargs)
+            with self._lease():
+                self._vector_processor.create(texts=texts, embeddings=embeddings, **kwargs)
+            DatasetIndexVersion.bump(self._dataset.id)
 
     def add_texts(self, documents: list[Document], **kwargs):
         if kwargs.get("duplicate_check", False):
             documents = self._filter_duplicate_texts(documents)
 
         embeddings = self._embeddings.embed_documents([document.page_content for document in documents])
-        self._vector_processor.create(texts=documents, embeddings=embeddings, **kwargs)
+        with self._lease():
+            self._vector_processor.create(texts=documents, embeddings=embeddings, **kwargs)
+        DatasetIndexVersion.bump(self._dataset.id)
 
     def text_exists(self, id: str) -> bool:
-        return self._vector_processor.text_exists(id)
+        with self._lease():
+            return self._vector_processor.text_exists(id)
+
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        with self._lease():
+            return self._vector_processor.existing_ids(ids)
 
     def delete_by_ids(self, ids: list[str]) -> None:
-        self._vector_processor.delete_by_ids(ids)
+        with self._lease():
+            self._vector_processor.delete_by_ids(ids)
+        DatasetIndexVersion.bump(self._dataset.id)
 
     def delete_by_metadata_field(self, key: str, value: str) -> None:
-        self._vector_processor.delete_by_metadata_field(key, value)
+        with self._lease():
+            self._vector_processor.delete_by_metadata_field(key, value)
+        DatasetIndexVersion.bump(self._dataset.id)
 
     def search_by_vector(self, query: str, **kwargs: Any) -> list[Document]:
         query_vector = self._embeddings.embed_query(query)
-        return self._vector_processor.search_by_vector(query_vector, **kwargs)
+        with self._lease():
+            return self._vector_processor.search_by_vector(query_vector, **kwargs)
 
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
-        return self._vector_processor.search_by_full_text(query, **kwargs)
+        with self._lease():
+            return self._vector_processor.search_by_full_text(query, **kwargs)
 
     def delete(self) -> None:
-        self._vector_processor.delete()
+        with self._lease():
+            self._vector_processor.delete()
+        DatasetIndexVersion.bump(self._dataset.id)
         # delete collection redis cache
         if self._vector_processor.collection_name:
             collection_exist_cache_key = "vector_indexing_{}".format(self._vector_processor.collection_name)
             redis_client.delete(collection_exist_cache_key)
 
+    def _lease(self) -> AbstractContextManager:
+        """
+        Lease a connection of the shared client of the vector store for one operation, if it has one.
+        """
+        registered_client = self._vector_processor.registered_client
+        if registered_client is None:
+            return nullcontext()
+        return VectorClientRegistry.lease(registered_client)
+
     def _get_embeddings(self) -> Embeddings:
         model_manager = ModelManager()
 
@@ -206,21 +240,26 @@ class Vector:
         return CacheEmbedding(embedding_model)
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata is None:
-                continue
-            doc_id = text.metadata["doc_id"]
-            if doc_id:
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        doc_ids = [text.metadata["doc_id"] for text in texts if text.metadata and text.metadata.get("doc_id")]
+        if not doc_ids:
+            return texts
+        existing_ids = self.existing_ids(doc_ids)
+        if not existing_ids:
+            return texts
+        return [text for text in texts if not (text.metadata and text.metadata.get("doc_id") in existing_ids)]
 
     def __getattr__(self, name):
         if self._vector_processor is not None:
             method = getattr(self._vector_processor, name)
             if callable(method):
-                return method
+                if self._vector_processor.registered_client is None:
+                    return method
+
+                @functools.wraps(method)
+                def leased_method(*args, **kwargs):
+                    with self._lease():
+                        return method(*args, **kwargs)
+
+                return leased_method
 
         raise AttributeError(f"'vector_processor' object has no attribute '{name}'")
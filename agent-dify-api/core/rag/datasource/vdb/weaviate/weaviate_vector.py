@@ -9,6 +9,7 @@ from pydantic import BaseModel, model_validator
 from configs import dify_config
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -33,7 +34,14 @@ class WeaviateConfig(BaseModel):
 class WeaviateVector(BaseVector):
     def __init__(self, collection_name: str, config: WeaviateConfig, attributes: list):
         super().__init__(collection_name)
-        self._client = self._init_client(config)
+        # one client per server is shared by the classes of all datasets, its batch is guarded by the lock
+        self.registered_client = VectorClientRegistry.get(
+            backend=VectorType.WEAVIATE,
+            endpoint=config.endpoint,
+            settings_hash=VectorClientRegistry.settings_hash(config.api_key, config.batch_size),
+            factory=lambda: self._init_client(config),
+        )
+        self._client = self.registered_client.client
         self._attributes = attributes
 
     def _init_client(self, config: WeaviateConfig) -> weaviate.Client:
@@ -103,7 +111,7 @@ class WeaviateVector(BaseVector):
 
         ids = []
 
-        with self._client.batch as batch:
+        with self.registered_client.lock, self._client.batch as batch:
             for i, text in enumerate(texts):
                 data_properties = {Field.TEXT_KEY.value: text}
                 if metadatas is not None:
@@ -164,6 +172,26 @@ class WeaviateVector(BaseVector):
 
         return True
 
+    def existing_ids(self, ids: list[str], batch_size: int = 100) -> set[str]:
+        collection_name = self._collection_name
+        if not ids or not self._client.schema.contains(self._default_schema(collection_name)):
+            return set()
+
+        existing_ids = set()
+        for i in range(0, len(ids), batch_size):
+            batch_ids = ids[i : i + batch_size]
+            operands = [{"path": ["doc_id"], "operator": "Equal", "valueText": id} for id in batch_ids]
+            result = (
+                self._client.query.get(collection_name, ["doc_id"])
+                .with_where({"operator": "Or", "operands": operands})
+                .with_limit(len(batch_ids))
+                .do()
+            )
+            if "errors" in result:
+                raise ValueError(f"Error during query: {result['errors']}")
+            existing_ids.update(entry["doc_id"] for entry in result["data"]["Get"][collection_name])
+        return existing_ids
+
     def delete_by_ids(self, ids: list[str]) -> None:
         # check whether the index already exists
         schema = self._default_schema(self._collection_name)
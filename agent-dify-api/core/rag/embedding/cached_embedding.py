@@ -1,9 +1,12 @@
 import base64
+import contextvars
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any, Optional, cast
 
 import numpy as np
-from sqlalchemy.exc import IntegrityError
+from flask import Flask, current_app, has_app_context
 
 from configs import dify_config
 from core.entities.embedding_type import EmbeddingInputType
@@ -11,10 +14,10 @@ from core.model_manager import ModelInstance
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.rag.embedding.embedding_base import Embeddings
+from core.rag.embedding.embedding_cache import EmbeddingCache
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from libs import helper
-from models.dataset import Embedding
 
 logger = logging.getLogger(__name__)
 
@@ -25,81 +28,93 @@ class CacheEmbedding(Embeddings):
         self._user = user
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed search docs in batches of 10."""
+        """Embed search docs, looking up all cache tiers once per batch."""
         # use doc embedding cache or store if not exists
         text_embeddings: list[Any] = [None for _ in range(len(texts))]
+        hashes = [helper.generate_text_hash(text) for text in texts]
+        cache = EmbeddingCache(self._model_instance.provider, self._model_instance.model)
+        cached = cache.get_many(hashes)
+
         embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = (
-                db.session.query(Embedding)
-                .filter_by(
-                    model_name=self._model_instance.model, hash=hash, provider_name=self._model_instance.provider
-                )
-                .first()
-            )
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
+        for i, hash in enumerate(hashes):
+            if hash in cached:
+                text_embeddings[i] = cached[hash].tolist()
             else:
                 embedding_queue_indices.append(i)
-        if embedding_queue_indices:
-            embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
-            embedding_queue_embeddings = []
-            try:
-                model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
-                model_schema = model_type_instance.get_model_schema(
-                    self._model_instance.model, self._model_instance.credentials
-                )
-                max_chunks = (
-                    model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS]
-                    if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties
-                    else 1
-                )
-                for i in range(0, len(embedding_queue_texts), max_chunks):
-                    batch_texts = embedding_queue_texts[i : i + max_chunks]
-
-                    embedding_result = self._model_instance.invoke_text_embedding(
-                        texts=batch_texts, user=self._user, input_type=EmbeddingInputType.DOCUMENT
+        if not embedding_queue_indices:
+            return text_embeddings
+
+        # embed each distinct missing text once
+        queue = {hashes[i]: texts[i] for i in embedding_queue_indices}
+        queue_hashes = list(queue)
+        queue_texts = list(queue.values())
+        try:
+            model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
+            model_schema = model_type_instance.get_model_schema(
+                self._model_instance.model, self._model_instance.credentials
+            )
+            max_chunks = (
+                model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS]
+                if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties
+                else 1
+            )
+            batches = [queue_texts[i : i + max_chunks] for i in range(0, len(queue_texts), max_chunks)]
+            if len(batches) == 1:
+                batch_results = [self._embed_batch(batches[0])]
+            else:
+                flask_app = current_app._get_current_object() if has_app_context() else None  # type: ignore
+                max_workers = min(len(batches), dify_config.EMBEDDING_MAX_CONCURRENT_BATCHES)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    batch_results = list(
+                        executor.map(
+                            partial(self._embed_batch_in_context, flask_app, contextvars.copy_context()), batches
+                        )
                     )
+        except Exception as ex:
+            db.session.rollback()
+            logger.exception("Failed to embed documents: %s")
+            raise ex
+
+        new_vectors: dict[str, np.ndarray] = {}
+        for hash, vector in zip(queue_hashes, (vector for batch in batch_results for vector in batch)):
+            if vector is not None:
+                new_vectors[hash] = vector
+        cache.put_many(new_vectors)
 
-                    for vector in embedding_result.embeddings:
-                        try:
-                            # FIXME: type ignore for numpy here
-                            normalized_embedding = (vector / np.linalg.norm(vector)).tolist()  # type: ignore
-                            # stackoverflow best way: https://stackoverflow.com/questions/20319813/how-to-check-list-containing-nan
-                            if np.isnan(normalized_embedding).any():
-                                # for issue #11827  float values are not json compliant
-                                logger.warning(f"Normalized embedding is nan: {normalized_embedding}")
-                                continue
-                            embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
-                        except Exception:
-                            logging.exception("Failed transform embedding")
-                cache_embeddings = []
-                try:
-                    for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = n_embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(
-                                model_name=self._model_instance.model,
-                                hash=hash,
-                                provider_name=self._model_instance.provider,
-                            )
-                            embedding_cache.set_embedding(n_embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
-            except Exception as ex:
-                db.session.rollback()
-                logger.exception("Failed to embed documents: %s")
-                raise ex
+        for i in embedding_queue_indices:
+            vector = new_vectors.get(hashes[i])
+            text_embeddings[i] = vector.tolist() if vector is not None else None
 
         return text_embeddings
 
+    def _embed_batch_in_context(
+        self, flask_app: Optional[Flask], context: contextvars.Context, batch_texts: list[str]
+    ) -> list[Optional[np.ndarray]]:
+        for var, val in context.items():
+            var.set(val)
+        if flask_app is None:
+            return self._embed_batch(batch_texts)
+        with flask_app.app_context():
+            return self._embed_batch(batch_texts)
+
+    def _embed_batch(self, batch_texts: list[str]) -> list[Optional[np.ndarray]]:
+        """Embed one model-sized batch, returning normalized float32 vectors (None when not finite)."""
+        embedding_result = self._model_instance.invoke_text_embedding(
+            texts=batch_texts, user=self._user, input_type=EmbeddingInputType.DOCUMENT
+        )
+
+        vectors: list[Optional[np.ndarray]] = []
+        for vector in embedding_result.embeddings:
+            normalized_embedding = np.asarray(vector, dtype=np.float64)
+            normalized_embedding = normalized_embedding / np.linalg.norm(normalized_embedding)
+            if np.isnan(normalized_embedding).any():
+                # for issue #11827  float values are not json compliant
+                logger.warning(f"Normalized embedding is nan: {normalized_embedding}")
+                vectors.append(None)
+                continue
+            vectors.append(normalized_embedding.astype("<f4"))
+        return vectors
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
         # use doc embedding cache or store if not exists
@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy.dialects.postgresql import insert
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import Embedding
+
+logger = logging.getLogger(__name__)
+
+# keep IN lists and multi-row inserts at a size postgres plans well
+_DB_BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Three tier cache of document embeddings for one provider/model pair.
+
+    Lookups go through an in-process LRU, then Redis, then the `embeddings` table; each tier
+    below the LRU is queried once per batch (`MGET` and `hash IN (...)`) instead of once per
+    text. Vectors are kept as little-endian float32 bytes in every tier.
+    """
+
+    _lru: LRUCache = LRUCache(maxsize=max(dify_config.EMBEDDING_CACHE_LRU_SIZE, 1))
+    _lru_lock = threading.Lock()
+
+    def __init__(self, provider_name: str, model_name: str) -> None:
+        self._provider_name = provider_name
+        self._model_name = model_name
+
+    def _lru_key(self, hash: str) -> tuple[str, str, str]:
+        return self._provider_name, self._model_name, hash
+
+    def _redis_key(self, hash: str) -> str:
+        return f"embedding_cache:{self._provider_name}:{self._model_name}:{hash}"
+
+    def get_many(self, hashes: Sequence[str]) -> dict[str, np.ndarray]:
+        """Return the cached vectors for the given text hashes, missing hashes are omitted."""
+        found: dict[str, np.ndarray] = {}
+        if dify_config.EMBEDDING_CACHE_LRU_SIZE:
+            with self._lru_lock:
+                for hash in hashes:
+                    vector = self._lru.get(self._lru_key(hash))
+                    if vector is not None:
+                        found[hash] = vector
+
+        missing = [hash for hash in dict.fromkeys(hashes) if hash not in found]
+        from_redis = self._get_from_redis(missing) if missing else {}
+        found.update(from_redis)
+
+        missing = [hash for hash in missing if hash not in from_redis]
+        from_db = self._get_from_db(missing) if missing else {}
+        found.update(from_db)
+
+        self._put_lru({**from_redis, **from_db})
+        if from_db:
+            self._put_redis(from_db)
+        return found
+
+    def put_many(self, vectors: Mapping[str, np.ndarray]) -> None:
+        """Store freshly computed vectors in every tier."""
+        if not vectors:
+            return
+        self._put_lru(vectors)
+        self._put_db(vectors)
+        self._put_redis(vectors)
+
+    def _put_lru(self, vectors: Mapping[str, np.ndarray]) -> None:
+        if not dify_config.EMBEDDING_CACHE_LRU_SIZE:
+            return
+        with self._lru_lock:
+            for hash, vector in vectors.items():
+                self._lru[self._lru_key(hash)] = vector
+
+    def _get_from_redis(self, hashes: Sequence[str]) -> dict[str, np.ndarray]:
+        if not dify_config.EMBEDDING_CACHE_REDIS_TTL:
+            return {}
+        try:
+            values = redis_client.mget([self._redis_key(hash) for hash in hashes])
+        except Exception:
+            logger.exception("Failed to read embeddings from redis")
+            return {}
+        return {hash: Embedding.decode_embedding(value) for hash, value in zip(hashes, values) if value}
+
+    def _put_redis(self, vectors: Mapping[str, np.ndarray]) -> None:
+        if not dify_config.EMBEDDING_CACHE_REDIS_TTL:
+            return
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for hash, vector in vectors.items():
+                pipeline.setex(
+                    self._redis_key(hash), dify_config.EMBEDDING_CACHE_REDIS_TTL, Embedding.encode_embedding(vector)
+                )
+            pipeline.execute()
+        except Exception:
+            logger.exception("Failed to write embeddings to redis")
+
+    def _get_from_db(self, hashes: Sequence[str]) -> dict[str, np.ndarray]:
+        found: dict[str, np.ndarray] = {}
+        for i in range(0, len(hashes), _DB_BATCH_SIZE):
+            rows = (
+                db.session.query(Embedding.hash, Embedding.embedding)
+                .filter(
+                    Embedding.model_name == self._model_name,
+                    Embedding.provider_name == self._provider_name,
+                    Embedding.hash.in_(hashes[i : i + _DB_BATCH_SIZE]),
+                )
+                .all()
+            )
+            for hash, data in rows:
+                found[hash] = Embedding.decode_embedding(data)
+        return found
+
+    def _put_db(self, vectors: Mapping[str, np.ndarray]) -> None:
+        rows = [
+            {
+                "model_name": self._model_name,
+                "provider_name": self._provider_name,
+                "hash": hash,
+                "embedding": Embedding.encode_embedding(vector),
+            }
+            for hash, vector in vectors.items()
+        ]
+        try:
+            for i in range(0, len(rows), _DB_BATCH_SIZE):
+                stmt = insert(Embedding).values(rows[i : i + _DB_BATCH_SIZE])
+                db.session.execute(stmt.on_conflict_do_nothing(constraint="embedding_hash_idx"))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to persist embeddings")
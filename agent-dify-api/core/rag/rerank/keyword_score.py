@@ -0,0 +1,94 @@
+import logging
+from collections.abc import Iterable
+
+import numpy as np
+
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import DocumentSegment
+
+logger = logging.getLogger(__name__)
+
+
+def get_documents_keywords(documents: list[Document]) -> list[set[str]]:
+    """
+    Keywords of each document, preferring the keywords stored on its segment at indexing time.
+
+    Segment keywords are loaded with one query; only documents without stored keywords are run through jieba.
+    """
+    node_ids = [
+        document.metadata["doc_id"] for document in documents if document.metadata and "doc_id" in document.metadata
+    ]
+    segment_keywords: dict[str, list[str]] = {}
+    if node_ids:
+        try:
+            dataset_ids = {
+                document.metadata["dataset_id"]
+                for document in documents
+                if document.metadata and document.metadata.get("dataset_id")
+            }
+            query = db.session.query(DocumentSegment.index_node_id, DocumentSegment.keywords).filter(
+                DocumentSegment.index_node_id.in_(node_ids)
+            )
+            if dataset_ids:
+                query = query.filter(DocumentSegment.dataset_id.in_(dataset_ids))
+            segment_keywords = {node_id: keywords for node_id, keywords in query.all() if keywords}
+        except Exception:
+            logger.exception("Failed to load segment keywords, extracting them from the documents instead")
+            # the failed query leaves the session unusable for the next queries of the request
+            db.session.rollback()
+
+    keyword_table_handler = JiebaKeywordTableHandler()
+    return keyword_table_handler.batch_extract_keywords(
+        [document.page_content for document in documents],
+        None,
+        [
+            segment_keywords.get(document.metadata.get("doc_id")) if document.metadata else None
+            for document in documents
+        ],
+    )
+
+
+def calculate_keyword_scores(query_keywords: Iterable[str], documents_keywords: list[set[str]]) -> list[float]:
+    """
+    TF-IDF cosine similarity between the query keywords and each document's keywords.
+
+    The document-keyword matrix is built once in coordinate form, so document frequencies, norms and
+    dot products are each a single vectorized pass over its non-zero entries.
+    """
+    total_documents = len(documents_keywords)
+    if not total_documents:
+        return []
+
+    flat_keywords = [keyword for document_keywords in documents_keywords for keyword in document_keywords]
+    if not flat_keywords:
+        return [0.0] * total_documents
+
+    vocabulary: dict[str, int] = dict.fromkeys(flat_keywords, 0)
+    for col, keyword in enumerate(vocabulary):
+        vocabulary[keyword] = col
+    col_idx = np.fromiter(map(vocabulary.__getitem__, flat_keywords), dtype=np.int64, count=len(flat_keywords))
+    row_idx = np.repeat(
+        np.arange(total_documents), [len(document_keywords) for document_keywords in documents_keywords]
+    )
+
+    # keyword sets have a term frequency of 1, so TF-IDF weights are the IDF of each present keyword
+    doc_count_containing_keyword = np.bincount(col_idx, minlength=len(vocabulary))
+    idf = np.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
+    weights = idf[col_idx]
+
+    query_tfidf = np.zeros(len(vocabulary))
+    for keyword in set(query_keywords):
+        col = vocabulary.get(keyword)
+        if col is not None:
+            query_tfidf[col] = idf[col]
+    query_norm = np.linalg.norm(query_tfidf)
+    if not query_norm:
+        return [0.0] * total_documents
+
+    numerators = np.bincount(row_idx, weights=weights * query_tfidf[col_idx], minlength=total_documents)
+    document_norms = np.sqrt(np.bincount(row_idx, weights=weights * weights, minlength=total_documents))
+    denominators = document_norms * query_norm
+    similarities = np.divide(numerators, denominators, out=np.zeros(total_documents), where=denominators > 0)
+    return similarities.tolist()
@@ -1,5 +1,3 @@
-import math
-from collections import Counter
 from typing import Optional
 
 import numpy as np
@@ -10,6 +8,7 @@ from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaK
 from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.models.document import Document
 from core.rag.rerank.entity.weight import VectorSetting, Weights
+from core.rag.rerank.keyword_score import calculate_keyword_scores, get_documents_keywords
 from core.rag.rerank.rerank_base import BaseRerankRunner
 
 
@@ -65,7 +64,7 @@ class WeightRerankRunner(BaseRerankRunner):
 
     def _calculate_keyword_score(self, query: str, documents: list[Document]) -> list[float]:
         """
-        Calculate BM25 scores
+        Calculate TF-IDF cosine scores
         :param query: search query
         :param documents: documents for reranking
 
@@ -73,72 +72,12 @@ class WeightRerankRunner(BaseRerankRunner):
         """
         keyword_table_handler = JiebaKeywordTableHandler()
         query_keywords = keyword_table_handler.extract_keywords(query, None)
-        documents_keywords = []
-        for document in documents:
-            # get the document keywords
-            document_keywords = keyword_table_handler.extract_keywords(document.page_content, None)
+        documents_keywords = get_documents_keywords(documents)
+        for document, document_keywords in zip(documents, documents_keywords):
             if document.metadata is not None:
                 document.metadata["keywords"] = document_keywords
-                documents_keywords.append(document_keywords)
-
-        # Counter query keywords(TF)
-        query_keyword_counts = Counter(query_keywords)
-
-        # total documents
-        total_documents = len(documents)
-
-        # calculate all documents' keywords IDF
-        all_keywords = set()
-        for document_keywords in documents_keywords:
-            all_keywords.update(document_keywords)
-
-        keyword_idf = {}
-        for keyword in all_keywords:
-            # calculate include query keywords' documents
-            doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
-            # IDF
-            keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
-
-        query_tfidf = {}
-
-        for keyword, count in query_keyword_counts.items():
-            tf = count
-            idf = keyword_idf.get(keyword, 0)
-            query_tfidf[keyword] = tf * idf
-
-        # calculate all documents' TF-IDF
-        documents_tfidf = []
-        for document_keywords in documents_keywords:
-            document_keyword_counts = Counter(document_keywords)
-            document_tfidf = {}
-            for keyword, count in document_keyword_counts.items():
-                tf = count
-                idf = keyword_idf.get(keyword, 0)
-                document_tfidf[keyword] = tf * idf
-            documents_tfidf.append(document_tfidf)
-
-        def cosine_similarity(vec1, vec2):
-            intersection = set(vec1.keys()) & set(vec2.keys())
-            numerator = sum(vec1[x] * vec2[x] for x in intersection)
-
-            sum1 = sum(vec1[x] ** 2 for x in vec1)
-            sum2 = sum(vec2[x] ** 2 for x in vec2)
-            denominator = math.sqrt(sum1) * math.sqrt(sum2)
-
-            if not denominator:
-                return 0.0
-            else:
-                return float(numerator) / denominator
-
-        similarities = []
-        for document_tfidf in documents_tfidf:
-            similarity = cosine_similarity(query_tfidf, document_tfidf)
-            similarities.append(similarity)
-
-        # for idx, similarity in enumerate(similarities):
-        #     print(f"Document {idx + 1} similarity: {similarity}")
-
-        return similarities
+
+        return calculate_keyword_scores(query_keywords, documents_keywords)
 
     def _calculate_cosine(
         self, tenant_id: str, query: str, documents: list[Document], vector_setting: VectorSetting
@@ -150,8 +89,6 @@ class WeightRerankRunner(BaseRerankRunner):
 
         :return:
         """
-        query_vector_scores = []
-
         model_manager = ModelManager()
 
         embedding_model = model_manager.get_model_instance(
@@ -161,25 +98,22 @@ class WeightRerankRunner(BaseRerankRunner):
             model=vector_setting.embedding_model_name,
         )
         cache_embedding = CacheEmbedding(embedding_model)
-        query_vector = cache_embedding.embed_query(query)
-        for document in documents:
-            # calculate cosine similarity
-            if document.metadata and "score" in document.metadata:
-                query_vector_scores.append(document.metadata["score"])
-            else:
-                # transform to NumPy
-                vec1 = np.array(query_vector)
-                vec2 = np.array(document.vector)
-
-                # calculate dot product
-                dot_product = np.dot(vec1, vec2)
-
-                # calculate norm
-                norm_vec1 = np.linalg.norm(vec1)
-                norm_vec2 = np.linalg.norm(vec2)
-
-                # calculate cosine similarity
-                cosine_sim = dot_product / (norm_vec1 * norm_vec2)
-                query_vector_scores.append(cosine_sim)
+        query_vector = np.asarray(cache_embedding.embed_query(query), dtype=np.float32)
+
+        # documents scored by the vector search keep that score, the rest are scored in one matrix product
+        query_vector_scores = [
+            document.metadata["score"] if document.metadata and "score" in document.metadata else 0.0
+            for document in documents
+        ]
+        unscored = [
+            i for i, document in enumerate(documents) if not (document.metadata and "score" in document.metadata)
+        ]
+        if unscored:
+            vectors = np.asarray([documents[i].vector for i in unscored], dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+            dot_products = vectors @ query_vector
+            cosine_sims = np.divide(dot_products, norms, out=np.zeros_like(dot_products), where=norms > 0)
+            for i, cosine_sim in zip(unscored, cosine_sims.tolist()):
+                query_vector_scores[i] = cosine_sim
 
         return query_vector_scores
@@ -1,9 +1,9 @@
 import json
-import math
+import logging
 import re
-import threading
-from collections import Counter, defaultdict
+from collections import defaultdict
 from collections.abc import Generator, Mapping
+from concurrent.futures import Future
 from typing import Any, Optional, Union, cast
 
 from flask import Flask, current_app
@@ -34,11 +34,13 @@ from core.prompt.entities.advanced_prompt_entities import ChatModelMessage, Comp
 from core.prompt.simple_prompt_transform import ModelMode
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.retrieval_executor import RetrievalBranchReport, RetrievalExecutor
 from core.rag.datasource.retrieval_service import RetrievalService
 from core.rag.entities.context_entities import DocumentContext
 from core.rag.entities.metadata_entities import Condition, MetadataCondition
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
+from core.rag.rerank.keyword_score import calculate_keyword_scores, get_documents_keywords
 from core.rag.rerank.rerank_type import RerankMode
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from core.rag.retrieval.router.multi_dataset_function_call_router import FunctionCallMultiDatasetRouter
@@ -59,6 +61,8 @@ from models.dataset import ChildChunk, Dataset, DatasetMetadata, DatasetQuery, D
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
 default_retrieval_model: dict[str, Any] = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -71,6 +75,13 @@ default_retrieval_model: dict[str, Any] = {
 class DatasetRetrieval:
     def __init__(self, application_generate_entity=None):
         self.application_generate_entity = application_generate_entity
+        # search branches of the retrievals run by this instance, with their status and latency
+        self.retrieval_branches: list[RetrievalBranchReport] = []
+
+    @property
+    def partial_retrieval(self) -> bool:
+        """Whether a search branch missed its deadline and its documents are missing from the results."""
+        return any(branch.status == "timeout" for branch in self.retrieval_branches)
 
     def retrieve(
         self,
@@ -375,7 +386,7 @@ class DatasetRetrieval:
                         score_threshold = retrieval_model_config.get("score_threshold", 0.0)
 
                     with measure_time() as timer:
-                        results = RetrievalService.retrieve(
+                        retrieval_result = RetrievalService.retrieve_with_report(
                             retrieval_method=retrieval_method,
                             dataset_id=dataset.id,
                             query=query,
@@ -386,6 +397,8 @@ class DatasetRetrieval:
                             weights=retrieval_model_config.get("weights", None),
                             document_ids_filter=document_ids_filter,
                         )
+                    results = retrieval_result.documents
+                    self.retrieval_branches.extend(retrieval_result.branches)
                 self._on_query(query, [dataset_id], app_id, user_from, user_id)
 
                 if results:
@@ -414,7 +427,7 @@ class DatasetRetrieval:
     ):
         if not available_datasets:
             return []
-        threads = []
+        futures: list[tuple[str, Future, list[Document]]] = []
         all_documents: list[Document] = []
         dataset_ids = [dataset.id for dataset in available_datasets]
         index_type_check = all(
@@ -460,22 +473,25 @@ class DatasetRetrieval:
                         document_ids_filter = document_ids
                     else:
                         continue
-            retrieval_thread = threading.Thread(
-                target=self._retriever,
-                kwargs={
-                    "flask_app": current_app._get_current_object(),  # type: ignore
-                    "dataset_id": dataset.id,
-                    "query": query,
-                    "top_k": top_k,
-                    "all_documents": all_documents,
-                    "document_ids_filter": document_ids_filter,
-                    "metadata_condition": metadata_condition,
-                },
+            dataset_documents: list[Document] = []
+            future = RetrievalExecutor.submit_dataset(
+                self._retriever,
+                flask_app=current_app._get_current_object(),  # type: ignore
+                dataset_id=dataset.id,
+                query=query,
+                top_k=top_k,
+                all_documents=dataset_documents,
+                document_ids_filter=document_ids_filter,
+                metadata_condition=metadata_condition,
             )
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+            futures.append((dataset.id, future, dataset_documents))
+        for dataset_id, future, dataset_documents in futures:
+            try:
+                future.result()
+            except Exception:
+                logger.exception(f"Failed to retrieve documents from dataset {dataset_id}")
+                continue
+            all_documents.extend(dataset_documents)
 
         with measure_time() as timer:
             if reranking_enable:
@@ -610,19 +626,20 @@ class DatasetRetrieval:
 
                 if dataset.indexing_technique == "economy":
                     # use keyword table query
-                    documents = RetrievalService.retrieve(
+                    retrieval_result = RetrievalService.retrieve_with_report(
                         retrieval_method="keyword_search",
                         dataset_id=dataset.id,
                         query=query,
                         top_k=top_k,
                         document_ids_filter=document_ids_filter,
                     )
-                    if documents:
-                        all_documents.extend(documents)
+                    self.retrieval_branches.extend(retrieval_result.branches)
+                    if retrieval_result.documents:
+                        all_documents.extend(retrieval_result.documents)
                 else:
                     if top_k > 0:
                         # retrieval source
-                        documents = RetrievalService.retrieve(
+                        retrieval_result = RetrievalService.retrieve_with_report(
                             retrieval_method=retrieval_model["search_method"],
                             dataset_id=dataset.id,
                             query=query,
@@ -637,8 +654,8 @@ class DatasetRetrieval:
                             weights=retrieval_model.get("weights", None),
                             document_ids_filter=document_ids_filter,
                         )
-
-                        all_documents.extend(documents)
+                        self.retrieval_branches.extend(retrieval_result.branches)
+                        all_documents.extend(retrieval_result.documents)
 
     def to_dataset_retriever_tool(
         self,
@@ -741,67 +758,12 @@ class DatasetRetrieval:
         """
         keyword_table_handler = JiebaKeywordTableHandler()
         query_keywords = keyword_table_handler.extract_keywords(query, None)
-        documents_keywords = []
-        for document in documents:
+        documents_keywords = get_documents_keywords(documents)
+        for document, document_keywords in zip(documents, documents_keywords):
             if document.metadata is not None:
-                # get the document keywords
-                document_keywords = keyword_table_handler.extract_keywords(document.page_content, None)
                 document.metadata["keywords"] = document_keywords
-                documents_keywords.append(document_keywords)
-
-        # Counter query keywords(TF)
-        query_keyword_counts = Counter(query_keywords)
-
-        # total documents
-        total_documents = len(documents)
-
-        # calculate all documents' keywords IDF
-        all_keywords = set()
-        for document_keywords in documents_keywords:
-            all_keywords.update(document_keywords)
-
-        keyword_idf = {}
-        for keyword in all_keywords:
-            # calculate include query keywords' documents
-            doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
-            # IDF
-            keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
-
-        query_tfidf = {}
-
-        for keyword, count in query_keyword_counts.items():
-            tf = count
-            idf = keyword_idf.get(keyword, 0)
-            query_tfidf[keyword] = tf * idf
-
-        # calculate all documents' TF-IDF
-        documents_tfidf = []
-        for document_keywords in documents_keywords:
-            document_keyword_counts = Counter(document_keywords)
-            document_tfidf = {}
-            for keyword, count in document_keyword_counts.items():
-                tf = count
-                idf = keyword_idf.get(keyword, 0)
-                document_tfidf[keyword] = tf * idf
-            documents_tfidf.append(document_tfidf)
-
-        def cosine_similarity(vec1, vec2):
-            intersection = set(vec1.keys()) & set(vec2.keys())
-            numerator = sum(vec1[x] * vec2[x] for x in intersection)
-
-            sum1 = sum(vec1[x] ** 2 for x in vec1)
-            sum2 = sum(vec2[x] ** 2 for x in vec2)
-            denominator = math.sqrt(sum1) * math.sqrt(sum2)
-
-            if not denominator:
-                return 0.0
-            else:
-                return float(numerator) / denominator
 
-        similarities = []
-        for document_tfidf in documents_tfidf:
-            similarity = cosine_similarity(query_tfidf, document_tfidf)
-            similarities.append(similarity)
+        similarities = calculate_keyword_scores(query_keywords, documents_keywords)
 
         for document, score in zip(documents, similarities):
             # format document
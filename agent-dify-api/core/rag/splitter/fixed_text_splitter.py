@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import re
+from collections.abc import Iterator
 from typing import Any, Optional
 
 from core.model_manager import ModelInstance
@@ -37,7 +39,7 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             if embedding_model_instance:
                 return embedding_model_instance.get_text_embedding_num_tokens(texts=texts)
             else:
-                return [GPT2Tokenizer.get_num_tokens(text) for text in texts]
+                return GPT2Tokenizer.count_batch(texts)
 
         if issubclass(cls, TokenTextSplitter):
             extra_kwargs = {
@@ -59,25 +61,26 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
 
     def split_text(self, text: str) -> list[str]:
         """Split incoming text and return chunks."""
+        return list(self.split_iter(text))
+
+    def split_iter(self, text: str) -> Iterator[str]:
+        """Split incoming text, yielding chunks as they are produced."""
         if self._fixed_separator:
-            chunks = text.split(self._fixed_separator)
+            chunks = _iter_str_split(text, self._fixed_separator)
         else:
-            chunks = [text]
+            chunks = iter([text])
 
-        final_chunks = []
-        chunks_lengths = self._length_function(chunks)
-        for chunk, chunk_length in zip(chunks, chunks_lengths):
+        for chunk, chunk_length in self._iter_with_lengths(chunks):
             if chunk_length > self._chunk_size:
-                final_chunks.extend(self.recursive_split_text(chunk))
+                yield from self._iter_recursive_split_text(chunk, chunk_length)
             else:
-                final_chunks.append(chunk)
-
-        return final_chunks
+                yield chunk
 
     def recursive_split_text(self, text: str) -> list[str]:
         """Split incoming text and return chunks."""
+        return list(self._iter_recursive_split_text(text))
 
-        final_chunks = []
+    def _iter_recursive_split_text(self, text: str, text_length: Optional[int] = None) -> Iterator[str]:
         separator = self._separators[-1]
         new_separators = []
 
@@ -93,42 +96,26 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
         # Now that we have the separator, split the text
         if separator:
             if separator == " ":
-                splits = text.split()
+                splits = _iter_str_split(text, None)
             else:
-                splits = text.split(separator)
+                splits = _iter_str_split(text, separator)
         else:
-            splits = list(text)
-        splits = [s for s in splits if (s not in {"", "\n"})]
-        _good_splits = []
-        _good_splits_lengths = []  # cache the lengths of the splits
+            splits = iter(text)
+        splits = (s for s in splits if (s not in {"", "\n"}))
+        split_lengths = self._iter_with_lengths(splits, text, text_length)
         _separator = "" if self._keep_separator else separator
-        s_lens = self._length_function(splits)
         if _separator != "":
-            for s, s_len in zip(splits, s_lens):
-                if s_len < self._chunk_size:
-                    _good_splits.append(s)
-                    _good_splits_lengths.append(s_len)
-                else:
-                    if _good_splits:
-                        merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
-                        final_chunks.extend(merged_text)
-                        _good_splits = []
-                        _good_splits_lengths = []
-                    if not new_separators:
-                        final_chunks.append(s)
-                    else:
-                        other_info = self._split_text(s, new_separators)
-                        final_chunks.extend(other_info)
-
-            if _good_splits:
-                merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
-                final_chunks.extend(merged_text)
+            yield from self._iter_merge_good_splits(
+                split_lengths,
+                _separator,
+                lambda s, s_len: self._iter_split_text(s, new_separators, s_len) if new_separators else iter([s]),
+            )
         else:
             current_part = ""
             current_length = 0
             overlap_part = ""
             overlap_part_length = 0
-            for s, s_len in zip(splits, s_lens):
+            for s, s_len in split_lengths:
                 if current_length + s_len <= self._chunk_size - self._chunk_overlap:
                     current_part += s
                     current_length += s_len
@@ -138,12 +125,25 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
                     overlap_part += s
                     overlap_part_length += s_len
                 else:
-                    final_chunks.append(current_part)
+                    yield current_part
                     current_part = overlap_part + s
                     current_length = s_len + overlap_part_length
                     overlap_part = ""
                     overlap_part_length = 0
             if current_part:
-                final_chunks.append(current_part)
-
-        return final_chunks
+                yield current_part
+
+
+def _iter_str_split(text: str, separator: Optional[str]) -> Iterator[str]:
+    """Lazy `str.split`, pieces are sliced from the text as they are consumed."""
+    if separator is None:
+        for match in re.finditer(r"\S+", text):
+            yield match.group()
+        return
+
+    start = 0
+    separator_len = len(separator)
+    while (end := text.find(separator, start)) != -1:
+        yield text[start:end]
+        start = end + separator_len
+    yield text[start:]
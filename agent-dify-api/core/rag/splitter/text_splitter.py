@@ -4,8 +4,10 @@ import copy
 import logging
 import re
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Collection, Iterable, Sequence, Set
+from collections import deque
+from collections.abc import Callable, Collection, Iterable, Iterator, Sequence, Set
 from dataclasses import dataclass
+from itertools import islice
 from typing import (
     Any,
     Literal,
@@ -38,9 +40,35 @@ def _split_text_with_regex(text: str, separator: str, keep_separator: bool) -> l
     return [s for s in splits if (s not in {"", "\n"})]
 
 
+def _iter_split_text_with_regex(text: str, separator: str, keep_separator: bool) -> Iterator[str]:
+    """Lazy version of `_split_text_with_regex`, pieces are sliced from the text as they are consumed."""
+    if not separator:
+        yield from (s for s in text if s != "\n")
+        return
+
+    pattern = re.compile(re.escape(separator) if keep_separator else separator)
+    if pattern.groups:
+        # re.split also returns the captured groups, leave those semantics to it
+        yield from _split_text_with_regex(text, separator, keep_separator)
+        return
+
+    start = 0
+    for match in pattern.finditer(text):
+        s = text[start : match.end()] if keep_separator else text[start : match.start()]
+        start = match.end()
+        if s not in {"", "\n"}:
+            yield s
+    s = text[start:]
+    if s not in {"", "\n"}:
+        yield s
+
+
 class TextSplitter(BaseDocumentTransformer, ABC):
     """Interface for splitting text into chunks."""
 
+    # number of splits measured per call of the length function
+    _LENGTH_BATCH_SIZE = 256
+
     def __init__(
         self,
         chunk_size: int = 4000,
@@ -67,18 +95,23 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         self._length_function = length_function
         self._keep_separator = keep_separator
         self._add_start_index = add_start_index
+        self._separator_lengths: dict[str, int] = {}
 
     @abstractmethod
     def split_text(self, text: str) -> list[str]:
         """Split text into multiple components."""
 
+    def split_iter(self, text: str) -> Iterator[str]:
+        """Split text into multiple components, yielding chunks as they are produced."""
+        yield from self.split_text(text)
+
     def create_documents(self, texts: list[str], metadatas: Optional[list[dict]] = None) -> list[Document]:
         """Create documents from a list of texts."""
         _metadatas = metadatas or [{}] * len(texts)
         documents = []
         for i, text in enumerate(texts):
             index = -1
-            for chunk in self.split_text(text):
+            for chunk in self.split_iter(text):
                 metadata = copy.deepcopy(_metadatas[i])
                 if self._add_start_index:
                     index = text.find(chunk, index + 1)
@@ -104,42 +137,60 @@ class TextSplitter(BaseDocumentTransformer, ABC):
             return text
 
     def _merge_splits(self, splits: Iterable[str], separator: str, lengths: list[int]) -> list[str]:
+        return list(self._iter_merge_splits(zip(splits, lengths), separator))
+
+    def _separator_length(self, separator: str) -> int:
+        separator_len = self._separator_lengths.get(separator)
+        if separator_len is None:
+            separator_len = self._separator_lengths[separator] = self._length_function([separator])[0]
+        return separator_len
+
+    def _iter_with_lengths(
+        self, splits: Iterable[str], known_text: Optional[str] = None, known_length: Optional[int] = None
+    ) -> Iterator[tuple[str, int]]:
+        """
+        Pair splits with their lengths, measuring them in batches.
+
+        A split equal to `known_text` (the text being split, when no separator applies) reuses `known_length`.
+        """
+        splits = iter(splits)
+        while batch := list(islice(splits, self._LENGTH_BATCH_SIZE)):
+            if known_length is not None and len(batch) == 1 and batch[0] == known_text:
+                yield batch[0], known_length
+                continue
+            yield from zip(batch, self._length_function(batch))
+
+    def _iter_merge_splits(self, splits: Iterable[tuple[str, int]], separator: str) -> Iterator[str]:
         # We now want to combine these smaller pieces into medium size
         # chunks to send to the LLM.
-        separator_len = self._length_function([separator])[0]
+        separator_len = self._separator_length(separator)
 
-        docs = []
-        current_doc: list[str] = []
+        # the window keeps the length of each split so popping never measures again
+        current_doc: deque[tuple[str, int]] = deque()
         total = 0
-        index = 0
-        for d in splits:
-            _len = lengths[index]
+        for d, _len in splits:
             if total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size:
                 if total > self._chunk_size:
                     logger.warning(
                         f"Created a chunk of size {total}, which is longer than the specified {self._chunk_size}"
                     )
                 if len(current_doc) > 0:
-                    doc = self._join_docs(current_doc, separator)
+                    doc = self._join_docs([s for s, _ in current_doc], separator)
                     if doc is not None:
-                        docs.append(doc)
+                        yield doc
                     # Keep on popping if:
                     # - we have a larger chunk than in the chunk overlap
                     # - or if we still have any chunks and the length is long
                     while total > self._chunk_overlap or (
                         total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size and total > 0
                     ):
-                        total -= self._length_function([current_doc[0]])[0] + (
-                            separator_len if len(current_doc) > 1 else 0
-                        )
-                        current_doc = current_doc[1:]
-            current_doc.append(d)
+                        total -= current_doc[0][1] + (separator_len if len(current_doc) > 1 else 0)
+                        current_doc.popleft()
+            current_doc.append((d, _len))
             total += _len + (separator_len if len(current_doc) > 1 else 0)
-            index += 1
-        doc = self._join_docs(current_doc, separator)
+        doc = self._join_docs([s for s, _ in current_doc], separator)
         if doc is not None:
-            docs.append(doc)
-        return docs
+            yield doc
 
     @classmethod
     def from_huggingface_tokenizer(cls, tokenizer: Any, **kwargs: Any) -> TextSplitter:
@@ -463,7 +514,9 @@ class RecursiveCharacterTextSplitter(TextSplitter):
         self._separators = separators or ["\n\n", "\n", " ", ""]
 
     def _split_text(self, text: str, separators: list[str]) -> list[str]:
-        final_chunks = []
+        return list(self._iter_split_text(text, separators))
+
+    def _iter_split_text(self, text: str, separators: list[str], text_length: Optional[int] = None) -> Iterator[str]:
         separator = separators[-1]
         new_separators = []
 
@@ -476,32 +529,41 @@ class RecursiveCharacterTextSplitter(TextSplitter):
                 new_separators = separators[i + 1 :]
                 break
 
-        splits = _split_text_with_regex(text, separator, self._keep_separator)
-        _good_splits = []
-        _good_splits_lengths = []  # cache the lengths of the splits
+        splits = _iter_split_text_with_regex(text, separator, self._keep_separator)
         _separator = "" if self._keep_separator else separator
-        s_lens = self._length_function(splits)
-        for s, s_len in zip(splits, s_lens):
-            if s_len < self._chunk_size:
-                _good_splits.append(s)
-                _good_splits_lengths.append(s_len)
-            else:
-                if _good_splits:
-                    merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
-                    final_chunks.extend(merged_text)
-                    _good_splits = []
-                    _good_splits_lengths = []
-                if not new_separators:
-                    final_chunks.append(s)
-                else:
-                    other_info = self._split_text(s, new_separators)
-                    final_chunks.extend(other_info)
-
-        if _good_splits:
-            merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
-            final_chunks.extend(merged_text)
-
-        return final_chunks
+        yield from self._iter_merge_good_splits(
+            self._iter_with_lengths(splits, text, text_length),
+            _separator,
+            lambda s, s_len: self._iter_split_text(s, new_separators, s_len) if new_separators else iter([s]),
+        )
+
+    def _iter_merge_good_splits(
+        self,
+        splits: Iterator[tuple[str, int]],
+        separator: str,
+        split_long: Callable[[str, int], Iterator[str]],
+    ) -> Iterator[str]:
+        """Merge runs of splits shorter than the chunk size, handing longer splits to `split_long`."""
+        long_split: Optional[tuple[str, int]] = None
+
+        def _good_splits() -> Iterator[tuple[str, int]]:
+            nonlocal long_split
+            for s, s_len in splits:
+                if s_len >= self._chunk_size:
+                    long_split = (s, s_len)
+                    return
+                yield s, s_len
+
+        while True:
+            yield from self._iter_merge_splits(_good_splits(), separator)
+            if long_split is None:
+                break
+            s, s_len = long_split
+            long_split = None
+            yield from split_long(s, s_len)
 
     def split_text(self, text: str) -> list[str]:
         return self._split_text(text, self._separators)
+
+    def split_iter(self, text: str) -> Iterator[str]:
+        return self._iter_split_text(text, self._separators)
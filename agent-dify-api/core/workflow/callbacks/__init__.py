@@ -1,7 +1,11 @@
 from .base_workflow_callback import WorkflowCallback
 from .workflow_logging_callback import WorkflowLoggingCallback
+from .workflow_profiling_callback import NodeRunProfile, WorkflowProfileRecorder, WorkflowProfilingCallback
 
 __all__ = [
+    "NodeRunProfile",
     "WorkflowCallback",
     "WorkflowLoggingCallback",
+    "WorkflowProfileRecorder",
+    "WorkflowProfilingCallback",
 ]
@@ -0,0 +1,98 @@
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Generator
+from threading import Lock
+from typing import Optional, TypeVar
+
+from pydantic import BaseModel
+
+from core.workflow.nodes.enums import NodeType
+
+T = TypeVar("T")
+
+
+class NodeRunProfile(BaseModel):
+    """
+    Timings of one node run as seen by the graph engine, in seconds.
+    """
+
+    node_id: str
+    node_type: NodeType
+    node_run_id: str
+    parallel_id: Optional[str] = None
+    queue_wait_time: float
+    """from the node being scheduled, including waiting for a thread of a parallel branch, to its run starting"""
+    run_time: float
+    """running the node, including the engine turning its results into events"""
+    event_dispatch_time: float
+    """waiting for the events of the node to be handled by their consumers"""
+    event_count: int
+
+
+class WorkflowProfilingCallback(ABC):
+    @abstractmethod
+    def on_node_run_profiled(self, profile: NodeRunProfile) -> None:
+        """
+        Called once a node run finished, from the thread that ran the node
+        """
+        raise NotImplementedError
+
+
+class WorkflowProfileRecorder(WorkflowProfilingCallback):
+    """
+    Keeps the profiles of all node runs in memory.
+    """
+
+    def __init__(self) -> None:
+        self.profiles: list[NodeRunProfile] = []
+        self._lock = Lock()
+
+    def on_node_run_profiled(self, profile: NodeRunProfile) -> None:
+        with self._lock:
+            self.profiles.append(profile)
+
+
+def profile_node_run(
+    generator: Generator[T, None, None],
+    *,
+    callback: WorkflowProfilingCallback,
+    node_id: str,
+    node_type: NodeType,
+    node_run_id: str,
+    parallel_id: Optional[str],
+    scheduled_at: float,
+) -> Generator[T, None, None]:
+    """
+    Pass on the events of a node run, timing the generator and the consumers of its events
+    """
+    run_time = 0.0
+    event_dispatch_time = 0.0
+    event_count = 0
+    started_at = time.perf_counter()
+    try:
+        while True:
+            resumed_at = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                run_time += time.perf_counter() - resumed_at
+                return
+            yielded_at = time.perf_counter()
+            run_time += yielded_at - resumed_at
+            event_count += 1
+            yield item
+            event_dispatch_time += time.perf_counter() - yielded_at
+    finally:
+        generator.close()
+        callback.on_node_run_profiled(
+            NodeRunProfile(
+                node_id=node_id,
+                node_type=node_type,
+                node_run_id=node_run_id,
+                parallel_id=parallel_id,
+                queue_wait_time=max(started_at - scheduled_at, 0.0),
+                run_time=run_time,
+                event_dispatch_time=event_dispatch_time,
+                event_count=event_count,
+            )
+        )
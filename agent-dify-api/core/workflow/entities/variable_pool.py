@@ -3,7 +3,7 @@ from collections import defaultdict
 from collections.abc import Mapping, Sequence
 from typing import Any, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from core.file import File, FileAttribute, file_manager
 from core.variables import Segment, SegmentGroup, Variable
@@ -19,6 +19,15 @@ VARIABLE_PATTERN = re.compile(r"\{\{#([a-zA-Z0-9_]{1,50}(?:\.[a-zA-Z_][a-zA-Z0-9
 
 
 class VariablePool(BaseModel):
+    """
+    Variables of a workflow run, looked up by selector.
+
+    A pool made by `create_child` is a copy-on-write layer over its parent: it holds only the variables added
+    or removed through it and reads everything else from the parent, so creating it costs the same however
+    large the parent is. Changes made through a child never reach the parent unless `merge_into_parent` is
+    called. The parent must not change the variables a child reads while the child is in use.
+    """
+
     # Variable dictionary is a dictionary for looking up variables by their selector.
     # The first element of the selector is the node id, it's the first-level key in the dictionary.
     # Other elements of the selector are the keys in the second-level dictionary. To get the key, we hash the
@@ -43,6 +52,11 @@ class VariablePool(BaseModel):
         default_factory=list,
     )
 
+    _parent: "VariablePool | None" = PrivateAttr(default=None)
+    # Keys of the parent hidden by this layer, only tracked by child pools.
+    _removed_keys: set[tuple[str, int]] = PrivateAttr(default_factory=set)
+    _removed_nodes: set[str] = PrivateAttr(default_factory=set)
+
     def __init__(
         self,
         *,
@@ -103,7 +117,7 @@ class VariablePool(BaseModel):
             variable = variable_factory.segment_to_variable(segment=segment, selector=selector)
 
         hash_key = hash(tuple(selector[1:]))
-        self.variable_dictionary[selector[0]][hash_key] = variable
+        self._set(selector[0], hash_key, variable)
 
     def get(self, selector: Sequence[str], /) -> Segment | None:
         """
@@ -122,7 +136,7 @@ class VariablePool(BaseModel):
             return None
 
         hash_key = hash(tuple(selector[1:]))
-        value = self.variable_dictionary[selector[0]].get(hash_key)
+        value = self._lookup(selector[0], hash_key)
 
         if value is None:
             selector, attr = selector[:-1], selector[-1]
@@ -153,10 +167,71 @@ class VariablePool(BaseModel):
         if not selector:
             return
         if len(selector) == 1:
-            self.variable_dictionary[selector[0]] = {}
+            self._remove_node(selector[0])
             return
         hash_key = hash(tuple(selector[1:]))
-        self.variable_dictionary[selector[0]].pop(hash_key, None)
+        self._remove_key(selector[0], hash_key)
+
+    def create_child(self) -> "VariablePool":
+        """
+        Create a copy-on-write pool layered over this one.
+
+        Returns:
+            VariablePool: An empty layer that reads through to this pool.
+        """
+        child = VariablePool.model_construct(
+            variable_dictionary=defaultdict(dict),
+            user_inputs=self.user_inputs,
+            system_variables=self.system_variables,
+            environment_variables=self.environment_variables,
+            conversation_variables=self.conversation_variables,
+        )
+        child._parent = self
+        return child
+
+    def merge_into_parent(self) -> None:
+        """
+        Apply the variables added and removed through this child pool to its parent.
+
+        Raises:
+            ValueError: If the pool is not a child pool.
+        """
+        if self._parent is None:
+            raise ValueError("Variable pool has no parent to merge into")
+        for node_id in self._removed_nodes:
+            self._parent._remove_node(node_id)
+        for node_id, hash_key in self._removed_keys:
+            self._parent._remove_key(node_id, hash_key)
+        for node_id, variables in self.variable_dictionary.items():
+            for hash_key, variable in variables.items():
+                self._parent._set(node_id, hash_key, variable)
+
+    def _lookup(self, node_id: str, hash_key: int) -> Segment | None:
+        pool: VariablePool | None = self
+        while pool is not None:
+            # Avoid the defaultdict insert, a parent may be shared by children running in other threads.
+            variables = pool.variable_dictionary.get(node_id)
+            if variables is not None and hash_key in variables:
+                return variables[hash_key]
+            if node_id in pool._removed_nodes or (node_id, hash_key) in pool._removed_keys:
+                return None
+            pool = pool._parent
+        return None
+
+    def _set(self, node_id: str, hash_key: int, variable: Segment) -> None:
+        self.variable_dictionary[node_id][hash_key] = variable
+        self._removed_keys.discard((node_id, hash_key))
+
+    def _remove_key(self, node_id: str, hash_key: int) -> None:
+        self.variable_dictionary[node_id].pop(hash_key, None)
+        if self._parent is not None:
+            self._removed_keys.add((node_id, hash_key))
+
+    def _remove_node(self, node_id: str) -> None:
+        self.variable_dictionary[node_id] = {}
+        if self._parent is not None:
+            self._removed_nodes.add(node_id)
+            self._removed_keys = {key for key in self._removed_keys if key[0] != node_id}
 
     def convert_template(self, template: str, /):
         parts = VARIABLE_PATTERN.split(template)
@@ -52,6 +52,7 @@ class Graph(BaseModel):
     )
     answer_stream_generate_routes: AnswerStreamGenerateRoute = Field(..., description="answer stream generate routes")
     end_stream_param: EndStreamParam = Field(..., description="end stream param")
+    config_hash: Optional[str] = Field(default=None, description="hash of the graph config, set by the graph cache")
 
     @classmethod
     def init(cls, graph_config: Mapping[str, Any], root_node_id: Optional[str] = None) -> "Graph":
@@ -25,3 +25,6 @@ class GraphRuntimeState(BaseModel):
 
     node_run_state: RuntimeRouteState = RuntimeRouteState()
     """node run state"""
+
+    prefetched_code_results: dict[str, dict[str, list[Any]]] = {}
+    """results of code nodes executed ahead of their runs, by node id and inputs"""
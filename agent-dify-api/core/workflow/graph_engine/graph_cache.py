@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from cachetools import LRUCache
+from pydantic import BaseModel
+
+from configs import dify_config
+from core.workflow.graph_engine.entities.graph import Graph
+
+logger = logging.getLogger(__name__)
+
+
+class GraphCacheStats(BaseModel):
+    """
+    Lookups served by the graph cache of this process.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def graph_config_hash(graph_config: Mapping[str, Any]) -> str:
+    """Content hash of a workflow graph config, independent of key order."""
+    return hashlib.sha256(
+        json.dumps(graph_config, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class GraphCache:
+    """
+    Process-local LRU cache of compiled workflow graphs.
+
+    Graphs are keyed by workflow id, the content hash of the graph config and the root node id, so the
+    main graph of a workflow and the sub graphs of its iteration and loop nodes are cached separately,
+    and editing a draft workflow yields a new key. Cached graphs are shared by concurrent runs and must
+    be treated as read only.
+    """
+
+    _graphs: LRUCache = LRUCache(maxsize=max(dify_config.WORKFLOW_GRAPH_CACHE_SIZE, 1))
+    _lock = threading.Lock()
+    _stats = GraphCacheStats()
+
+    @classmethod
+    def get(
+        cls,
+        workflow_id: str,
+        graph_config: Mapping[str, Any],
+        root_node_id: Optional[str] = None,
+        config_hash: Optional[str] = None,
+    ) -> Graph:
+        """
+        Get the compiled graph of a graph config, compiling it on a miss.
+
+        :param workflow_id: workflow id
+        :param graph_config: graph config
+        :param root_node_id: root node id, None for the start node of the workflow
+        :param config_hash: hash of the graph config when already known, e.g. from the parent graph
+        :return: graph
+        """
+        if not dify_config.WORKFLOW_GRAPH_CACHE_SIZE:
+            return Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+
+        config_hash = config_hash or graph_config_hash(graph_config)
+        key = (workflow_id, config_hash, root_node_id)
+        with cls._lock:
+            graph = cls._graphs.get(key)
+            if graph is not None:
+                cls._stats.hits += 1
+                return graph
+            cls._stats.misses += 1
+
+        graph = Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+        graph.config_hash = config_hash
+        with cls._lock:
+            # a concurrent miss may have compiled the same graph, keep the first so runs share one copy
+            graph = cls._graphs.setdefault(key, graph)
+        logger.debug(f"Compiled graph of workflow {workflow_id} rooted at {root_node_id or 'start'}")
+        return graph
+
+    @classmethod
+    def get_stats(cls) -> GraphCacheStats:
+        with cls._lock:
+            return cls._stats.model_copy(update={"size": len(cls._graphs)})
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._graphs.clear()
+            cls._stats = GraphCacheStats()
@@ -5,7 +5,7 @@ import time
 import uuid
 from collections.abc import Generator, Mapping
 from concurrent.futures import ThreadPoolExecutor, wait
-from copy import copy, deepcopy
+from copy import copy
 from datetime import UTC, datetime
 from typing import Any, Optional, cast
 
@@ -14,6 +14,7 @@ from flask import Flask, current_app
 from configs import dify_config
 from core.app.apps.base_app_queue_manager import GenerateTaskStoppedError
 from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow.callbacks.workflow_profiling_callback import WorkflowProfilingCallback, profile_node_run
 from core.workflow.entities.node_entities import AgentNodeStrategyInit, NodeRunMetadataKey, NodeRunResult
 from core.workflow.entities.variable_pool import VariablePool, VariableValue
 from core.workflow.graph_engine.condition_handlers.condition_manager import ConditionManager
@@ -88,6 +89,7 @@ class GraphEngineThreadPool(ThreadPoolExecutor):
 
 class GraphEngine:
     workflow_thread_pool_mapping: dict[str, GraphEngineThreadPool] = {}
+    workflow_profiling_callback_mapping: dict[str, WorkflowProfilingCallback] = {}
 
     def __init__(
         self,
@@ -105,6 +107,7 @@ class GraphEngine:
         max_execution_steps: int,
         max_execution_time: int,
         thread_pool_id: Optional[str] = None,
+        profiling_callback: Optional[WorkflowProfilingCallback] = None,
     ) -> None:
         thread_pool_max_submit_count = dify_config.MAX_SUBMIT_COUNT
         thread_pool_max_workers = 10
@@ -125,6 +128,13 @@ class GraphEngine:
             self.is_main_thread_pool = True
             GraphEngine.workflow_thread_pool_mapping[self.thread_pool_id] = self.thread_pool
 
+        # sub graphs of iterations and loops run on the thread pool of the workflow and are profiled with it
+        if profiling_callback is None and thread_pool_id:
+            profiling_callback = GraphEngine.workflow_profiling_callback_mapping.get(thread_pool_id)
+        elif profiling_callback is not None and self.is_main_thread_pool:
+            GraphEngine.workflow_profiling_callback_mapping[self.thread_pool_id] = profiling_callback
+        self.profiling_callback = profiling_callback
+
         self.graph = graph
         self.init_params = GraphInitParams(
             tenant_id=tenant_id,
@@ -220,6 +230,8 @@ class GraphEngine:
     def _release_thread(self):
         if self.is_main_thread_pool and self.thread_pool_id in GraphEngine.workflow_thread_pool_mapping:
             del GraphEngine.workflow_thread_pool_mapping[self.thread_pool_id]
+        if self.is_main_thread_pool:
+            GraphEngine.workflow_profiling_callback_mapping.pop(self.thread_pool_id, None)
 
     def _run(
         self,
@@ -228,6 +240,7 @@ class GraphEngine:
         parent_parallel_id: Optional[str] = None,
         parent_parallel_start_node_id: Optional[str] = None,
         handle_exceptions: list[str] = [],
+        scheduled_at: Optional[float] = None,
     ) -> Generator[GraphEngineEvent, None, None]:
         parallel_start_node_id = None
         if in_parallel_id:
@@ -236,6 +249,9 @@ class GraphEngine:
         next_node_id = start_node_id
         previous_route_node_state: Optional[RouteNodeState] = None
         while True:
+            node_scheduled_at = scheduled_at if scheduled_at is not None else time.perf_counter()
+            scheduled_at = None
+
             # max steps reached
             if self.graph_runtime_state.node_run_steps > self.max_execution_steps:
                 raise GraphRunFailedError("Max steps {} reached.".format(self.max_execution_steps))
@@ -284,6 +300,16 @@ class GraphEngine:
                     parent_parallel_start_node_id=parent_parallel_start_node_id,
                     handle_exceptions=handle_exceptions,
                 )
+                if self.profiling_callback:
+                    generator = profile_node_run(
+                        generator,
+                        callback=self.profiling_callback,
+                        node_id=node_id,
+                        node_type=node_type,
+                        node_run_id=route_node_state.id,
+                        parallel_id=in_parallel_id,
+                        scheduled_at=node_scheduled_at,
+                    )
 
                 for item in generator:
                     if isinstance(item, NodeRunStartedEvent):
@@ -488,6 +514,7 @@ class GraphEngine:
                     "parent_parallel_id": in_parallel_id,
                     "parent_parallel_start_node_id": parallel_start_node_id,
                     "handle_exceptions": handle_exceptions,
+                    "scheduled_at": time.perf_counter(),
                 },
             )
 
@@ -533,6 +560,7 @@ class GraphEngine:
         parent_parallel_id: Optional[str] = None,
         parent_parallel_start_node_id: Optional[str] = None,
         handle_exceptions: list[str] = [],
+        scheduled_at: Optional[float] = None,
     ) -> None:
         """
         Run parallel nodes
@@ -558,6 +586,7 @@ class GraphEngine:
                     parent_parallel_id=parent_parallel_id,
                     parent_parallel_start_node_id=parent_parallel_start_node_id,
                     handle_exceptions=handle_exceptions,
+                    scheduled_at=scheduled_at,
                 )
 
                 for item in generator:
@@ -875,11 +904,11 @@ class GraphEngine:
     def create_copy(self):
         """
         create a graph engine copy
-        :return: graph engine with a new variable pool and initialized total tokens
+        :return: graph engine with a copy-on-write child of the variable pool and initialized total tokens
         """
         new_instance = copy(self)
         new_instance.graph_runtime_state = copy(self.graph_runtime_state)
-        new_instance.graph_runtime_state.variable_pool = deepcopy(self.graph_runtime_state.variable_pool)
+        new_instance.graph_runtime_state.variable_pool = self.graph_runtime_state.variable_pool.create_child()
         new_instance.graph_runtime_state.total_tokens = 0
         return new_instance
 
@@ -1,5 +1,7 @@
+import json
+import logging
 from collections.abc import Mapping, Sequence
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from configs import dify_config
 from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor, CodeLanguage
@@ -8,6 +10,7 @@ from core.helper.code_executor.javascript.javascript_code_provider import Javasc
 from core.helper.code_executor.python3.python3_code_provider import Python3CodeProvider
 from core.variables.segments import ArrayFileSegment
 from core.workflow.entities.node_entities import NodeRunResult
+from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.nodes.base import BaseNode
 from core.workflow.nodes.code.entities import CodeNodeData
 from core.workflow.nodes.enums import NodeType
@@ -19,6 +22,11 @@ from .exc import (
     OutputValidationError,
 )
 
+if TYPE_CHECKING:
+    from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
+
+logger = logging.getLogger(__name__)
+
 
 class CodeNode(BaseNode[CodeNodeData]):
     _node_data_cls = CodeNodeData
@@ -46,21 +54,20 @@ class CodeNode(BaseNode[CodeNodeData]):
         code = self.node_data.code
 
         # Get variables
-        variables = {}
-        for variable_selector in self.node_data.variables:
-            variable_name = variable_selector.variable
-            variable = self.graph_runtime_state.variable_pool.get(variable_selector.value_selector)
-            if isinstance(variable, ArrayFileSegment):
-                variables[variable_name] = [v.to_dict() for v in variable.value] if variable.value else None
-            else:
-                variables[variable_name] = variable.to_object() if variable else None
+        variables = self.fetch_variables(self.node_data, self.graph_runtime_state.variable_pool)
         # Run code
         try:
-            result = CodeExecutor.execute_workflow_code_template(
-                language=code_language,
-                code=code,
-                inputs=variables,
-            )
+            prefetched_result = self._take_prefetched_result(variables)
+            if isinstance(prefetched_result, Exception):
+                raise prefetched_result
+            if prefetched_result is not None:
+                result = prefetched_result
+            else:
+                result = CodeExecutor.execute_workflow_code_template(
+                    language=code_language,
+                    code=code,
+                    inputs=variables,
+                )
 
             # Transform result
             result = self._transform_result(result=result, output_schema=self.node_data.outputs)
@@ -71,6 +78,77 @@ class CodeNode(BaseNode[CodeNodeData]):
 
         return NodeRunResult(status=WorkflowNodeExecutionStatus.SUCCEEDED, inputs=variables, outputs=result)
 
+    @staticmethod
+    def fetch_variables(node_data: CodeNodeData, variable_pool: VariablePool) -> dict[str, Any]:
+        """
+        Get the inputs of the code from the variable pool
+        :param node_data: node data
+        :param variable_pool: variable pool
+        :return: inputs by variable name
+        """
+        variables = {}
+        for variable_selector in node_data.variables:
+            variable_name = variable_selector.variable
+            variable = variable_pool.get(variable_selector.value_selector)
+            if isinstance(variable, ArrayFileSegment):
+                variables[variable_name] = [v.to_dict() for v in variable.value] if variable.value else None
+            else:
+                variables[variable_name] = variable.to_object() if variable else None
+        return variables
+
+    @classmethod
+    def prefetch_results(
+        cls,
+        *,
+        node_id: str,
+        node_data: CodeNodeData,
+        inputs_list: Sequence[Mapping[str, Any]],
+        graph_runtime_state: "GraphRuntimeState",
+    ) -> None:
+        """
+        Execute the code for the inputs of upcoming runs of a node, CODE_EXECUTION_BATCH_SIZE inputs per
+        sandbox request. The results are kept in the graph runtime state and taken by the runs with the same
+        inputs. Runs whose batch failed as a whole execute their code on their own.
+        :param node_id: node id
+        :param node_data: node data
+        :param inputs_list: inputs of the upcoming runs
+        :param graph_runtime_state: graph runtime state the node runs with
+        """
+        if not CodeExecutor.supports_batch(node_data.code_language):
+            return
+
+        batch_size = dify_config.CODE_EXECUTION_BATCH_SIZE
+        prefetched = graph_runtime_state.prefetched_code_results.setdefault(node_id, {})
+        for start in range(0, len(inputs_list), batch_size):
+            batch = inputs_list[start : start + batch_size]
+            try:
+                results = CodeExecutor.execute_workflow_code_template_batch(
+                    language=node_data.code_language,
+                    code=node_data.code,
+                    inputs_list=batch,
+                )
+            except CodeExecutionError:
+                logger.warning(f"Failed to execute code node {node_id} in a batch", exc_info=True)
+                continue
+            for inputs, result in zip(batch, results):
+                prefetched.setdefault(cls._inputs_key(inputs), []).append(result)
+
+    def _take_prefetched_result(self, variables: Mapping[str, Any]) -> Mapping[str, Any] | Exception | None:
+        prefetched = self.graph_runtime_state.prefetched_code_results.get(self.node_id)
+        if not prefetched:
+            return None
+        results = prefetched.get(self._inputs_key(variables))
+        try:
+            # runs with equal inputs take one result each, the code may not be deterministic
+            return results.pop(0) if results else None
+        except IndexError:
+            # taken by a parallel run in the meantime
+            return None
+
+    @staticmethod
+    def _inputs_key(inputs: Mapping[str, Any]) -> str:
+        return json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+
     def _check_string(self, value: str | None, variable: str) -> str | None:
         """
         Check string
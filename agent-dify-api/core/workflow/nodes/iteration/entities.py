@@ -23,6 +23,7 @@ class IterationNodeData(BaseIterationNodeData):
     is_parallel: bool = False  # open the parallel mode or not
     parallel_nums: int = 10  # the numbers of parallel
     error_handle_mode: ErrorHandleMode = ErrorHandleMode.TERMINATED  # how to handle the error
+    stream_output: bool = False  # stream the output of each item to answer and end nodes as it completes
 
 
 class IterationStartNodeData(BaseNodeData):
@@ -1,15 +1,18 @@
 import contextvars
+import itertools
 import logging
+import threading
 import uuid
-from collections.abc import Generator, Mapping, Sequence
+from collections.abc import Generator, Iterator, Mapping, Sequence
 from concurrent.futures import Future, wait
 from datetime import UTC, datetime
-from queue import Empty, Queue
+from queue import Empty, Full, Queue
 from typing import TYPE_CHECKING, Any, Optional, cast
 
 from flask import Flask, current_app
 
 from configs import dify_config
+from core.helper.code_executor.code_executor import CodeExecutor
 from core.variables import ArrayVariable, IntegerVariable, NoneVariable
 from core.workflow.entities.node_entities import (
     NodeRunMetadataKey,
@@ -33,9 +36,12 @@ from core.workflow.graph_engine.entities.event import (
     NodeRunSucceededEvent,
 )
 from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.graph_cache import GraphCache
 from core.workflow.nodes.base import BaseNode
+from core.workflow.nodes.code import CodeNode
+from core.workflow.nodes.code.entities import CodeNodeData
 from core.workflow.nodes.enums import NodeType
-from core.workflow.nodes.event import NodeEvent, RunCompletedEvent
+from core.workflow.nodes.event import NodeEvent, RunCompletedEvent, RunStreamChunkEvent
 from core.workflow.nodes.iteration.entities import ErrorHandleMode, IterationNodeData
 from models.workflow import WorkflowNodeExecutionStatus
 
@@ -49,6 +55,7 @@ from .exc import (
 )
 
 if TYPE_CHECKING:
+    from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
     from core.workflow.graph_engine.graph_engine import GraphEngine
 logger = logging.getLogger(__name__)
 
@@ -108,7 +115,12 @@ class IterationNode(BaseNode[IterationNodeData]):
         root_node_id = self.node_data.start_node_id
 
         # init graph
-        iteration_graph = Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+        iteration_graph = GraphCache.get(
+            workflow_id=self.workflow_id,
+            graph_config=graph_config,
+            root_node_id=root_node_id,
+            config_hash=self.graph.config_hash,
+        )
 
         if not iteration_graph:
             raise IterationGraphNotFoundError("iteration graph not found")
@@ -152,6 +164,12 @@ class IterationNode(BaseNode[IterationNodeData]):
             predecessor_node_id=self.previous_node_id,
         )
 
+        code_result_prefetcher = self._get_code_result_prefetcher(
+            iteration_graph=iteration_graph,
+            iterator_list_value=iterator_list_value,
+            graph_engine=graph_engine,
+        )
+
         yield IterationRunNextEvent(
             iteration_id=self.id,
             iteration_node_id=self.node_id,
@@ -163,59 +181,82 @@ class IterationNode(BaseNode[IterationNodeData]):
         )
         iter_run_map: dict[str, float] = {}
         outputs: list[Any] = [None] * len(iterator_list_value)
+        output_stream = (
+            _IterationOutputStream(
+                node_id=self.node_id,
+                outputs=outputs,
+                skip_none=self.node_data.error_handle_mode == ErrorHandleMode.REMOVE_ABNORMAL_OUTPUT,
+            )
+            if self.node_data.stream_output
+            else None
+        )
         try:
             if self.node_data.is_parallel:
-                futures: list[Future] = []
-                q: Queue = Queue()
+                q: Queue = Queue(maxsize=dify_config.WORKFLOW_ITERATION_EVENT_QUEUE_SIZE)
+                stopped = threading.Event()
+                # workers take the items one after another, at most parallel_nums items are in flight.
+                # When the code results are prefetched, each worker takes a whole chunk of items and
+                # prefetches it in one request, so parallel_nums chunks are prefetched at the same time
+                chunk_indexes = itertools.count()
+                worker_count = min(self.node_data.parallel_nums, len(iterator_list_value), dify_config.MAX_SUBMIT_COUNT)
                 thread_pool = GraphEngineThreadPool(
-                    max_workers=self.node_data.parallel_nums, max_submit_count=dify_config.MAX_SUBMIT_COUNT
+                    max_workers=worker_count, max_submit_count=dify_config.MAX_SUBMIT_COUNT
                 )
-                for index, item in enumerate(iterator_list_value):
+                futures: list[Future] = []
+                for _ in range(worker_count):
                     future: Future = thread_pool.submit(
                         self._run_single_iter_parallel,
                         flask_app=current_app._get_current_object(),  # type: ignore
                         q=q,
+                        stopped=stopped,
                         context=contextvars.copy_context(),
+                        chunk_indexes=chunk_indexes,
+                        code_result_prefetcher=code_result_prefetcher,
                         iterator_list_value=iterator_list_value,
                         inputs=inputs,
                         outputs=outputs,
                         start_at=start_at,
                         graph_engine=graph_engine,
                         iteration_graph=iteration_graph,
-                        index=index,
-                        item=item,
                         iter_run_map=iter_run_map,
                     )
                     future.add_done_callback(thread_pool.task_done_callback)
                     futures.append(future)
-                succeeded_count = 0
-                while True:
-                    try:
-                        event = q.get(timeout=1)
-                        if event is None:
-                            break
+                try:
+                    completed_count = 0
+                    draining = False
+                    while completed_count < len(iterator_list_value):
+                        try:
+                            event = q.get_nowait() if draining else q.get(timeout=1)
+                        except Empty:
+                            if draining or all(f.done() for f in futures):
+                                break
+                            continue
                         if isinstance(event, IterationRunNextEvent):
-                            succeeded_count += 1
-                            if succeeded_count == len(futures):
-                                q.put(None)
+                            completed_count += 1
                         yield event
+                        if output_stream and isinstance(event, IterationRunNextEvent):
+                            yield from output_stream.complete(event.index - 1)
                         if isinstance(event, RunCompletedEvent):
-                            q.put(None)
-                            for f in futures:
-                                if not f.done():
-                                    f.cancel()
                             yield event
+                            break
                         if isinstance(event, IterationRunFailedEvent):
-                            q.put(None)
+                            # take no more items, only pass on the events already queued
+                            stopped.set()
+                            draining = True
                             yield event
-                    except Empty:
-                        continue
+                finally:
+                    # release workers waiting on a full queue nobody consumes anymore
+                    stopped.set()
 
                 # wait all threads
                 wait(futures)
             else:
-                for _ in range(len(iterator_list_value)):
-                    yield from self._run_single_iter(
+                for index in range(len(iterator_list_value)):
+                    # prefetch lazily, chunk by chunk, so no code runs for items after a stop
+                    if code_result_prefetcher and index % code_result_prefetcher.chunk_size == 0:
+                        code_result_prefetcher.prefetch(index)
+                    for event in self._run_single_iter(
                         iterator_list_value=iterator_list_value,
                         variable_pool=variable_pool,
                         inputs=inputs,
@@ -224,7 +265,10 @@ class IterationNode(BaseNode[IterationNodeData]):
                         graph_engine=graph_engine,
                         iteration_graph=iteration_graph,
                         iter_run_map=iter_run_map,
-                    )
+                    ):
+                        yield event
+                        if output_stream and isinstance(event, IterationRunNextEvent):
+                            yield from output_stream.complete(event.index - 1)
             if self.node_data.error_handle_mode == ErrorHandleMode.REMOVE_ABNORMAL_OUTPUT:
                 outputs = [output for output in outputs if output is not None]
 
@@ -344,6 +388,52 @@ class IterationNode(BaseNode[IterationNodeData]):
 
         return variable_mapping
 
+    def _get_code_result_prefetcher(
+        self,
+        *,
+        iteration_graph: Graph,
+        iterator_list_value: Sequence[Any],
+        graph_engine: "GraphEngine",
+    ) -> Optional["_CodeResultPrefetcher"]:
+        """
+        Get a prefetcher executing the code of a chunk of items in one request when the iteration only contains
+        a code node, instead of one code execution request per item.
+
+        Not done when the iteration terminates on the first error, the code of the items after it must not run.
+        """
+        if dify_config.CODE_EXECUTION_BATCH_SIZE <= 1 or len(iterator_list_value) <= 1:
+            return None
+        if self.node_data.error_handle_mode == ErrorHandleMode.TERMINATED:
+            return None
+
+        node_configs = [
+            node_config
+            for node_id, node_config in iteration_graph.node_id_config_mapping.items()
+            if node_id != iteration_graph.root_node_id
+        ]
+        if len(node_configs) != 1 or node_configs[0].get("data", {}).get("type") != NodeType.CODE.value:
+            return None
+
+        code_node_data = CodeNodeData.model_validate(node_configs[0]["data"])
+        if not CodeExecutor.supports_batch(code_node_data.code_language):
+            return None
+
+        variable_pool = graph_engine.graph_runtime_state.variable_pool
+        inputs_list = []
+        for index, item in enumerate(iterator_list_value):
+            variable_pool.add([self.node_id, "index"], index)
+            variable_pool.add([self.node_id, "item"], item)
+            inputs_list.append(CodeNode.fetch_variables(code_node_data, variable_pool))
+        variable_pool.add([self.node_id, "index"], 0)
+        variable_pool.add([self.node_id, "item"], iterator_list_value[0])
+
+        return _CodeResultPrefetcher(
+            code_node_id=node_configs[0]["id"],
+            code_node_data=code_node_data,
+            inputs_list=inputs_list,
+            graph_runtime_state=graph_engine.graph_runtime_state,
+        )
+
     def _handle_event_metadata(
         self,
         *,
@@ -572,37 +662,126 @@ class IterationNode(BaseNode[IterationNodeData]):
         flask_app: Flask,
         context: contextvars.Context,
         q: Queue,
+        stopped: threading.Event,
+        chunk_indexes: Iterator[int],
+        code_result_prefetcher: Optional["_CodeResultPrefetcher"],
         iterator_list_value: Sequence[str],
         inputs: Mapping[str, list],
         outputs: list,
         start_at: datetime,
         graph_engine: "GraphEngine",
         iteration_graph: Graph,
-        index: int,
-        item: Any,
         iter_run_map: dict[str, float],
     ):
         """
-        run single iteration in parallel mode
+        run iterations in parallel mode, taking the next chunk of items until all items are taken or the iteration
+        stopped. Chunks are single items unless the code results are prefetched.
         """
         for var, val in context.items():
             var.set(val)
+        chunk_size = code_result_prefetcher.chunk_size if code_result_prefetcher else 1
         with flask_app.app_context():
-            parallel_mode_run_id = uuid.uuid4().hex
-            graph_engine_copy = graph_engine.create_copy()
-            variable_pool_copy = graph_engine_copy.graph_runtime_state.variable_pool
-            variable_pool_copy.add([self.node_id, "index"], index)
-            variable_pool_copy.add([self.node_id, "item"], item)
-            for event in self._run_single_iter(
-                iterator_list_value=iterator_list_value,
-                variable_pool=variable_pool_copy,
-                inputs=inputs,
-                outputs=outputs,
-                start_at=start_at,
-                graph_engine=graph_engine_copy,
-                iteration_graph=iteration_graph,
-                iter_run_map=iter_run_map,
-                parallel_mode_run_id=parallel_mode_run_id,
-            ):
-                q.put(event)
-            graph_engine.graph_runtime_state.total_tokens += graph_engine_copy.graph_runtime_state.total_tokens
+            while not stopped.is_set():
+                # next() of itertools.count is atomic, every chunk is taken by one worker
+                chunk_start = next(chunk_indexes) * chunk_size
+                if chunk_start >= len(iterator_list_value):
+                    return
+                if code_result_prefetcher:
+                    code_result_prefetcher.prefetch(chunk_start)
+                for index in range(chunk_start, min(chunk_start + chunk_size, len(iterator_list_value))):
+                    if stopped.is_set():
+                        return
+                    parallel_mode_run_id = uuid.uuid4().hex
+                    graph_engine_copy = graph_engine.create_copy()
+                    variable_pool_copy = graph_engine_copy.graph_runtime_state.variable_pool
+                    variable_pool_copy.add([self.node_id, "index"], index)
+                    variable_pool_copy.add([self.node_id, "item"], iterator_list_value[index])
+                    for event in self._run_single_iter(
+                        iterator_list_value=iterator_list_value,
+                        variable_pool=variable_pool_copy,
+                        inputs=inputs,
+                        outputs=outputs,
+                        start_at=start_at,
+                        graph_engine=graph_engine_copy,
+                        iteration_graph=iteration_graph,
+                        iter_run_map=iter_run_map,
+                        parallel_mode_run_id=parallel_mode_run_id,
+                    ):
+                        self._put_parallel_event(q=q, stopped=stopped, event=event)
+                    graph_engine.graph_runtime_state.total_tokens += graph_engine_copy.graph_runtime_state.total_tokens
+
+    @staticmethod
+    def _put_parallel_event(*, q: Queue, stopped: threading.Event, event: Any) -> None:
+        """
+        put an event of a parallel item, waiting while the queue is full unless the iteration stopped
+        """
+        while not stopped.is_set():
+            try:
+                q.put(event, timeout=1)
+                return
+            except Full:
+                continue
+
+
+class _CodeResultPrefetcher:
+    """
+    Executes the code node of an iteration that only contains that node for a chunk of CODE_EXECUTION_BATCH_SIZE
+    items in one code execution request, right before the items of the chunk run. The results are taken by the
+    code node runs with the same inputs.
+    """
+
+    def __init__(
+        self,
+        *,
+        code_node_id: str,
+        code_node_data: CodeNodeData,
+        inputs_list: Sequence[Mapping[str, Any]],
+        graph_runtime_state: "GraphRuntimeState",
+    ) -> None:
+        self._code_node_id = code_node_id
+        self._code_node_data = code_node_data
+        self._inputs_list = inputs_list
+        self._graph_runtime_state = graph_runtime_state
+        self.chunk_size = dify_config.CODE_EXECUTION_BATCH_SIZE
+
+    def prefetch(self, start: int) -> None:
+        """
+        Execute the code of the chunk of items starting at the index
+        """
+        CodeNode.prefetch_results(
+            node_id=self._code_node_id,
+            node_data=self._code_node_data,
+            inputs_list=self._inputs_list[start : start + self.chunk_size],
+            graph_runtime_state=self._graph_runtime_state,
+        )
+
+
+class _IterationOutputStream:
+    """
+    Streams the output of each item in item order as soon as the items before it completed, so answer and end
+    nodes referencing the iteration output show it incrementally. The chunks are the lines of the markdown of
+    the final output, item outputs that are lists stream one line per element like the flattened output.
+    """
+
+    def __init__(self, *, node_id: str, outputs: list[Any], skip_none: bool) -> None:
+        self._node_id = node_id
+        self._outputs = outputs
+        self._skip_none = skip_none
+        self._completed = [False] * len(outputs)
+        self._position = 0
+        self._started = False
+
+    def complete(self, index: int) -> Generator[RunStreamChunkEvent, None, None]:
+        if 0 <= index < len(self._completed):
+            self._completed[index] = True
+        while self._position < len(self._outputs) and self._completed[self._position]:
+            output = self._outputs[self._position]
+            self._position += 1
+            if output is None and self._skip_none:
+                continue
+            for item in output if isinstance(output, list) else [output]:
+                yield RunStreamChunkEvent(
+                    chunk_content=f"\n{item}" if self._started else str(item),
+                    from_variable_selector=[self._node_id, "output"],
+                )
+                self._started = True
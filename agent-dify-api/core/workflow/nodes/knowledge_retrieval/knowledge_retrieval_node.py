@@ -112,10 +112,21 @@ class KnowledgeRetrievalNode(LLMNode):
 
         # retrieve knowledge
         try:
-            results = self._fetch_dataset_retriever(node_data=node_data, query=query)
+            dataset_retrieval = DatasetRetrieval()
+            results = self._fetch_dataset_retriever(
+                node_data=node_data, query=query, dataset_retrieval=dataset_retrieval
+            )
             outputs = {"result": results}
+            # partial is set when a search branch missed its deadline and its documents are missing from the result
+            process_data = {
+                "partial": dataset_retrieval.partial_retrieval,
+                "retrieval_branches": [branch.model_dump() for branch in dataset_retrieval.retrieval_branches],
+            }
             return NodeRunResult(
-                status=WorkflowNodeExecutionStatus.SUCCEEDED, inputs=variables, process_data=None, outputs=outputs
+                status=WorkflowNodeExecutionStatus.SUCCEEDED,
+                inputs=variables,
+                process_data=process_data,
+                outputs=outputs,
             )
 
         except KnowledgeRetrievalNodeError as e:
@@ -135,7 +146,9 @@ class KnowledgeRetrievalNode(LLMNode):
                 error_type=type(e).__name__,
             )
 
-    def _fetch_dataset_retriever(self, node_data: KnowledgeRetrievalNodeData, query: str) -> list[dict[str, Any]]:
+    def _fetch_dataset_retriever(
+        self, node_data: KnowledgeRetrievalNodeData, query: str, dataset_retrieval: DatasetRetrieval
+    ) -> list[dict[str, Any]]:
         available_datasets = []
         dataset_ids = node_data.dataset_ids
 
@@ -170,7 +183,6 @@ class KnowledgeRetrievalNode(LLMNode):
             [dataset.id for dataset in available_datasets], query, node_data
         )
         all_documents = []
-        dataset_retrieval = DatasetRetrieval()
         if node_data.retrieval_mode == DatasetRetrieveConfigEntity.RetrieveStrategy.SINGLE.value:
             # fetch model config
             model_instance, model_config = self._fetch_model_config(node_data.single_retrieval_config.model)  # type: ignore
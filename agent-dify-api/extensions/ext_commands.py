@@ -12,10 +12,12 @@ def init_app(app: DifyApp):
         fix_app_site_missing,
         install_plugins,
         migrate_data_for_plugin,
+        migrate_keyword_postings,
         old_metadata_migration,
         reset_email,
         reset_encrypt_key_pair,
         reset_password,
+        retrieval_cache_stats,
         upgrade_db,
         vdb_migrate,
     )
@@ -36,6 +38,8 @@ def init_app(app: DifyApp):
         install_plugins,
         old_metadata_migration,
         clear_free_plan_tenant_expired_logs,
+        migrate_keyword_postings,
+        retrieval_cache_stats,
     ]
     for cmd in cmds_to_register:
         app.cli.add_command(cmd)
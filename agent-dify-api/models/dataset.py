@@ -11,6 +11,7 @@ import time
 from json import JSONDecodeError
 from typing import Any, cast
 
+import numpy as np
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped
@@ -906,6 +907,21 @@ class DatasetKeywordTable(db.Model):  # type: ignore[name-defined]
                 return None
 
 
+class DatasetKeywordPosting(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "dataset_keyword_postings"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="dataset_keyword_posting_pkey"),
+        db.UniqueConstraint("dataset_id", "keyword", "index_node_id", name="dataset_keyword_posting_unique_idx"),
+        db.Index("dataset_keyword_posting_node_idx", "dataset_id", "index_node_id"),
+    )
+
+    id = db.Column(StringUUID, primary_key=True, server_default=db.text("uuid_generate_v4()"))
+    dataset_id = db.Column(StringUUID, nullable=False)
+    keyword = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
 class Embedding(db.Model):  # type: ignore[name-defined]
     __tablename__ = "embeddings"
     __table_args__ = (
@@ -923,11 +939,25 @@ class Embedding(db.Model):  # type: ignore[name-defined]
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
     provider_name = db.Column(db.String(255), nullable=False, server_default=db.text("''::character varying"))
 
+    # marks vectors stored as raw little-endian float32, rows without it are legacy pickles
+    FLOAT32_PREFIX = b"\x00f32"
+
+    @classmethod
+    def encode_embedding(cls, embedding_data: "list[float] | np.ndarray") -> bytes:
+        return cls.FLOAT32_PREFIX + np.asarray(embedding_data, dtype="<f4").tobytes()
+
+    @classmethod
+    def decode_embedding(cls, data: bytes) -> np.ndarray:
+        """Decode a stored vector, without copying when it is in the float32 format."""
+        if data[: len(cls.FLOAT32_PREFIX)] == cls.FLOAT32_PREFIX:
+            return np.frombuffer(data, dtype="<f4", offset=len(cls.FLOAT32_PREFIX))
+        return np.asarray(pickle.loads(data), dtype="<f4")  # noqa: S301
+
     def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+        self.embedding = self.encode_embedding(embedding_data)
 
     def get_embedding(self) -> list[float]:
-        return cast(list[float], pickle.loads(self.embedding))  # noqa: S301
+        return cast(list[float], self.decode_embedding(self.embedding).tolist())
 
 
 class DatasetCollectionBinding(db.Model):  # type: ignore[name-defined]
@@ -0,0 +1,64 @@
+import functools
+import json
+from collections.abc import Callable
+from typing import Any, Optional, TypeVar
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+T = TypeVar("T")
+
+
+def json_loads(value: str | bytes) -> Any:
+    """
+    Parse JSON text with orjson when it is installed, falling back to the standard library for what orjson
+    rejects but `json.loads` accepts, like `NaN` or integers wider than 64 bits.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(value)
+
+
+def cached_json_property(
+    column: str, vary_on: Optional[Callable[[], Any]] = None
+) -> Callable[[Callable[[Any], T]], property]:
+    """
+    Property whose value is computed from the JSON text of a column once per instance.
+
+    The value is kept in the instance `__dict__` together with the column value it was computed from, and is
+    computed again once that is not the same object anymore, as after the column is set or the instance is
+    expired or refreshed. The column value is read after the getter ran, so getters that rewrite their column
+    are cached as well. `vary_on` adds the result of a callable to what the value depends on, for getters that
+    read e.g. a context variable.
+
+    The cached value is shared by all callers: copy it before modifying it, unless the modified value is
+    written back to its column right after.
+
+    :param column: attribute name of the column the value is computed from
+    :param vary_on: optional callable whose result the value depends on as well
+    """
+
+    def decorator(func: Callable[[Any], T]) -> property:
+        cache_attribute = f"_cached_{func.__name__}"
+
+        @functools.wraps(func)
+        def getter(self) -> T:
+            # loaded column values live in the instance `__dict__`, reading them there skips the descriptor
+            state = self.__dict__
+            varies_by = vary_on() if vary_on else None
+            cached = state.get(cache_attribute)
+            if cached is not None and cached[0] is state.get(column) and cached[1] == varies_by:
+                return cached[2]
+
+            value = func(self)
+            state[cache_attribute] = (getattr(self, column), varies_by, value)
+            return value
+
+        return property(getter)
+
+    return decorator
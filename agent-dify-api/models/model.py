@@ -29,6 +29,7 @@ from core.file.tool_file_parser import ToolFileParser
 from libs.helper import generate_string
 from models.base import Base
 from models.enums import CreatedByRole
+from models.json_property import cached_json_property, json_loads
 from models.workflow import WorkflowRunStatus
 
 from .account import Account, Tenant
@@ -335,33 +336,33 @@ class AppModelConfig(Base):
         app = db.session.query(App).filter(App.id == self.app_id).first()
         return app
 
-    @property
+    @cached_json_property("model")
     def model_dict(self) -> dict:
-        return json.loads(self.model) if self.model else {}
+        return json_loads(self.model) if self.model else {}
 
-    @property
+    @cached_json_property("suggested_questions")
     def suggested_questions_list(self) -> list:
-        return json.loads(self.suggested_questions) if self.suggested_questions else []
+        return json_loads(self.suggested_questions) if self.suggested_questions else []
 
-    @property
+    @cached_json_property("suggested_questions_after_answer")
     def suggested_questions_after_answer_dict(self) -> dict:
         return (
-            json.loads(self.suggested_questions_after_answer)
+            json_loads(self.suggested_questions_after_answer)
             if self.suggested_questions_after_answer
             else {"enabled": False}
         )
 
-    @property
+    @cached_json_property("speech_to_text")
     def speech_to_text_dict(self) -> dict:
-        return json.loads(self.speech_to_text) if self.speech_to_text else {"enabled": False}
+        return json_loads(self.speech_to_text) if self.speech_to_text else {"enabled": False}
 
-    @property
+    @cached_json_property("text_to_speech")
     def text_to_speech_dict(self) -> dict:
-        return json.loads(self.text_to_speech) if self.text_to_speech else {"enabled": False}
+        return json_loads(self.text_to_speech) if self.text_to_speech else {"enabled": False}
 
-    @property
+    @cached_json_property("retriever_resource")
     def retriever_resource_dict(self) -> dict:
-        return json.loads(self.retriever_resource) if self.retriever_resource else {"enabled": True}
+        return json_loads(self.retriever_resource) if self.retriever_resource else {"enabled": True}
 
     @property
     def annotation_reply_dict(self) -> dict:
@@ -386,46 +387,46 @@ class AppModelConfig(Base):
         else:
             return {"enabled": False}
 
-    @property
+    @cached_json_property("more_like_this")
     def more_like_this_dict(self) -> dict:
-        return json.loads(self.more_like_this) if self.more_like_this else {"enabled": False}
+        return json_loads(self.more_like_this) if self.more_like_this else {"enabled": False}
 
-    @property
+    @cached_json_property("sensitive_word_avoidance")
     def sensitive_word_avoidance_dict(self) -> dict:
         return (
-            json.loads(self.sensitive_word_avoidance)
+            json_loads(self.sensitive_word_avoidance)
             if self.sensitive_word_avoidance
             else {"enabled": False, "type": "", "configs": []}
         )
 
-    @property
+    @cached_json_property("external_data_tools")
     def external_data_tools_list(self) -> list[dict]:
-        return json.loads(self.external_data_tools) if self.external_data_tools else []
+        return json_loads(self.external_data_tools) if self.external_data_tools else []
 
-    @property
+    @cached_json_property("user_input_form")
     def user_input_form_list(self):
-        return json.loads(self.user_input_form) if self.user_input_form else []
+        return json_loads(self.user_input_form) if self.user_input_form else []
 
-    @property
+    @cached_json_property("agent_mode")
     def agent_mode_dict(self) -> dict:
         return (
-            json.loads(self.agent_mode)
+            json_loads(self.agent_mode)
             if self.agent_mode
             else {"enabled": False, "strategy": None, "tools": [], "prompt": None}
         )
 
-    @property
+    @cached_json_property("chat_prompt_config")
     def chat_prompt_config_dict(self) -> dict:
-        return json.loads(self.chat_prompt_config) if self.chat_prompt_config else {}
+        return json_loads(self.chat_prompt_config) if self.chat_prompt_config else {}
 
-    @property
+    @cached_json_property("completion_prompt_config")
     def completion_prompt_config_dict(self) -> dict:
-        return json.loads(self.completion_prompt_config) if self.completion_prompt_config else {}
+        return json_loads(self.completion_prompt_config) if self.completion_prompt_config else {}
 
-    @property
+    @cached_json_property("dataset_configs")
     def dataset_configs_dict(self) -> dict:
         if self.dataset_configs:
-            dataset_configs: dict = json.loads(self.dataset_configs)
+            dataset_configs: dict = json_loads(self.dataset_configs)
             if "retrieval_model" not in dataset_configs:
                 return {"retrieval_model": "single"}
             else:
@@ -434,10 +435,10 @@ class AppModelConfig(Base):
             "retrieval_model": "multiple",
         }
 
-    @property
+    @cached_json_property("file_upload")
     def file_upload_dict(self) -> dict:
         return (
-            json.loads(self.file_upload)
+            json_loads(self.file_upload)
             if self.file_upload
             else {
                 "image": {
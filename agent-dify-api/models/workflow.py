@@ -18,10 +18,12 @@ import contexts
 from constants import HIDDEN_VALUE
 from core.helper import encrypter
 from core.variables import SecretVariable, Variable
+from extensions.ext_storage import storage
 from factories import variable_factory
 from libs import helper
 from models.base import Base
 from models.enums import CreatedByRole
+from models.json_property import cached_json_property, json_loads
 
 from .account import Account
 from .engine import db
@@ -171,9 +173,9 @@ class Workflow(Base):
     def updated_by_account(self):
         return db.session.get(Account, self.updated_by) if self.updated_by else None
 
-    @property
+    @cached_json_property("graph")
     def graph_dict(self) -> Mapping[str, Any]:
-        return json.loads(self.graph) if self.graph else {}
+        return json_loads(self.graph) if self.graph else {}
 
     @property
     def features(self) -> str:
@@ -183,7 +185,7 @@ class Workflow(Base):
         if not self._features:
             return self._features
 
-        features = json.loads(self._features)
+        features = json_loads(self._features)
         if features.get("file_upload", {}).get("image", {}).get("enabled", False):
             image_enabled = True
             image_number_limits = int(features["file_upload"]["image"].get("number_limits", 1))
@@ -203,9 +205,9 @@ class Workflow(Base):
     def features(self, value: str) -> None:
         self._features = value
 
-    @property
+    @cached_json_property("_features")
     def features_dict(self) -> dict[str, Any]:
-        return json.loads(self.features) if self.features else {}
+        return json_loads(self.features) if self.features else {}
 
     def user_input_form(self, to_old_structure: bool = False) -> list:
         # get start node from graph
@@ -254,7 +256,7 @@ class Workflow(Base):
             > 0
         )
 
-    @property
+    @cached_json_property("_environment_variables", vary_on=contexts.tenant_id.get)
     def environment_variables(self) -> Sequence[Variable]:
         # TODO: find some way to init `self._environment_variables` when instance created.
         if self._environment_variables is None:
@@ -262,7 +264,7 @@ class Workflow(Base):
 
         tenant_id = contexts.tenant_id.get()
 
-        environment_variables_dict: dict[str, Any] = json.loads(self._environment_variables)
+        environment_variables_dict: dict[str, Any] = json_loads(self._environment_variables)
         results = [
             variable_factory.build_environment_variable_from_mapping(v) for v in environment_variables_dict.values()
         ]
@@ -325,13 +327,13 @@ class Workflow(Base):
         }
         return result
 
-    @property
+    @cached_json_property("_conversation_variables")
     def conversation_variables(self) -> Sequence[Variable]:
         # TODO: find some way to init `self._conversation_variables` when instance created.
         if self._conversation_variables is None:
             self._conversation_variables = "{}"
 
-        variables_dict: dict[str, Any] = json.loads(self._conversation_variables)
+        variables_dict: dict[str, Any] = json_loads(self._conversation_variables)
         results = [variable_factory.build_conversation_variable_from_mapping(v) for v in variables_dict.values()]
         return results
 
@@ -434,17 +436,17 @@ class WorkflowRun(Base):
         created_by_role = CreatedByRole(self.created_by_role)
         return db.session.get(EndUser, self.created_by) if created_by_role == CreatedByRole.END_USER else None
 
-    @property
+    @cached_json_property("graph")
     def graph_dict(self):
-        return json.loads(self.graph) if self.graph else {}
+        return json_loads(self.graph) if self.graph else {}
 
-    @property
+    @cached_json_property("inputs")
     def inputs_dict(self) -> Mapping[str, Any]:
-        return json.loads(self.inputs) if self.inputs else {}
+        return json_loads(self.inputs) if self.inputs else {}
 
-    @property
+    @cached_json_property("outputs")
     def outputs_dict(self) -> Mapping[str, Any]:
-        return json.loads(self.outputs) if self.outputs else {}
+        return json_loads(self.outputs) if self.outputs else {}
 
     @property
     def message(self):
@@ -665,17 +667,32 @@ class WorkflowNodeExecution(Base):
         created_by_role = CreatedByRole(self.created_by_role)
         return db.session.get(EndUser, self.created_by) if created_by_role == CreatedByRole.END_USER else None
 
+    @staticmethod
+    def offloaded_payload(storage_key: str) -> str:
+        """Column value referring to a payload saved to storage."""
+        return json.dumps({"__storage_key__": storage_key})
+
+    @staticmethod
+    def load_payload(value: Optional[str]) -> Any:
+        """Decode the inputs, process data or outputs column, loading payloads offloaded to storage."""
+        if not value:
+            return None
+        payload = json.loads(value)
+        if isinstance(payload, dict) and payload.keys() == {"__storage_key__"}:
+            payload = json.loads(storage.load_once(payload["__storage_key__"]))
+        return payload
+
     @property
     def inputs_dict(self):
-        return json.loads(self.inputs) if self.inputs else None
+        return self.load_payload(self.inputs)
 
     @property
     def outputs_dict(self):
-        return json.loads(self.outputs) if self.outputs else None
+        return self.load_payload(self.outputs)
 
     @property
     def process_data_dict(self):
-        return json.loads(self.process_data) if self.process_data else None
+        return self.load_payload(self.process_data)
 
     @property
     def execution_metadata_dict(self):
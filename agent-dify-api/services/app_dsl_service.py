@@ -1,4 +1,5 @@
 import base64
+import copy
 import hashlib
 import logging
 import uuid
@@ -566,6 +567,8 @@ class AppDslService:
             raise ValueError("Missing draft workflow configuration, please check.")
 
         workflow_dict = workflow.to_dict(include_secret=include_secret)
+        # the graph is the cached value of `Workflow.graph_dict`, the dataset ids are encrypted in a copy of it
+        workflow_dict = {**workflow_dict, "graph": copy.deepcopy(workflow_dict["graph"])}
         for node in workflow_dict.get("graph", {}).get("nodes", []):
             if node.get("data", {}).get("type", "") == NodeType.KNOWLEDGE_RETRIEVAL.value:
                 dataset_ids = node["data"].get("dataset_ids", [])
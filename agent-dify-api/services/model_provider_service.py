@@ -2,6 +2,7 @@ import logging
 from typing import Optional
 
 from core.entities.model_entities import ModelStatus, ModelWithProviderEntity, ProviderModelWithStatusEntity
+from core.helper.model_provider_cache import TenantModelProviderCache
 from core.model_runtime.entities.model_entities import ModelType, ParameterRule
 from core.model_runtime.model_providers.model_provider_factory import ModelProviderFactory
 from core.provider_manager import ProviderManager
@@ -143,6 +144,7 @@ class ModelProviderService:
 
         # Add or update custom provider credentials.
         provider_configuration.add_or_update_custom_credentials(credentials)
+        TenantModelProviderCache.bump(tenant_id)
 
     def remove_provider_credentials(self, tenant_id: str, provider: str) -> None:
         """
@@ -162,6 +164,7 @@ class ModelProviderService:
 
         # Remove custom provider credentials.
         provider_configuration.delete_custom_credentials()
+        TenantModelProviderCache.bump(tenant_id)
 
     def get_model_credentials(self, tenant_id: str, provider: str, model_type: str, model: str) -> Optional[dict]:
         """
@@ -237,6 +240,7 @@ class ModelProviderService:
         provider_configuration.add_or_update_custom_model_credentials(
             model_type=ModelType.value_of(model_type), model=model, credentials=credentials
         )
+        TenantModelProviderCache.bump(tenant_id)
 
     def remove_model_credentials(self, tenant_id: str, provider: str, model_type: str, model: str) -> None:
         """
@@ -258,6 +262,7 @@ class ModelProviderService:
 
         # Remove custom model credentials
         provider_configuration.delete_custom_model_credentials(model_type=ModelType.value_of(model_type), model=model)
+        TenantModelProviderCache.bump(tenant_id)
 
     def get_models_by_model_type(self, tenant_id: str, model_type: str) -> list[ProviderWithModelsResponse]:
         """
@@ -437,6 +442,7 @@ class ModelProviderService:
 
         # Switch preferred provider type
         provider_configuration.switch_preferred_provider_type(preferred_provider_type_enum)
+        TenantModelProviderCache.bump(tenant_id)
 
     def enable_model(self, tenant_id: str, provider: str, model: str, model_type: str) -> None:
         """
@@ -458,6 +464,7 @@ class ModelProviderService:
 
         # Enable model
         provider_configuration.enable_model(model=model, model_type=ModelType.value_of(model_type))
+        TenantModelProviderCache.bump(tenant_id)
 
     def disable_model(self, tenant_id: str, provider: str, model: str, model_type: str) -> None:
         """
@@ -479,3 +486,4 @@ class ModelProviderService:
 
         # Enable model
         provider_configuration.disable_model(model=model, model_type=ModelType.value_of(model_type))
+        TenantModelProviderCache.bump(tenant_id)
@@ -0,0 +1,257 @@
+"""
+Overhead of the workflow graph engine, on synthetic graphs of mocked nodes so no model, tool, code sandbox or
+database is involved.
+
+Run from the api directory:
+
+    python -m tests.benchmarks.bench_graph_engine --graph all
+    python -m tests.benchmarks.bench_graph_engine --graph fan-out --size 50 --rounds 5
+
+Graphs, `--size` scales each of them:
+
+    chain       start -> size nodes -> end
+    fan-out     start -> size parallel branches -> join -> end
+    iteration   an iteration over size items, each running a chain of 3 nodes
+    parallel-iteration
+                the same iteration in parallel mode
+    loop        a loop of size rounds, each running a chain of 3 nodes
+    nested      an iteration over size items, each running a loop of 3 rounds of a chain of 3 nodes and
+                collecting its result in one more node
+
+For each round it prints events per second, the scheduling latency of the nodes (queue wait from the node
+being scheduled to its run starting), the run and event dispatch time per node and the peak traced memory.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable, Mapping
+from contextlib import ExitStack
+from typing import Any, Optional
+from unittest.mock import patch
+
+from flask import Flask
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow.callbacks import WorkflowProfileRecorder
+from core.workflow.entities.node_entities import NodeRunResult
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.graph_engine.entities.event import GraphRunSucceededEvent
+from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.graph_engine import GraphEngine
+from core.workflow.nodes.template_transform.template_transform_node import TemplateTransformNode
+from models.enums import UserFrom
+from models.workflow import WorkflowNodeExecutionStatus, WorkflowType
+
+BODY_LENGTH = 3
+
+
+def _node(node_id: str, node_type: str = "template-transform", **data: Any) -> dict[str, Any]:
+    return {"id": node_id, "data": {"type": node_type, "title": node_id, **data}}
+
+
+def _edge(source: str, target: str) -> dict[str, Any]:
+    return {"id": f"{source}-{target}", "source": source, "target": target}
+
+
+def _chain(prefix: str, length: int, **data: Any) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    node_ids = [f"{prefix}{i}" for i in range(length)]
+    nodes = [_node(node_id, template="{{ value }}", variables=[], **data) for node_id in node_ids]
+    edges = [_edge(source, target) for source, target in zip(node_ids, node_ids[1:])]
+    return nodes, edges
+
+
+def _graph(nodes: list[dict[str, Any]], edges: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "nodes": [_node("start", "start", variables=[]), *nodes, _node("end", "end", outputs=[])],
+        "edges": edges,
+    }
+
+
+def build_chain_graph(size: int) -> dict[str, Any]:
+    nodes, edges = _chain("node-", size)
+    return _graph(nodes, [_edge("start", "node-0"), *edges, _edge(f"node-{size - 1}", "end")])
+
+
+def build_fan_out_graph(size: int) -> dict[str, Any]:
+    nodes = [_node(f"branch-{i}", template="", variables=[]) for i in range(size)]
+    nodes.append(_node("join", template="", variables=[]))
+    edges = [edge for i in range(size) for edge in (_edge("start", f"branch-{i}"), _edge(f"branch-{i}", "join"))]
+    return _graph(nodes, [*edges, _edge("join", "end")])
+
+
+def _iteration_nodes(node_id: str, output_node_id: str, **data: Any) -> list[dict[str, Any]]:
+    return [
+        _node(
+            node_id,
+            "iteration",
+            iterator_selector=["bench", "items"],
+            output_selector=[output_node_id, "output"],
+            output_type="array[string]",
+            start_node_id=f"{node_id}-start",
+            **data,
+        ),
+        _node(f"{node_id}-start", "iteration-start", iteration_id=node_id),
+    ]
+
+
+def _loop_nodes(node_id: str, rounds: int, **data: Any) -> list[dict[str, Any]]:
+    return [
+        _node(
+            node_id,
+            "loop",
+            loop_count=rounds,
+            break_conditions=[],
+            logical_operator="and",
+            start_node_id=f"{node_id}-start",
+            **data,
+        ),
+        _node(f"{node_id}-start", "loop-start", loop_id=node_id),
+    ]
+
+
+def build_iteration_graph(size: int, is_parallel: bool = False) -> dict[str, Any]:
+    body, body_edges = _chain("body-", BODY_LENGTH, iteration_id="iteration")
+    nodes = [*_iteration_nodes("iteration", body[-1]["id"], is_parallel=is_parallel), *body]
+    edges = [_edge("start", "iteration"), _edge("iteration-start", "body-0"), *body_edges, _edge("iteration", "end")]
+    return _graph(nodes, edges)
+
+
+def build_loop_graph(size: int) -> dict[str, Any]:
+    body, body_edges = _chain("body-", BODY_LENGTH, loop_id="loop")
+    nodes = [*_loop_nodes("loop", size), *body]
+    edges = [_edge("start", "loop"), _edge("loop-start", "body-0"), *body_edges, _edge("loop", "end")]
+    return _graph(nodes, edges)
+
+
+def build_nested_graph(size: int) -> dict[str, Any]:
+    body, body_edges = _chain("body-", BODY_LENGTH, loop_id="loop")
+    nodes = [
+        *_iteration_nodes("iteration", "collect"),
+        *_loop_nodes("loop", BODY_LENGTH, iteration_id="iteration"),
+        _node("collect", template="", variables=[], iteration_id="iteration"),
+        *body,
+    ]
+    edges = [
+        _edge("start", "iteration"),
+        _edge("iteration-start", "loop"),
+        _edge("loop", "collect"),
+        _edge("loop-start", "body-0"),
+        *body_edges,
+        _edge("iteration", "end"),
+    ]
+    return _graph(nodes, edges)
+
+
+GRAPH_BUILDERS: Mapping[str, Callable[[int], dict[str, Any]]] = {
+    "chain": build_chain_graph,
+    "fan-out": build_fan_out_graph,
+    "iteration": build_iteration_graph,
+    "parallel-iteration": lambda size: build_iteration_graph(size, is_parallel=True),
+    "loop": build_loop_graph,
+    "nested": build_nested_graph,
+}
+
+DEFAULT_SIZES = {
+    "chain": 200,
+    "fan-out": 10,
+    "iteration": 100,
+    "parallel-iteration": 100,
+    "loop": 100,
+    "nested": 30,
+}
+
+
+def _mock_node_run(self) -> NodeRunResult:
+    return NodeRunResult(status=WorkflowNodeExecutionStatus.SUCCEEDED, outputs={"output": self.node_id})
+
+
+def run_graph(
+    graph_config: Mapping[str, Any],
+    size: int,
+    trace_memory: bool = False,
+    recorder: Optional[WorkflowProfileRecorder] = None,
+) -> dict[str, float]:
+    """
+    Run a synthetic graph once with mocked nodes and return its measurements.
+    """
+    variable_pool = VariablePool(system_variables={}, user_inputs={}, environment_variables=[])
+    variable_pool.add(["bench", "items"], [str(i) for i in range(size)])
+    recorder = recorder or WorkflowProfileRecorder()
+    graph_engine = GraphEngine(
+        tenant_id="bench",
+        app_id="bench",
+        workflow_type=WorkflowType.WORKFLOW,
+        workflow_id="bench",
+        user_id="bench",
+        user_from=UserFrom.ACCOUNT,
+        invoke_from=InvokeFrom.DEBUGGER,
+        call_depth=0,
+        graph=Graph.init(graph_config=graph_config),
+        graph_config=graph_config,
+        variable_pool=variable_pool,
+        max_execution_steps=1_000_000,
+        max_execution_time=3600,
+        profiling_callback=recorder,
+    )
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(TemplateTransformNode, "_run", new=_mock_node_run))
+        stack.enter_context(patch("extensions.ext_database.db.session.close"))
+        stack.enter_context(patch("extensions.ext_database.db.session.remove"))
+        stack.enter_context(Flask(__name__).app_context())
+        if trace_memory:
+            tracemalloc.start()
+        started_at = time.perf_counter()
+        events = list(graph_engine.run())
+        elapsed = time.perf_counter() - started_at
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+
+    if not isinstance(events[-1], GraphRunSucceededEvent):
+        raise RuntimeError(f"Graph run did not succeed: {events[-1]}")
+
+    profiles = recorder.profiles
+    queue_waits = sorted(profile.queue_wait_time for profile in profiles)
+    return {
+        "events": len(events),
+        "elapsed": elapsed,
+        "events_per_second": len(events) / elapsed,
+        "node_runs": len(profiles),
+        "queue_wait_mean": statistics.fmean(queue_waits),
+        "queue_wait_p95": queue_waits[int(len(queue_waits) * 0.95)],
+        "run_time_mean": statistics.fmean(profile.run_time for profile in profiles),
+        "event_dispatch_time_mean": statistics.fmean(profile.event_dispatch_time for profile in profiles),
+        "peak_memory": peak_memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the workflow graph engine on synthetic graphs.")
+    parser.add_argument("--graph", choices=[*GRAPH_BUILDERS, "all"], default="all")
+    parser.add_argument("--size", type=int, help="scale of the graph, defaults to a size per graph")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    names = list(GRAPH_BUILDERS) if args.graph == "all" else [args.graph]
+    for name in names:
+        size = args.size or DEFAULT_SIZES[name]
+        graph_config = GRAPH_BUILDERS[name](size)
+        for round in range(1, args.rounds + 1):
+            result = run_graph(graph_config, size)
+            print(
+                f"{name} size {size} round {round}: {result['events_per_second']:.0f} events/s,"
+                f" {result['node_runs']} node runs in {result['elapsed']:.3f}s,"
+                f" queue wait mean {result['queue_wait_mean'] * 1e3:.3f}ms p95 {result['queue_wait_p95'] * 1e3:.3f}ms,"
+                f" run {result['run_time_mean'] * 1e3:.3f}ms,"
+                f" dispatch {result['event_dispatch_time_mean'] * 1e3:.3f}ms per node"
+            )
+        # tracing allocations slows the run down, memory is measured in a separate run
+        result = run_graph(graph_config, size, trace_memory=True)
+        print(f"{name} size {size}: peak traced memory {result['peak_memory'] / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
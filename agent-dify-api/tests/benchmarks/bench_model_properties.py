@@ -0,0 +1,253 @@
+"""
+Cost of the JSON-backed properties of `AppModelConfig` and `Workflow` over one request, parsing them on every
+access as before they were cached, cached with the standard library json and cached with orjson.
+
+Run from the api directory:
+
+    python -m tests.benchmarks.bench_model_properties
+    python -m tests.benchmarks.bench_model_properties --requests 2000 --rounds 5
+
+A request reads the properties the way a chat request of a chat app, or an advanced chat app, does between
+loading the app config and finishing its generate task pipeline, on a freshly loaded instance.
+"""
+
+import argparse
+import gc
+import json
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from typing import Any
+from unittest.mock import patch
+from uuid import uuid4
+
+import contexts
+from core.variables import SecretVariable, StringVariable
+from models import json_property
+from models.model import AppModelConfig
+from models.workflow import Workflow
+
+# reads of a chat request, from the generator and `ChatAppConfigManager` to the task pipeline
+CHAT_REQUEST_READS = [
+    "to_dict",
+    "to_dict",
+    "model_dict",
+    "dataset_configs_dict",
+    "more_like_this_dict",
+    "suggested_questions_after_answer_dict",
+    "text_to_speech_dict",
+    "retriever_resource_dict",
+    "sensitive_word_avoidance_dict",
+    "to_dict",
+]
+
+# reads of an advanced chat request, from the generator and the app runner to the task pipeline
+ADVANCED_CHAT_REQUEST_READS = [
+    "features_dict",
+    "user_input_form",
+    "features_dict",
+    "conversation_variables",
+    "environment_variables",
+    "graph_dict",
+    "graph_dict",
+    "features_dict",
+]
+
+
+def _prompt(length: int) -> str:
+    return " ".join(f"word{i}" for i in range(length))
+
+
+def build_app_model_config() -> AppModelConfig:
+    app_model_config = AppModelConfig(
+        opening_statement="Hello",
+        pre_prompt=_prompt(300),
+        prompt_type="simple",
+        dataset_query_variable="",
+    )
+    return app_model_config.from_model_config_dict(
+        {
+            "pre_prompt": _prompt(300),
+            "model": {
+                "provider": "langgenius/openai/openai",
+                "name": "gpt-4o",
+                "mode": "chat",
+                "completion_params": {"temperature": 0.7, "top_p": 1, "max_tokens": 512, "stop": []},
+            },
+            "suggested_questions": [f"question {i}" for i in range(3)],
+            "suggested_questions_after_answer": {"enabled": True},
+            "speech_to_text": {"enabled": False},
+            "text_to_speech": {"enabled": True, "voice": "alloy", "language": "en-US"},
+            "more_like_this": {"enabled": False},
+            "retriever_resource": {"enabled": True},
+            "sensitive_word_avoidance": {"enabled": False, "type": "", "configs": []},
+            "user_input_form": [
+                {"text-input": {"label": f"field {i}", "variable": f"field_{i}", "required": False, "max_length": 48}}
+                for i in range(6)
+            ],
+            "agent_mode": {
+                "enabled": False,
+                "strategy": "function_call",
+                "tools": [
+                    {
+                        "provider_id": "time",
+                        "provider_type": "builtin",
+                        "tool_name": f"tool_{i}",
+                        "tool_parameters": {"format": "%Y-%m-%d"},
+                        "enabled": True,
+                    }
+                    for i in range(4)
+                ],
+            },
+            "dataset_configs": {
+                "retrieval_model": "multiple",
+                "top_k": 4,
+                "reranking_enable": False,
+                "datasets": {"datasets": [{"dataset": {"enabled": True, "id": str(uuid4())}} for _ in range(3)]},
+            },
+            "file_upload": {
+                "enabled": True,
+                "allowed_file_types": ["image"],
+                "allowed_file_upload_methods": ["remote_url", "local_file"],
+                "number_limits": 3,
+            },
+        }
+    )
+
+
+def build_workflow() -> Workflow:
+    nodes: list[dict[str, Any]] = [{"id": "start", "data": {"type": "start", "title": "Start", "variables": []}}]
+    nodes.extend(
+        {
+            "id": f"llm-{i}",
+            "data": {
+                "type": "llm",
+                "title": f"LLM {i}",
+                "model": {"provider": "openai", "name": "gpt-4o", "mode": "chat", "completion_params": {}},
+                "prompt_template": [{"role": "system", "text": _prompt(100)}],
+                "context": {"enabled": False, "variable_selector": []},
+            },
+            "position": {"x": i * 300, "y": 0},
+        }
+        for i in range(20)
+    )
+    nodes.append({"id": "answer", "data": {"type": "answer", "title": "Answer", "answer": "{{#llm-19.text#}}"}})
+    node_ids = [node["id"] for node in nodes]
+    edges = [{"id": f"{a}-{b}", "source": a, "target": b} for a, b in zip(node_ids, node_ids[1:])]
+    features = {
+        "file_upload": {"image": {"enabled": True, "number_limits": 3, "transfer_methods": ["local_file"]}},
+        "text_to_speech": {"enabled": False},
+        "suggested_questions": [],
+    }
+    return Workflow.new(
+        tenant_id="bench",
+        app_id="bench",
+        type="chat",
+        version="draft",
+        graph=json.dumps({"nodes": nodes, "edges": edges}),
+        features=json.dumps(features),
+        created_by="bench",
+        environment_variables=[StringVariable(id=str(uuid4()), name=f"env_{i}", value=f"value {i}") for i in range(5)]
+        + [SecretVariable(id=str(uuid4()), name="api_key", value="secret")],
+        conversation_variables=[StringVariable(id=str(uuid4()), name=f"var_{i}", value="") for i in range(5)],
+    )
+
+
+def _fresh(instance: Any) -> Any:
+    """
+    Copy of the instance with only its columns set, like an instance loaded by a new request.
+    """
+    fresh = type(instance)()
+    for column in type(instance).__table__.columns:
+        attribute = column.key
+        for key in (attribute, f"_{attribute}"):
+            if key in instance.__dict__:
+                setattr(fresh, key, instance.__dict__[key])
+    return fresh
+
+
+@contextmanager
+def _uncached(*classes: type) -> Iterator[None]:
+    """
+    Replace the cached properties of the classes with their undecorated getters.
+    """
+    with ExitStack() as stack:
+        for cls in classes:
+            for name, value in vars(cls).items():
+                if isinstance(value, property) and hasattr(value.fget, "__wrapped__"):
+                    stack.enter_context(
+                        patch.object(cls, name, new=property(value.fget.__wrapped__, value.fset))  # type: ignore
+                    )
+        yield
+
+
+def _read(instance: Any, reads: list[str]) -> None:
+    for name in reads:
+        value = getattr(instance, name)
+        if callable(value):
+            value()
+
+
+def run_requests(mode: str, requests: int) -> dict[str, float]:
+    """
+    Run the reads of the given number of chat and advanced chat requests and return their time per request.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(AppModelConfig, "annotation_reply_dict", new={"enabled": False}))
+        stack.enter_context(patch("core.helper.encrypter.encrypt_token", return_value="encrypted"))
+        stack.enter_context(patch("core.helper.encrypter.decrypt_token", return_value="secret"))
+        app_model_config = build_app_model_config()
+        workflow = build_workflow()
+        if mode == "uncached":
+            stack.enter_context(_uncached(AppModelConfig, Workflow))
+        if mode != "cached-orjson":
+            for module in ("models.model", "models.workflow"):
+                stack.enter_context(patch(f"{module}.json_loads", new=json.loads))
+
+        results = {}
+        for name, instance, reads in (
+            ("chat", app_model_config, CHAT_REQUEST_READS),
+            ("advanced_chat", workflow, ADVANCED_CHAT_REQUEST_READS),
+        ):
+            instances = [_fresh(instance) for _ in range(requests)]
+            gc.disable()
+            try:
+                started_at = time.perf_counter()
+                for fresh in instances:
+                    _read(fresh, reads)
+                results[name] = (time.perf_counter() - started_at) / requests
+            finally:
+                gc.enable()
+    return results
+
+
+MODES = ("uncached", "cached-json", "cached-orjson")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON-backed properties of the app models.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    contexts.tenant_id.set("bench")
+    for mode in MODES:
+        if mode == "cached-orjson" and json_property.orjson is None:
+            print(f"{mode}: skipped, orjson is not installed")
+            continue
+        results = []
+        for round in range(1, args.rounds + 1):
+            result = run_requests(mode, args.requests)
+            results.append(result)
+            print(
+                f"{mode} round {round}: chat {result['chat'] * 1e6:.1f}us,"
+                f" advanced chat {result['advanced_chat'] * 1e6:.1f}us per request"
+            )
+        print(
+            f"{mode} best: chat {min(r['chat'] for r in results) * 1e6:.1f}us,"
+            f" advanced chat {min(r['advanced_chat'] for r in results) * 1e6:.1f}us per request"
+        )
+
+
+if __name__ == "__main__":
+    main()
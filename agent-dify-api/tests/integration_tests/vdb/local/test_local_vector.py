@@ -0,0 +1,24 @@
+from core.rag.datasource.vdb.local.local_vector import LocalVector, LocalVectorConfig
+from tests.integration_tests.vdb.test_vector_store import (
+    AbstractVectorTest,
+    get_example_text,
+)
+
+
+class LocalVectorTest(AbstractVectorTest):
+    def __init__(self, path: str):
+        super().__init__()
+        self.vector = LocalVector(collection_name=self.collection_name, config=LocalVectorConfig(path=path))
+
+    def search_by_full_text(self):
+        # the local vector store does not support full text searching
+        hits_by_full_text = self.vector.search_by_full_text(query=get_example_text())
+        assert len(hits_by_full_text) == 0
+
+    def get_ids_by_metadata_field(self):
+        ids = self.vector.get_ids_by_metadata_field(key="document_id", value=self.example_doc_id)
+        assert ids == [self.example_doc_id]
+
+
+def test_local_vector(tmp_path):
+    LocalVectorTest(str(tmp_path)).run_all_tests()
@@ -0,0 +1,95 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from configs import dify_config
+from core.app.apps.base_app_queue_manager import GenerateTaskStoppedError, PublishFrom
+from core.app.apps.task_stop_channel import TaskStopChannel
+from core.app.apps.workflow.app_queue_manager import WorkflowAppQueueManager
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import QueuePingEvent, QueueStopEvent
+
+
+@pytest.fixture
+def redis():
+    redis = MagicMock()
+    redis.get.return_value = None
+    # keep the subscriber thread from connecting to redis
+    with (
+        patch("core.app.apps.base_app_queue_manager.redis_client", redis),
+        patch("core.app.apps.task_stop_channel.redis_client", redis),
+        patch.object(TaskStopChannel, "_thread", MagicMock()),
+    ):
+        yield redis
+
+
+def _queue_manager(task_id: str = "task-1") -> WorkflowAppQueueManager:
+    return WorkflowAppQueueManager(task_id, "user-1", InvokeFrom.SERVICE_API, "workflow")
+
+
+def test_stop_message_stops_task_without_polling_redis(redis):
+    queue_manager = _queue_manager()
+    queue_manager.publish(QueuePingEvent(), PublishFrom.APPLICATION_MANAGER)
+
+    TaskStopChannel._dispatch({"type": "message", "data": b"task-1"})
+
+    with pytest.raises(GenerateTaskStoppedError):
+        queue_manager.publish(QueuePingEvent(), PublishFrom.APPLICATION_MANAGER)
+    redis.get.assert_not_called()
+
+
+def test_stop_message_for_other_task_is_ignored(redis):
+    queue_manager = _queue_manager()
+    TaskStopChannel._dispatch({"type": "message", "data": b"task-2"})
+
+    assert not queue_manager._is_stopped()
+
+
+def test_stop_flag_is_polled_at_check_interval(redis):
+    queue_manager = _queue_manager()
+    redis.get.return_value = b"1"
+    with patch.object(dify_config, "APP_STOP_CHECK_INTERVAL", 5):
+        assert not queue_manager._is_stopped()
+        redis.get.assert_not_called()
+
+        queue_manager._last_stop_check -= 5
+        assert queue_manager._is_stopped()
+        assert queue_manager._is_stopped()
+    redis.get.assert_called_once()
+
+
+def test_set_stop_flag_publishes_stop_message(redis):
+    redis.get.return_value = b"end-user-user-1"
+
+    WorkflowAppQueueManager.set_stop_flag("task-1", InvokeFrom.SERVICE_API, "user-1")
+
+    redis.setex.assert_called_once_with("generate_task_stopped:task-1", 600, 1)
+    redis.publish.assert_called_once_with(TaskStopChannel.CHANNEL, "task-1")
+
+
+def test_listen_publishes_stop_event_once_stopped(redis):
+    queue_manager = _queue_manager()
+    TaskStopChannel._dispatch({"type": "message", "data": b"task-1"})
+    queue_manager.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
+
+    events = [message.event for message in queue_manager.listen()]
+
+    assert isinstance(events[-1], QueueStopEvent)
+
+
+def test_listen_closes_the_failed_subscription_before_resubscribing(redis):
+    class _Stop(BaseException):
+        pass
+
+    pubsubs = [MagicMock(), MagicMock()]
+    for pubsub in pubsubs:
+        pubsub.__enter__.return_value = pubsub
+    pubsubs[0].listen.side_effect = ConnectionError("connection lost")
+    pubsubs[1].listen.side_effect = _Stop()
+    redis.pubsub.side_effect = pubsubs
+
+    with patch("core.app.apps.task_stop_channel.time.sleep"), pytest.raises(_Stop):
+        TaskStopChannel._listen()
+
+    pubsubs[0].__exit__.assert_called_once()
+    pubsubs[1].subscribe.assert_called_once_with(TaskStopChannel.CHANNEL)
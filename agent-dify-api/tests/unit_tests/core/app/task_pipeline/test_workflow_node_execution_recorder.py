@@ -0,0 +1,166 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from configs import dify_config
+from core.app.task_pipeline.workflow_node_execution_recorder import (
+    _MAX_WRITE_ATTEMPTS,
+    WorkflowNodeExecutionRecorder,
+    WorkflowNodeExecutionWriteError,
+)
+from models.workflow import WorkflowNodeExecution
+
+
+def _node_execution(id: str, status: str = "running", **kwargs) -> WorkflowNodeExecution:
+    workflow_node_execution = WorkflowNodeExecution()
+    workflow_node_execution.id = id
+    workflow_node_execution.tenant_id = "tenant-1"
+    workflow_node_execution.status = status
+    for key, value in kwargs.items():
+        setattr(workflow_node_execution, key, value)
+    return workflow_node_execution
+
+
+@pytest.fixture
+def written():
+    rows: list[list[dict]] = []
+    lock = threading.Lock()
+
+    def write(self, batch):
+        with lock:
+            rows.append(batch)
+
+    with patch.object(WorkflowNodeExecutionRecorder, "_write", write):
+        yield rows
+
+
+def test_flush_writes_latest_state_of_each_execution_once(written):
+    recorder = WorkflowNodeExecutionRecorder()
+    node_execution = _node_execution("execution-1")
+    recorder.record(node_execution)
+    node_execution.status = "succeeded"
+    node_execution.outputs = json.dumps({"text": "done"})
+    recorder.record(node_execution)
+    recorder.record(_node_execution("execution-2"))
+
+    recorder.flush()
+
+    rows = {row["id"]: row for batch in written for row in batch}
+    assert sum(len(batch) for batch in written) == 2
+    assert rows["execution-1"]["status"] == "succeeded"
+    assert rows["execution-2"]["status"] == "running"
+    # unset columns are left to their server defaults
+    assert "elapsed_time" not in rows["execution-2"]
+
+
+def test_batches_are_written_once_flush_size_is_reached(written):
+    recorder = WorkflowNodeExecutionRecorder()
+    with (
+        patch.object(dify_config, "WORKFLOW_NODE_EXECUTION_FLUSH_SIZE", 2),
+        patch.object(
+            dify_config,
+            "WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL",
+            60,
+        ),
+    ):
+        for i in range(4):
+            recorder.record(_node_execution(f"execution-{i}"))
+        recorder.flush()
+
+    assert sorted(row["id"] for batch in written for row in batch) == [f"execution-{i}" for i in range(4)]
+
+
+def test_failed_writes_are_retried_row_by_row():
+    attempts: list[list[str]] = []
+
+    def write(self, rows):
+        attempts.append([row["id"] for row in rows])
+        if len(attempts) <= 2:
+            raise RuntimeError("database unavailable")
+
+    recorder = WorkflowNodeExecutionRecorder()
+    with (
+        patch.object(WorkflowNodeExecutionRecorder, "_write", write),
+        patch.object(dify_config, "WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL", 0.01),
+    ):
+        recorder.record(_node_execution("execution-1"))
+        recorder.record(_node_execution("execution-2"))
+        recorder.flush()
+
+    assert attempts == [["execution-1", "execution-2"], ["execution-1"], ["execution-2"], ["execution-1"]]
+
+
+def test_rows_that_keep_failing_are_dropped_and_reported_by_flush():
+    attempts: list[list[str]] = []
+
+    def write(self, rows):
+        attempts.append([row["id"] for row in rows])
+        if any(row["id"] == "execution-1" for row in rows):
+            raise RuntimeError("violates check constraint")
+
+    recorder = WorkflowNodeExecutionRecorder()
+    with (
+        patch.object(WorkflowNodeExecutionRecorder, "_write", write),
+        patch.object(dify_config, "WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL", 0.01),
+    ):
+        recorder.record(_node_execution("execution-1"))
+        recorder.record(_node_execution("execution-2"))
+        with pytest.raises(WorkflowNodeExecutionWriteError) as exc_info:
+            recorder.flush()
+        assert exc_info.value.ids == ["execution-1"]
+
+        # the dropped row no longer holds back later writes
+        recorder.record(_node_execution("execution-3"))
+        recorder.flush()
+
+    assert attempts.count(["execution-1"]) == _MAX_WRITE_ATTEMPTS
+    assert ["execution-2"] in attempts
+    assert attempts[-1] == ["execution-3"]
+
+
+def test_write_upserts_rows_of_each_shape():
+    session = MagicMock()
+    with (
+        patch("core.app.task_pipeline.workflow_node_execution_recorder.Session") as session_cls,
+        patch("core.app.task_pipeline.workflow_node_execution_recorder.db"),
+    ):
+        session_cls.return_value.__enter__.return_value = session
+        WorkflowNodeExecutionRecorder()._write(
+            [
+                {"id": "execution-1", "tenant_id": "tenant-1", "status": "running"},
+                {"id": "execution-2", "tenant_id": "tenant-1", "status": "succeeded", "elapsed_time": 1.0},
+            ]
+        )
+
+    statements = [str(call.args[0].compile(dialect=postgresql.dialect())) for call in session.execute.call_args_list]
+    assert len(statements) == 2
+    assert all("ON CONFLICT (id) DO UPDATE" in statement for statement in statements)
+    assert "elapsed_time = excluded.elapsed_time" in statements[1]
+    session.commit.assert_called_once()
+
+
+def test_large_payloads_are_offloaded_to_storage():
+    saved: dict[str, bytes] = {}
+    outputs = json.dumps({"text": "x" * 100})
+    with (
+        patch.object(
+            dify_config,
+            "WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD",
+            50,
+        ),
+        patch("core.app.task_pipeline.workflow_node_execution_recorder.storage") as recorder_storage,
+        patch("models.workflow.storage") as model_storage,
+    ):
+        recorder_storage.save.side_effect = lambda key, data: saved.__setitem__(key, data)
+        model_storage.load_once.side_effect = lambda key: saved[key]
+        row = WorkflowNodeExecutionRecorder._offload_payloads(
+            {"id": "execution-1", "tenant_id": "tenant-1", "inputs": json.dumps({"a": 1}), "outputs": outputs}
+        )
+
+        assert row["inputs"] == json.dumps({"a": 1})
+        assert list(saved) == ["workflow_node_executions/tenant-1/execution-1/outputs.json"]
+        node_execution = _node_execution("execution-1", outputs=row["outputs"])
+        assert node_execution.outputs_dict == {"text": "x" * 100}
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor, CodeLanguage
+from core.helper.code_executor.jinja2.jinja2_transformer import Jinja2TemplateTransformer
+from core.helper.code_executor.python3.python3_transformer import Python3TemplateTransformer
+
+
+def _sandbox_response(stdout: str) -> MagicMock:
+    return MagicMock(status_code=200, json=lambda: {"code": 0, "message": "success", "data": {"stdout": stdout}})
+
+
+def test_client_is_reused_across_executions():
+    with patch("httpx.Client.post", return_value=_sandbox_response('<<RESULT>>{"a": 1}<<RESULT>>')) as post:
+        for _ in range(2):
+            assert CodeExecutor.execute_workflow_code_template(
+                language=CodeLanguage.PYTHON3, code="def main():\n    return {'a': 1}\n", inputs={}
+            ) == {"a": 1}
+
+    assert post.call_count == 2
+    assert CodeExecutor._get_client() is CodeExecutor._get_client()
+
+
+def test_preload_script_is_built_once():
+    CodeExecutor.dependencies_cache.pop(CodeLanguage.JINJA2, None)
+    with patch.object(Jinja2TemplateTransformer, "get_preload_script", return_value="import jinja2") as preload:
+        assert CodeExecutor.get_preload_script(CodeLanguage.JINJA2) == "import jinja2"
+        assert CodeExecutor.get_preload_script(CodeLanguage.JINJA2) == "import jinja2"
+
+    preload.assert_called_once()
+    CodeExecutor.dependencies_cache.pop(CodeLanguage.JINJA2, None)
+
+
+def test_execute_batch_in_one_request():
+    stdout = '<<RESULT>>[{"result": {"a": 1}}, {"error": "Traceback: ValueError"}, {"result": [1]}]<<RESULT>>'
+    with patch.object(CodeExecutor, "execute_code", return_value=stdout) as execute_code:
+        results = CodeExecutor.execute_workflow_code_template_batch(
+            language=CodeLanguage.PYTHON3,
+            code="def main(x):\n    return {'a': x}\n",
+            inputs_list=[{"x": 1}, {"x": 2}, {"x": 3}],
+        )
+
+    execute_code.assert_called_once()
+    assert results[0] == {"a": 1}
+    assert isinstance(results[1], CodeExecutionError)
+    assert str(results[1]) == "Traceback: ValueError"
+    assert isinstance(results[2], ValueError)
+
+
+def test_execute_batch_rejects_incomplete_response():
+    with patch.object(CodeExecutor, "execute_code", return_value='<<RESULT>>[{"result": {}}]<<RESULT>>'):
+        with pytest.raises(CodeExecutionError):
+            CodeExecutor.execute_workflow_code_template_batch(
+                language=CodeLanguage.JAVASCRIPT, code="function main() { return {} }", inputs_list=[{}, {}]
+            )
+
+    with pytest.raises(CodeExecutionError):
+        CodeExecutor.execute_workflow_code_template_batch(language=CodeLanguage.JINJA2, code="", inputs_list=[{}])
+
+
+def test_batch_support_is_declared_by_the_transformer():
+    assert CodeExecutor.supports_batch(CodeLanguage.PYTHON3)
+    assert CodeExecutor.supports_batch(CodeLanguage.JAVASCRIPT)
+    assert not CodeExecutor.supports_batch(CodeLanguage.JINJA2)
+
+
+def test_batch_runner_runs_each_call_in_fresh_globals():
+    code = (
+        "seen = []\n\n"
+        "def main(x):\n"
+        "    seen.append(x)\n"
+        "    if x == 2:\n"
+        "        raise ValueError(x)\n"
+        "    return {'seen': seen}\n"
+    )
+    runner = Python3TemplateTransformer.assemble_batch_runner_script(code, [{"x": 1}, {"x": 2}, {"x": 3}])
+
+    stdout = subprocess.run([sys.executable, "-c", runner], capture_output=True, text=True, check=True).stdout
+    items = Python3TemplateTransformer.transform_batch_response(stdout, 3)
+
+    assert items[0] == {"result": {"seen": [1]}}
+    assert "ValueError: 2" in items[1]["error"]
+    assert items[2] == {"result": {"seen": [3]}}
@@ -0,0 +1,142 @@
+from unittest.mock import patch
+
+import pytest
+
+from configs import dify_config
+from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor, CodeLanguage
+from core.helper.code_executor.jinja2.jinja2_sandbox import (
+    Jinja2SandboxRenderer,
+    Jinja2SandboxRenderError,
+    Jinja2SandboxUnsupportedError,
+)
+
+
+@pytest.fixture(autouse=True)
+def local_render_enabled():
+    with patch.object(dify_config, "JINJA2_LOCAL_RENDER_ENABLED", True):
+        yield
+
+
+def test_render_in_process_without_code_sandbox():
+    with patch.object(CodeExecutor, "execute_code") as execute_code:
+        result = CodeExecutor.execute_workflow_code_template(
+            language=CodeLanguage.JINJA2,
+            code="{% for item in items %}{{ item.name | upper }}{% if not loop.last %}, {% endif %}{% endfor %}",
+            inputs={"items": [{"name": "a"}, {"name": "b"}]},
+        )
+
+    assert result == {"result": "A, B"}
+    execute_code.assert_not_called()
+
+
+def test_compiled_templates_are_reused():
+    template = "Hello {{ name }}"
+    with patch.object(
+        Jinja2SandboxRenderer._environment, "from_string", wraps=Jinja2SandboxRenderer._environment.from_string
+    ) as from_string:
+        assert Jinja2SandboxRenderer.render(template + "!", {"name": "World"}) == "Hello World!"
+        assert Jinja2SandboxRenderer.render(template + "!", {"name": "Dify"}) == "Hello Dify!"
+
+    from_string.assert_called_once()
+
+
+def test_unsafe_template_falls_back_to_code_sandbox():
+    template = "{% set items = [] %}{{ items.append(1) }}{{ items }}"
+    with pytest.raises(Jinja2SandboxUnsupportedError):
+        Jinja2SandboxRenderer.render(template, {})
+
+    with patch.object(CodeExecutor, "execute_code", return_value="<<RESULT>>None[1]<<RESULT>>\n") as execute_code:
+        result = CodeExecutor.execute_workflow_code_template(language=CodeLanguage.JINJA2, code=template, inputs={})
+
+    assert result == {"result": "None[1]"}
+    execute_code.assert_called_once()
+
+
+def test_limits_defer_to_code_sandbox():
+    with patch.object(dify_config, "JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH", 10):
+        with pytest.raises(Jinja2SandboxUnsupportedError):
+            Jinja2SandboxRenderer.render("{% for i in range(100) %}{{ i }}{% endfor %}", {})
+
+    with patch.object(dify_config, "JINJA2_LOCAL_RENDER_MAX_CPU_TIME", 0.01):
+        with pytest.raises(Jinja2SandboxUnsupportedError):
+            Jinja2SandboxRenderer.render(
+                "{% for i in range(100000) %}{% for j in range(100000) %}{% endfor %}{% endfor %}", {}
+            )
+
+
+def test_template_errors_are_raised_without_code_sandbox():
+    with pytest.raises(Jinja2SandboxRenderError):
+        Jinja2SandboxRenderer.render("{% for %}", {})
+
+    with patch.object(CodeExecutor, "execute_code") as execute_code:
+        with pytest.raises(CodeExecutionError):
+            CodeExecutor.execute_workflow_code_template(
+                language=CodeLanguage.JINJA2, code="{{ missing.attribute.call() }}", inputs={}
+            )
+    execute_code.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "{% set s = 'x' * 300000000 %}{{ s|length }}",
+        "{{ [0] * 300000000 }}",
+        "{{ (10 ** 100000000) > 1 }}",
+        "{{ ('%300000000d' % 1)|length }}",
+        "{{ ('%*d' % (300000000, 1))|length }}",
+        "{{ 'x'.center(300000000)|length }}",
+        "{{ 'x'|center(300000000)|length }}",
+        "{{ ('x' * 1000)|replace('x', 'y' * 1000)|replace('y', 'z' * 1000)|length }}",
+        "{{ (range(1000)|join('x' * 300000))|length }}",
+        "{{ (range(99999)|join('x' * 300000))|length }}",
+        "{% set ns = namespace(a='x') %}{% for i in range(100) %}{% set ns.a = ns.a ~ ns.a %}{% endfor %}"
+        "{{ ns.a|length }}",
+        "{{ ([['x' * 1000] * 1000] * 1000)|length }}",
+        "{{ ('x' * 300000).join(range(1000))|length }}",
+        "{{ ('{:>300000000}'.format(1))|length }}",
+        "{{ (range(1000)|map('center', 300000)|list)|length }}",
+        "{{ ([['x' * 1000] * 100] * 100)|sum(start=[])|length }}",
+        "{{ ('x' * 1000)|wordwrap(1, wrapstring='y' * 1000)|length }}",
+        "{{ range(3)|slice(300000000)|list|length }}",
+        "{% set s %}{% for i in range(99999) %}{{ 'x' * 300000 }}{% endfor %}{% endset %}{{ s|length }}",
+        "{% macro m(n) %}{{ 'x' * 1000 if n == 0 else m(n - 1) ~ m(n - 1) }}{% endmacro %}{{ m(20)|length }}",
+        "{{ lipsum(1000000)|length }}",
+    ],
+)
+def test_oversized_values_defer_to_code_sandbox_before_they_are_built(template):
+    with pytest.raises(Jinja2SandboxUnsupportedError):
+        Jinja2SandboxRenderer.render(template, {})
+
+
+def test_operators_within_limits_render_in_process():
+    template = "{{ 2 * 3 }} {{ 'ab' * 2 }} {{ 2 ** 10 }} {{ '%05d' % 42 }} {{ 'a' + 'b' }} {{ 7 % 3 }}"
+    template += " {{ 'x'|center(3) }}"
+    assert Jinja2SandboxRenderer.render(template, {}) == "6 abab 1024 00042 ab 1  x "
+
+
+def test_values_within_limits_render_in_process():
+    template = "{{ range(3)|join('-') }} {{ 'a' ~ 1 ~ 'b' }} {{ '-'.join(['a', 'b']) }} {{ '{:>3}'.format(1) }}"
+    template += " {{ [[1], [2]]|sum(start=[]) }} {{ 'abc'|list }} {{ [1, 2, 3]|batch(2, 0)|list }}"
+    assert Jinja2SandboxRenderer.render(template, {}) == "0-1-2 a1b a-b   1 [1, 2] ['a', 'b', 'c'] [[1, 2], [3, 0]]"
+
+
+def test_unsafe_attributes_fall_back_to_code_sandbox():
+    with pytest.raises(Jinja2SandboxUnsupportedError):
+        Jinja2SandboxRenderer.render("{{ name.__class__ }}", {"name": "x"})
+
+
+def test_backslash_escapes_are_decoded_like_the_code_sandbox():
+    assert Jinja2SandboxRenderer.render(r"{{ a }}\n{{ '\\\\' }}\t", {"a": 1}) == "1\n\\\t"
+    with pytest.raises(Jinja2SandboxUnsupportedError):
+        Jinja2SandboxRenderer.render("{{ a }}\\", {"a": 1})
+
+
+def test_templates_are_sent_to_the_code_sandbox_unless_enabled():
+    with (
+        patch.object(dify_config, "JINJA2_LOCAL_RENDER_ENABLED", False),
+        patch.object(CodeExecutor, "execute_code", return_value="<<RESULT>>x<<RESULT>>\n") as execute_code,
+    ):
+        result = CodeExecutor.execute_workflow_code_template(language=CodeLanguage.JINJA2, code="{{ a }}", inputs={})
+
+    assert result == {"result": "x"}
+    execute_code.assert_called_once()
@@ -0,0 +1,120 @@
+import contextvars
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from configs import dify_config
+from core.entities.provider_entities import ModelLoadBalancingConfiguration
+from core.helper.model_provider_cache import TenantModelProviderCache
+from core.model_manager import LBModelManager
+from core.model_runtime.entities.model_entities import ModelType
+from core.model_runtime.model_providers.model_provider_factory import ModelProviderFactory
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+
+@pytest.fixture(autouse=True)
+def fake_redis():
+    TenantModelProviderCache.clear()
+    fake = FakeRedis()
+    with patch("core.helper.model_provider_cache.redis_client", fake):
+        yield fake
+    TenantModelProviderCache.clear()
+
+
+def test_entries_are_loaded_once_per_version():
+    loader = MagicMock(side_effect=lambda: object())
+
+    first = TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader)
+    assert TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader) is first
+    other_tenant = TenantModelProviderCache.get_or_load("tenant-2", "configurations", loader)
+    assert other_tenant is not first
+
+    TenantModelProviderCache.bump("tenant-1")
+    assert TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader) is not first
+    assert TenantModelProviderCache.get_or_load("tenant-2", "configurations", loader) is other_tenant
+    assert loader.call_count == 3
+
+
+def test_none_is_not_cached():
+    loader = MagicMock(return_value=None)
+
+    assert TenantModelProviderCache.get_or_load("tenant-1", "schema", loader) is None
+    assert TenantModelProviderCache.get_or_load("tenant-1", "schema", loader) is None
+    assert loader.call_count == 2
+
+
+def test_entries_are_loaded_without_cache_when_redis_fails_or_cache_is_disabled(fake_redis):
+    loader = MagicMock(side_effect=lambda: object())
+
+    with patch.object(fake_redis, "get", side_effect=ConnectionError):
+        TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader)
+        TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader)
+    with patch.object(dify_config, "MODEL_PROVIDER_CACHE_ENABLED", False):
+        TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader)
+        TenantModelProviderCache.get_or_load("tenant-1", "configurations", loader)
+
+    assert loader.call_count == 4
+
+
+def test_plugin_model_providers_are_fetched_once_across_requests():
+    provider = MagicMock(plugin_id="langgenius/openai")
+    provider.declaration.provider = "openai"
+    factory = ModelProviderFactory("tenant-1")
+    factory.plugin_model_manager = MagicMock()
+    factory.plugin_model_manager.fetch_model_providers.return_value = [provider]
+
+    # a fresh context stands in for each request
+    for _ in range(3):
+        providers = contextvars.Context().run(factory.get_plugin_model_providers)
+        assert [p.declaration.provider for p in providers] == ["langgenius/openai/openai"]
+
+    factory.plugin_model_manager.fetch_model_providers.assert_called_once_with("tenant-1")
+
+
+def test_lb_model_manager_does_not_modify_the_cached_configs():
+    inherit = ModelLoadBalancingConfiguration(id="id1", name="__inherit__", credentials={})
+    configs = [inherit, ModelLoadBalancingConfiguration(id="id2", name="first", credentials={"api_key": "key"})]
+
+    lb_model_manager = LBModelManager(
+        tenant_id="tenant-1",
+        provider="openai",
+        model_type=ModelType.LLM,
+        model="gpt-4",
+        load_balancing_configs=configs,
+        managed_credentials={"api_key": "managed"},
+    )
+
+    assert lb_model_manager._load_balancing_configs[0].credentials == {"api_key": "managed"}
+    assert inherit.credentials == {}
+    assert len(configs) == 2
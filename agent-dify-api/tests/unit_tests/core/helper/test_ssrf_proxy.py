@@ -1,9 +1,15 @@
+import gc
 import random
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from configs import dify_config
+from core.helper import ssrf_proxy
+from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, get_pool_stats, make_request
 
 
 @patch("httpx.Client.request")
@@ -50,3 +56,91 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+def test_client_is_reused_across_requests_and_retries():
+    clients = []
+
+    def request(self, method, url, **kwargs):
+        clients.append(self)
+        return MagicMock(status_code=500 if len(clients) == 1 else 200)
+
+    with patch("httpx.Client.request", autospec=True, side_effect=request), patch("core.helper.ssrf_proxy.time.sleep"):
+        make_request("GET", "http://example.com")
+        make_request("POST", "http://example.com/other")
+
+    assert len(clients) == 3
+    assert clients[0] is clients[1] is clients[2]
+    assert any(stats.requests >= 2 for stats in get_pool_stats())
+
+
+def test_concurrent_requests_per_host_are_limited():
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def request(method, url, **kwargs):
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.02)
+        with lock:
+            active[host] -= 1
+        return MagicMock(status_code=200)
+
+    with (
+        patch("httpx.Client.request", side_effect=request),
+        patch.object(dify_config, "SSRF_POOL_MAX_CONNECTIONS_PER_HOST", 2),
+    ):
+        threads = [
+            threading.Thread(target=make_request, args=("GET", f"http://{host}.example.com/{i}"))
+            for host in ("a", "b")
+            for i in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert peak == {"a.example.com": 2, "b.example.com": 2}
+
+
+def test_host_semaphores_are_released_once_idle():
+    with (
+        patch("httpx.Client.request", return_value=MagicMock(status_code=200)),
+        patch.object(dify_config, "SSRF_POOL_MAX_CONNECTIONS_PER_HOST", 2),
+    ):
+        for i in range(100):
+            make_request("GET", f"http://host-{i}.example.com")
+    gc.collect()
+
+    assert not any(host.startswith("host-") for host in ssrf_proxy._host_semaphores)
+
+
+def test_proxy_transports_use_the_ssl_verify_setting():
+    with (
+        patch.object(dify_config, "SSRF_PROXY_ALL_URL", None),
+        patch.object(dify_config, "SSRF_PROXY_HTTP_URL", "http://proxy:3128"),
+        patch.object(dify_config, "SSRF_PROXY_HTTPS_URL", "http://proxy:3128"),
+        patch.object(ssrf_proxy, "HTTP_REQUEST_NODE_SSL_VERIFY", False),
+        patch("httpx.HTTPTransport", wraps=httpx.HTTPTransport) as transport,
+    ):
+        ssrf_proxy._create_client()
+
+    assert [call.kwargs["verify"] for call in transport.call_args_list] == [False, False]
+
+
+def test_cookies_are_not_shared_between_requests():
+    sent_cookies = []
+
+    def handle_request(self, request):
+        sent_cookies.append(request.headers.get("cookie"))
+        return httpx.Response(200, headers={"Set-Cookie": "session=secret; Path=/"}, request=request)
+
+    with patch("httpx.HTTPTransport.handle_request", handle_request):
+        make_request("GET", "http://example.com/login")
+        make_request("GET", "http://example.com/profile")
+        make_request("GET", "http://example.com/profile", cookies={"theme": "dark"})
+
+    assert sent_cookies == [None, None, "theme=dark"]
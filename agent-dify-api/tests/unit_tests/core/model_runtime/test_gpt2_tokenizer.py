@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.model_runtime.model_providers.__base.tokenizers import gpt2_tokenzier
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+
+
+class _WhitespaceEncoder:
+    def __init__(self):
+        self.encoded: list[str] = []
+        self.batches: list[list[str]] = []
+
+    def encode(self, text: str) -> list[str]:
+        self.encoded.append(text)
+        return text.split()
+
+    def encode_batch(self, texts: list[str], num_threads: int = 8) -> list[list[str]]:
+        self.batches.append(texts)
+        return [text.split() for text in texts]
+
+
+@pytest.fixture
+def encoder():
+    encoder = _WhitespaceEncoder()
+    with (
+        patch.object(gpt2_tokenzier, "_tokenizer", encoder),
+        patch.object(gpt2_tokenzier, "_token_count_cache", gpt2_tokenzier.LRUCache(maxsize=16)),
+    ):
+        yield encoder
+
+
+def test_count_batch_uses_cached_counts(encoder):
+    assert GPT2Tokenizer.count_batch(["a b", "c", "a b"]) == [2, 1, 2]
+    assert encoder.encoded == ["a b", "c"]
+
+    assert GPT2Tokenizer.get_num_tokens("c") == 1
+    assert GPT2Tokenizer.count_batch(["c", "d e f"]) == [1, 3]
+    assert encoder.encoded == ["a b", "c", "d e f"]
+
+
+def test_count_batch_encodes_large_batches_together(encoder):
+    texts = [f"token {i}" for i in range(gpt2_tokenzier._BATCH_THREAD_THRESHOLD)]
+
+    assert GPT2Tokenizer.count_batch(texts) == [2] * len(texts)
+    assert encoder.batches == [texts]
+    assert encoder.encoded == []
+
+
+def test_texts_with_equal_hashes_are_counted_separately(encoder):
+    class _Text(str):
+        def __hash__(self):
+            return 1
+
+    assert GPT2Tokenizer.count_batch([_Text("a b")]) == [2]
+    assert GPT2Tokenizer.count_batch([_Text("c")]) == [1]
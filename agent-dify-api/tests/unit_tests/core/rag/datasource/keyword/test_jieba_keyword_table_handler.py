@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from core.rag.datasource.keyword.jieba import jieba_keyword_table_handler
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+
+TEXTS = [
+    "Dify is an open-source LLM app development platform.",
+    "结巴中文分词支持精确模式和全模式。",
+    "Retrieval-augmented generation combines search with text generation.",
+]
+
+
+def test_batch_extract_keywords_matches_serial_extraction():
+    handler = JiebaKeywordTableHandler()
+
+    assert handler.batch_extract_keywords(TEXTS) == [handler.extract_keywords(text) for text in TEXTS]
+
+
+def test_batch_extract_keywords_keeps_given_keywords():
+    handler = JiebaKeywordTableHandler()
+
+    result = handler.batch_extract_keywords(TEXTS, keywords_list=[["dify"], [], None])
+
+    assert result[0] == {"dify"}
+    assert result[1] == handler.extract_keywords(TEXTS[1])
+    assert result[2] == handler.extract_keywords(TEXTS[2])
+
+
+def test_batch_extract_keywords_in_process_pool():
+    handler = JiebaKeywordTableHandler()
+    texts = TEXTS * 12
+
+    with (
+        patch.object(jieba_keyword_table_handler.dify_config, "KEYWORD_EXTRACTION_MAX_WORKERS", 2),
+        patch.object(jieba_keyword_table_handler, "_PARALLEL_MIN_TEXTS", 1),
+    ):
+        try:
+            result = handler.batch_extract_keywords(texts)
+            assert jieba_keyword_table_handler._pool is not None
+        finally:
+            jieba_keyword_table_handler._disable_pool()
+            jieba_keyword_table_handler._pool_disabled = False
+
+    assert result == [handler.extract_keywords(text) for text in texts]
+
+
+def test_subtokens_skip_stopwords():
+    handler = JiebaKeywordTableHandler()
+
+    assert handler._expand_tokens_with_subtokens({"the-retrieval"}) == {"the-retrieval", "retrieval"}
@@ -0,0 +1,151 @@
+import re
+from collections import defaultdict
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy.dialects import postgresql
+
+import commands
+from core.rag.datasource.keyword.jieba import jieba_postings
+from core.rag.datasource.keyword.jieba.jieba_postings import JiebaPostings
+from core.rag.models.document import Document
+
+
+@pytest.fixture
+def db():
+    with patch.object(jieba_postings, "db") as db:
+        yield db
+
+
+def _inserted_rows(db) -> set[tuple[str, str, str]]:
+    """Rows of the insert statements executed on the session, as (dataset_id, keyword, index_node_id)."""
+    rows: set[tuple[str, str, str]] = set()
+    for call in db.session.execute.call_args_list:
+        compiled = call.args[0].compile(dialect=postgresql.dialect())
+        assert "ON CONFLICT ON CONSTRAINT dataset_keyword_posting_unique_idx DO NOTHING" in str(compiled)
+        values: dict[str, dict[str, str]] = defaultdict(dict)
+        for name, value in compiled.params.items():
+            column, index = re.fullmatch(r"(\w+)_m(\d+)", name).groups()
+            values[index][column] = value
+        rows.update((row["dataset_id"], row["keyword"], row["index_node_id"]) for row in values.values())
+    return rows
+
+
+def _deleted_node_ids(db) -> list[list[str]]:
+    return [
+        call.args[1].right.value
+        for call in db.session.query.return_value.filter.call_args_list
+        if call.args[1].left.table.name == "dataset_keyword_postings"
+    ]
+
+
+def test_add_texts_replaces_the_postings_of_the_chunks(db):
+    texts = [
+        Document(page_content="Dify is an LLM app platform.", metadata={"doc_id": "node-1"}),
+        Document(page_content="Retrieval-augmented generation.", metadata={"doc_id": "node-2"}),
+    ]
+
+    JiebaPostings(MagicMock(id="dataset-1")).add_texts(
+        texts, keywords_list=[["dify", "llm", "dify"], ["rag", "x" * 256]]
+    )
+
+    assert _deleted_node_ids(db) == [["node-1", "node-2"]]
+    assert _inserted_rows(db) == {
+        ("dataset-1", "dify", "node-1"),
+        ("dataset-1", "llm", "node-1"),
+        ("dataset-1", "rag", "node-2"),
+    }
+    db.session.commit.assert_called()
+
+
+def test_delete_by_ids_deletes_postings_in_batches(db):
+    ids = [f"node-{i}" for i in range(jieba_postings._BATCH_SIZE + 1)]
+
+    JiebaPostings(MagicMock(id="dataset-1")).delete_by_ids(ids)
+
+    assert _deleted_node_ids(db) == [ids[: jieba_postings._BATCH_SIZE], ids[jieba_postings._BATCH_SIZE :]]
+    assert db.session.query.return_value.filter.return_value.delete.call_count == 2
+    db.session.commit.assert_called_once()
+
+
+def test_search_returns_chunks_in_order_of_matching_keywords(db):
+    ranking_query = MagicMock()
+    ranking = ranking_query.filter.return_value.group_by.return_value.order_by.return_value.limit.return_value
+    ranking.all.return_value = [
+        MagicMock(index_node_id="node-2", hits=2),
+        MagicMock(index_node_id="node-deleted", hits=2),
+        MagicMock(index_node_id="node-1", hits=1),
+    ]
+    segment_query = MagicMock()
+    segment_query.filter.return_value.all.return_value = [
+        MagicMock(index_node_id=node_id, content=f"content of {node_id}", document_id="document-1")
+        for node_id in ("node-1", "node-2")
+    ]
+    db.session.query.side_effect = [ranking_query, segment_query]
+
+    documents = JiebaPostings(MagicMock(id="dataset-1")).search("dify retrieval platform", top_k=3)
+
+    assert [document.metadata["doc_id"] for document in documents] == ["node-2", "node-1"]
+    assert documents[0].page_content == "content of node-2"
+    order_by = ranking_query.filter.return_value.group_by.return_value.order_by.call_args.args
+    assert [str(clause) for clause in order_by] == [
+        "count(dataset_keyword_postings.keyword) DESC",
+        "DatasetKeywordPosting.index_node_id",
+    ]
+    ranking_query.filter.return_value.group_by.return_value.order_by.return_value.limit.assert_called_once_with(3)
+
+
+def test_search_without_keywords_does_not_query(db):
+    assert JiebaPostings(MagicMock(id="dataset-1")).search("the of and") == []
+    db.session.query.assert_not_called()
+
+
+def test_import_keyword_table(db):
+    keyword_table = {"dify": ["node-1", "node-2"], "rag": ["node-2"], "x" * 256: ["node-3"]}
+
+    posting_count = JiebaPostings(MagicMock(id="dataset-1")).import_keyword_table(keyword_table)
+
+    assert posting_count == 3
+    assert _inserted_rows(db) == {
+        ("dataset-1", "dify", "node-1"),
+        ("dataset-1", "dify", "node-2"),
+        ("dataset-1", "rag", "node-2"),
+    }
+    db.session.commit.assert_called_once()
+
+
+def test_migrate_keyword_postings_imports_every_keyword_table():
+    keyword_tables = [
+        MagicMock(dataset_id="dataset-1", keyword_table_dict={"__data__": {"table": {"dify": ["node-1"]}}}),
+        MagicMock(dataset_id="dataset-2", keyword_table_dict={"__data__": {"table": {"rag": ["node-2"]}}}),
+        MagicMock(dataset_id="dataset-3", keyword_table_dict=None),
+    ]
+    page = MagicMock(has_next=False)
+    page.__iter__.return_value = iter(keyword_tables)
+    imported: list[tuple[str, dict]] = []
+
+    def import_keyword_table(self, keyword_table):
+        if self.dataset.id == "dataset-2":
+            raise RuntimeError("database unavailable")
+        imported.append((self.dataset.id, keyword_table))
+        return 1
+
+    with (
+        patch.object(commands, "DatasetKeywordTable") as keyword_table_model,
+        patch.object(commands, "db") as db,
+        patch.object(JiebaPostings, "import_keyword_table", import_keyword_table),
+    ):
+        keyword_table_model.query.order_by.return_value.paginate.return_value = page
+        db.session.query.return_value.filter.return_value.first.side_effect = [
+            MagicMock(id="dataset-1"),
+            MagicMock(id="dataset-2"),
+            MagicMock(id="dataset-3"),
+        ]
+        result = CliRunner().invoke(commands.migrate_keyword_postings)
+
+    assert result.exit_code == 0
+    assert imported == [("dataset-1", {"dify": ["node-1"]})]
+    assert "Failed to migrate keyword postings for dataset dataset-2." in result.output
+    assert "Migrated keyword postings for 1 datasets." in result.output
+    db.session.rollback.assert_called_once()
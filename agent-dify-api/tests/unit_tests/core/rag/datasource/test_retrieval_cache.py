@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.retrieval_cache import DatasetIndexVersion, RetrievalCache
+from core.rag.models.document import ChildDocument, Document
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+    def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        fields[field.encode()] = str(int(fields.get(field.encode(), 0)) + amount).encode()
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field.encode()] = value
+
+    def hlen(self, key):
+        return len(self.data.get(key, {}))
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def expire(self, key, ttl):
+        pass
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+
+@pytest.fixture
+def redis():
+    redis = FakeRedis()
+    with patch("core.rag.datasource.retrieval_cache.redis_client", redis):
+        yield redis
+
+
+@pytest.fixture
+def dataset():
+    return MagicMock(id="dataset-1", tenant_id="tenant-1", indexing_technique="high_quality")
+
+
+def _documents(*contents: str) -> list[Document]:
+    return [Document(page_content=content, metadata={"doc_id": content, "score": 0.5}) for content in contents]
+
+
+def test_cache_hit_on_normalized_query(redis, dataset):
+    RetrievalCache(dataset, {"top_k": 2}).set("what  is\tdify", _documents("a", "b"))
+
+    documents = RetrievalCache(dataset, {"top_k": 2}).get(" what is dify ")
+
+    assert documents == _documents("a", "b")
+    assert RetrievalCache(dataset, {"top_k": 3}).get("what is dify") is None
+    assert RetrievalCache.get_stats() == {"hits": 1, "semantic_hits": 0, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_documents_with_keyword_sets_are_cached_without_vectors(redis, dataset):
+    document = Document(
+        page_content="a",
+        vector=[0.1, 0.2],
+        metadata={"doc_id": "a", "score": 0.5, "keywords": {"dify"}},
+        children=[ChildDocument(page_content="child", vector=[0.3], metadata={"doc_id": "child"})],
+    )
+    RetrievalCache(dataset, {}).set("query", [document])
+
+    documents = RetrievalCache(dataset, {}).get("query")
+
+    assert documents == [
+        Document(
+            page_content="a",
+            metadata={"doc_id": "a", "score": 0.5, "keywords": ["dify"]},
+            children=[ChildDocument(page_content="child", metadata={"doc_id": "child"})],
+        )
+    ]
+
+
+def test_index_version_bump_invalidates_entries(redis, dataset):
+    RetrievalCache(dataset, {}).set("query", _documents("a"))
+
+    DatasetIndexVersion.bump(dataset.id)
+
+    assert RetrievalCache(dataset, {}).get("query") is None
+
+
+def test_semantic_lookup_reuses_near_duplicate_query(redis, dataset):
+    embeddings = {"what is dify": [1.0, 0.0], "what's dify": [0.99, 0.1], "pricing": [0.0, 1.0]}
+    with (
+        patch("core.rag.datasource.retrieval_cache.dify_config.RETRIEVAL_CACHE_SEMANTIC_THRESHOLD", 0.95),
+        patch.object(RetrievalCache, "_embed_query", side_effect=lambda query: embeddings[query]),
+    ):
+        RetrievalCache(dataset, {}).set("what is dify", _documents("a"))
+
+        assert RetrievalCache(dataset, {}).get("what's dify") == _documents("a")
+        assert RetrievalCache(dataset, {}).get("pricing") is None
+
+    assert RetrievalCache.get_stats()["semantic_hits"] == 1
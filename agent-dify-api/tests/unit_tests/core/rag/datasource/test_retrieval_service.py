@@ -0,0 +1,142 @@
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.retrieval_executor import RetrievalExecutor
+from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.models.document import Document
+
+
+@pytest.fixture
+def dataset():
+    dataset = MagicMock(id="dataset-1", tenant_id="tenant-1", available_document_count=1, available_segment_count=1)
+    with patch.object(RetrievalService, "_get_dataset", return_value=dataset):
+        yield dataset
+
+
+def _search(content: str, delay: float = 0.0):
+    def search(all_documents: list, **kwargs):
+        time.sleep(delay)
+        all_documents.append(Document(page_content=content, metadata={"doc_id": content}))
+
+    return search
+
+
+def test_retrieve_reports_branches(dataset):
+    with (
+        patch.object(RetrievalService, "embedding_search", _search("vector")),
+        patch.object(RetrievalService, "full_text_index_search", _search("full text")),
+        patch("core.rag.datasource.retrieval_service.DataPostProcessor") as post_processor,
+    ):
+        post_processor.return_value.invoke.side_effect = lambda documents, **kwargs: documents
+        result = RetrievalService.retrieve_with_report("hybrid_search", dataset.id, "query", top_k=2)
+
+    assert [document.page_content for document in result.documents] == ["vector", "full text"]
+    assert not result.partial
+    assert [(report.name, report.status, report.document_count) for report in result.branches] == [
+        ("embedding_search", "completed", 1),
+        ("full_text_search", "completed", 1),
+    ]
+    assert all(report.latency is not None for report in result.branches)
+
+
+def test_retrieve_returns_partial_result_on_deadline(dataset):
+    with (
+        patch.object(RetrievalService, "embedding_search", _search("vector")),
+        patch.object(RetrievalService, "full_text_index_search", _search("full text", delay=0.5)),
+        patch("core.rag.datasource.retrieval_service.dify_config.RETRIEVAL_BRANCH_TIMEOUT", 0.1),
+        patch("core.rag.datasource.retrieval_service.DataPostProcessor") as post_processor,
+    ):
+        post_processor.return_value.invoke.side_effect = lambda documents, **kwargs: documents
+        result = RetrievalService.retrieve_with_report("hybrid_search", dataset.id, "query", top_k=2)
+
+    assert result.partial
+    assert [document.page_content for document in result.documents] == ["vector"]
+    assert [report.status for report in result.branches] == ["completed", "timeout"]
+
+
+def test_branch_deadline_starts_when_the_branch_runs():
+    release = threading.Event()
+    with patch.object(RetrievalExecutor, "_branch_executor", ThreadPoolExecutor(max_workers=1)):
+        busy = RetrievalExecutor.submit_branch("tenant-queued", time.perf_counter() + 5, release.wait)
+        queued = RetrievalExecutor.submit_branch("tenant-queued", time.perf_counter() + 5, time.sleep, 0.1)
+        time.sleep(0.2)
+        release.set()
+
+        # the queued branch waited longer than its timeout for the worker, but ran within it
+        queued.result(time.perf_counter() + 5, 0.15)
+        busy.future.result()
+
+
+def test_branch_that_does_not_start_before_the_queue_deadline_is_cancelled():
+    release = threading.Event()
+    with patch.object(RetrievalExecutor, "_branch_executor", ThreadPoolExecutor(max_workers=1)):
+        busy = RetrievalExecutor.submit_branch("tenant-queued", time.perf_counter() + 5, release.wait)
+        queued = RetrievalExecutor.submit_branch("tenant-queued", time.perf_counter() + 5, time.sleep, 0)
+
+        with pytest.raises(TimeoutError):
+            queued.result(time.perf_counter() + 0.05, 5)
+        release.set()
+        busy.future.result()
+
+    assert queued.future.cancelled()
+
+
+def test_tenant_concurrency_is_bounded():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def branch():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    with patch("core.rag.datasource.retrieval_executor.dify_config.RETRIEVAL_TENANT_MAX_CONCURRENCY", 2):
+        futures = [RetrievalExecutor.submit_branch("tenant-bounded", time.perf_counter() + 5, branch) for _ in range(6)]
+        for future in futures:
+            future.future.result()
+
+    assert peak <= 2
+
+
+def test_tenant_semaphores_are_released_once_idle():
+    release = threading.Event()
+    branch = RetrievalExecutor.submit_branch("tenant-idle", time.perf_counter() + 5, release.wait)
+
+    assert "tenant-idle" in RetrievalExecutor._tenant_semaphores
+    release.set()
+    branch.future.result()
+    del branch
+    # the worker thread drops its reference to the finished branch right after running it
+    deadline = time.perf_counter() + 5
+    while "tenant-idle" in RetrievalExecutor._tenant_semaphores and time.perf_counter() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+
+    assert "tenant-idle" not in RetrievalExecutor._tenant_semaphores
+
+
+def test_retrieve_serves_cached_documents(dataset):
+    retrieval_cache = MagicMock()
+    retrieval_cache.get.side_effect = [None, [Document(page_content="cached")]]
+    with (
+        patch("core.rag.datasource.retrieval_service.dify_config.RETRIEVAL_CACHE_ENABLED", True),
+        patch("core.rag.datasource.retrieval_service.RetrievalCache", return_value=retrieval_cache),
+        patch.object(RetrievalService, "embedding_search", _search("vector")),
+    ):
+        first = RetrievalService.retrieve_with_report("semantic_search", dataset.id, "query", top_k=2)
+        second = RetrievalService.retrieve_with_report("semantic_search", dataset.id, "query", top_k=2)
+
+    assert not first.cached
+    retrieval_cache.set.assert_called_once_with("query", first.documents)
+    assert second.cached
+    assert [document.page_content for document in second.documents] == ["cached"]
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.vdb.milvus.milvus_vector import MilvusConfig, MilvusVector
+from core.rag.datasource.vdb.pgvector.pgvector import PGVector, PGVectorConfig
+from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.models.document import Document
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    VectorClientRegistry.clear()
+    yield
+    VectorClientRegistry.clear()
+
+
+def _documents(*doc_ids: str) -> list[Document]:
+    return [Document(page_content=f"text {doc_id}", metadata={"doc_id": doc_id}) for doc_id in doc_ids]
+
+
+def test_existing_ids_falls_back_to_text_exists():
+    vector = MagicMock(spec=BaseVector)
+    vector.text_exists.side_effect = lambda id: id in {"node-1", "node-3"}
+
+    assert BaseVector.existing_ids(vector, ["node-1", "node-2", "node-3"]) == {"node-1", "node-3"}
+    assert vector.text_exists.call_count == 3
+
+
+def test_duplicate_texts_are_filtered_with_one_lookup():
+    processor = MagicMock(registered_client=None)
+    processor.existing_ids.return_value = {"node-1", "node-3"}
+    with (
+        patch.object(Vector, "_get_embeddings", return_value=MagicMock()),
+        patch.object(Vector, "_init_vector", return_value=processor),
+    ):
+        vector = Vector(dataset=MagicMock())
+
+    documents = _documents("node-0", "node-1", "node-2", "node-3")
+    documents.append(Document(page_content="without metadata"))
+    filtered = vector._filter_duplicate_texts(documents)
+
+    assert [document.page_content for document in filtered] == ["text node-0", "text node-2", "without metadata"]
+    processor.existing_ids.assert_called_once_with(["node-0", "node-1", "node-2", "node-3"])
+    processor.text_exists.assert_not_called()
+
+
+def test_pgvector_checks_ids_in_one_query():
+    config = PGVectorConfig(
+        host="localhost",
+        port=5432,
+        user="postgres",
+        password="password",
+        database="dify",
+        min_connection=1,
+        max_connection=2,
+    )
+    with patch("psycopg2.pool.ThreadedConnectionPool"):
+        vector = PGVector("collection", config)
+    cursor = vector.pool.getconn.return_value.cursor.return_value
+    cursor.__iter__.return_value = iter([("node-1",)])
+
+    assert vector.existing_ids(["node-1", "node-2"]) == {"node-1"}
+    cursor.execute.assert_called_once_with(
+        "SELECT id FROM embedding_collection WHERE id IN %s", (("node-1", "node-2"),)
+    )
+    assert vector.existing_ids([]) == set()
+
+
+def test_milvus_queries_ids_in_batches():
+    config = MilvusConfig(uri="http://milvus:19530", user="root", password="Milvus")
+    with patch("core.rag.datasource.vdb.milvus.milvus_vector.MilvusClient") as client_cls:
+        client = client_cls.return_value
+        client.has_collection.return_value = True
+        client.get_server_version.return_value = "2.5.4"
+        vector = MilvusVector("collection", config)
+    client.query.side_effect = [[{"metadata": {"doc_id": "node-0"}}], [{"metadata": {"doc_id": "node-2"}}]]
+
+    assert vector.existing_ids(["node-0", "node-1", "node-2"], batch_size=2) == {"node-0", "node-2"}
+    assert [call.kwargs["filter"] for call in client.query.call_args_list] == [
+        'metadata["doc_id"] in ["node-0", "node-1"]',
+        'metadata["doc_id"] in ["node-2"]',
+    ]
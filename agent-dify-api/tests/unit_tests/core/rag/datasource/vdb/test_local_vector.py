@@ -0,0 +1,124 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from core.rag.datasource.vdb.local import local_vector
+from core.rag.datasource.vdb.local.local_vector import LocalVector, LocalVectorConfig
+from core.rag.models.document import Document
+
+
+def _documents(count: int, document_id: str = "document-1", start: int = 0) -> list[Document]:
+    return [
+        Document(page_content=f"text {i}", metadata={"doc_id": f"node-{i}", "document_id": document_id})
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def vector_path(tmp_path):
+    local_vector._indexes.clear()
+    return str(tmp_path)
+
+
+def test_search_returns_exact_top_k(vector_path):
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(300, 16)).astype(np.float32)
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    vector.create(_documents(200), embeddings[:200].tolist())
+    vector.add_texts(_documents(100, document_id="document-2", start=200), embeddings[200:].tolist())
+
+    query = embeddings[42] + 0.01
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+    hits = vector.search_by_vector(query.tolist(), top_k=5, score_threshold=-1)
+    assert [hit.metadata["doc_id"] for hit in hits] == [f"node-{i}" for i in expected]
+    assert hits[0].metadata["score"] == pytest.approx(1.0, abs=1e-3)
+
+    filtered = vector.search_by_vector(query.tolist(), top_k=5, score_threshold=-1, document_ids_filter=["document-2"])
+    assert len(filtered) == 5
+    assert all(hit.metadata["document_id"] == "document-2" for hit in filtered)
+
+
+def test_deletes_are_seen_by_other_processes(vector_path):
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    vector.add_texts(_documents(3), [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    vector.delete_by_ids(["node-0"])
+    vector.delete_by_metadata_field("doc_id", "node-1")
+
+    # a fresh index stands in for another process reading the same directory
+    local_vector._indexes.clear()
+    reader = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    assert not reader.text_exists("node-0")
+    assert reader.existing_ids(["node-0", "node-1", "node-2", "node-3"]) == {"node-2"}
+    assert reader.get_ids_by_metadata_field("document_id", "document-1") == ["node-2"]
+    assert [hit.metadata["doc_id"] for hit in reader.search_by_vector([1.0, 0.0], top_k=3)] == ["node-2"]
+
+
+def test_documents_without_metadata_are_skipped_with_their_embeddings(vector_path):
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    documents = [Document(page_content="no metadata", metadata={}), *_documents(2)]
+
+    assert vector.add_texts(documents, [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]) == ["node-0", "node-1"]
+    hit = vector.search_by_vector([0.0, 1.0], top_k=1)[0]
+    assert (hit.metadata["doc_id"], hit.page_content) == ("node-0", "text 0")
+    assert hit.metadata["score"] == pytest.approx(1.0)
+
+
+def test_torn_log_line_is_ignored_and_overwritten(vector_path):
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    vector.add_texts(_documents(1), [[1.0, 0.0]])
+    index = vector._index
+    with open(index._log_path(), "ab") as f:
+        f.write(b'{"row": 1, "dimension": 2, "records": [["node-x"')
+
+    local_vector._indexes.clear()
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    assert not vector.text_exists("node-x")
+    vector.add_texts(_documents(1, start=1), [[0.0, 1.0]])
+
+    local_vector._indexes.clear()
+    reader = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    assert reader.text_exists("node-0")
+    assert reader.text_exists("node-1")
+    assert not reader.text_exists("node-x")
+
+
+def test_compaction_drops_deleted_rows(vector_path):
+    rng = np.random.default_rng(2)
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    with patch.object(local_vector, "_COMPACT_MIN_DELETED_ROWS", 10):
+        vector.add_texts(_documents(40), rng.normal(size=(40, 8)).tolist())
+        old_generation = vector._index.generation
+        vector.delete_by_ids([f"node-{i}" for i in range(30)])
+
+    assert vector._index.generation != old_generation
+    assert vector._index.total_rows == 10
+    assert sorted(vector.get_ids_by_metadata_field("document_id", "document-1")) == sorted(
+        f"node-{i}" for i in range(30, 40)
+    )
+    assert vector.search_by_vector(rng.normal(size=8).tolist(), top_k=20, score_threshold=-1)
+
+
+def test_ivf_search_finds_near_neighbours(vector_path):
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(8, 32))
+    embeddings = np.repeat(centers, 100, axis=0) + rng.normal(scale=0.05, size=(800, 32))
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path, ivf_min_rows=100, ivf_probes=3))
+    vector.add_texts(_documents(800), embeddings.tolist())
+
+    hits = vector.search_by_vector(embeddings[150].tolist(), top_k=3)
+    assert hits[0].metadata["doc_id"] == "node-150"
+    assert all(100 <= int(hit.metadata["doc_id"].split("-")[1]) < 200 for hit in hits)
+    assert os.path.exists(vector._index._ivf_path())
+
+
+def test_delete_removes_collection(vector_path):
+    vector = LocalVector("collection", LocalVectorConfig(path=vector_path))
+    vector.add_texts(_documents(1), [[1.0]])
+    vector.delete()
+
+    assert not os.path.exists(os.path.join(vector_path, "collection"))
+    assert vector.search_by_vector([1.0]) == []
@@ -0,0 +1,129 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from configs import dify_config
+from core.rag.datasource.vdb.milvus.milvus_vector import MilvusConfig, MilvusVector
+from core.rag.datasource.vdb.pgvector.pgvector import PGVector, PGVectorConfig
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry, VectorStorePoolTimeoutError
+from core.rag.datasource.vdb.vector_factory import Vector
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    VectorClientRegistry.clear()
+    yield VectorClientRegistry
+    VectorClientRegistry.clear()
+
+
+def _pgvector_config(**kwargs) -> PGVectorConfig:
+    values = {
+        "host": "localhost",
+        "port": 5432,
+        "user": "postgres",
+        "password": "password",
+        "database": "dify",
+        "min_connection": 1,
+        "max_connection": 2,
+    }
+    return PGVectorConfig(**(values | kwargs))
+
+
+def test_client_is_created_once_per_settings():
+    factory = MagicMock(side_effect=lambda: object())
+
+    key_hash = VectorClientRegistry.settings_hash("key")
+    first = VectorClientRegistry.get("qdrant", "http://qdrant:6333", key_hash, factory)
+    second = VectorClientRegistry.get("qdrant", "http://qdrant:6333", key_hash, factory)
+    other_hash = VectorClientRegistry.settings_hash("other")
+    other = VectorClientRegistry.get("qdrant", "http://qdrant:6333", other_hash, factory)
+
+    assert first is second
+    assert other.client is not first.client
+    assert factory.call_count == 2
+
+
+def test_lease_waits_for_a_free_connection_and_reports_saturation():
+    registered = VectorClientRegistry.get("milvus", "http://milvus:19530", "", object, max_connections=2)
+    entered = threading.Barrier(3)
+    release = threading.Event()
+
+    def hold():
+        with VectorClientRegistry.lease(registered):
+            entered.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    entered.wait()
+
+    (stats,) = VectorClientRegistry.get_pool_stats()
+    assert stats.in_use == 2
+    assert stats.saturated
+
+    with patch.object(dify_config, "VECTOR_STORE_POOL_TIMEOUT", 0.05):
+        with pytest.raises(VectorStorePoolTimeoutError):
+            with VectorClientRegistry.lease(registered):
+                pass
+
+    threading.Timer(0.05, release.set).start()
+    started_at = time.perf_counter()
+    with VectorClientRegistry.lease(registered):
+        assert time.perf_counter() - started_at >= 0.04
+    for thread in threads:
+        thread.join()
+
+    (stats,) = VectorClientRegistry.get_pool_stats()
+    assert (stats.in_use, stats.peak_in_use, stats.leases, stats.waits, stats.timeouts) == (0, 2, 3, 1, 1)
+
+
+def test_lease_is_reentrant():
+    registered = VectorClientRegistry.get("weaviate", "http://weaviate:8080", "", object, max_connections=1)
+
+    with VectorClientRegistry.lease(registered), VectorClientRegistry.lease(registered):
+        assert VectorClientRegistry.get_pool_stats()[0].in_use == 1
+
+
+def test_pgvector_collections_share_one_pool():
+    with patch("psycopg2.pool.ThreadedConnectionPool", side_effect=lambda *args, **kwargs: MagicMock()) as pool_cls:
+        first = PGVector("collection_1", _pgvector_config())
+        second = PGVector("collection_2", _pgvector_config())
+        other_database = PGVector("collection_1", _pgvector_config(database="other"))
+
+    assert first.pool is second.pool
+    assert other_database.pool is not first.pool
+    assert pool_cls.call_count == 2
+    assert first.registered_client.max_connections == 2
+
+    VectorClientRegistry.clear()
+    first.pool.closeall.assert_called_once()
+
+
+def test_milvus_checks_the_server_version_once_per_client():
+    config = MilvusConfig(uri="http://milvus:19530", user="root", password="Milvus", enable_hybrid_search=True)
+    with patch("core.rag.datasource.vdb.milvus.milvus_vector.MilvusClient") as client_cls:
+        client_cls.return_value.has_collection.return_value = False
+        client_cls.return_value.get_server_version.return_value = "2.5.4"
+        vectors = [MilvusVector(f"collection_{i}", config) for i in range(3)]
+
+    assert client_cls.call_count == 1
+    assert client_cls.return_value.get_server_version.call_count == 1
+    assert all(vector._hybrid_search_enabled for vector in vectors)
+
+
+def test_vector_operations_lease_a_connection():
+    registered = VectorClientRegistry.get("qdrant", "http://qdrant:6333", "", object, max_connections=1)
+    processor = MagicMock(registered_client=registered)
+    processor.search_by_vector.side_effect = lambda *args, **kwargs: VectorClientRegistry.get_pool_stats()[0].in_use
+
+    with (
+        patch.object(Vector, "_get_embeddings", return_value=MagicMock()),
+        patch.object(Vector, "_init_vector", return_value=processor),
+    ):
+        vector = Vector(dataset=MagicMock())
+
+    assert vector.search_by_vector("query") == 1
+    assert VectorClientRegistry.get_pool_stats()[0].leases == 1
@@ -0,0 +1,48 @@
+import pickle
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from core.rag.embedding.embedding_cache import EmbeddingCache
+from models.dataset import Embedding
+
+
+def test_embedding_codec_roundtrip():
+    vector = [0.1, -0.2, 0.3]
+    data = Embedding.encode_embedding(vector)
+
+    assert data.startswith(Embedding.FLOAT32_PREFIX)
+    assert len(data) == len(Embedding.FLOAT32_PREFIX) + 4 * len(vector)
+    decoded = Embedding.decode_embedding(data)
+    assert decoded.dtype == np.dtype("<f4")
+    assert np.allclose(decoded, vector)
+
+
+def test_embedding_codec_reads_legacy_pickle():
+    legacy = pickle.dumps([0.5, 0.25], protocol=pickle.HIGHEST_PROTOCOL)
+
+    assert np.allclose(Embedding.decode_embedding(legacy), [0.5, 0.25])
+
+
+def test_get_many_queries_each_tier_once():
+    cache = EmbeddingCache("provider", "model-tiers")
+    EmbeddingCache._lru[cache._lru_key("h1")] = np.array([1.0], dtype="<f4")
+
+    redis = MagicMock()
+    redis.mget.return_value = [Embedding.encode_embedding([2.0]), None]
+    session = MagicMock()
+    session.query.return_value.filter.return_value.all.return_value = [("h3", Embedding.encode_embedding([3.0]))]
+
+    with (
+        patch("core.rag.embedding.embedding_cache.redis_client", redis),
+        patch("core.rag.embedding.embedding_cache.db") as db,
+    ):
+        db.session = session
+        found = cache.get_many(["h1", "h2", "h3", "h1"])
+
+    assert {hash: vector.tolist() for hash, vector in found.items()} == {"h1": [1.0], "h2": [2.0], "h3": [3.0]}
+    redis.mget.assert_called_once_with([cache._redis_key("h2"), cache._redis_key("h3")])
+    session.query.return_value.filter.assert_called_once()
+    # database hits are promoted to redis and the in-process cache
+    assert redis.pipeline.return_value.setex.call_count == 1
+    assert EmbeddingCache._lru[cache._lru_key("h3")].tolist() == [3.0]
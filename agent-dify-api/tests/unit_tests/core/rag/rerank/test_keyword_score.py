@@ -0,0 +1,42 @@
+import math
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from core.rag.models.document import Document
+from core.rag.rerank import keyword_score
+from core.rag.rerank.keyword_score import calculate_keyword_scores, get_documents_keywords
+
+
+def test_keyword_scores_match_tfidf_cosine():
+    documents_keywords = [{"dify", "rag"}, {"rag", "rerank", "vector"}, {"jieba"}]
+
+    scores = calculate_keyword_scores({"rag", "vector", "unknown"}, documents_keywords)
+
+    idf_rag = math.log(4 / 3) + 1
+    idf_single = math.log(4 / 2) + 1
+    query_norm = math.sqrt(idf_rag**2 + idf_single**2)
+    assert scores[0] == pytest.approx(idf_rag**2 / (query_norm * math.sqrt(idf_rag**2 + idf_single**2)))
+    assert scores[1] == pytest.approx(
+        (idf_rag**2 + idf_single**2) / (query_norm * math.sqrt(idf_rag**2 + 2 * idf_single**2))
+    )
+    assert scores[2] == 0.0
+
+
+def test_keyword_scores_without_matches():
+    assert calculate_keyword_scores({"dify"}, [set(), {"rag"}]) == [0.0, 0.0]
+    assert calculate_keyword_scores({"dify"}, []) == []
+
+
+def test_documents_keywords_fall_back_to_jieba_and_roll_back_when_loading_fails():
+    documents = [Document(page_content="Dify retrieval", metadata={"doc_id": "node-1", "dataset_id": "dataset-1"})]
+    with (
+        patch.object(keyword_score, "db") as db,
+        patch.object(keyword_score.JiebaKeywordTableHandler, "batch_extract_keywords", return_value=[{"dify"}]),
+    ):
+        db.session.query.side_effect = OperationalError("SELECT", {}, Exception("connection lost"))
+        keywords = get_documents_keywords(documents)
+
+    assert keywords == [{"dify"}]
+    db.session.rollback.assert_called_once()
@@ -0,0 +1,46 @@
+from core.rag.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.rag.splitter.text_splitter import RecursiveCharacterTextSplitter
+
+
+class _CountingLength:
+    def __init__(self):
+        self.measured: list[str] = []
+
+    def __call__(self, texts: list[str]) -> list[int]:
+        self.measured.extend(texts)
+        return [len(text) for text in texts]
+
+
+def test_merge_does_not_measure_splits_again():
+    length_function = _CountingLength()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=12, chunk_overlap=4, keep_separator=False, length_function=length_function
+    )
+
+    chunks = splitter.split_text("aaa bbb ccc ddd eee fff ggg")
+
+    assert chunks == ["aaa bbb ccc", "ccc ddd eee", "eee fff ggg"]
+    # every word once, plus the separator
+    assert sorted(length_function.measured) == [" ", "aaa", "bbb", "ccc", "ddd", "eee", "fff", "ggg"]
+
+
+def test_split_iter_matches_split_text():
+    text = "\n\n".join(f"paragraph {i} " + "word " * (i * 7 % 40) for i in range(50))
+    splitter = FixedRecursiveCharacterTextSplitter(
+        fixed_separator="\n\n", separators=["\n", " ", ""], chunk_size=60, chunk_overlap=10, keep_separator=False
+    )
+
+    assert list(splitter.split_iter(text)) == splitter.split_text(text)
+
+
+def test_split_iter_is_lazy():
+    length_function = _CountingLength()
+    splitter = FixedRecursiveCharacterTextSplitter(
+        fixed_separator="\n\n", chunk_size=20, chunk_overlap=0, length_function=length_function
+    )
+    text = "\n\n".join(f"short piece {i}" for i in range(10_000))
+
+    first = next(splitter.split_iter(text))
+
+    assert first == "short piece 0"
+    assert len(length_function.measured) <= FixedRecursiveCharacterTextSplitter._LENGTH_BATCH_SIZE
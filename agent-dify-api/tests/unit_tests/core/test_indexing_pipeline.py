@@ -0,0 +1,98 @@
+import threading
+import time
+
+from flask import current_app
+
+from core.indexing_pipeline import StagedPipeline
+
+
+def _pipeline(on_error=None) -> StagedPipeline:
+    return StagedPipeline(current_app._get_current_object(), 2, on_error or (lambda item, error: None))
+
+
+def test_items_flow_through_stages_with_bounded_queues():
+    results = []
+    lock = threading.Lock()
+    pipeline = _pipeline()
+
+    def double(item):
+        pipeline.put("collect", item * 2)
+
+    def collect(item):
+        time.sleep(0.001)
+        with lock:
+            results.append(item)
+
+    pipeline.add_stage("double", double, workers=2)
+    pipeline.add_stage("collect", collect)
+    stats = pipeline.run("double", range(50))
+
+    assert sorted(results) == [i * 2 for i in range(50)]
+    assert [(stage.name, stage.items) for stage in stats] == [("double", 50), ("collect", 50)]
+    assert all(stage.max_queue_depth <= 2 for stage in stats)
+
+
+def test_partitioned_stage_routes_keys_to_one_worker():
+    threads_by_key: dict[int, set[str]] = {}
+    lock = threading.Lock()
+    pipeline = _pipeline()
+
+    def route(item):
+        pipeline.put("work", item, key=item % 3)
+
+    def work(item):
+        with lock:
+            threads_by_key.setdefault(item % 3, set()).add(threading.current_thread().name)
+
+    pipeline.add_stage("route", route)
+    pipeline.add_stage("work", work, workers=3, partitioned=True)
+    pipeline.run("route", range(30))
+
+    assert all(len(thread_names) == 1 for thread_names in threads_by_key.values())
+    assert len(set.union(*threads_by_key.values())) == 3
+
+
+def test_handler_errors_are_reported_and_do_not_stop_the_pipeline():
+    errors = []
+    handled = []
+    pipeline = _pipeline(on_error=lambda item, error: errors.append((item, str(error))))
+
+    def handle(item):
+        if item == 3:
+            raise ValueError("bad item")
+        handled.append(item)
+
+    pipeline.add_stage("handle", handle)
+    pipeline.run("handle", range(5))
+
+    assert errors == [(3, "bad item")]
+    assert handled == [0, 1, 2, 4]
+
+
+def test_failing_feed_aborts_the_pipeline_instead_of_deadlocking():
+    pipeline = _pipeline()
+    errors = []
+
+    def fan_out(item):
+        for i in range(20):
+            pipeline.put("slow", i)
+
+    def items():
+        yield 0
+        time.sleep(0.05)
+        raise RuntimeError("extraction failed")
+
+    def run():
+        try:
+            pipeline.run("fan_out", items())
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    pipeline.add_stage("fan_out", fan_out)
+    pipeline.add_stage("slow", lambda item: time.sleep(0.01))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert errors == ["extraction failed"]
@@ -0,0 +1,126 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.indexing_runner import IndexingRunner
+from core.rag.datasource.keyword.keyword_type import KeyWordType
+from core.rag.models.document import Document
+
+_dataset_documents: dict[str, MagicMock] = {}
+
+
+def _dataset_document(document_id: str) -> MagicMock:
+    dataset_document = MagicMock(id=document_id, dataset_id="dataset-1", doc_form="text_model")
+    _dataset_documents[document_id] = dataset_document
+    return dataset_document
+
+
+@pytest.fixture
+def runner():
+    runner = IndexingRunner.__new__(IndexingRunner)
+    runner.model_manager = MagicMock()
+    dataset = MagicMock(id="dataset-1", tenant_id="tenant-1", indexing_technique="high_quality")
+    with (
+        patch("core.indexing_runner.Dataset") as dataset_model,
+        patch("core.indexing_runner.DatasetDocument") as dataset_document_model,
+        patch("core.indexing_runner.db"),
+        patch("core.indexing_runner.DatasetDocumentStore"),
+        patch("core.indexing_runner.IndexProcessorFactory"),
+        patch("core.indexing_runner.dify_config.INDEXING_PIPELINE_PAGES_PER_BATCH", 4),
+    ):
+        dataset_model.query.filter_by.return_value.first.return_value = dataset
+        dataset_document_model.query.filter_by.side_effect = lambda id: MagicMock(
+            first=MagicMock(return_value=_dataset_documents[id])
+        )
+        yield runner
+
+
+@pytest.mark.parametrize(
+    ("keyword_store", "keyword_calls_per_document"),
+    [
+        # the whole keyword table is rewritten on each call, so it is updated once per document
+        (KeyWordType.JIEBA, 1),
+        (KeyWordType.JIEBA_POSTINGS, 3),
+    ],
+)
+def test_run_indexes_every_page_batch(runner, keyword_store, keyword_calls_per_document):
+    indexed: list[str] = []
+    keyword_indexed: list[str] = []
+    keyword_calls: list[str] = []
+    statuses: list[tuple[str, str, int]] = []
+    lock = threading.Lock()
+
+    def extract(index_processor, dataset_document, process_rule):
+        return [Document(page_content=f"{dataset_document.id} page {i}", metadata={}) for i in range(10)]
+
+    def transform(index_processor, dataset, text_docs, doc_language, process_rule):
+        return [Document(page_content=doc.page_content, metadata={"doc_id": doc.page_content}) for doc in text_docs]
+
+    def process_chunk(flask_app, index_processor, chunk_documents, dataset, document_id, embedding_model_instance):
+        with lock:
+            indexed.extend(document.page_content for document in chunk_documents)
+        return len(chunk_documents)
+
+    def process_keyword_index(flask_app, dataset_id, document_id, documents):
+        with lock:
+            keyword_indexed.extend(document.page_content for document in documents)
+            keyword_calls.append(document_id)
+
+    def update_status(document_id, after_indexing_status, extra_update_params=None):
+        tokens = next((value for key, value in (extra_update_params or {}).items() if isinstance(value, int)), 0)
+        with lock:
+            statuses.append((document_id, after_indexing_status, tokens))
+
+    with (
+        patch.object(runner, "_extract", side_effect=extract),
+        patch.object(runner, "_transform", side_effect=transform),
+        patch.object(runner, "_process_chunk", side_effect=process_chunk),
+        patch.object(IndexingRunner, "_process_keyword_index", side_effect=process_keyword_index),
+        patch.object(IndexingRunner, "_update_document_index_status", side_effect=update_status),
+        patch("core.indexing_runner.dify_config.KEYWORD_STORE", keyword_store),
+    ):
+        runner.run([_dataset_document("doc-1"), _dataset_document("doc-2")])
+
+    expected = sorted(f"doc-{d} page {i}" for d in (1, 2) for i in range(10))
+    assert sorted(indexed) == expected
+    assert sorted(keyword_indexed) == expected
+    assert sorted(keyword_calls) == ["doc-1"] * keyword_calls_per_document + ["doc-2"] * keyword_calls_per_document
+    for document_id in ("doc-1", "doc-2"):
+        assert [(status, tokens) for doc, status, tokens in statuses if doc == document_id] == [
+            ("indexing", 0),
+            ("completed", 10),
+        ]
+
+
+def test_run_marks_failed_document_without_stopping_the_others(runner):
+    completed: list[str] = []
+    failing_document = _dataset_document("doc-2")
+
+    def transform(index_processor, dataset, text_docs, doc_language, process_rule):
+        if text_docs[0].metadata["document_id"] == "doc-2":
+            raise ValueError("split failed")
+        return [Document(page_content=doc.page_content, metadata={"doc_id": doc.page_content}) for doc in text_docs]
+
+    def update_status(document_id, after_indexing_status, extra_update_params=None):
+        if after_indexing_status == "completed":
+            completed.append(document_id)
+
+    with (
+        patch.object(
+            runner,
+            "_extract",
+            side_effect=lambda index_processor, dataset_document, process_rule: [
+                Document(page_content="page", metadata={"document_id": dataset_document.id})
+            ],
+        ),
+        patch.object(runner, "_transform", side_effect=transform),
+        patch.object(runner, "_process_chunk", return_value=1),
+        patch.object(IndexingRunner, "_process_keyword_index"),
+        patch.object(IndexingRunner, "_update_document_index_status", side_effect=update_status),
+    ):
+        runner.run([_dataset_document("doc-1"), failing_document])
+
+    assert completed == ["doc-1"]
+    assert failing_document.indexing_status == "error"
+    assert failing_document.error == "split failed"
@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.graph_cache import GraphCache, graph_config_hash
+
+
+def _graph_config(answer: str = "1") -> dict:
+    return {
+        "edges": [
+            {"id": "start-source-llm-target", "source": "start", "target": "llm"},
+            {"id": "llm-source-answer-target", "source": "llm", "target": "answer"},
+            {"id": "iteration-start-source-code-target", "source": "iteration-start", "target": "code"},
+        ],
+        "nodes": [
+            {"data": {"type": "start"}, "id": "start"},
+            {"data": {"type": "llm"}, "id": "llm"},
+            {"data": {"type": "answer", "title": "answer", "answer": answer}, "id": "answer"},
+            {"data": {"type": "iteration-start", "iteration_id": "iteration"}, "id": "iteration-start"},
+            {"data": {"type": "code", "iteration_id": "iteration"}, "id": "code"},
+        ],
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    GraphCache.clear()
+    yield
+    GraphCache.clear()
+
+
+def test_get_reuses_compiled_graph_until_config_changes():
+    with patch.object(Graph, "init", wraps=Graph.init) as init:
+        graph = GraphCache.get(workflow_id="workflow-1", graph_config=_graph_config())
+        assert GraphCache.get(workflow_id="workflow-1", graph_config=_graph_config()) is graph
+        assert init.call_count == 1
+
+        changed = GraphCache.get(workflow_id="workflow-1", graph_config=_graph_config(answer="2"))
+        assert changed is not graph
+        assert init.call_count == 2
+
+    assert graph.config_hash == graph_config_hash(_graph_config())
+    stats = GraphCache.get_stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 2)
+
+
+def test_sub_graphs_are_keyed_by_root_node():
+    graph = GraphCache.get(workflow_id="workflow-1", graph_config=_graph_config())
+    sub_graph = GraphCache.get(
+        workflow_id="workflow-1",
+        graph_config=_graph_config(),
+        root_node_id="iteration-start",
+        config_hash=graph.config_hash,
+    )
+
+    assert sub_graph.root_node_id == "iteration-start"
+    assert sub_graph is not graph
+    assert (
+        GraphCache.get(
+            workflow_id="workflow-1",
+            graph_config=_graph_config(),
+            root_node_id="iteration-start",
+            config_hash=graph.config_hash,
+        )
+        is sub_graph
+    )
+
+
+def test_graph_config_hash_ignores_key_order():
+    config = _graph_config()
+    reordered = {"nodes": config["nodes"], "edges": config["edges"]}
+
+    assert graph_config_hash(config) == graph_config_hash(reordered)
@@ -0,0 +1,44 @@
+import pytest
+
+from core.workflow.callbacks import NodeRunProfile, WorkflowProfileRecorder
+from core.workflow.graph_engine.graph_engine import GraphEngine
+from tests.benchmarks import bench_graph_engine
+
+
+def _profile_graph(graph_config: dict, size: int) -> list[NodeRunProfile]:
+    recorder = WorkflowProfileRecorder()
+    bench_graph_engine.run_graph(graph_config, size, recorder=recorder)
+    return recorder.profiles
+
+
+def test_profiles_every_node_run():
+    profiles = _profile_graph(bench_graph_engine.build_chain_graph(5), 5)
+
+    assert [profile.node_id for profile in profiles] == ["start", *[f"node-{i}" for i in range(5)], "end"]
+    for profile in profiles:
+        assert profile.queue_wait_time >= 0
+        assert profile.run_time > 0
+        assert profile.event_dispatch_time >= 0
+        # started and succeeded
+        assert profile.event_count >= 2
+
+
+def test_profiles_parallel_branches_and_sub_graphs():
+    profiles = _profile_graph(bench_graph_engine.build_fan_out_graph(3), 3)
+    branch_profiles = [profile for profile in profiles if profile.node_id.startswith("branch-")]
+    assert len(branch_profiles) == 3
+    assert all(profile.parallel_id for profile in branch_profiles)
+
+    profiles = _profile_graph(bench_graph_engine.build_iteration_graph(4), 4)
+    body_profiles = [profile for profile in profiles if profile.node_id.startswith("body-")]
+    assert len(body_profiles) == 4 * bench_graph_engine.BODY_LENGTH
+    # the callback is only registered for the duration of the run
+    assert not GraphEngine.workflow_profiling_callback_mapping
+
+
+@pytest.mark.parametrize("graph", list(bench_graph_engine.GRAPH_BUILDERS))
+def test_benchmark_graphs_run(graph):
+    result = bench_graph_engine.run_graph(bench_graph_engine.GRAPH_BUILDERS[graph](3), 3)
+
+    assert result["node_runs"] > 0
+    assert result["events_per_second"] > 0
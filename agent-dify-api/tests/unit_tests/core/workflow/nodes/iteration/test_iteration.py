@@ -1,15 +1,21 @@
+import threading
 import time
 import uuid
+from collections.abc import Sequence
+from typing import Any
 from unittest.mock import patch
 
+from configs import dify_config
 from core.app.entities.app_invoke_entities import InvokeFrom
+from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor
 from core.workflow.entities.node_entities import NodeRunResult
 from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.enums import SystemVariableKey
+from core.workflow.graph_engine.entities.event import IterationRunNextEvent
 from core.workflow.graph_engine.entities.graph import Graph
 from core.workflow.graph_engine.entities.graph_init_params import GraphInitParams
 from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
-from core.workflow.nodes.event import RunCompletedEvent
+from core.workflow.nodes.event import RunCompletedEvent, RunStreamChunkEvent
 from core.workflow.nodes.iteration.entities import ErrorHandleMode
 from core.workflow.nodes.iteration.iteration_node import IterationNode
 from core.workflow.nodes.template_transform.template_transform_node import TemplateTransformNode
@@ -858,3 +864,244 @@ def test_iteration_run_error_handle():
             assert item.run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
             assert item.run_result.outputs == {"output": []}
     assert count == 14
+
+
+def _code_iteration_node(
+    error_handle_mode: ErrorHandleMode, is_parallel: bool, items: Sequence[str] = ("a", "b", "c"), **data: Any
+) -> IterationNode:
+    iteration_data = {
+        **data,
+        "iterator_selector": ["start", "items"],
+        "output_selector": ["code", "result"],
+        "output_type": "array[string]",
+        "start_node_id": "iteration-start",
+        "title": "iteration",
+        "type": "iteration",
+        "is_parallel": is_parallel,
+        "error_handle_mode": error_handle_mode,
+    }
+    graph_config = {
+        "edges": [
+            {"id": "start-source-iteration-1-target", "source": "start", "target": "iteration-1"},
+            {"id": "iteration-start-source-code-target", "source": "iteration-start", "target": "code"},
+        ],
+        "nodes": [
+            {"data": {"title": "Start", "type": "start", "variables": []}, "id": "start"},
+            {"data": iteration_data, "id": "iteration-1"},
+            {
+                "data": {"iteration_id": "iteration-1", "title": "iteration-start", "type": "iteration-start"},
+                "id": "iteration-start",
+            },
+            {
+                "data": {
+                    "iteration_id": "iteration-1",
+                    "title": "code",
+                    "type": "code",
+                    "code_language": "python3",
+                    "code": "def main(arg1):\n    return {'result': arg1 + '!'}\n",
+                    "variables": [{"variable": "arg1", "value_selector": ["iteration-1", "item"]}],
+                    "outputs": {"result": {"type": "string"}},
+                },
+                "id": "code",
+            },
+        ],
+    }
+
+    init_params = GraphInitParams(
+        tenant_id="1",
+        app_id="1",
+        workflow_type=WorkflowType.WORKFLOW,
+        workflow_id="1",
+        graph_config=graph_config,
+        user_id="1",
+        user_from=UserFrom.ACCOUNT,
+        invoke_from=InvokeFrom.DEBUGGER,
+        call_depth=0,
+    )
+    pool = VariablePool(system_variables={}, user_inputs={}, environment_variables=[])
+    pool.add(["start", "items"], list(items))
+
+    return IterationNode(
+        id=str(uuid.uuid4()),
+        graph_init_params=init_params,
+        graph=Graph.init(graph_config=graph_config),
+        graph_runtime_state=GraphRuntimeState(variable_pool=pool, start_at=time.perf_counter()),
+        config={"data": iteration_data, "id": "iteration-1"},
+    )
+
+
+def test_iteration_run_code_node_in_batches():
+    batches = []
+
+    def execute_batch(language, code, inputs_list):
+        batches.append([inputs["arg1"] for inputs in inputs_list])
+        return [
+            CodeExecutionError("failed") if inputs["arg1"] == "b" else {"result": inputs["arg1"] + "!"}
+            for inputs in inputs_list
+        ]
+
+    for is_parallel in (False, True):
+        batches.clear()
+        iteration_node = _code_iteration_node(ErrorHandleMode.CONTINUE_ON_ERROR, is_parallel)
+        with (
+            patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 2),
+            patch.object(CodeExecutor, "execute_workflow_code_template_batch", side_effect=execute_batch),
+            patch.object(CodeExecutor, "execute_workflow_code_template") as execute_single,
+        ):
+            events = list(iteration_node._run())
+
+        execute_single.assert_not_called()
+        assert sorted(batches) == [["a", "b"], ["c"]]
+        result = next(event for event in events if isinstance(event, RunCompletedEvent))
+        assert result.run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+        assert result.run_result.outputs == {"output": ["a!", None, "c!"]}
+
+
+def test_iteration_prefetches_code_results_chunk_by_chunk():
+    batches = []
+
+    def execute_batch(language, code, inputs_list):
+        batches.append([inputs["arg1"] for inputs in inputs_list])
+        return [{"result": inputs["arg1"] + "!"} for inputs in inputs_list]
+
+    iteration_node = _code_iteration_node(ErrorHandleMode.CONTINUE_ON_ERROR, False, ("a", "b", "c", "d", "e"))
+    with (
+        patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 2),
+        patch.object(CodeExecutor, "execute_workflow_code_template_batch", side_effect=execute_batch),
+    ):
+        events = iteration_node._run()
+        for event in events:
+            if isinstance(event, IterationRunNextEvent) and event.index == 1:
+                break
+        # the workflow stopped after the first item, the items of the next chunks are not executed
+        events.close()
+
+    assert batches == [["a", "b"]]
+
+
+def test_iteration_prefetches_one_chunk_per_worker_in_parallel_mode():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def execute_batch(language, code, inputs_list):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return [{"result": inputs["arg1"] + "!"} for inputs in inputs_list]
+
+    items = [str(i) for i in range(12)]
+    iteration_node = _code_iteration_node(ErrorHandleMode.CONTINUE_ON_ERROR, True, items, parallel_nums=2)
+    with (
+        patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 3),
+        patch.object(CodeExecutor, "execute_workflow_code_template_batch", side_effect=execute_batch) as batch,
+        patch.object(CodeExecutor, "execute_workflow_code_template") as execute_single,
+    ):
+        events = list(iteration_node._run())
+
+    assert batch.call_count == 4
+    assert peak == 2
+    execute_single.assert_not_called()
+    result = next(event for event in events if isinstance(event, RunCompletedEvent))
+    assert result.run_result.outputs == {"output": [item + "!" for item in items]}
+
+
+def test_iteration_run_code_node_falls_back_when_batch_fails():
+    iteration_node = _code_iteration_node(ErrorHandleMode.CONTINUE_ON_ERROR, False)
+    with (
+        patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 2),
+        patch.object(
+            CodeExecutor, "execute_workflow_code_template_batch", side_effect=CodeExecutionError("unavailable")
+        ),
+        patch.object(
+            CodeExecutor,
+            "execute_workflow_code_template",
+            side_effect=lambda language, code, inputs: {"result": inputs["arg1"] + "?"},
+        ) as execute_single,
+    ):
+        events = list(iteration_node._run())
+
+    assert execute_single.call_count == 3
+    result = next(event for event in events if isinstance(event, RunCompletedEvent))
+    assert result.run_result.outputs == {"output": ["a?", "b?", "c?"]}
+
+
+def test_iteration_run_code_node_terminated_mode_does_not_run_items_after_the_error():
+    executed = []
+
+    def execute(language, code, inputs):
+        executed.append(inputs["arg1"])
+        if inputs["arg1"] == "b":
+            raise CodeExecutionError("failed")
+        return {"result": inputs["arg1"] + "!"}
+
+    iteration_node = _code_iteration_node(ErrorHandleMode.TERMINATED, False)
+    with (
+        patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 2),
+        patch.object(CodeExecutor, "execute_workflow_code_template_batch") as execute_batch,
+        patch.object(CodeExecutor, "execute_workflow_code_template", side_effect=execute),
+    ):
+        events = list(iteration_node._run())
+
+    execute_batch.assert_not_called()
+    assert "c" not in executed
+    result = next(event for event in events if isinstance(event, RunCompletedEvent))
+    assert result.run_result.status == WorkflowNodeExecutionStatus.FAILED
+
+
+def test_iteration_run_in_parallel_mode_keeps_items_in_flight_bounded():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def execute(language, code, inputs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return {"result": inputs["arg1"] + "!"}
+
+    items = [str(i) for i in range(12)]
+    iteration_node = _code_iteration_node(ErrorHandleMode.TERMINATED, True, items, parallel_nums=3)
+    with (
+        patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 0),
+        patch.object(dify_config, "MAX_SUBMIT_COUNT", 5),
+        patch.object(dify_config, "WORKFLOW_ITERATION_EVENT_QUEUE_SIZE", 2),
+        patch.object(CodeExecutor, "execute_workflow_code_template", side_effect=execute),
+    ):
+        events = list(iteration_node._run())
+
+    assert peak == 3
+    result = next(event for event in events if isinstance(event, RunCompletedEvent))
+    assert result.run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert result.run_result.outputs == {"output": [item + "!" for item in items]}
+
+
+def test_iteration_run_streams_outputs_in_item_order():
+    def execute(language, code, inputs):
+        # later items complete first in parallel mode
+        time.sleep(0.03 if inputs["arg1"] == "a" else 0)
+        if inputs["arg1"] == "b":
+            raise CodeExecutionError("failed")
+        return {"result": inputs["arg1"] + "!"}
+
+    for is_parallel in (False, True):
+        iteration_node = _code_iteration_node(ErrorHandleMode.REMOVE_ABNORMAL_OUTPUT, is_parallel, stream_output=True)
+        with (
+            patch.object(dify_config, "CODE_EXECUTION_BATCH_SIZE", 0),
+            patch.object(CodeExecutor, "execute_workflow_code_template", side_effect=execute),
+        ):
+            events = list(iteration_node._run())
+
+        chunks = [event for event in events if isinstance(event, RunStreamChunkEvent)]
+        assert [chunk.chunk_content for chunk in chunks] == ["a!", "\nc!"]
+        assert all(chunk.from_variable_selector == ["iteration-1", "output"] for chunk in chunks)
+        result = next(event for event in events if isinstance(event, RunCompletedEvent))
+        assert result.run_result.outputs == {"output": ["a!", "c!"]}
@@ -44,3 +44,50 @@ def test_use_long_selector(pool):
     result = pool.get(("node_1", "part_1", "part_2"))
     assert result is not None
     assert result.value == "test_value"
+
+
+def test_child_pool_reads_through_without_changing_parent(pool):
+    pool.add(("node_1", "shared"), StringSegment(value="parent"))
+    pool.add(("node_2", "output"), StringSegment(value="parent output"))
+
+    child = pool.create_child()
+    assert child.get(("node_1", "shared")).value == "parent"
+
+    child.add(("node_1", "shared"), StringSegment(value="child"))
+    child.add(("iteration", "item"), StringSegment(value="item"))
+    child.remove(("node_2",))
+
+    assert child.get(("node_1", "shared")).value == "child"
+    assert child.get(("iteration", "item")).value == "item"
+    assert child.get(("node_2", "output")) is None
+    assert pool.get(("node_1", "shared")).value == "parent"
+    assert pool.get(("iteration", "item")) is None
+    assert pool.get(("node_2", "output")).value == "parent output"
+
+
+def test_child_pool_hides_removed_keys_until_added_again(pool):
+    pool.add(("node_1", "value"), StringSegment(value="parent"))
+    child = pool.create_child()
+    grandchild = child.create_child()
+
+    child.remove(("node_1", "value"))
+    assert child.get(("node_1", "value")) is None
+    assert grandchild.get(("node_1", "value")) is None
+
+    child.add(("node_1", "value"), StringSegment(value="child"))
+    assert grandchild.get(("node_1", "value")).value == "child"
+
+
+def test_merge_into_parent_applies_child_changes(pool):
+    pool.add(("node_1", "value"), StringSegment(value="parent"))
+    pool.add(("node_2", "value"), StringSegment(value="removed"))
+    child = pool.create_child()
+    child.add(("node_1", "value"), StringSegment(value="child"))
+    child.remove(("node_2", "value"))
+
+    child.merge_into_parent()
+
+    assert pool.get(("node_1", "value")).value == "child"
+    assert pool.get(("node_2", "value")) is None
+    with pytest.raises(ValueError):
+        pool.merge_into_parent()
@@ -0,0 +1,83 @@
+import json
+import math
+from unittest import mock
+from uuid import uuid4
+
+import contexts
+from core.variables import SecretVariable
+from models.json_property import json_loads
+from models.model import AppModelConfig
+from models.workflow import Workflow
+
+
+def _workflow(**kwargs) -> Workflow:
+    return Workflow(
+        tenant_id="tenant_id",
+        app_id="app_id",
+        type="workflow",
+        version="draft",
+        created_by="account_id",
+        **kwargs,
+    )
+
+
+def test_json_loads_falls_back_for_what_orjson_rejects():
+    assert json_loads('{"a": [1, 2.5, "b"]}') == {"a": [1, 2.5, "b"]}
+    assert math.isnan(json_loads('{"a": NaN}')["a"])
+    assert json_loads(str(2**70)) == 2**70
+
+
+def test_app_model_config_properties_are_parsed_once():
+    app_model_config = AppModelConfig(model=json.dumps({"provider": "openai", "name": "gpt-4o"}))
+
+    with mock.patch("models.model.json_loads", wraps=json_loads) as loads:
+        assert app_model_config.model_dict["name"] == "gpt-4o"
+        assert app_model_config.model_dict is app_model_config.model_dict
+        assert loads.call_count == 1
+
+        app_model_config.model = json.dumps({"provider": "openai", "name": "gpt-4o-mini"})
+        assert app_model_config.model_dict["name"] == "gpt-4o-mini"
+        assert loads.call_count == 2
+
+
+def test_workflow_graph_dict_follows_its_column():
+    workflow = _workflow(graph=json.dumps({"nodes": [], "edges": []}), features="{}")
+
+    graph = workflow.graph_dict
+    assert workflow.graph_dict is graph
+
+    workflow.graph = json.dumps({"nodes": [{"id": "start"}], "edges": []})
+    assert workflow.graph_dict["nodes"] == [{"id": "start"}]
+
+
+def test_workflow_features_dict_is_cached_after_migration():
+    features = {"file_upload": {"image": {"enabled": True, "number_limits": 2}}}
+    workflow = _workflow(graph="{}", features=json.dumps(features))
+
+    features_dict = workflow.features_dict
+    assert features_dict["file_upload"]["number_limits"] == 2
+    assert "image" not in features_dict["file_upload"]
+    assert workflow.features_dict is features_dict
+
+
+def test_workflow_environment_variables_are_decrypted_once_per_tenant():
+    contexts.tenant_id.set("tenant_id")
+    variable = SecretVariable.model_validate(
+        {"name": "key", "value": "secret", "id": str(uuid4()), "selector": ["env", "key"]}
+    )
+
+    with (
+        mock.patch("core.helper.encrypter.encrypt_token", return_value="encrypted"),
+        mock.patch("core.helper.encrypter.decrypt_token", return_value="secret") as decrypt_token,
+    ):
+        workflow = _workflow(graph="{}", features="{}", environment_variables=[variable], conversation_variables=[])
+        decrypt_token.reset_mock()
+
+        assert workflow.environment_variables[0].value == "secret"
+        assert workflow.environment_variables[0].value == "secret"
+        assert decrypt_token.call_count == 1
+
+        contexts.tenant_id.set("another_tenant_id")
+        assert workflow.environment_variables[0].value == "secret"
+        assert decrypt_token.call_count == 2
+        assert decrypt_token.call_args.kwargs["tenant_id"] == "another_tenant_id"
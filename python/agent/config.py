@@ -34,6 +34,8 @@ class Config:
     CRAWL_DELAY: float = 0.5  # Seconds between requests
     MAX_PAGES_PER_SITE: int = 100
     USER_AGENT: str = "AlphaAgentBot/1.0"
+    CRAWL_CONCURRENCY: int = 64  # Requests in flight across all hosts
+    CRAWL_HOST_CONCURRENCY: int = 2  # Requests in flight per host
     
     # Model Configuration
     DEFAULT_MODEL: str = "gpt-4o"
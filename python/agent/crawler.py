@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Asynchronous crawler engine for the Alpha Agent Network application.
+Crawls many hosts concurrently while staying polite to each one, and streams
+extracted page text to disk instead of keeping it in memory.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+SKIPPED_EXTENSIONS = (".pdf", ".zip", ".gz", ".jpg", ".jpeg", ".png", ".gif", ".svg",
+                      ".mp3", ".mp4", ".avi", ".css", ".js", ".ico", ".woff", ".woff2")
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """Normalize a URL so that trivially different spellings map to one key"""
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter used to remember which URLs were already queued"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> bool:
+        """Add an item, returning False if it was (probably) present already"""
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+
+class TokenBucket:
+    """Per-host rate limiter allowing short bursts up to ``capacity`` requests"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PageParser(HTMLParser):
+    """Extracts the title, visible text and outgoing links of an HTML page"""
+
+    IGNORED_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.links: List[str] = []
+        self.chunks: List[str] = []
+        self._in_title = False
+        self._ignored_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.IGNORED_TAGS:
+            self._ignored_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+    def handle_endtag(self, tag):
+        if tag in self.IGNORED_TAGS and self._ignored_depth:
+            self._ignored_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._ignored_depth:
+            return
+        if self._in_title:
+            self.title += data
+            return
+        text = data.strip()
+        if text:
+            self.chunks.append(text)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.chunks)
+
+
+class HostState:
+    """Politeness state kept for every host: rate limit, concurrency and robots.txt"""
+
+    def __init__(self, delay: float, concurrency: int):
+        self.bucket = TokenBucket(rate=1.0 / max(delay, 0.01))
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_lock = asyncio.Lock()
+        self.pages = 0
+
+
+class CrawlEngine:
+    """Asyncio crawler with per-host politeness, conditional GETs and deduplication
+
+    Seen URLs are tracked with a Bloom filter over canonical URLs, and pages whose
+    extracted text hashes to an already stored page are skipped. ETag and
+    Last-Modified validators are kept between runs so that unchanged pages are
+    answered with a cheap 304.
+    """
+
+    def __init__(self,
+                 output_dir: str,
+                 user_agent: str,
+                 delay: float = 0.5,
+                 max_pages_per_site: int = 100,
+                 concurrency: int = 64,
+                 host_concurrency: int = 2,
+                 timeout: int = 30,
+                 follow_external: bool = False,
+                 on_log: Optional[Callable[[str], None]] = None,
+                 on_page: Optional[Callable[[str, str], None]] = None,
+                 on_progress: Optional[Callable[[Dict], None]] = None):
+        self.output_dir = output_dir
+        self.user_agent = user_agent
+        self.delay = delay
+        self.max_pages_per_site = max_pages_per_site
+        self.concurrency = concurrency
+        self.host_concurrency = host_concurrency
+        self.timeout = timeout
+        self.follow_external = follow_external
+        self.on_log = on_log or logger.info
+        self.on_page = on_page
+        self.on_progress = on_progress
+
+        self.seen_urls = BloomFilter()
+        self.hosts: Dict[str, HostState] = {}
+        self.allowed_hosts: Set[str] = set()
+        self.validators_file = os.path.join(output_dir, "validators.json")
+        self.validators: Dict[str, Dict] = {}
+        self.content_hashes: Set[str] = set()
+        self.stats = {"fetched": 0, "stored": 0, "not_modified": 0, "duplicates": 0,
+                      "disallowed": 0, "errors": 0, "queued": 0}
+
+        self._frontier: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._output = None
+
+    def stop(self):
+        """Ask a running crawl to stop; safe to call from any thread"""
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    def _load_validators(self):
+        if not os.path.exists(self.validators_file):
+            return
+        try:
+            with open(self.validators_file, "r") as f:
+                state = json.load(f)
+            self.validators = state.get("validators", {})
+            self.content_hashes = set(state.get("content_hashes", []))
+        except Exception as e:
+            logger.error(f"Error loading crawl validators: {e}")
+
+    def _save_validators(self):
+        tmp_file = f"{self.validators_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"validators": self.validators, "content_hashes": sorted(self.content_hashes)}, f)
+        os.replace(tmp_file, self.validators_file)
+
+    def _host_state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(self.delay, self.host_concurrency)
+            self.hosts[host] = state
+        return state
+
+    def enqueue(self, url: str) -> bool:
+        canonical = canonicalize_url(url)
+        if not canonical or canonical.lower().endswith(SKIPPED_EXTENSIONS):
+            return False
+        host = urlsplit(canonical).netloc
+        if not self.follow_external and host not in self.allowed_hosts:
+            return False
+        if self._host_state(host).pages >= self.max_pages_per_site:
+            return False
+        if not self.seen_urls.add(canonical):
+            return False
+        self._frontier.put_nowait(canonical)
+        self.stats["queued"] += 1
+        return True
+
+    async def _robots(self, session: aiohttp.ClientSession, url: str, state: HostState) -> RobotFileParser:
+        async with state.robots_lock:
+            if state.robots is None:
+                parts = urlsplit(url)
+                robots_url = urlunsplit((parts.scheme, parts.netloc, "/robots.txt", "", ""))
+                parser = RobotFileParser(robots_url)
+                try:
+                    async with session.get(robots_url) as response:
+                        if response.status >= 400:
+                            parser.allow_all = response.status < 500
+                            parser.disallow_all = response.status >= 500
+                        else:
+                            parser.parse((await response.text(errors="replace")).splitlines())
+                except Exception as e:
+                    logger.debug(f"Could not fetch {robots_url}: {e}")
+                    parser.allow_all = True
+                crawl_delay = parser.crawl_delay(self.user_agent)
+                if crawl_delay:
+                    state.bucket.rate = min(state.bucket.rate, 1.0 / float(crawl_delay))
+                state.robots = parser
+        return state.robots
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str):
+        host = urlsplit(url).netloc
+        state = self._host_state(host)
+        if state.pages >= self.max_pages_per_site:
+            return
+
+        robots = await self._robots(session, url, state)
+        if not robots.can_fetch(self.user_agent, url):
+            self.stats["disallowed"] += 1
+            return
+
+        headers = {}
+        validator = self.validators.get(url, {})
+        if validator.get("etag"):
+            headers["If-None-Match"] = validator["etag"]
+        if validator.get("last_modified"):
+            headers["If-Modified-Since"] = validator["last_modified"]
+
+        async with state.semaphore:
+            await state.bucket.acquire()
+            async with session.get(url, headers=headers, allow_redirects=True) as response:
+                self.stats["fetched"] += 1
+                state.pages += 1
+                if response.status == 304:
+                    # Unchanged pages still lead to the links seen last time
+                    self.stats["not_modified"] += 1
+                    for link in validator.get("links", []):
+                        self.enqueue(link)
+                    return
+                if response.status != 200 or "html" not in response.headers.get("Content-Type", ""):
+                    return
+
+                body = await response.text(errors="replace")
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+
+        page = PageParser()
+        page.feed(body)
+        links = [urljoin(url, link) for link in page.links]
+        for link in links:
+            self.enqueue(link)
+        if etag or last_modified:
+            self.validators[url] = {"etag": etag, "last_modified": last_modified, "links": links}
+
+        text = page.text
+        content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if content_hash in self.content_hashes:
+            self.stats["duplicates"] += 1
+            return
+        self.content_hashes.add(content_hash)
+
+        title = " ".join(page.title.split())
+        self._output.write(json.dumps({
+            "url": url,
+            "title": title,
+            "hash": content_hash,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            "text": text,
+        }, ensure_ascii=False) + "\n")
+        self.stats["stored"] += 1
+        if self.on_page:
+            self.on_page(url, title)
+
+    async def _worker(self, session: aiohttp.ClientSession):
+        while not self._stop_event.is_set():
+            try:
+                url = await asyncio.wait_for(self._frontier.get(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            try:
+                await self._fetch(session, url)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.on_log(f"Error crawling {url}: {e}")
+            finally:
+                self._frontier.task_done()
+                if self.on_progress:
+                    self.on_progress(dict(self.stats, pending=self._frontier.qsize()))
+
+    async def run(self, seeds: Iterable[str]) -> Dict:
+        """Crawl from the seed URLs until the frontier drains, limits are hit or stop() is called"""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._frontier = asyncio.Queue()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._load_validators()
+
+        seeds = list(seeds)
+        for seed in seeds:
+            canonical = canonicalize_url(seed)
+            if canonical:
+                self.allowed_hosts.add(urlsplit(canonical).netloc)
+        for seed in seeds:
+            self.enqueue(seed)
+
+        output_file = os.path.join(self.output_dir, f"crawl_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.host_concurrency,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        started = time.monotonic()
+
+        with open(output_file, "a", encoding="utf-8") as self._output:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers={"User-Agent": self.user_agent}) as session:
+                workers = [asyncio.create_task(self._worker(session)) for _ in range(self.concurrency)]
+                drained = asyncio.create_task(self._frontier.join())
+                stopped = asyncio.create_task(self._stop_event.wait())
+                await asyncio.wait({drained, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                self._stop_event.set()
+                drained.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        self._output = None
+
+        self._save_validators()
+        elapsed = time.monotonic() - started
+        self.on_log(f"Crawled {self.stats['fetched']} pages from {len(self.hosts)} hosts in {elapsed:.1f}s, "
+                    f"stored {self.stats['stored']} to {output_file}")
+        return dict(self.stats, output_file=output_file, elapsed=elapsed)
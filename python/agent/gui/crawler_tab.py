@@ -14,6 +14,7 @@ import threading
 import logging
 from datetime import datetime
 import queue
+import asyncio
 
 # Application imports
 from agent.config import Config
@@ -30,6 +31,7 @@ class CrawlerFrame(ttk.Frame):
         self.crawl_queue = queue.Queue()
         self.is_crawling = False
         self.crawl_thread = None
+        self.crawl_engine = None
         
         self.setup_ui()
         self.load_saved_targets()
@@ -354,64 +356,56 @@ class CrawlerFrame(ttk.Frame):
             messagebox.showinfo("Not Crawling", "Crawler is not running")
             return
         
-        # Update flag to stop thread
+        # Update flag and signal the crawl engine to stop
         self.is_crawling = False
+        if self.crawl_engine:
+            self.crawl_engine.stop()
         
         # Log stop
-        self.log_message("Crawler stopping... (waiting for current page to complete)")
+        self.log_message("Crawler stopping... (waiting for in-flight pages to complete)")
         
         # Update status
         self.status_var.set("Stopping...")
     
     def crawl_worker(self):
-        """Worker thread for crawling websites"""
+        """Worker thread running the asyncio crawl engine"""
+        pages_crawled = 0
         try:
             # Import crawler functionality here to avoid circular imports
-            # This is a placeholder for actual crawler implementation
-            pages_crawled = 0
+            from agent.crawler import CrawlEngine
+            
+            seeds = []
+            while not self.crawl_queue.empty():
+                seeds.append(self.crawl_queue.get())
             max_pages = self.max_pages_var.get()
-            delay = self.delay_var.get()
+            total_pages = max_pages * len(seeds)
+            
+            def on_progress(stats):
+                self.after(0, lambda: self.queue_size_var.set(f"Queue Size: {stats['pending']}"))
+                self.update_progress(stats["fetched"], total_pages)
+            
+            self.crawl_engine = CrawlEngine(
+                output_dir=Config.CRAWL_DIR,
+                user_agent=self.user_agent_var.get(),
+                delay=self.delay_var.get(),
+                max_pages_per_site=max_pages,
+                concurrency=Config.CRAWL_CONCURRENCY,
+                host_concurrency=Config.CRAWL_HOST_CONCURRENCY,
+                timeout=Config.REQUEST_TIMEOUT,
+                on_log=self.log_message,
+                on_page=self.add_crawled_page,
+                on_progress=on_progress,
+            )
+            stats = asyncio.run(self.crawl_engine.run(seeds))
+            pages_crawled = stats["stored"]
             
-            # Mock crawling process
-            while self.is_crawling and not self.crawl_queue.empty() and pages_crawled < max_pages:
-                url = self.crawl_queue.get()
-                
-                # Log current action
-                self.log_message(f"Crawling: {url}")
-                
-                # Simulate crawling
-                import time
-                import random
-                time.sleep(delay)  # Respect crawl delay
-                
-                # Simulate finding a title
-                title = f"Page Title {pages_crawled + 1}"
-                
-                # Add to results
-                self.add_crawled_page(url, title)
-                
-                # Simulate finding links and adding to queue
-                if pages_crawled < max_pages - 1:
-                    num_links = random.randint(1, 3)
-                    for i in range(num_links):
-                        new_url = f"{url}/subpage_{i}"
-                        self.crawl_queue.put(new_url)
-                        self.log_message(f"Found link: {new_url}")
-                    
-                    # Update queue size
-                    self.update_queue_size()
-                
-                # Update progress
-                pages_crawled += 1
-                self.update_progress(pages_crawled, max_pages)
-                
             # Finished crawling
             if not self.is_crawling:
                 self.log_message("Crawler stopped by user")
-            elif self.crawl_queue.empty():
-                self.log_message("Crawler finished: Queue empty")
             else:
-                self.log_message(f"Crawler finished: Reached max pages ({max_pages})")
+                self.log_message(f"Crawler finished: {stats['fetched']} fetched, {stats['not_modified']} not modified, "
+                                 f"{stats['duplicates']} duplicates, {stats['disallowed']} blocked by robots.txt")
+                self.log_message(f"Extracted text saved to {stats['output_file']}")
         
         except Exception as e:
             self.log_message(f"Crawler error: {e}")
@@ -420,6 +414,7 @@ class CrawlerFrame(ttk.Frame):
         finally:
             # Update UI
             self.is_crawling = False
+            self.crawl_engine = None
             self.status_var.set("Ready")
             
             # Show finished message
@@ -441,9 +436,8 @@ class CrawlerFrame(ttk.Frame):
         # Schedule the UI update to run on the main thread
         self.after(0, lambda: self.pages_tree.insert("", "end", values=(url, title, timestamp)))
         
-        # Update pages crawled counter
-        pages_crawled = len(self.pages_tree.get_children())
-        self.after(0, lambda: self.pages_crawled_var.set(f"Pages Crawled: {pages_crawled}"))
+        # Update pages crawled counter once the row has been inserted
+        self.after(0, lambda: self.pages_crawled_var.set(f"Pages Crawled: {len(self.pages_tree.get_children())}"))
     
     def update_progress(self, current, total):
         """Update the progress bar"""
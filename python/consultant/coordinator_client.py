@@ -0,0 +1,64 @@
+import logging
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import requests
+
+
+class CoordinatorClient:
+    """Worker-side client for mining_coordinator.py."""
+
+    def __init__(self, base_url: str, worker_id: Optional[str] = None, timeout: int = 30):
+        self.base_url = base_url.rstrip('/')
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.timeout = timeout
+        self.sess = requests.Session()
+
+    def _post(self, path: str, payload: Dict) -> Dict:
+        response = self.sess.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def acquire(self, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """Ask the coordinator for a lease, returns None when there is no work."""
+        return self._post('/lease', {"worker_id": self.worker_id, "kinds": kinds}).get("lease")
+
+    def heartbeat(self, lease_id: str) -> bool:
+        return self._post('/heartbeat', {"lease_id": lease_id}).get("ok", False)
+
+    def complete(self, lease_id: str, results: List[Dict]) -> bool:
+        return self._post('/complete', {"lease_id": lease_id, "results": results}).get("ok", False)
+
+    def release(self, lease_id: str, error: str = "") -> bool:
+        return self._post('/release', {"lease_id": lease_id, "error": error}).get("ok", False)
+
+    @contextmanager
+    def hold(self, lease: Dict):
+        """Keep a lease alive with background heartbeats, releasing it if the body raises."""
+        stop_event = threading.Event()
+
+        def beat():
+            interval = max(1, lease["ttl"] / 3)
+            while not stop_event.wait(interval):
+                try:
+                    if not self.heartbeat(lease["lease_id"]):
+                        logging.warning(f"Lease {lease['lease_id']} was lost, the task may be re-issued")
+                        return
+                except requests.RequestException as e:
+                    logging.error(f"Heartbeat failed: {str(e)}")
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield lease
+        except Exception as e:
+            try:
+                self.release(lease["lease_id"], str(e))
+            except requests.RequestException:
+                pass
+            raise
+        finally:
+            stop_event.set()
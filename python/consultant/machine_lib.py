@@ -53,6 +53,7 @@ class WorldQuantBrain:
     def multi_simulate(self, alpha_pools: list, neut: str, region: str, universe: str, start: int = 0):
         """Run multiple alpha simulations in parallel."""
         logging.info(f"Starting multi-simulate for {len(alpha_pools)} pools")
+        results = []
         
         for x, pool in enumerate(alpha_pools):
             if x < start:
@@ -92,11 +93,14 @@ class WorldQuantBrain:
                     self.login()
                     continue
 
-            self._monitor_progress(progress_urls)
+            results += self._monitor_progress(progress_urls)
             logging.info(f"Pool {x+1} simulations completed")
 
-    def _monitor_progress(self, progress_urls: list):
-        """Monitor simulation progress."""
+        return results
+
+    def _monitor_progress(self, progress_urls: list) -> list:
+        """Monitor simulation progress and return the final progress payloads."""
+        results = []
         for j, progress in enumerate(progress_urls):
             try:
                 while True:
@@ -106,14 +110,18 @@ class WorldQuantBrain:
                         break
                     sleep(float(retry_after))
 
-                status = simulation_progress.json().get("status")
+                result = simulation_progress.json()
+                status = result.get("status")
                 logging.info(f"Task {j+1} status: {status}")
                 if status != "COMPLETE":
                     logging.warning(f"Task not complete: {progress}")
+                results.append(result)
 
             except Exception as e:
                 logging.error(f"Error monitoring progress: {str(e)}")
 
+        return results
+
     def generate_sim_data(self, alpha_list, region, uni, neut):
         sim_data_list = []
         for alpha, decay in alpha_list:
@@ -6,6 +6,8 @@ import json
 import os
 from itertools import product
 import requests
+import argparse
+from coordinator_client import CoordinatorClient
 
 logging.basicConfig(
     level=logging.INFO,
@@ -60,6 +62,46 @@ class MachineMiner:
                 self.brain.login()
                 continue
 
+    def run_worker(self, client: CoordinatorClient):
+        """Simulate expression shards leased from a mining coordinator until stopped."""
+        logging.info(f"Starting machine miner worker {client.worker_id} against {client.base_url}")
+        
+        while True:
+            try:
+                lease = client.acquire(["shard"])
+                if not lease:
+                    logging.info("No shards available. Waiting...")
+                    sleep(60)
+                    continue
+                
+                with client.hold(lease):
+                    shard = lease["payload"]
+                    logging.info(f"Leased shard {lease['task_id']} with {len(shard['expressions'])} alphas "
+                                 f"for {shard['region']}/{shard['universe']}")
+                    alpha_list = [(alpha, 0) for alpha in shard["expressions"]]
+                    pools = self.brain.load_task_pool(alpha_list, 10, 10)
+                    results = self.brain.multi_simulate(pools, shard["neut"], shard["region"], shard["universe"], 0)
+                    
+                    # multi_simulate logs and skips failed batches, so only complete fully simulated shards
+                    batches = sum(len(pool) for pool in pools)
+                    completed = sum(1 for result in results if result.get("status") == "COMPLETE")
+                    if completed < batches:
+                        logging.warning(f"Only {completed}/{batches} batches of shard {lease['task_id']} "
+                                        f"completed, releasing it")
+                        client.release(lease["lease_id"], f"{batches - completed} of {batches} batches failed")
+                    else:
+                        client.complete(lease["lease_id"], results)
+                    
+            except KeyboardInterrupt:
+                logging.info("Stopping machine miner worker...")
+                break
+                
+            except Exception as e:
+                logging.error(f"Error in worker loop: {str(e)}")
+                sleep(600)
+                self.brain.login()
+                continue
+
     def _process_results(self):
         # Implementation of _process_results method
         pass
@@ -76,13 +118,22 @@ class MachineMiner:
         logging.info(f"Results saved to machine_results_{timestamp}.json")
 
 def main():
+    parser = argparse.ArgumentParser(description='Mine alphas using WorldQuant Brain')
+    parser.add_argument('--coordinator', help='Mining coordinator URL, e.g. http://host:8765 (enables worker mode)')
+    parser.add_argument('--worker-id', help='Worker name reported to the coordinator (default: hostname)')
+    
+    args = parser.parse_args()
+    
     username = "YOUR USERNAME"
     password = "YOUR PASSWORD"
     if not username or not password:
         raise ValueError("Please set WQ_USERNAME and WQ_PASSWORD environment variables")
         
     miner = MachineMiner(username, password)
-    miner.mine_alphas()
+    if args.coordinator:
+        miner.run_worker(CoordinatorClient(args.coordinator, args.worker_id))
+    else:
+        miner.mine_alphas()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
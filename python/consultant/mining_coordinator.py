@@ -0,0 +1,396 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('mining_coordinator.log'),
+        logging.StreamHandler()
+    ]
+)
+
+SHARD = "shard"
+SEED = "seed"
+TASK_KINDS = (SHARD, SEED)
+
+
+class LeaseManager:
+    """Hands out time-limited leases on mining tasks and tracks their completion.
+
+    Two kinds of task are managed: ``shard`` tasks hold a slice of the expression
+    space generated by the machine_lib factories, ``seed`` tasks hold one entry of
+    the hopeful-alphas queue. Every task is leased to at most one worker at a time
+    and is only re-issued once its lease expires without a heartbeat, so adding
+    workers never duplicates simulations.
+    """
+
+    def __init__(self, state_file: str = 'coordinator_state.json',
+                 results_file: str = 'coordinator_results.jsonl',
+                 lease_ttl: int = 900, max_attempts: int = 3):
+        self.state_file = state_file
+        self.results_file = results_file
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.tasks: Dict[str, Dict] = {}
+        self.pending = {kind: deque() for kind in TASK_KINDS}
+        self.leases: Dict[str, Dict] = {}
+        self.workers: Dict[str, float] = {}
+        self.seen_keys = set()
+        self.seen_expressions = set()
+        self.result_count = 0
+        self.reissued = 0
+        self.dirty = False
+        self.load_state()
+
+    def add_task(self, kind: str, key: str, payload: Dict) -> bool:
+        """Queue a task unless one with the same key was ever queued."""
+        with self.lock:
+            if key in self.seen_keys:
+                return False
+            task_id = uuid.uuid4().hex
+            self.tasks[task_id] = {
+                "id": task_id,
+                "kind": kind,
+                "key": key,
+                "payload": payload,
+                "status": "pending",
+                "attempts": 0,
+            }
+            self.seen_keys.add(key)
+            self.pending[kind].append(task_id)
+            self.dirty = True
+            return True
+
+    def add_expressions(self, region: str, universe: str, neut: str,
+                        expressions: List[str], shard_size: int = 100) -> int:
+        """Split expressions into shards, skipping any already sharded before."""
+        with self.lock:
+            fresh = []
+            for expression in expressions:
+                dedupe_key = f"{region}|{universe}|{neut}|{expression}"
+                if dedupe_key in self.seen_expressions:
+                    continue
+                self.seen_expressions.add(dedupe_key)
+                fresh.append(expression)
+
+        added = 0
+        for i in range(0, len(fresh), shard_size):
+            chunk = fresh[i:i + shard_size]
+            payload = {"region": region, "universe": universe, "neut": neut, "expressions": chunk}
+            if self.add_task(SHARD, f"{SHARD}:{region}:{universe}:{neut}:{chunk[0]}:{len(chunk)}", payload):
+                added += 1
+        logging.info(f"Queued {added} shards ({len(fresh)} new expressions) for {region}/{universe}")
+        return added
+
+    def add_seeds(self, alphas: List[Dict]) -> int:
+        """Queue hopeful alphas, keyed by alpha id (or expression when missing)."""
+        added = 0
+        for alpha in alphas:
+            if not isinstance(alpha, dict) or "expression" not in alpha:
+                continue
+            key = f"{SEED}:{alpha.get('alpha_id') or alpha['expression']}"
+            if self.add_task(SEED, key, alpha):
+                added += 1
+        if added:
+            logging.info(f"Queued {added} hopeful alphas")
+        return added
+
+    def acquire(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """Lease the next pending task of one of the requested kinds."""
+        with self.lock:
+            self.workers[worker_id] = time.time()
+            for kind in kinds or TASK_KINDS:
+                queue = self.pending.get(kind)
+                while queue:
+                    task = self.tasks.get(queue.popleft())
+                    if task is None or task["status"] != "pending":
+                        continue
+                    lease_id = uuid.uuid4().hex
+                    task["status"] = "leased"
+                    task["attempts"] += 1
+                    self.leases[lease_id] = {
+                        "task_id": task["id"],
+                        "worker_id": worker_id,
+                        "expires_at": time.time() + self.lease_ttl,
+                    }
+                    self.dirty = True
+                    logging.info(f"Leased {kind} task {task['id']} to {worker_id} "
+                                 f"(attempt {task['attempts']})")
+                    return {
+                        "lease_id": lease_id,
+                        "task_id": task["id"],
+                        "kind": kind,
+                        "payload": task["payload"],
+                        "ttl": self.lease_ttl,
+                    }
+        return None
+
+    def heartbeat(self, lease_id: str) -> bool:
+        """Extend a lease; returns False when the lease is unknown or already expired."""
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if not lease:
+                return False
+            lease["expires_at"] = time.time() + self.lease_ttl
+            self.workers[lease["worker_id"]] = time.time()
+            return True
+
+    def complete(self, lease_id: str, results: List[Dict]) -> bool:
+        """Mark a leased task done and append its results to the results file."""
+        with self.lock:
+            lease = self.leases.pop(lease_id, None)
+            if not lease:
+                return False
+            task = self.tasks[lease["task_id"]]
+            task["status"] = "done"
+            self.workers[lease["worker_id"]] = time.time()
+            self.dirty = True
+
+            with open(self.results_file, 'a') as f:
+                for result in results or []:
+                    record = {
+                        "timestamp": int(time.time()),
+                        "task_id": task["id"],
+                        "kind": task["kind"],
+                        "worker_id": lease["worker_id"],
+                        "result": result,
+                    }
+                    f.write(json.dumps(record) + "\n")
+                    self.result_count += 1
+        logging.info(f"Task {task['id']} completed by {lease['worker_id']} "
+                     f"with {len(results or [])} results")
+        return True
+
+    def release(self, lease_id: str, error: str = "") -> bool:
+        """Give a lease back early, e.g. after a worker-side failure."""
+        with self.lock:
+            lease = self.leases.pop(lease_id, None)
+            if not lease:
+                return False
+            self._requeue(self.tasks[lease["task_id"]], error or "released")
+            return True
+
+    def reap_expired(self) -> int:
+        """Re-issue tasks whose lease has not been renewed in time."""
+        now = time.time()
+        with self.lock:
+            expired = [lease_id for lease_id, lease in self.leases.items() if lease["expires_at"] < now]
+            for lease_id in expired:
+                lease = self.leases.pop(lease_id)
+                logging.warning(f"Lease {lease_id} held by {lease['worker_id']} expired")
+                self._requeue(self.tasks[lease["task_id"]], "lease expired")
+                self.reissued += 1
+        return len(expired)
+
+    def _requeue(self, task: Dict, reason: str):
+        if task["attempts"] >= self.max_attempts:
+            task["status"] = "failed"
+            logging.error(f"Task {task['id']} failed after {task['attempts']} attempts: {reason}")
+        else:
+            task["status"] = "pending"
+            self.pending[task["kind"]].appendleft(task["id"])
+        self.dirty = True
+
+    def stats(self) -> Dict:
+        with self.lock:
+            by_status = {}
+            for task in self.tasks.values():
+                counts = by_status.setdefault(task["kind"], {})
+                counts[task["status"]] = counts.get(task["status"], 0) + 1
+            now = time.time()
+            return {
+                "tasks": by_status,
+                "active_leases": len(self.leases),
+                "reissued_leases": self.reissued,
+                "results": self.result_count,
+                "workers": {
+                    worker_id: round(now - last_seen, 1) for worker_id, last_seen in self.workers.items()
+                },
+            }
+
+    def save_state(self, force: bool = False):
+        """Persist tasks atomically so a restart resumes without re-running finished work."""
+        with self.lock:
+            if not (self.dirty or force):
+                return
+            state = {"tasks": list(self.tasks.values()), "result_count": self.result_count}
+            self.dirty = False
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def load_state(self):
+        if not os.path.exists(self.state_file):
+            return
+        with open(self.state_file, 'r') as f:
+            state = json.load(f)
+        for task in state.get("tasks", []):
+            # Leases do not survive a restart; their tasks go back to the queue
+            if task["status"] == "leased":
+                task["status"] = "pending"
+            self.tasks[task["id"]] = task
+            self.seen_keys.add(task["key"])
+            if task["kind"] == SHARD:
+                payload = task["payload"]
+                for expression in payload["expressions"]:
+                    self.seen_expressions.add(
+                        f"{payload['region']}|{payload['universe']}|{payload['neut']}|{expression}")
+            if task["status"] == "pending":
+                self.pending[task["kind"]].append(task["id"])
+        self.result_count = state.get("result_count", 0)
+        logging.info(f"Restored {len(self.tasks)} tasks from {self.state_file}")
+
+
+def build_expression_shards(manager: LeaseManager, brain, region: str, universe: str,
+                            neut: str = "INDUSTRY", shard_size: int = 100) -> int:
+    """Generate first order expressions with the machine_lib factories and queue them as shards."""
+    logging.info(f"Building expression shards for {region}/{universe}")
+    fields_df = brain.get_datafields(region=region, universe=universe)
+    matrix_fields = brain.process_datafields(fields_df, "matrix")
+    vector_fields = brain.process_datafields(fields_df, "vector")
+    first_order = brain.get_first_order(vector_fields + matrix_fields, brain.ops_set)
+    return manager.add_expressions(region, universe, neut, first_order, shard_size)
+
+
+def ingest_hopeful_alphas(manager: LeaseManager, path: str) -> int:
+    """Queue any entries of hopeful_alphas.json that have not been seen before."""
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'r') as f:
+            hopeful_alphas = json.load(f)
+    except json.JSONDecodeError:
+        logging.warning(f"Could not parse {path}, will retry later")
+        return 0
+    return manager.add_seeds(hopeful_alphas)
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    manager: LeaseManager = None
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length', 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._send_json(200, self.manager.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        if self.path == '/lease':
+            worker_id = body.get("worker_id")
+            if not worker_id:
+                self._send_json(400, {"error": "worker_id is required"})
+                return
+            self._send_json(200, {"lease": self.manager.acquire(worker_id, body.get("kinds"))})
+        elif self.path == '/heartbeat':
+            self._send_json(200, {"ok": self.manager.heartbeat(body.get("lease_id", ""))})
+        elif self.path == '/complete':
+            self._send_json(200, {"ok": self.manager.complete(body.get("lease_id", ""), body.get("results", []))})
+        elif self.path == '/release':
+            self._send_json(200, {"ok": self.manager.release(body.get("lease_id", ""), body.get("error", ""))})
+        elif self.path == '/seeds':
+            self._send_json(200, {"added": self.manager.add_seeds(body.get("alphas", []))})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s" % (self.address_string(), format % args))
+
+
+def maintenance_loop(manager: LeaseManager, stop_event: threading.Event,
+                     hopeful_file: Optional[str], ingest_interval: int = 60):
+    """Expire stale leases, pick up new hopeful alphas and checkpoint state."""
+    last_ingest = 0
+    while not stop_event.wait(5):
+        try:
+            manager.reap_expired()
+            if hopeful_file and time.time() - last_ingest >= ingest_interval:
+                ingest_hopeful_alphas(manager, hopeful_file)
+                last_ingest = time.time()
+            manager.save_state()
+        except Exception as e:
+            logging.error(f"Error in maintenance loop: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Coordinate alpha mining across several worker machines')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--username', help='WorldQuant username, required to build expression shards')
+    parser.add_argument('--password', help='WorldQuant password, required to build expression shards')
+    parser.add_argument('--regions', default='USA:TOP3000',
+                        help='Comma-separated REGION:UNIVERSE pairs to shard (default: USA:TOP3000)')
+    parser.add_argument('--neut', default='INDUSTRY', help='Neutralization used for expression shards')
+    parser.add_argument('--shard-size', type=int, default=100, help='Expressions per shard')
+    parser.add_argument('--hopeful-file', default='../pre_consultant/hopeful_alphas.json',
+                        help='hopeful_alphas.json to feed seed leases from')
+    parser.add_argument('--lease-ttl', type=int, default=900, help='Seconds before an unrenewed lease is re-issued')
+    parser.add_argument('--state-file', default='coordinator_state.json', help='Where to checkpoint task state')
+    parser.add_argument('--results-file', default='coordinator_results.jsonl', help='Where aggregated results go')
+
+    args = parser.parse_args()
+
+    manager = LeaseManager(args.state_file, args.results_file, lease_ttl=args.lease_ttl)
+
+    if args.username and args.password:
+        import machine_lib as ml
+        brain = ml.WorldQuantBrain(args.username, args.password)
+        for pair in args.regions.split(','):
+            region, universe = pair.split(':')
+            build_expression_shards(manager, brain, region, universe, args.neut, args.shard_size)
+    else:
+        logging.info("No credentials given, only serving already queued shards and hopeful alphas")
+
+    ingest_hopeful_alphas(manager, args.hopeful_file)
+    manager.save_state(force=True)
+
+    stop_event = threading.Event()
+    threading.Thread(
+        target=maintenance_loop, args=(manager, stop_event, args.hopeful_file), daemon=True
+    ).start()
+
+    CoordinatorHandler.manager = manager
+    server = ThreadingHTTPServer((args.host, args.port), CoordinatorHandler)
+    logging.info(f"Mining coordinator listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopping mining coordinator...")
+    finally:
+        stop_event.set()
+        server.server_close()
+        manager.save_state(force=True)
+
+
+if __name__ == "__main__":
+    main()
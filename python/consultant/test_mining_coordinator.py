@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import mining_coordinator
+from mining_coordinator import SHARD, LeaseManager
+
+
+class LeaseManagerTest(unittest.TestCase):
+    """Lease expiry and reassignment of the mining coordinator. Run with ``python -m unittest`` from this folder."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.now = 1000.0
+        time_patch = patch.object(mining_coordinator.time, 'time', side_effect=lambda: self.now)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+        self.manager = self._manager()
+        self.manager.add_expressions("USA", "TOP3000", "INDUSTRY", ["rank(close)", "rank(open)"], shard_size=10)
+
+    def _manager(self) -> LeaseManager:
+        return LeaseManager(os.path.join(self.tmp_dir.name, 'state.json'),
+                            os.path.join(self.tmp_dir.name, 'results.jsonl'),
+                            lease_ttl=60, max_attempts=2)
+
+    def test_task_is_leased_to_one_worker_at_a_time(self):
+        lease = self.manager.acquire("worker-1", [SHARD])
+
+        self.assertEqual(lease["payload"]["expressions"], ["rank(close)", "rank(open)"])
+        self.assertIsNone(self.manager.acquire("worker-2", [SHARD]))
+
+    def test_heartbeat_keeps_lease_from_expiring(self):
+        lease = self.manager.acquire("worker-1", [SHARD])
+
+        self.now += 50
+        self.assertTrue(self.manager.heartbeat(lease["lease_id"]))
+        self.now += 50
+        self.assertEqual(self.manager.reap_expired(), 0)
+        self.assertIsNone(self.manager.acquire("worker-2", [SHARD]))
+
+    def test_expired_lease_is_reassigned(self):
+        lease = self.manager.acquire("worker-1", [SHARD])
+
+        self.now += 61
+        self.assertEqual(self.manager.reap_expired(), 1)
+        reassigned = self.manager.acquire("worker-2", [SHARD])
+
+        self.assertEqual(reassigned["task_id"], lease["task_id"])
+        self.assertEqual(self.manager.tasks[lease["task_id"]]["attempts"], 2)
+        # the first worker lost the lease and can no longer report it
+        self.assertFalse(self.manager.heartbeat(lease["lease_id"]))
+        self.assertFalse(self.manager.complete(lease["lease_id"], [{"id": "alpha-1"}]))
+        self.assertTrue(self.manager.complete(reassigned["lease_id"], [{"id": "alpha-2"}]))
+
+        with open(self.manager.results_file) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(record["worker_id"], record["result"]) for record in records],
+                         [("worker-2", {"id": "alpha-2"})])
+        self.assertEqual(self.manager.stats()["reissued_leases"], 1)
+
+    def test_released_task_is_reassigned_until_max_attempts(self):
+        lease = self.manager.acquire("worker-1", [SHARD])
+        self.assertTrue(self.manager.release(lease["lease_id"], "1 of 1 batches failed"))
+
+        lease = self.manager.acquire("worker-2", [SHARD])
+        self.assertIsNotNone(lease)
+        self.now += 61
+        self.manager.reap_expired()
+
+        self.assertIsNone(self.manager.acquire("worker-3", [SHARD]))
+        self.assertEqual(self.manager.tasks[lease["task_id"]]["status"], "failed")
+
+    def test_leased_tasks_are_reissued_after_restart(self):
+        lease = self.manager.acquire("worker-1", [SHARD])
+        self.manager.save_state(force=True)
+
+        restarted = self._manager()
+        reassigned = restarted.acquire("worker-2", [SHARD])
+
+        self.assertEqual(reassigned["task_id"], lease["task_id"])
+        self.assertFalse(restarted.complete(lease["lease_id"], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
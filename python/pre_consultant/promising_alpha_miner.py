@@ -12,6 +12,12 @@ from time import sleep
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import threading
+import sys
+from pathlib import Path
+
+# The coordinator client is shared with the consultant miners
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "consultant"))
+from coordinator_client import CoordinatorClient
 
 logging.basicConfig(
     level=logging.INFO,
@@ -277,8 +283,11 @@ class PromisingAlphaMiner:
         
         return alpha_data
 
-    def process_hopeful_alpha(self, alpha_data: Dict) -> bool:
-        """Process a single hopeful alpha, trying parameter variations."""
+    def process_hopeful_alpha(self, alpha_data: Dict, found: List[Dict] = None) -> bool:
+        """Process a single hopeful alpha, trying parameter variations.
+
+        Variants meeting the submission criteria are appended to ``found`` when given.
+        """
         
         cleaned_data = self.clean_expression(alpha_data)
         if not cleaned_data:
@@ -312,7 +321,16 @@ class PromisingAlphaMiner:
             for result in results:
                 if self.meets_criteria(result):
                     logging.info(f"Found successful variant in batch")
-                    if self.submit_alpha(result["id"]):
+                    submitted = self.submit_alpha(result["id"])
+                    if found is not None:
+                        found.append({
+                            "alpha_id": result["id"],
+                            "expression": result.get("regular", {}).get("code"),
+                            "sharpe": result["is"]["sharpe"],
+                            "fitness": result["is"]["fitness"],
+                            "submitted": submitted,
+                        })
+                    if submitted:
                         logging.info("Alpha submitted successfully!")
                         return True
                         
@@ -364,15 +382,50 @@ class PromisingAlphaMiner:
                 sleep(300)
                 continue
 
+    def run_worker(self, client: CoordinatorClient):
+        """Process hopeful alphas leased from a mining coordinator instead of the local file."""
+        logging.info(f"Starting promising alpha worker {client.worker_id} against {client.base_url}")
+        
+        while True:
+            try:
+                lease = client.acquire(["seed"])
+                if not lease:
+                    logging.info("No hopeful alphas leased. Waiting...")
+                    sleep(60)
+                    continue
+                
+                with client.hold(lease):
+                    alpha = lease["payload"]
+                    logging.info(f"Processing leased alpha {lease['task_id']}: {alpha['expression']}")
+                    found = []
+                    self.process_hopeful_alpha(alpha, found)
+                    client.complete(lease["lease_id"], found)
+                    
+            except KeyboardInterrupt:
+                logging.info("Stopping alpha miner worker...")
+                break
+                
+            except Exception as e:
+                logging.error(f"Error in worker loop: {str(e)}")
+                sleep(300)
+                continue
+
 def main():
     parser = argparse.ArgumentParser(description='Mine promising alphas by varying parameters')
     parser.add_argument('--credentials', type=str, default='./credential.txt',
                       help='Path to credentials file (default: ./credential.txt)')
+    parser.add_argument('--coordinator', type=str,
+                      help='Mining coordinator URL, e.g. http://host:8765 (enables worker mode)')
+    parser.add_argument('--worker-id', type=str,
+                      help='Worker name reported to the coordinator (default: hostname)')
     
     args = parser.parse_args()
     
     miner = PromisingAlphaMiner(args.credentials)
-    miner.run()
+    if args.coordinator:
+        miner.run_worker(CoordinatorClient(args.coordinator, args.worker_id))
+    else:
+        miner.run()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file